@@ -0,0 +1,163 @@
+"""
+Benchmark: asset list and valuation latency, plain vs hash-partitioned assets.
+
+Builds two copies of the assets table in a scratch schema, one laid out like
+migrations 000003-000007 and one hash-partitioned by portfolio_id like 000008,
+fills both with the same synthetic rows, then times the two asset queries of
+SQLAlchemyDataService for random portfolios:
+  - list:      WHERE portfolio_id = $1 ORDER BY id DESC LIMIT 20
+  - valuation: SELECT symbol, quantity WHERE portfolio_id = $1
+
+Needs the usual DB_* settings. At the default 100M rows, loading takes a while
+and ~30GB of disk; use --rows for a quicker run, --keep to reuse the data.
+
+Usage (from backend/python):
+    python -m benchmarks.assets_partitioning [--rows 100000000] [--samples 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src.infrastructure.config.settings import build_settings
+
+SCHEMA = "bench_partitioning"
+PARTITIONS = 32
+LOAD_CHUNK = 5_000_000
+
+DDL = [
+    f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}",
+    f"""CREATE TABLE {SCHEMA}.assets_plain (
+        id INTEGER PRIMARY KEY,
+        portfolio_id INTEGER NOT NULL,
+        symbol VARCHAR(10) NOT NULL,
+        quantity DOUBLE PRECISION NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )""",
+    f"""CREATE TABLE {SCHEMA}.assets_hash (
+        id INTEGER NOT NULL,
+        portfolio_id INTEGER NOT NULL,
+        symbol VARCHAR(10) NOT NULL,
+        quantity DOUBLE PRECISION NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (portfolio_id, id)
+    ) PARTITION BY HASH (portfolio_id)""",
+    *(
+        f"""CREATE TABLE {SCHEMA}.assets_hash_p{i:02d}
+            PARTITION OF {SCHEMA}.assets_hash
+            FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {i})"""
+        for i in range(PARTITIONS)
+    ),
+]
+
+# Created after loading, as a real deployment would have them
+INDEXES = [
+    f"CREATE INDEX ON {SCHEMA}.assets_plain (portfolio_id, id DESC)",
+    f"""CREATE INDEX ON {SCHEMA}.assets_plain (portfolio_id)
+        INCLUDE (symbol, quantity)""",
+    f"""CREATE INDEX ON {SCHEMA}.assets_hash (portfolio_id)
+        INCLUDE (symbol, quantity)""",
+]
+
+LIST_SQL = """SELECT id, portfolio_id, symbol, quantity, created_at
+    FROM {table} WHERE portfolio_id = :portfolio_id ORDER BY id DESC LIMIT 20"""
+VALUATION_SQL = (
+    "SELECT symbol, quantity FROM {table} WHERE portfolio_id = :portfolio_id"
+)
+
+
+async def _load(conn: AsyncConnection, rows: int, portfolios: int) -> None:
+    symbols = "ARRAY['BTC','ETH','SOL','ADA','DOT','XRP','AAPL','MSFT','TSLA','NVDA']"
+    for start in range(1, rows + 1, LOAD_CHUNK):
+        stop = min(start + LOAD_CHUNK - 1, rows)
+        for table in ("assets_plain", "assets_hash"):
+            await conn.execute(
+                text(
+                    f"""INSERT INTO {SCHEMA}.{table} (id, portfolio_id, symbol, quantity)
+                    SELECT g, 1 + (hashint4(g) & 2147483647) % :portfolios,
+                           ({symbols})[1 + g % 10], random() * 100
+                    FROM generate_series(:start, :stop) AS g"""
+                ),
+                {"portfolios": portfolios, "start": start, "stop": stop},
+            )
+        print(f"  loaded {stop:,} / {rows:,} rows")
+    for statement in INDEXES:
+        await conn.execute(text(statement))
+    for table in ("assets_plain", "assets_hash"):
+        await conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.{table}"))
+
+
+async def _time(
+    conn: AsyncConnection, sql: str, portfolio_ids: list[int]
+) -> tuple[float, float, float]:
+    """p50/p95/p99 latency in milliseconds."""
+    statement = text(sql)
+    for portfolio_id in portfolio_ids[:100]:  # warm-up, prepares the statement
+        await conn.execute(statement, {"portfolio_id": portfolio_id})
+    latencies = []
+    for portfolio_id in portfolio_ids:
+        start = time.perf_counter()
+        (await conn.execute(statement, {"portfolio_id": portfolio_id})).all()
+        latencies.append((time.perf_counter() - start) * 1000)
+    q = statistics.quantiles(latencies, n=100)
+    return q[49], q[94], q[98]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000_000)
+    parser.add_argument("--assets-per-portfolio", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument(
+        "--keep", action="store_true", help="keep (and reuse) the loaded schema"
+    )
+    args = parser.parse_args()
+    portfolios = max(args.rows // args.assets_per_portfolio, 1)
+
+    settings = build_settings()
+    engine = create_async_engine(
+        settings.database_url,
+        connect_args={"ssl": settings.asyncpg_ssl},
+        isolation_level="AUTOCOMMIT",  # VACUUM can't run in a transaction
+    )
+    try:
+        async with engine.connect() as conn:
+            loaded = (
+                await conn.execute(
+                    text("SELECT to_regclass(:table) IS NOT NULL"),
+                    {"table": f"{SCHEMA}.assets_hash"},
+                )
+            ).scalar()
+            if not loaded:
+                print(f"Loading {args.rows:,} rows over {portfolios:,} portfolios")
+                for statement in DDL:
+                    await conn.execute(text(statement))
+                await _load(conn, args.rows, portfolios)
+
+            portfolio_ids = [random.randint(1, portfolios) for _ in range(args.samples)]
+            print(f"{'query':<12}{'table':<14}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+            for name, sql in (("list", LIST_SQL), ("valuation", VALUATION_SQL)):
+                for table in ("assets_plain", "assets_hash"):
+                    p50, p95, p99 = await _time(
+                        conn, sql.format(table=f"{SCHEMA}.{table}"), portfolio_ids
+                    )
+                    print(f"{name:<12}{table:<14}{p50:>9.3f}{p95:>9.3f}{p99:>9.3f}")
+
+            if not args.keep:
+                await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
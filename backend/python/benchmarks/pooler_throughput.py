@@ -0,0 +1,101 @@
+"""
+Benchmark: read throughput directly against Postgres vs through PgBouncer.
+
+Runs `--concurrency` workers calling get_portfolio for `--seconds` with each
+engine configuration:
+  - direct:              DB_POOLER_MODE=none, app pool + pre-ping
+  - pgbouncer:           DB_POOLER_MODE=transaction, app pool, no statement cache
+  - pgbouncer+nullpool:  DB_POOLER_MODE=transaction, DB_POOLER_NULLPOOL=true
+
+Needs the usual DB_* settings for a migrated database, plus a transaction-mode
+pgbouncer in front of it (e.g. the one from the CI workflow on port 6432).
+
+Usage (from backend/python):
+    PGBOUNCER_PORT=6432 python -m benchmarks.pooler_throughput [--seconds 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from sqlalchemy import delete, insert
+
+from src.domain.usecases.portfoliomgt.payloads import PortfolioCreate
+from src.infrastructure.config.settings import Settings, build_settings
+from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
+    SQLAlchemyDataService,
+)
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
+from src.infrastructure.datastore.sqlalchemy.models.user import User as UserModel
+
+
+async def _run(settings: Settings, seconds: float, concurrency: int) -> float:
+    """Requests per second for get_portfolio with the given engine settings."""
+    base_mod.build_engine(settings=settings)
+    ds = SQLAlchemyDataService()
+    owner_id = uuid.uuid4()
+    async with base_mod.session_scope() as session:
+        await session.execute(
+            insert(UserModel).values(
+                id=owner_id, email=f"bench-{owner_id}@test.com", password_hash="x"
+            )
+        )
+        await session.commit()
+    try:
+        portfolio = await ds.create_portfolio(
+            owner_id=str(owner_id), payload=PortfolioCreate(name="bench")
+        )
+        deadline = time.perf_counter() + seconds
+        done = 0
+
+        async def worker() -> None:
+            nonlocal done
+            while time.perf_counter() < deadline:
+                await ds.get_portfolio(
+                    owner_id=str(owner_id), portfolio_id=portfolio.id
+                )
+                done += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return done / (time.perf_counter() - start)
+    finally:
+        async with base_mod.session_scope() as session:
+            await session.execute(delete(UserModel).where(UserModel.id == owner_id))
+            await session.commit()
+        await base_mod.engine.dispose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--pgbouncer-port", type=int, default=int(os.getenv("PGBOUNCER_PORT", "6432"))
+    )
+    args = parser.parse_args()
+
+    direct = build_settings()
+    pgbouncer = direct.model_copy(
+        update={"db_port": args.pgbouncer_port, "db_pooler_mode": "transaction"}
+    )
+    nullpool = pgbouncer.model_copy(update={"db_pooler_nullpool": True})
+
+    print(f"{'mode':<22}{'req/s':>10}")
+    for name, settings in [
+        ("direct", direct),
+        ("pgbouncer", pgbouncer),
+        ("pgbouncer+nullpool", nullpool),
+    ]:
+        rps = await _run(settings, args.seconds, args.concurrency)
+        print(f"{name:<22}{rps:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""
+Benchmark: SQLite (DB_BACKEND=sqlite) vs Postgres throughput, same workload.
+
+Runs `--concurrency` workers for `--seconds` against SQLAlchemyDataService, each
+request being a write (create_asset) with probability `--write-ratio` and
+otherwise a read (get_portfolio or list_assets_paginated, alternately). Reports
+requests/s and read/write p99 for each backend.
+
+SQLite uses a fresh database built from database/migrations-sqlite in a
+temporary directory (or --sqlite-path). Postgres needs the usual DB_* settings
+for a migrated database; leave it out with --backends sqlite.
+
+Usage (from backend/python):
+    python -m benchmarks.sqlite_throughput [--seconds 10] [--write-ratio 0.1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from sqlalchemy import delete, insert
+
+from src.domain.usecases.portfoliomgt.payloads import AssetCreate, PortfolioCreate
+from src.infrastructure.config.settings import Settings, build_settings
+from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
+    SQLAlchemyDataService,
+)
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
+from src.infrastructure.datastore.sqlalchemy.models.user import User as UserModel
+from src.infrastructure.utils.pagination import PaginationRequest
+
+SQLITE_MIGRATIONS = Path(__file__).parents[3] / "database" / "migrations-sqlite"
+
+
+def _migrate_sqlite(path: Path) -> None:
+    with sqlite3.connect(path) as conn:
+        for migration in sorted(SQLITE_MIGRATIONS.glob("*.up.sql")):
+            conn.executescript(migration.read_text())
+
+
+async def _run(
+    settings: Settings, seconds: float, concurrency: int, write_ratio: float
+) -> tuple[float, float, float]:
+    """Requests/s, read p99 ms and write p99 ms."""
+    base_mod.build_engine(settings=settings)
+    ds = SQLAlchemyDataService()
+    owner_id = uuid.uuid4()
+    async with base_mod.session_scope() as session:
+        await session.execute(
+            insert(UserModel).values(
+                id=owner_id, email=f"bench-{owner_id}@test.com", password_hash="x"
+            )
+        )
+        await session.commit()
+    try:
+        owner = str(owner_id)
+        portfolio = await ds.create_portfolio(owner, PortfolioCreate(name="bench"))
+        for _ in range(20):
+            await ds.create_asset(owner, portfolio.id, AssetCreate("BTC", 1.0))
+        page = PaginationRequest(items_per_page=20, page=1)
+        reads: list[float] = []
+        writes: list[float] = []
+        deadline = time.perf_counter() + seconds
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                if random.random() < write_ratio:
+                    await ds.create_asset(owner, portfolio.id, AssetCreate("ETH", 1.0))
+                    writes.append(time.perf_counter() - start)
+                elif len(reads) % 2:
+                    await ds.get_portfolio(owner, portfolio.id)
+                    reads.append(time.perf_counter() - start)
+                else:
+                    await ds.list_assets_paginated(owner, portfolio.id, page)
+                    reads.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        rps = (len(reads) + len(writes)) / (time.perf_counter() - start)
+
+        def p99(latencies: list[float]) -> float:
+            if len(latencies) < 2:
+                return float("nan")
+            return statistics.quantiles(latencies, n=100)[98] * 1000
+
+        return rps, p99(reads), p99(writes)
+    finally:
+        async with base_mod.session_scope() as session:
+            await session.execute(delete(UserModel).where(UserModel.id == owner_id))
+            await session.commit()
+        await base_mod.engine.dispose()
+        if base_mod.read_engine is not None:
+            await base_mod.read_engine.dispose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--backends", default="sqlite,postgres")
+    parser.add_argument("--sqlite-path", type=Path)
+    args = parser.parse_args()
+
+    print(f"{'backend':<12}{'req/s':>10}{'read p99 ms':>14}{'write p99 ms':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends.split(","):
+            settings = build_settings().model_copy(update={"db_backend": backend})
+            if backend == "sqlite":
+                path = args.sqlite_path or Path(tmp) / "portfolio.db"
+                if not path.exists():
+                    _migrate_sqlite(path)
+                settings = settings.model_copy(update={"db_sqlite_path": str(path)})
+            rps, read_p99, write_p99 = await _run(
+                settings, args.seconds, args.concurrency, args.write_ratio
+            )
+            print(f"{backend:<12}{rps:>10.0f}{read_p99:>14.2f}{write_p99:>15.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Microbenchmark: Python-side overhead per query for the hot statements.
+
+Compares building the select() construct on every call (what the data services
+used to do) with executing the module-level statements and their bound
+parameters. Runs against an in-memory SQLite database so that driver and network
+time stay negligible and the difference is the SQLAlchemy overhead.
+
+Usage (from backend/python):
+    python -m benchmarks.statement_overhead [--iterations 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+import uuid
+from collections.abc import Callable
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from sqlalchemy import create_engine, insert, select
+
+from src.infrastructure.dataservice.auth_local.local import (
+    GET_USER_BY_ID_STMT,
+)
+from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
+    GET_PORTFOLIO_STMT,
+    LIST_ASSETS_STMT,
+)
+from src.infrastructure.datastore.sqlalchemy.base import Base
+from src.infrastructure.datastore.sqlalchemy.models.asset import Asset as AssetModel
+from src.infrastructure.datastore.sqlalchemy.models.portfolio import (
+    Portfolio as PortfolioModel,
+)
+from src.infrastructure.datastore.sqlalchemy.models.user import User as UserModel
+
+
+def _timeit(fn: Callable[[], object], iterations: int) -> float:
+    """Mean microseconds per call, after a warm-up that fills the compiled cache."""
+    for _ in range(min(iterations, 500)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    user_id = uuid.uuid4()
+    with engine.begin() as conn:
+        conn.execute(
+            insert(UserModel).values(id=user_id, email="a@b.c", password_hash="x")
+        )
+        portfolio_id = conn.execute(
+            insert(PortfolioModel)
+            .values(name="bench", owner_id=user_id)
+            .returning(PortfolioModel.id)
+        ).scalar_one()
+        conn.execute(
+            insert(AssetModel),
+            [
+                {"portfolio_id": portfolio_id, "symbol": "BTC", "quantity": 1.0}
+                for _ in range(10)
+            ],
+        )
+
+    conn = engine.connect()
+
+    def get_portfolio_inline():
+        conn.execute(
+            select(PortfolioModel).where(
+                PortfolioModel.owner_id == user_id,
+                PortfolioModel.id == portfolio_id,
+            )
+        ).all()
+
+    def get_portfolio_prebuilt():
+        conn.execute(
+            GET_PORTFOLIO_STMT, {"owner_id": user_id, "portfolio_id": portfolio_id}
+        ).all()
+
+    def list_assets_inline():
+        conn.execute(
+            select(AssetModel)
+            .join(PortfolioModel, AssetModel.portfolio_id == PortfolioModel.id)
+            .where(
+                PortfolioModel.owner_id == user_id,
+                AssetModel.portfolio_id == portfolio_id,
+            )
+        ).all()
+
+    def list_assets_prebuilt():
+        conn.execute(
+            LIST_ASSETS_STMT, {"owner_id": user_id, "portfolio_id": portfolio_id}
+        ).all()
+
+    def get_user_inline():
+        conn.execute(select(UserModel).where(UserModel.id == user_id)).all()
+
+    def get_user_prebuilt():
+        conn.execute(GET_USER_BY_ID_STMT, {"user_id": user_id}).all()
+
+    cases = [
+        ("get_portfolio", get_portfolio_inline, get_portfolio_prebuilt),
+        ("list_assets", list_assets_inline, list_assets_prebuilt),
+        ("get_user_from_token", get_user_inline, get_user_prebuilt),
+    ]
+    print(f"{'query':<22}{'inline (us)':>14}{'prebuilt (us)':>16}{'saved':>9}")
+    for name, inline, prebuilt in cases:
+        before = _timeit(inline, args.iterations)
+        after = _timeit(prebuilt, args.iterations)
+        saved = (before - after) / before * 100
+        print(f"{name:<22}{before:>14.1f}{after:>16.1f}{saved:>8.1f}%")
+
+    conn.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
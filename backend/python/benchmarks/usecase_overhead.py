@@ -0,0 +1,86 @@
+"""
+Microbenchmark: Python-side overhead of the PortfolioMgt use cases.
+
+Runs the use cases on InMemoryDbDataService (DB_BACKEND=memory), so the timings
+are the domain layer plus a dict lookup, without driver, network or database
+time. Useful as the baseline the data-service benchmarks are compared against.
+
+Usage (from backend/python):
+    python -m benchmarks.usecase_overhead [--iterations 20000] [--assets 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from src.domain.usecases.portfoliomgt.payloads import AssetCreate, PortfolioCreate
+from src.domain.usecases.portfoliomgt.portfoliomgt import (
+    ASSET_PRICES_USD,
+    PortfolioMgt,
+)
+from src.infrastructure.dataservice.db_memory.memory import InMemoryDbDataService
+from src.infrastructure.utils.pagination import PaginationRequest
+
+
+async def _timeit(fn: Callable[[], Awaitable[object]], iterations: int) -> float:
+    """Mean microseconds per call, after a warm-up."""
+    for _ in range(min(iterations, 500)):
+        await fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--assets", type=int, default=20)
+    args = parser.parse_args()
+
+    uc = PortfolioMgt(data_service=InMemoryDbDataService())
+    owner_id = str(uuid.uuid4())
+    portfolio = await uc.create_portfolio(owner_id, PortfolioCreate(name="bench"))
+    symbols = list(ASSET_PRICES_USD)
+    for i in range(args.assets):
+        await uc.create_asset(
+            owner_id,
+            portfolio.id,
+            AssetCreate(symbol=symbols[i % len(symbols)], quantity=1.0),
+        )
+    page = PaginationRequest(items_per_page=20, page=1)
+
+    async def valuation_uncached():
+        uc.valuation_cache.clear()
+        await uc.compute_portfolio_valuation(owner_id, portfolio.id)
+
+    cases = [
+        ("get_portfolio", lambda: uc.get_portfolio(owner_id, portfolio.id)),
+        (
+            "list_portfolios_paginated",
+            lambda: uc.list_portfolios_paginated(owner_id, page),
+        ),
+        (
+            "list_assets_paginated",
+            lambda: uc.list_assets_paginated(owner_id, portfolio.id, page),
+        ),
+        ("valuation (uncached)", valuation_uncached),
+        (
+            "valuation (cached)",
+            lambda: uc.compute_portfolio_valuation(owner_id, portfolio.id),
+        ),
+    ]
+    print(f"{'use case':<28}{'us/call':>10}")
+    for name, fn in cases:
+        print(f"{name:<28}{await _timeit(fn, args.iterations):>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
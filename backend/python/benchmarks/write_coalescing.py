@@ -0,0 +1,150 @@
+"""
+Benchmark: create_asset throughput and latency with and without group commit
+(DB_WRITE_COALESCING).
+
+Runs `--concurrency` workers for `--seconds`, each inserting assets back to back,
+first with one transaction per create_asset, then coalesced with each
+`--max-wait-ms` value (DB_WRITE_BATCH_MAX_WAIT_MS). Reports writes/s, p50/p99
+latency and the mean rows per commit.
+
+SQLite uses a fresh database built from database/migrations-sqlite in a
+temporary directory. Postgres needs the usual DB_* settings for a migrated
+database; leave it out with --backends sqlite.
+
+Usage (from backend/python):
+    python -m benchmarks.write_coalescing [--seconds 5] [--concurrency 64]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from sqlalchemy import delete, event, insert
+
+from src.domain.usecases.portfoliomgt.payloads import AssetCreate, PortfolioCreate
+from src.infrastructure.config.settings import Settings, build_settings
+from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
+    SQLAlchemyDataService,
+)
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
+from src.infrastructure.datastore.sqlalchemy.models.user import User as UserModel
+
+SQLITE_MIGRATIONS = Path(__file__).parents[3] / "database" / "migrations-sqlite"
+
+
+def _migrate_sqlite(path: Path) -> None:
+    with sqlite3.connect(path) as conn:
+        for migration in sorted(SQLITE_MIGRATIONS.glob("*.up.sql")):
+            conn.executescript(migration.read_text())
+
+
+async def _run(
+    ds: SQLAlchemyDataService, seconds: float, concurrency: int
+) -> tuple[float, float, float, float]:
+    """Writes/s, p50 ms, p99 ms and rows per commit."""
+    owner_id = uuid.uuid4()
+    async with base_mod.session_scope() as session:
+        await session.execute(
+            insert(UserModel).values(
+                id=owner_id, email=f"bench-{owner_id}@test.com", password_hash="x"
+            )
+        )
+        await session.commit()
+    commits = 0
+
+    def count_commit(conn) -> None:
+        nonlocal commits
+        commits += 1
+
+    event.listen(base_mod.engine.sync_engine, "commit", count_commit)
+    try:
+        owner = str(owner_id)
+        portfolio = await ds.create_portfolio(owner, PortfolioCreate(name="bench"))
+        latencies: list[float] = []
+        deadline = time.perf_counter() + seconds
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await ds.create_asset(owner, portfolio.id, AssetCreate("BTC", 1.0))
+                latencies.append(time.perf_counter() - start)
+
+        commits = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        quantiles = statistics.quantiles(latencies, n=100)
+        return (
+            len(latencies) / elapsed,
+            quantiles[49] * 1000,
+            quantiles[98] * 1000,
+            len(latencies) / max(commits, 1),
+        )
+    finally:
+        event.remove(base_mod.engine.sync_engine, "commit", count_commit)
+        async with base_mod.session_scope() as session:
+            await session.execute(delete(UserModel).where(UserModel.id == owner_id))
+            await session.commit()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", default="0,1,2,5")
+    parser.add_argument("--backends", default="sqlite,postgres")
+    args = parser.parse_args()
+
+    modes: list[tuple[str, SQLAlchemyDataService]] = [
+        ("per-call commit", SQLAlchemyDataService())
+    ]
+    for wait in args.max_wait_ms.split(","):
+        ds = SQLAlchemyDataService(
+            coalesce_writes=True,
+            write_batch_max_size=args.max_batch_size,
+            write_batch_max_wait_ms=float(wait),
+        )
+        modes.append((f"coalesced {wait}ms", ds))
+
+    print(
+        f"{'backend':<10}{'mode':<18}{'writes/s':>10}{'p50 ms':>9}"
+        f"{'p99 ms':>9}{'rows/commit':>13}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends.split(","):
+            settings: Settings = build_settings().model_copy(
+                update={"db_backend": backend, "db_query_profiler": False}
+            )
+            if backend == "sqlite":
+                path = Path(tmp) / "portfolio.db"
+                _migrate_sqlite(path)
+                settings = settings.model_copy(update={"db_sqlite_path": str(path)})
+            base_mod.build_engine(settings=settings)
+            try:
+                for name, ds in modes:
+                    rps, p50, p99, per_commit = await _run(
+                        ds, args.seconds, args.concurrency
+                    )
+                    print(
+                        f"{backend:<10}{name:<18}{rps:>10.0f}{p50:>9.2f}"
+                        f"{p99:>9.2f}{per_commit:>13.1f}"
+                    )
+            finally:
+                await base_mod.engine.dispose()
+                if base_mod.read_engine is not None:
+                    await base_mod.read_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,34 @@
 from __future__ import annotations
 
+import math
 from contextlib import asynccontextmanager
 
 import structlog
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from src.api.rest.deadline import ClientDisconnectedError, request_deadline
+from src.api.rest.dependencies import db_request_scope
+from src.api.rest.routers.admin import router as admin_router
 from src.api.rest.routers.assets import router as assets_router
 from src.api.rest.routers.auth import router as auth_router
 from src.api.rest.routers.health import router as health_router
 from src.api.rest.routers.portfolios import router as portfolios_router
 from src.domain.usecases.usecases import UseCases
 from src.infrastructure.config.settings import Settings
+from src.infrastructure.dataservice.db_sharded.exceptions import OwnerMovingError
+from src.infrastructure.datastore.sqlalchemy.exceptions import DeadlineExceededError
+from src.infrastructure.datastore.sqlalchemy.pool_controller import (
+    start_pool_controller,
+    stop_pool_controller,
+)
+from src.infrastructure.datastore.sqlalchemy.pool_validation import (
+    start_pool_validation,
+    stop_pool_validation,
+)
+from src.infrastructure.datastore.sqlalchemy.purge import start_purger, stop_purger
+from src.infrastructure.datastore.sqlalchemy.symbols import load_symbols
 from src.infrastructure.observability import shutdown_observability
 from src.infrastructure.observability.middleware import RequestLoggingMiddleware
 from src.infrastructure.observability.setup import instrument_app
@@ -21,7 +38,34 @@ logger = structlog.get_logger("app")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    settings: Settings = app.state.settings
+    if settings.db_backend != "memory":
+        try:
+            await load_symbols()
+        except Exception:
+            # loaded on first use instead
+            logger.exception("db_symbols_load_failed")
+    if settings.db_pool_validation == "background":
+        start_pool_validation(settings.db_pool_validation_interval)
+    # DB_BACKEND=memory deletes portfolios right away, there's nothing to purge
+    if settings.db_purge_enabled and settings.db_backend != "memory":
+        start_purger(
+            settings.db_purge_interval,
+            batch_size=settings.db_purge_batch_size,
+            pause=settings.db_purge_pause,
+        )
+    # SQLite has a single writer connection, there's nothing to size
+    if settings.db_pool_adaptive and settings.db_backend == "postgres":
+        start_pool_controller(
+            settings.db_pool_adapt_interval,
+            ceiling=settings.db_pool_size + settings.db_max_overflow,
+            target_wait_ms=settings.db_pool_target_wait_ms,
+            budget=settings.db_pool_global_budget,
+        )
     yield
+    await stop_pool_controller()
+    await stop_purger()
+    await stop_pool_validation()
     shutdown_observability()
 
 
@@ -30,6 +74,9 @@ def create_app(settings: Settings, usecases: UseCases) -> FastAPI:
         title=settings.app_name,
         version="1.0.0",
         lifespan=lifespan,
+        # app-level dependencies run first, so get_current_user shares them too.
+        # The deadline is inside the scope: it's over before connections return.
+        dependencies=[Depends(db_request_scope), Depends(request_deadline)],
     )
 
     app.state.settings = settings
@@ -47,12 +94,39 @@ def create_app(settings: Settings, usecases: UseCases) -> FastAPI:
     )
 
     # Request logging middleware (runs after CORS)
-    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(
+        RequestLoggingMiddleware, track_db_queries=settings.db_query_stats
+    )
+
+    # a write during a shard move (DB_SHARDS): retry once the move is done
+    retry_after = str(max(math.ceil(settings.db_shard_map_ttl), 1))
+
+    @app.exception_handler(OwnerMovingError)
+    async def owner_moving(request: Request, exc: OwnerMovingError) -> JSONResponse:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(exc)},
+            headers={"Retry-After": retry_after},
+        )
+
+    @app.exception_handler(DeadlineExceededError)
+    async def deadline_exceeded(
+        request: Request, exc: DeadlineExceededError
+    ) -> JSONResponse:
+        return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+    @app.exception_handler(ClientDisconnectedError)
+    async def client_disconnected(
+        request: Request, exc: ClientDisconnectedError
+    ) -> JSONResponse:
+        # nobody reads it: the status is for the request log (nginx's 499)
+        return JSONResponse(status_code=499, content={"detail": str(exc)})
 
     app.include_router(health_router)
     app.include_router(auth_router)
     app.include_router(portfolios_router)
     app.include_router(assets_router)
+    app.include_router(admin_router)
 
     # OTel FastAPI instrumentation (spans + metrics per route)
     if settings.otel_enabled:
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from fastapi import Depends, Request
+from sqlalchemy.exc import DBAPIError
+
+from src.infrastructure.datastore.sqlalchemy.base import reset_deadline, set_deadline
+from src.infrastructure.datastore.sqlalchemy.exceptions import DeadlineExceededError
+
+# seconds, shortens the route's timeout (never extends it)
+TIMEOUT_HEADER = "X-Request-Timeout"
+# Postgres query_canceled: statement_timeout (or a cancel request) hit
+_QUERY_CANCELED = "57014"
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client went away before the response was ready."""
+
+    def __init__(self, msg="Client disconnected", *args, **kwargs):
+        super().__init__(msg, *args, **kwargs)
+
+
+class RequestDeadline:
+    """Deadline of one request (see request_deadline): when it passes, the
+    request's task is cancelled, so are its in-flight queries."""
+
+    def __init__(self, timeout: asyncio.Timeout, requested: float | None) -> None:
+        self._timeout = timeout
+        self.requested = requested
+
+    def set_timeout(self, timeout: float | None) -> None:
+        """Restart the deadline at `timeout` seconds from now (None: none), or
+        at the client's timeout if shorter."""
+        if self.requested is not None:
+            timeout = (
+                self.requested if timeout is None else min(timeout, self.requested)
+            )
+        if timeout is None:
+            self._timeout.reschedule(None)
+            set_deadline(None)
+            return
+        self._timeout.reschedule(asyncio.get_running_loop().time() + timeout)
+        set_deadline(time.monotonic() + timeout)
+
+
+def _requested_timeout(request: Request) -> float | None:
+    try:
+        timeout = float(request.headers.get(TIMEOUT_HEADER, ""))
+    except ValueError:
+        return None
+    return timeout if timeout > 0 else None
+
+
+async def _cancel_on_disconnect(request: Request, task: asyncio.Task) -> None:
+    # the body was read before the dependencies ran: next comes the disconnect,
+    # or the end of the request (this watcher is cancelled first)
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+    task.cancel()
+
+
+async def request_deadline(request: Request) -> AsyncGenerator[None, None]:
+    """Run the request under a deadline: REQUEST_TIMEOUT (or the route's, see
+    route_timeout), shortened by the X-Request-Timeout header. It's cancelled
+    when it passes (504) or when the client disconnects."""
+    settings = request.app.state.settings
+    task = asyncio.current_task()
+    assert task is not None
+    watcher = asyncio.create_task(_cancel_on_disconnect(request, task))
+    token = set_deadline(None)
+    try:
+        async with asyncio.timeout(None) as timeout:
+            deadline = RequestDeadline(timeout, _requested_timeout(request))
+            deadline.set_timeout(settings.request_timeout or None)
+            request.state.deadline = deadline
+            yield
+    except TimeoutError as e:
+        raise DeadlineExceededError from e
+    except DBAPIError as e:
+        if getattr(e.orig, "sqlstate", None) != _QUERY_CANCELED:
+            raise
+        raise DeadlineExceededError from e
+    except asyncio.CancelledError as e:
+        if watcher.done() and not watcher.cancelled() and task.uncancel() == 0:
+            raise ClientDisconnectedError from e
+        raise
+    finally:
+        watcher.cancel()
+        reset_deadline(token)
+
+
+def route_timeout(timeout: float) -> Any:
+    """Route dependency replacing REQUEST_TIMEOUT for the route, e.g.
+    `@router.get(..., dependencies=[route_timeout(5)])`."""
+
+    # async: a sync dependency would run in a thread, outside the request context
+    async def set_route_timeout(request: Request) -> None:
+        request.state.deadline.set_timeout(timeout)
+
+    return Depends(set_route_timeout)
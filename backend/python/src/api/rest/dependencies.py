@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import AsyncGenerator
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, Request
@@ -7,6 +8,7 @@ from fastapi import Depends, HTTPException, Request
 from src.domain.aggregates.auth.user import User
 from src.domain.usecases.usecases import UseCases
 from src.infrastructure.config.settings import Settings
+from src.infrastructure.datastore.sqlalchemy.base import request_scope
 
 
 def get_settings(request: Request) -> Settings:
@@ -17,6 +19,13 @@ def get_usecases(request: Request) -> UseCases:
     return request.app.state.usecases
 
 
+async def db_request_scope() -> AsyncGenerator[None, None]:
+    """Unit of work: the DB connection is checked out on first use, shared by
+    the auth and portfolio data services and released after the response."""
+    async with request_scope():
+        yield
+
+
 async def get_current_user(request: Request) -> User:
     token = request.cookies.get("access_token")
     if not token:
@@ -29,6 +38,13 @@ async def get_current_user(request: Request) -> User:
     return user
 
 
+async def get_admin_user(request: Request, user: CurrentUser) -> User:
+    if user.email.lower() not in request.app.state.settings.admin_emails:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return user
+
+
 SettingsDep = Annotated[Settings, Depends(get_settings)]
 UseCasesDep = Annotated[UseCases, Depends(get_usecases)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
+AdminUser = Annotated[User, Depends(get_admin_user)]
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+
+from fastapi import APIRouter, Query
+
+from src.api.rest.dependencies import AdminUser
+from src.api.rest.schemas.admin import QueryProfileResponse
+from src.infrastructure.observability.db_profiler import profiler
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/db/queries", response_model=list[QueryProfileResponse])
+async def get_query_profiles(_: AdminUser, limit: int = Query(50, ge=1, le=1000)):
+    """SQL fingerprints of this process, by total time spent."""
+    return [QueryProfileResponse(**asdict(p)) for p in profiler.profiles(limit)]
+
+
+@router.delete("/db/queries", status_code=204)
+async def reset_query_profiles(_: AdminUser):
+    profiler.reset()
@@ -3,10 +3,19 @@ from __future__ import annotations
 from fastapi import APIRouter, HTTPException, Query
 
 from src.api.rest.dependencies import CurrentUser, UseCasesDep
-from src.api.rest.schemas.asset import AssetCreateRequest, AssetResponse
+from src.api.rest.schemas.asset import (
+    AssetCreateRequest,
+    AssetPatchRequest,
+    AssetResponse,
+)
 from src.api.rest.schemas.common import ListResponse
-from src.domain.aggregates.exceptions.portfolio import PortfolioNotFound
-from src.domain.usecases.portfoliomgt.portfoliomgt import AssetCreate
+from src.domain.aggregates.exceptions.portfolio import (
+    AssetNotFound,
+    InsufficientQuantityError,
+    PortfolioNotFound,
+    SymbolLimitError,
+)
+from src.domain.usecases.portfoliomgt.portfoliomgt import AssetCreate, AssetUpdate
 from src.infrastructure.utils.pagination import PaginationRequest
 
 router = APIRouter(tags=["assets"])
@@ -27,21 +36,22 @@ async def add_asset(
     user: CurrentUser,
     ucs: UseCasesDep,
 ):
-    # Ensure portfolio belongs to user
-    p = await ucs.portfolio_mgt.get_portfolio(
-        owner_id=user.id, portfolio_id=portfolio_id
-    )
-    if not p:
+    # Ownership is enforced by the insert itself: nothing is created if the
+    # portfolio doesn't belong to the user
+    try:
+        a = await ucs.portfolio_mgt.create_asset(
+            owner_id=user.id,
+            portfolio_id=portfolio_id,
+            payload=AssetCreate(
+                symbol=payload.symbol,
+                quantity=payload.quantity,
+            ),
+        )
+    except SymbolLimitError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    if not a:
         raise HTTPException(status_code=404, detail=str(PortfolioNotFound()))
 
-    a = await ucs.portfolio_mgt.create_asset(
-        payload=AssetCreate(
-            symbol=payload.symbol,
-            quantity=payload.quantity,
-        ),
-        portfolio_id=portfolio_id,
-    )
-
     return AssetResponse(
         id=a.id,
         portfolio_id=a.portfolio_id,
@@ -61,17 +71,14 @@ async def list_assets(
     page: int = Query(1, ge=1),
     items_per_page: int = Query(20, ge=1, le=100),
 ):
-    # Effectively checking if the asset's portfolio is owned by the user
-    p = await ucs.portfolio_mgt.get_portfolio(
-        owner_id=user.id, portfolio_id=portfolio_id
-    )
-    if not p:
-        raise HTTPException(status_code=404, detail=str(PortfolioNotFound()))
-
-    items, page_res = await ucs.portfolio_mgt.list_assets_paginated(
+    res = await ucs.portfolio_mgt.list_assets_paginated(
+        owner_id=user.id,
         portfolio_id=portfolio_id,
         pagination_request=PaginationRequest(page=page, items_per_page=items_per_page),
     )
+    if res is None:
+        raise HTTPException(status_code=404, detail=str(PortfolioNotFound()))
+    items, page_res = res
 
     return ListResponse(
         items=[
@@ -88,21 +95,49 @@ async def list_assets(
     )
 
 
-@router.delete("/portfolios/{portfolio_id}/assets/{asset_id}", status_code=204)
-async def delete_asset(
+@router.patch(
+    "/portfolios/{portfolio_id}/assets/{asset_id}",
+    response_model=AssetResponse,
+    status_code=200,
+)
+async def update_asset(
     portfolio_id: int,
     asset_id: int,
+    payload: AssetPatchRequest,
     user: CurrentUser,
     ucs: UseCasesDep,
 ):
-    p = await ucs.portfolio_mgt.get_portfolio(
-        owner_id=user.id, portfolio_id=portfolio_id
+    # One ownership-scoped UPDATE: the position keeps its id and created_at
+    try:
+        a = await ucs.portfolio_mgt.update_asset(
+            owner_id=user.id,
+            portfolio_id=portfolio_id,
+            asset_id=asset_id,
+            payload=AssetUpdate(quantity=payload.quantity, delta=payload.delta),
+        )
+    except InsufficientQuantityError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    if not a:
+        raise HTTPException(status_code=404, detail=str(AssetNotFound()))
+
+    return AssetResponse(
+        id=a.id,
+        portfolio_id=a.portfolio_id,
+        symbol=a.symbol,
+        quantity=a.quantity,
+        created_at=a.created_at,
     )
-    if not p:
-        raise HTTPException(status_code=404, detail=str(PortfolioNotFound()))
 
+
+@router.delete("/portfolios/{portfolio_id}/assets/{asset_id}", status_code=204)
+async def delete_asset(
+    portfolio_id: int,
+    asset_id: int,
+    user: CurrentUser,
+    ucs: UseCasesDep,
+):
     ok = await ucs.portfolio_mgt.delete_asset(
-        portfolio_id=portfolio_id, asset_id=asset_id
+        owner_id=user.id, portfolio_id=portfolio_id, asset_id=asset_id
     )
     if not ok:
-        raise HTTPException(status_code=404, detail="Asset not found")
+        raise HTTPException(status_code=404, detail=str(AssetNotFound()))
@@ -4,13 +4,20 @@ from fastapi import APIRouter
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
+from src.api.rest.deadline import route_timeout
 from src.api.rest.dependencies import UseCasesDep
 from src.api.rest.schemas.health import Health
 
 router = APIRouter(tags=["health"])
 
 
-@router.get("/health", response_model=Health, status_code=200)
+# a probe gets its answer (or a 504) before the orchestrator gives up on it
+@router.get(
+    "/health",
+    response_model=Health,
+    status_code=200,
+    dependencies=[route_timeout(5)],
+)
 async def get_health(ucs: UseCasesDep):
     auth_health = await ucs.auth_mgt.health_check()
     portfolio_health = await ucs.portfolio_mgt.health_check()
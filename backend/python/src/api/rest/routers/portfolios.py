@@ -28,13 +28,15 @@ async def create_portfolio(
 ):
     uc = ucs.portfolio_mgt
     portfolio = await uc.create_portfolio(
-        owner_id=user.id, payload=PortfolioCreate(name=payload.name)
+        owner_id=user.id,
+        payload=PortfolioCreate(name=payload.name, consolidated=payload.consolidated),
     )
     return PortfolioResponse(
         id=portfolio.id,
         owner_id=portfolio.owner_id,
         name=portfolio.name,
         created_at=portfolio.created_at,
+        consolidated=portfolio.consolidated,
     )
 
 
@@ -58,6 +60,7 @@ async def list_portfolios(
                 owner_id=p.owner_id,
                 name=p.name,
                 created_at=p.created_at,
+                consolidated=p.consolidated,
             )
             for p in items
         ],
@@ -78,7 +81,11 @@ async def get_portfolio(
         raise HTTPException(status_code=404, detail=str(PortfolioNotFound()))
 
     return PortfolioResponse(
-        id=p.id, owner_id=p.owner_id, name=p.name, created_at=p.created_at
+        id=p.id,
+        owner_id=p.owner_id,
+        name=p.name,
+        created_at=p.created_at,
+        consolidated=p.consolidated,
     )
 
 
@@ -94,12 +101,16 @@ async def update_portfolio(
     p = await uc.update_portfolio(
         owner_id=user.id,
         portfolio_id=portfolio_id,
-        payload=PortfolioUpdate(name=payload.name),
+        payload=PortfolioUpdate(name=payload.name, consolidated=payload.consolidated),
     )
     if not p:
         raise HTTPException(status_code=404, detail=str(PortfolioNotFound()))
     return PortfolioResponse(
-        id=p.id, owner_id=p.owner_id, name=p.name, created_at=p.created_at
+        id=p.id,
+        owner_id=p.owner_id,
+        name=p.name,
+        created_at=p.created_at,
+        consolidated=p.consolidated,
     )
 
 
@@ -133,7 +144,7 @@ async def get_portfolio_valutation(
         raise HTTPException(status_code=404, detail=str(PortfolioNotFound()))
 
     portfolio_valuation = await uc.compute_portfolio_valuation(
-        portfolio_id=portfolio_id
+        owner_id=user.id, portfolio_id=portfolio_id
     )
     return PortfolioValuationResponse(
         portfolio_id=portfolio_id,
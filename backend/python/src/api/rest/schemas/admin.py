@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class QueryProfileResponse(BaseModel):
+    fingerprint: str
+    count: int
+    total_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    rows: int | None
+    slow: int
+    plan: str | None
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Self
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class AssetCreateRequest(BaseModel):
@@ -10,6 +11,19 @@ class AssetCreateRequest(BaseModel):
     quantity: float = Field(gt=0)
 
 
+class AssetPatchRequest(BaseModel):
+    """A new quantity, or a delta added to the current one (a sale is negative)."""
+
+    quantity: float | None = Field(gt=0, default=None)
+    delta: float | None = None
+
+    @model_validator(mode="after")
+    def one_of_quantity_or_delta(self) -> Self:
+        if (self.quantity is None) == (self.delta is None):
+            raise ValueError("give one of quantity or delta")
+        return self
+
+
 class AssetResponse(BaseModel):
     id: int
     portfolio_id: int
@@ -8,10 +8,13 @@ from pydantic import BaseModel, Field
 
 class PortfolioCreateRequest(BaseModel):
     name: str = Field(min_length=1, max_length=100)
+    # repeated buys of a symbol add up in one holding instead of one asset each
+    consolidated: bool = False
 
 
 class PortfolioPatchRequest(BaseModel):
     name: str | None = Field(min_length=1, max_length=100, default=None)
+    consolidated: bool | None = None
 
 
 class PortfolioResponse(BaseModel):
@@ -19,3 +22,4 @@ class PortfolioResponse(BaseModel):
     owner_id: uuid.UUID
     name: str
     created_at: datetime
+    consolidated: bool
@@ -1,3 +1,18 @@
 class PortfolioNotFound(Exception):
     def __init__(self, msg="Portfolio not found", *args, **kwargs):
         super().__init__(msg, *args, **kwargs)
+
+
+class AssetNotFound(Exception):
+    def __init__(self, msg="Asset not found", *args, **kwargs):
+        super().__init__(msg, *args, **kwargs)
+
+
+class InsufficientQuantityError(Exception):
+    def __init__(self, msg="Asset quantity must stay above 0", *args, **kwargs):
+        super().__init__(msg, *args, **kwargs)
+
+
+class SymbolLimitError(Exception):
+    def __init__(self, msg="No more asset symbols can be added", *args, **kwargs):
+        super().__init__(msg, *args, **kwargs)
@@ -11,3 +11,5 @@ class Portfolio:
     owner_id: uuid.UUID
     name: str
     created_at: datetime
+    # adding an asset merges it into the symbol's holding (one row per symbol)
+    consolidated: bool = False
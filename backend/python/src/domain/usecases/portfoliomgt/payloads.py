@@ -6,14 +6,24 @@ from dataclasses import dataclass
 @dataclass(frozen=True, slots=True)
 class PortfolioCreate:
     name: str
+    consolidated: bool = False
 
 
 @dataclass(frozen=True, slots=True)
 class PortfolioUpdate:
     name: str | None
+    consolidated: bool | None = None
 
 
 @dataclass(frozen=True, slots=True)
 class AssetCreate:
     symbol: str
     quantity: float
+
+
+@dataclass(frozen=True, slots=True)
+class AssetUpdate:
+    """Either a new quantity, or a delta added to the stored one."""
+
+    quantity: float | None = None
+    delta: float | None = None
@@ -12,7 +12,7 @@ from src.domain.aggregates.portfolio.portfolio_valuation import (
 from src.infrastructure.dataservice.dbdataservice import DbDataService
 from src.infrastructure.utils.pagination import PaginationRequest, PaginationResponse
 
-from .payloads import AssetCreate, PortfolioCreate, PortfolioUpdate
+from .payloads import AssetCreate, AssetUpdate, PortfolioCreate, PortfolioUpdate
 
 ASSET_PRICES_USD = {
     "ETH": 3191.30,
@@ -63,7 +63,7 @@ class PortfolioMgt:
         )
 
     async def compute_portfolio_valuation(
-        self, portfolio_id: int
+        self, owner_id: str, portfolio_id: int
     ) -> PortfolioValuation:
         # Check if it's cached
         cache_key = f"valuation:{portfolio_id}"
@@ -71,7 +71,9 @@ class PortfolioMgt:
         if value is not None:
             return value
 
-        assets = await self.data_service.list_assets(portfolio_id=portfolio_id)
+        assets = await self.data_service.list_assets(
+            owner_id=owner_id, portfolio_id=portfolio_id
+        )
         total = 0.0
         unkown_symbols = []
         valuation_lines = []
@@ -101,17 +103,29 @@ class PortfolioMgt:
         return value
 
     # ----------------- Asset Methods -----------------
-    async def create_asset(self, portfolio_id: int, payload: AssetCreate) -> Asset:
+    async def create_asset(
+        self, owner_id: str, portfolio_id: int, payload: AssetCreate
+    ) -> Asset | None:
+        self.valuation_cache.pop(f"valuation:{portfolio_id}", None)
+        return await self.data_service.create_asset(owner_id, portfolio_id, payload)
+
+    async def update_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int, payload: AssetUpdate
+    ) -> Asset | None:
         self.valuation_cache.pop(f"valuation:{portfolio_id}", None)
-        return await self.data_service.create_asset(portfolio_id, payload)
+        return await self.data_service.update_asset(
+            owner_id, portfolio_id, asset_id, payload
+        )
 
-    async def delete_asset(self, portfolio_id: int, asset_id: int) -> bool:
+    async def delete_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int
+    ) -> bool:
         self.valuation_cache.pop(f"valuation:{portfolio_id}", None)
-        return await self.data_service.delete_asset(asset_id)
+        return await self.data_service.delete_asset(owner_id, portfolio_id, asset_id)
 
     async def list_assets_paginated(
-        self, portfolio_id: int, pagination_request: PaginationRequest
-    ) -> tuple[list[Asset], PaginationResponse]:
+        self, owner_id: str, portfolio_id: int, pagination_request: PaginationRequest
+    ) -> tuple[list[Asset], PaginationResponse] | None:
         return await self.data_service.list_assets_paginated(
-            portfolio_id, pagination_request
+            owner_id, portfolio_id, pagination_request
         )
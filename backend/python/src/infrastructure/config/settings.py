@@ -5,9 +5,11 @@ from typing import Literal
 from urllib.parse import quote_plus
 from zoneinfo import ZoneInfo
 
-from pydantic import Field, field_validator, model_validator
+from pydantic import Field, ValidationInfo, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from src.infrastructure.utils.faults import FaultSpec, parse_faults
+
 SameSite = Literal["lax", "strict", "none"]
 
 
@@ -24,6 +26,16 @@ class Settings(BaseSettings):
     app_debug: bool = Field(default=False, alias="APP_DEBUG")
     tz: str = Field(default="UTC", alias="TZ")
 
+    # Data service backend: "postgres" | "sqlite" (single box, DB_SQLITE_PATH) |
+    # "memory" (in-process, not persisted; benchmarks and tests without a database)
+    db_backend: str = Field(default="postgres", alias="DB_BACKEND")
+    db_sqlite_path: str = Field(default="portfolio.db", alias="DB_SQLITE_PATH")
+    # Seconds a write waits for another process's write lock before failing
+    db_sqlite_busy_timeout: float = Field(default=5, alias="DB_SQLITE_BUSY_TIMEOUT")
+    # Read-only connections next to the single writer. Each one is a thread
+    # (aiosqlite): a few are faster than DB_POOL_SIZE-many fighting over the GIL
+    db_sqlite_read_pool_size: int = Field(default=4, alias="DB_SQLITE_READ_POOL_SIZE")
+
     # Database (REQUIRED)
     db_host: str = Field(default="localhost", alias="DB_HOST")
     db_port: int = Field(default=5432, alias="DB_PORT")
@@ -31,6 +43,97 @@ class Settings(BaseSettings):
     db_user: str = Field(default="postgres", alias="DB_USER")
     db_password: str = Field(default="postgres", alias="DB_PASSWORD")
     db_sslmode: str = Field(default="prefer", alias="DB_SSLMODE")
+    # Connection pool (per replica: pool_size + max_overflow connections at most)
+    db_pool_size: int = Field(default=10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=20, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=30, alias="DB_POOL_TIMEOUT")
+    # Connections older than this (seconds) are replaced on checkout (-1: never)
+    db_pool_recycle: int = Field(default=1800, alias="DB_POOL_RECYCLE")
+    # How connections are checked: "pre_ping" (a round trip on every checkout) or
+    # "background" (idle connections pinged every DB_POOL_VALIDATION_INTERVAL
+    # seconds, reads retried once on disconnect)
+    db_pool_validation: str = Field(default="pre_ping", alias="DB_POOL_VALIDATION")
+    db_pool_validation_interval: float = Field(
+        default=30, alias="DB_POOL_VALIDATION_INTERVAL"
+    )
+    # Adaptive sizing: the primary pool's limit moves between DB_POOL_SIZE and
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW, growing while checkouts wait longer than
+    # DB_POOL_TARGET_WAIT_MS. DB_POOL_GLOBAL_BUDGET (0: none) caps the connections
+    # all replicas together hold open; each still keeps DB_POOL_SIZE.
+    db_pool_adaptive: bool = Field(default=False, alias="DB_POOL_ADAPTIVE")
+    db_pool_adapt_interval: float = Field(default=10, alias="DB_POOL_ADAPT_INTERVAL")
+    db_pool_target_wait_ms: float = Field(default=5, alias="DB_POOL_TARGET_WAIT_MS")
+    db_pool_global_budget: int = Field(default=0, alias="DB_POOL_GLOBAL_BUDGET")
+    # Forces pool_pre_ping on/off; unset, it follows DB_POOL_VALIDATION/DB_POOLER_MODE
+    db_pool_pre_ping: bool | None = Field(default=None, alias="DB_POOL_PRE_PING")
+    # Read replica (optional): same credentials and database name as the primary
+    db_read_host: str | None = Field(default=None, alias="DB_READ_HOST")
+    db_read_port: int | None = Field(default=None, alias="DB_READ_PORT")
+    db_read_pool_size: int = Field(default=10, alias="DB_READ_POOL_SIZE")
+    db_read_max_overflow: int = Field(default=20, alias="DB_READ_MAX_OVERFLOW")
+    # Seconds a user reads from the primary after writing (replication lag cover)
+    db_read_your_writes_seconds: float = Field(
+        default=5, alias="DB_READ_YOUR_WRITES_SECONDS"
+    )
+    # Sharding by owner: extra databases next to the primary (shard 0), as
+    # "host[:port][/dbname]" (Postgres) or file paths (SQLite), comma-separated.
+    # Owners are looked up in owner_shards, cached DB_SHARD_MAP_TTL seconds.
+    db_shards_raw: str = Field(default="", alias="DB_SHARDS")
+    db_shard_map_ttl: float = Field(default=5, alias="DB_SHARD_MAP_TTL")
+    # External pooler in front of Postgres: "none" | "transaction" (PgBouncer
+    # pool_mode=transaction). DB_POOLER_NULLPOOL drops the in-process pool.
+    db_pooler_mode: str = Field(default="none", alias="DB_POOLER_MODE")
+    db_pooler_nullpool: bool = Field(default=False, alias="DB_POOLER_NULLPOOL")
+    # asyncpg prepared statements cached per connection (0 disables the cache)
+    db_prepared_statement_cache_size: int = Field(
+        default=100, alias="DB_PREPARED_STATEMENT_CACHE_SIZE"
+    )
+    # Deleted portfolios are soft-deleted, then purged in the background: every
+    # DB_PURGE_INTERVAL seconds, DB_PURGE_BATCH_SIZE asset rows per transaction
+    # with DB_PURGE_PAUSE seconds between batches (bounds WAL / replication lag)
+    db_purge_enabled: bool = Field(default=True, alias="DB_PURGE_ENABLED")
+    db_purge_interval: float = Field(default=30, alias="DB_PURGE_INTERVAL")
+    db_purge_batch_size: int = Field(default=1000, alias="DB_PURGE_BATCH_SIZE")
+    db_purge_pause: float = Field(default=0.1, alias="DB_PURGE_PAUSE")
+    # Group commit: concurrent create_asset calls are merged into one multi-row
+    # INSERT and one commit, of up to DB_WRITE_BATCH_MAX_SIZE rows. A batch waits
+    # at most DB_WRITE_BATCH_MAX_WAIT_MS for more writes (added to write latency)
+    db_write_coalescing: bool = Field(default=False, alias="DB_WRITE_COALESCING")
+    db_write_batch_max_size: int = Field(default=64, alias="DB_WRITE_BATCH_MAX_SIZE")
+    db_write_batch_max_wait_ms: float = Field(
+        default=2, alias="DB_WRITE_BATCH_MAX_WAIT_MS"
+    )
+    # Loader for get_portfolio: lookups issued within DB_READ_BATCH_MAX_WAIT_MS
+    # (0: the same event-loop tick) share one query per owner, up to
+    # DB_READ_BATCH_MAX_SIZE ids
+    db_read_batching: bool = Field(default=False, alias="DB_READ_BATCHING")
+    db_read_batch_max_size: int = Field(default=100, alias="DB_READ_BATCH_MAX_SIZE")
+    db_read_batch_max_wait_ms: float = Field(
+        default=0, alias="DB_READ_BATCH_MAX_WAIT_MS"
+    )
+    # Reads failing on a transient error (lost connection, failover, serialization
+    # failure) are retried up to DB_READ_RETRIES times, after a random backoff of
+    # up to DB_READ_RETRY_BACKOFF_MS doubled on each retry. Writes never are.
+    db_read_retries: int = Field(default=2, alias="DB_READ_RETRIES")
+    db_read_retry_backoff_ms: float = Field(
+        default=50, alias="DB_READ_RETRY_BACKOFF_MS"
+    )
+    # Hedged reads: a read still running after its p95 latency (at least
+    # DB_HEDGE_MIN_DELAY_MS) gets a second attempt, the first to finish wins.
+    # Both attempts run on their own connection, outside the request's.
+    db_hedged_reads: bool = Field(default=False, alias="DB_HEDGED_READS")
+    db_hedge_min_delay_ms: float = Field(default=10, alias="DB_HEDGE_MIN_DELAY_MS")
+
+    # Fault injection, for tail-latency and failover tests (not with APP_ENV=prod):
+    # latency, slow-query spikes and connection errors added to the data service
+    # calls, see src/infrastructure/utils/faults.py. FAULTS_SEED: reproducible
+    faults_raw: str = Field(default="", alias="FAULTS")
+    faults_seed: int | None = Field(default=None, alias="FAULTS_SEED")
+
+    # Request deadline in seconds (0: none; some routes have their own). A client
+    # can shorten it with an X-Request-Timeout header (seconds). On Postgres, the
+    # time left is each transaction's statement_timeout.
+    request_timeout: float = Field(default=30, alias="REQUEST_TIMEOUT")
 
     # CORS
     cors_origins_raw: str = Field(default="http://localhost:3000", alias="CORS_ORIGINS")
@@ -44,6 +147,8 @@ class Settings(BaseSettings):
         default="lax", alias="COOKIE_SAMESITE"
     )  # lax|strict|none
     cookie_domain: str | None = Field(default=None, alias="COOKIE_DOMAIN")
+    # Comma-separated emails allowed on the /admin endpoints
+    admin_emails_raw: str = Field(default="", alias="ADMIN_EMAILS")
     # Observability
     otel_enabled: bool = Field(default=True, alias="OTEL_ENABLED")
     otel_service_name: str = Field(
@@ -56,6 +161,15 @@ class Settings(BaseSettings):
         default=True, alias="OTEL_EXPORTER_OTLP_INSECURE"
     )
     otel_log_level: str = Field(default="INFO", alias="OTEL_LOG_LEVEL")
+    # SQL statement count and DB time per request, on the request log line
+    db_query_stats: bool = Field(default=True, alias="DB_QUERY_STATS")
+    # Rolling stats per SQL fingerprint (GET /admin/db/queries). Statements over
+    # DB_SLOW_QUERY_MS are logged; the plan of the first DB_SLOW_QUERY_EXPLAIN
+    # slow SELECTs of each fingerprint is captured (Postgres: EXPLAIN ANALYZE,
+    # which runs the query a second time)
+    db_query_profiler: bool = Field(default=False, alias="DB_QUERY_PROFILER")
+    db_slow_query_ms: float = Field(default=200, alias="DB_SLOW_QUERY_MS")
+    db_slow_query_explain: int = Field(default=0, alias="DB_SLOW_QUERY_EXPLAIN")
 
     # Supabase (required if auth_mode == "supabase")
     supabase_url: str | None = Field(default=None, alias="SUPABASE_URL")
@@ -100,14 +214,238 @@ class Settings(BaseSettings):
             raise ValueError(f"DB_SSLMODE must be one of {allowed}")
         return v
 
+    @field_validator("db_pool_size", "db_read_pool_size")
+    @classmethod
+    def validate_pool_size(cls, v: int, info: ValidationInfo) -> int:
+        if v < 1:
+            raise ValueError(f"{info.field_name.upper()} must be >= 1")
+        return v
+
+    @field_validator("db_max_overflow", "db_read_max_overflow")
+    @classmethod
+    def validate_max_overflow(cls, v: int, info: ValidationInfo) -> int:
+        if v < 0:
+            raise ValueError(f"{info.field_name.upper()} must be >= 0")
+        return v
+
+    @field_validator("db_read_port")
+    @classmethod
+    def validate_read_port(cls, v: int | None) -> int | None:
+        if v is not None and not (1 <= v <= 65535):
+            raise ValueError("DB_READ_PORT must be between 1 and 65535")
+        return v
+
+    @field_validator("db_read_your_writes_seconds")
+    @classmethod
+    def validate_read_your_writes_seconds(cls, v: float) -> float:
+        if v < 0:
+            raise ValueError("DB_READ_YOUR_WRITES_SECONDS must be >= 0")
+        return v
+
+    @field_validator("db_pool_timeout")
+    @classmethod
+    def validate_pool_timeout(cls, v: float) -> float:
+        if v <= 0:
+            raise ValueError("DB_POOL_TIMEOUT must be > 0")
+        return v
+
+    @field_validator("db_pool_validation_interval")
+    @classmethod
+    def validate_pool_validation_interval(cls, v: float) -> float:
+        if v <= 0:
+            raise ValueError("DB_POOL_VALIDATION_INTERVAL must be > 0")
+        return v
+
+    @field_validator("db_shard_map_ttl")
+    @classmethod
+    def validate_shard_map_ttl(cls, v: float) -> float:
+        if v < 0:
+            raise ValueError("DB_SHARD_MAP_TTL must be >= 0")
+        return v
+
+    @field_validator("db_pool_adapt_interval")
+    @classmethod
+    def validate_pool_adapt_interval(cls, v: float) -> float:
+        if v <= 0:
+            raise ValueError("DB_POOL_ADAPT_INTERVAL must be > 0")
+        return v
+
+    @field_validator("db_pool_target_wait_ms", "db_pool_global_budget")
+    @classmethod
+    def validate_pool_adaptive(cls, v: float, info: ValidationInfo) -> float:
+        if v < 0:
+            raise ValueError(f"{info.field_name.upper()} must be >= 0")
+        return v
+
+    @field_validator("db_pool_recycle")
+    @classmethod
+    def validate_pool_recycle(cls, v: int) -> int:
+        if v != -1 and v <= 0:
+            raise ValueError("DB_POOL_RECYCLE must be > 0 or -1")
+        return v
+
+    @field_validator("db_pool_validation")
+    @classmethod
+    def validate_pool_validation(cls, v: str) -> str:
+        allowed = {"pre_ping", "background"}
+        v = v.lower()
+        if v not in allowed:
+            raise ValueError(f"DB_POOL_VALIDATION must be one of {allowed}")
+        return v
+
+    @field_validator("db_backend")
+    @classmethod
+    def validate_db_backend(cls, v: str) -> str:
+        allowed = {"postgres", "sqlite", "memory"}
+        v = v.lower()
+        if v not in allowed:
+            raise ValueError(f"DB_BACKEND must be one of {allowed}")
+        return v
+
+    @field_validator("db_sqlite_busy_timeout")
+    @classmethod
+    def validate_sqlite_busy_timeout(cls, v: float) -> float:
+        if v < 0:
+            raise ValueError("DB_SQLITE_BUSY_TIMEOUT must be >= 0")
+        return v
+
+    @field_validator("db_sqlite_read_pool_size")
+    @classmethod
+    def validate_sqlite_read_pool_size(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError("DB_SQLITE_READ_POOL_SIZE must be >= 1")
+        return v
+
+    @field_validator("request_timeout")
+    @classmethod
+    def validate_request_timeout(cls, v: float) -> float:
+        if v < 0:
+            raise ValueError("REQUEST_TIMEOUT must be >= 0")
+        return v
+
+    @field_validator("faults_raw")
+    @classmethod
+    def validate_faults(cls, v: str) -> str:
+        try:
+            parse_faults(v)
+        except ValueError as e:
+            raise ValueError(f"FAULTS is invalid: {e}") from e
+        return v
+
+    @field_validator("db_purge_interval")
+    @classmethod
+    def validate_purge_interval(cls, v: float) -> float:
+        if v <= 0:
+            raise ValueError("DB_PURGE_INTERVAL must be > 0")
+        return v
+
+    @field_validator("db_purge_batch_size")
+    @classmethod
+    def validate_purge_batch_size(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError("DB_PURGE_BATCH_SIZE must be >= 1")
+        return v
+
+    @field_validator("db_purge_pause")
+    @classmethod
+    def validate_purge_pause(cls, v: float) -> float:
+        if v < 0:
+            raise ValueError("DB_PURGE_PAUSE must be >= 0")
+        return v
+
+    @field_validator("db_write_batch_max_size", "db_read_batch_max_size")
+    @classmethod
+    def validate_batch_max_size(cls, v: int, info: ValidationInfo) -> int:
+        if v < 1:
+            raise ValueError(f"{info.field_name.upper()} must be >= 1")
+        return v
+
+    @field_validator("db_write_batch_max_wait_ms", "db_read_batch_max_wait_ms")
+    @classmethod
+    def validate_batch_max_wait_ms(cls, v: float, info: ValidationInfo) -> float:
+        if v < 0:
+            raise ValueError(f"{info.field_name.upper()} must be >= 0")
+        return v
+
+    @field_validator(
+        "db_read_retries", "db_read_retry_backoff_ms", "db_hedge_min_delay_ms"
+    )
+    @classmethod
+    def validate_read_resilience(cls, v: float, info: ValidationInfo) -> float:
+        if v < 0:
+            raise ValueError(f"{info.field_name.upper()} must be >= 0")
+        return v
+
+    @field_validator("db_slow_query_ms", "db_slow_query_explain")
+    @classmethod
+    def validate_slow_query(cls, v: float, info: ValidationInfo) -> float:
+        if v < 0:
+            raise ValueError(f"{info.field_name.upper()} must be >= 0")
+        return v
+
+    @field_validator("db_pooler_mode")
+    @classmethod
+    def validate_pooler_mode(cls, v: str) -> str:
+        allowed = {"none", "transaction"}
+        v = v.lower()
+        if v not in allowed:
+            raise ValueError(f"DB_POOLER_MODE must be one of {allowed}")
+        return v
+
+    @field_validator("db_prepared_statement_cache_size")
+    @classmethod
+    def validate_prepared_statement_cache_size(cls, v: int) -> int:
+        if v < 0:
+            raise ValueError("DB_PREPARED_STATEMENT_CACHE_SIZE must be >= 0")
+        return v
+
     @property
     def database_url(self) -> str:
+        if self.db_backend == "sqlite":
+            return f"sqlite+aiosqlite:///{self.db_sqlite_path}"
         encoded_password = quote_plus(self.db_password)
         return (
             f"postgresql+asyncpg://{self.db_user}:{encoded_password}"
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
         )
 
+    @property
+    def read_database_url(self) -> str | None:
+        if not self.db_read_host:
+            return None
+        encoded_password = quote_plus(self.db_password)
+        port = self.db_read_port or self.db_port
+        return (
+            f"postgresql+asyncpg://{self.db_user}:{encoded_password}"
+            f"@{self.db_read_host}:{port}/{self.db_name}"
+        )
+
+    @property
+    def shard_database_urls(self) -> list[str]:
+        """URLs of the DB_SHARDS databases (shards 1..N), with the primary's
+        credentials and, unless given, its port and database name."""
+        urls = []
+        for entry in filter(None, map(str.strip, self.db_shards_raw.split(","))):
+            if self.db_backend == "sqlite":
+                urls.append(f"sqlite+aiosqlite:///{entry}")
+                continue
+            address, _, name = entry.partition("/")
+            host, _, port = address.partition(":")
+            encoded_password = quote_plus(self.db_password)
+            urls.append(
+                f"postgresql+asyncpg://{self.db_user}:{encoded_password}"
+                f"@{host}:{port or self.db_port}/{name or self.db_name}"
+            )
+        return urls
+
+    @property
+    def pool_pre_ping(self) -> bool:
+        if self.db_pool_pre_ping is not None:
+            return self.db_pool_pre_ping
+        # background validation replaces it; behind a pooler the pooler checks
+        # its server connections
+        return self.db_pool_validation == "pre_ping" and self.db_pooler_mode == "none"
+
     @property
     def asyncpg_ssl(self) -> bool:
         """
@@ -116,11 +454,21 @@ class Settings(BaseSettings):
         """
         return self.db_sslmode in {"require", "prefer"}
 
+    @property
+    def faults(self) -> dict[str, FaultSpec]:
+        return parse_faults(self.faults_raw)
+
     @property
     def cors_origins(self) -> list[str]:
         # comma-separated -> list, trimmed, no empties
         return [o.strip() for o in self.cors_origins_raw.split(",") if o.strip()]
 
+    @property
+    def admin_emails(self) -> set[str]:
+        return {
+            e.strip().lower() for e in self.admin_emails_raw.split(",") if e.strip()
+        }
+
     @property
     def tzinfo(self) -> ZoneInfo:
         return ZoneInfo(self.tz)
@@ -134,6 +482,12 @@ class Settings(BaseSettings):
             raise ValueError(f"COOKIE_SAMESITE must be one of {allowed}")
         return v
 
+    @model_validator(mode="after")
+    def validate_faults_env(self) -> Settings:
+        if self.faults_raw.strip() and self.app_env.lower() in {"prod", "production"}:
+            raise ValueError("FAULTS must not be set in production (APP_ENV)")
+        return self
+
     @model_validator(mode="after")
     def validate_auth_requirements(self) -> Settings:
         mode = (self.auth_mode or "").lower()
@@ -155,6 +509,14 @@ class Settings(BaseSettings):
 
         return self
 
+    @model_validator(mode="after")
+    def validate_pooler_requirements(self) -> Settings:
+        if self.db_pooler_nullpool and self.db_pooler_mode == "none":
+            raise ValueError(
+                "DB_POOLER_NULLPOOL requires an external pooler (DB_POOLER_MODE)"
+            )
+        return self
+
 
 def build_settings():
     env_file = os.getenv("ENV_FILE", ".env")
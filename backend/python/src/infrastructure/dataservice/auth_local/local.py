@@ -6,7 +6,7 @@ from datetime import datetime, timedelta, timezone
 import jwt
 from argon2 import PasswordHasher
 from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
-from sqlalchemy import delete, select
+from sqlalchemy import bindparam, delete, insert, select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from src.domain.aggregates.auth.user import User
@@ -16,11 +16,22 @@ from src.domain.aggregates.exceptions.auth import (
 )
 from src.domain.aggregates.health.health import Health
 from src.infrastructure.config.settings import Settings
-from src.infrastructure.datastore.sqlalchemy.base import session_scope
+from src.infrastructure.datastore.sqlalchemy.base import (
+    mark_written,
+    read_session_scope,
+    retry_on_disconnect,
+    session_scope,
+)
 from src.infrastructure.datastore.sqlalchemy.models.user import User as UserModel
 
 from ..authdataservice import AuthDataService
 
+# Token lookup runs on every authenticated request: built once with a bound
+# parameter rather than per call
+GET_USER_BY_ID_STMT = select(UserModel.id, UserModel.email, UserModel.created_at).where(
+    UserModel.id == bindparam("user_id")
+)
+
 
 class LocalAuthDataService(AuthDataService):
     def __init__(self, settings: Settings) -> None:
@@ -44,16 +55,24 @@ class LocalAuthDataService(AuthDataService):
 
     async def register(self, email: str, password: str) -> tuple[User, str]:
         hash_password = self.__hash_password(password)
-        model = UserModel(email=email, password_hash=hash_password)
         try:
             async with session_scope() as db:
-                db.add(model)
+                res = await db.execute(
+                    insert(UserModel)
+                    .values(email=email, password_hash=hash_password)
+                    .returning(UserModel.id, UserModel.email, UserModel.created_at)
+                )
+                row = res.one()
                 await db.commit()
-                await db.refresh(model)
         except IntegrityError as e:
-            if "already exists" in str(e):
+            # Postgres / SQLite unique violation on users.email
+            if "already exists" in str(e) or "UNIQUE constraint failed" in str(e):
                 raise EmailAlreadyExistsError
-        user = User(id=model.id, email=model.email, created_at=model.created_at)
+            raise
+        # The new user authenticates right away: keep their token lookups off a
+        # replica that may not have the row yet
+        mark_written(row.id)
+        user = User(id=row.id, email=row.email, created_at=row.created_at)
         token = self.__create_access_token(user.id)
         return user, token
 
@@ -67,6 +86,7 @@ class LocalAuthDataService(AuthDataService):
             token = self.__create_access_token(user.id)
             return user, token
 
+    @retry_on_disconnect
     async def get_user_from_token(self, access_token: str) -> User | None:
         if not self.settings.jwt_secret:
             raise ValueError("JWT secret is not set")
@@ -81,12 +101,12 @@ class LocalAuthDataService(AuthDataService):
         except (jwt.PyJWTError, ValueError):
             return None
 
-        async with session_scope() as db:
-            res = await db.execute(select(UserModel).where(UserModel.id == user_id))
-            model = res.scalar_one_or_none()
-            if not model:
+        async with read_session_scope(pin_key=user_id) as db:
+            res = await db.execute(GET_USER_BY_ID_STMT, {"user_id": user_id})
+            row = res.one_or_none()
+            if not row:
                 return None
-            return User(id=model.id, email=model.email, created_at=model.created_at)
+            return User(id=row.id, email=row.email, created_at=row.created_at)
 
     async def delete_user(self, email: str) -> bool:
         async with session_scope() as db:
@@ -13,10 +13,21 @@ def build_auth_dataservice(settings: Settings) -> AuthDataService:
     if settings.auth_mode == "local":
         from src.infrastructure.dataservice.auth_local.local import LocalAuthDataService
 
-        return LocalAuthDataService(settings=settings)
+        ds: AuthDataService = LocalAuthDataService(settings=settings)
+    else:
+        from src.infrastructure.dataservice.auth_supabase.supabase import (
+            SupabaseAuthDataService,
+        )
 
-    from src.infrastructure.dataservice.auth_supabase.supabase import (
-        SupabaseAuthDataService,
-    )
+        ds = SupabaseAuthDataService(settings=settings, client=None)
 
-    return SupabaseAuthDataService(settings=settings, client=None)
+    if settings.faults:
+        from src.infrastructure.dataservice.faulty.faulty import (
+            FaultyAuthDataService,
+        )
+        from src.infrastructure.utils.faults import FaultInjector
+
+        ds = FaultyAuthDataService(
+            ds, FaultInjector(settings.faults, settings.faults_seed)
+        )
+    return ds
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import itertools
+import uuid
+from dataclasses import replace
+from datetime import UTC, datetime
+
+from src.domain.aggregates.exceptions.portfolio import InsufficientQuantityError
+from src.domain.aggregates.health.health import Health
+from src.domain.aggregates.portfolio.asset import Asset
+from src.domain.aggregates.portfolio.portfolio import Portfolio
+from src.domain.usecases.portfoliomgt.payloads import (
+    AssetCreate,
+    AssetUpdate,
+    PortfolioCreate,
+    PortfolioUpdate,
+)
+from src.infrastructure.dataservice.dbdataservice import DbDataService
+from src.infrastructure.utils.pagination import (
+    PaginationRequest,
+    PaginationResponse,
+    create_pagination_response,
+)
+
+
+class InMemoryDbDataService(DbDataService):
+    """DbDataService kept in process memory (DB_BACKEND=memory), for benchmarks
+    and tests that shouldn't depend on a database. Same semantics as
+    SQLAlchemyDataService: owner-scoped lookups, newest-first pagination and
+    assets deleted with their portfolio. Not shared between processes."""
+
+    def __init__(self) -> None:
+        self._portfolio_ids = itertools.count(1)
+        self._asset_ids = itertools.count(1)
+        self._portfolios: dict[int, Portfolio] = {}
+        # Indexes; ids are increasing, so insertion order is id order
+        self._portfolios_by_owner: dict[uuid.UUID, dict[int, Portfolio]] = {}
+        self._assets_by_portfolio: dict[int, dict[int, Asset]] = {}
+        # consolidated portfolios: symbol -> id of its holding
+        self._holdings: dict[int, dict[str, int]] = {}
+
+    async def health_check(self) -> Health:
+        return Health(errors=[], warnings=[])
+
+    def _owned_portfolio(self, owner_id: str, portfolio_id: int) -> Portfolio | None:
+        return self._portfolios_by_owner.get(_owner_key(owner_id), {}).get(portfolio_id)
+
+    # ----------------- Portfolio Methods -----------------
+    async def create_portfolio(
+        self, owner_id: str, payload: PortfolioCreate
+    ) -> Portfolio:
+        owner = _owner_key(owner_id)
+        portfolio = Portfolio(
+            id=next(self._portfolio_ids),
+            owner_id=owner,
+            name=payload.name,
+            created_at=datetime.now(UTC),
+            consolidated=payload.consolidated,
+        )
+        self._portfolios[portfolio.id] = portfolio
+        self._portfolios_by_owner.setdefault(owner, {})[portfolio.id] = portfolio
+        self._assets_by_portfolio[portfolio.id] = {}
+        self._holdings[portfolio.id] = {}
+        return portfolio
+
+    async def get_portfolio(self, owner_id: str, portfolio_id: int) -> Portfolio | None:
+        return self._owned_portfolio(owner_id, portfolio_id)
+
+    async def update_portfolio(
+        self, owner_id: str, portfolio_id: int, payload: PortfolioUpdate
+    ) -> Portfolio | None:
+        portfolio = self._owned_portfolio(owner_id, portfolio_id)
+        if portfolio is None:
+            return None
+        changes = {}
+        if payload.name:
+            changes["name"] = payload.name
+        if payload.consolidated is not None:
+            changes["consolidated"] = payload.consolidated
+        if changes:
+            portfolio = replace(portfolio, **changes)
+            self._portfolios[portfolio.id] = portfolio
+            self._portfolios_by_owner[portfolio.owner_id][portfolio.id] = portfolio
+        return portfolio
+
+    async def delete_portfolio(self, owner_id: str, portfolio_id: int) -> bool:
+        if self._owned_portfolio(owner_id, portfolio_id) is None:
+            return False
+        del self._portfolios[portfolio_id]
+        del self._portfolios_by_owner[_owner_key(owner_id)][portfolio_id]
+        # ON DELETE CASCADE
+        del self._assets_by_portfolio[portfolio_id]
+        del self._holdings[portfolio_id]
+        return True
+
+    async def list_portfolios_paginated(
+        self, owner_id: str, pagination_request: PaginationRequest
+    ) -> tuple[list[Portfolio], PaginationResponse]:
+        portfolios = self._portfolios_by_owner.get(_owner_key(owner_id), {})
+        return (
+            _newest_first_page(portfolios, pagination_request),
+            create_pagination_response(len(portfolios), pagination_request),
+        )
+
+    # ----------------- Asset Methods -----------------
+    async def create_asset(
+        self, owner_id: str, portfolio_id: int, payload: AssetCreate
+    ) -> Asset | None:
+        portfolio = self._owned_portfolio(owner_id, portfolio_id)
+        if portfolio is None:
+            return None
+        assets = self._assets_by_portfolio[portfolio_id]
+        holdings = self._holdings[portfolio_id]
+        if portfolio.consolidated:
+            holding = assets.get(holdings.get(payload.symbol, 0))
+            if holding is not None:
+                # ON CONFLICT DO UPDATE: the row keeps its id and place
+                holding = replace(holding, quantity=holding.quantity + payload.quantity)
+                assets[holding.id] = holding
+                return holding
+        asset = Asset(
+            id=next(self._asset_ids),
+            portfolio_id=portfolio_id,
+            symbol=payload.symbol,
+            quantity=payload.quantity,
+            created_at=datetime.now(UTC),
+        )
+        assets[asset.id] = asset
+        if portfolio.consolidated:
+            holdings[payload.symbol] = asset.id
+        return asset
+
+    async def update_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int, payload: AssetUpdate
+    ) -> Asset | None:
+        if self._owned_portfolio(owner_id, portfolio_id) is None:
+            return None
+        assets = self._assets_by_portfolio[portfolio_id]
+        asset = assets.get(asset_id)
+        if asset is None:
+            return None
+        if payload.delta is not None:
+            quantity = asset.quantity + payload.delta
+        else:
+            quantity = payload.quantity
+        if quantity <= 0:
+            raise InsufficientQuantityError
+        asset = replace(asset, quantity=quantity)
+        assets[asset_id] = asset
+        return asset
+
+    async def delete_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int
+    ) -> bool:
+        if self._owned_portfolio(owner_id, portfolio_id) is None:
+            return False
+        return self._assets_by_portfolio[portfolio_id].pop(asset_id, None) is not None
+
+    async def list_assets_paginated(
+        self, owner_id: str, portfolio_id: int, pagination_request: PaginationRequest
+    ) -> tuple[list[Asset], PaginationResponse] | None:
+        if self._owned_portfolio(owner_id, portfolio_id) is None:
+            return None
+        assets = self._assets_by_portfolio[portfolio_id]
+        return (
+            _newest_first_page(assets, pagination_request),
+            create_pagination_response(len(assets), pagination_request),
+        )
+
+    async def list_assets(self, owner_id: str, portfolio_id: int) -> list[Asset]:
+        if self._owned_portfolio(owner_id, portfolio_id) is None:
+            return []
+        return list(self._assets_by_portfolio[portfolio_id].values())
+
+
+def _owner_key(owner_id: str | uuid.UUID) -> uuid.UUID:
+    return owner_id if isinstance(owner_id, uuid.UUID) else uuid.UUID(owner_id)
+
+
+def _newest_first_page[T](
+    items: dict[int, T], pagination_request: PaginationRequest
+) -> list[T]:
+    # ORDER BY id DESC LIMIT/OFFSET: dicts keep id order and iterate in reverse
+    start = pagination_request.offset
+    stop = start + pagination_request.items_per_page
+    return list(itertools.islice(reversed(items.values()), start, stop))
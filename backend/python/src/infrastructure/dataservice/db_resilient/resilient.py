@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
+from functools import partial
+
+import structlog
+from sqlalchemy.exc import DBAPIError
+
+from src.domain.aggregates.health.health import Health
+from src.domain.aggregates.portfolio.asset import Asset
+from src.domain.aggregates.portfolio.portfolio import Portfolio
+from src.domain.usecases.portfoliomgt.payloads import (
+    AssetCreate,
+    AssetUpdate,
+    PortfolioCreate,
+    PortfolioUpdate,
+)
+from src.infrastructure.dataservice.dbdataservice import DbDataService
+from src.infrastructure.datastore.sqlalchemy.base import (
+    detached_context,
+    retried_by_caller,
+    time_left,
+)
+from src.infrastructure.observability.db_resilience import (
+    HEDGES,
+    RETRIES,
+    RETRIES_EXHAUSTED,
+)
+from src.infrastructure.utils.pagination import PaginationRequest, PaginationResponse
+
+logger = structlog.get_logger("db.resilient")
+
+# SQLSTATEs worth another try: connection exceptions (class 08), the server
+# shutting down or not accepting connections yet (failover), and transactions a
+# rerun can get past (serialization failure, deadlock)
+_RETRYABLE_SQLSTATES = ("08", "57P01", "57P02", "57P03", "40001", "40P01")
+# latencies kept per read for its p95, and how many it takes before hedging
+_LATENCY_WINDOW = 500
+_MIN_SAMPLES = 50
+
+
+def is_retryable(e: BaseException) -> bool:
+    if isinstance(e, DBAPIError):
+        if e.connection_invalidated:
+            return True
+        return (getattr(e.orig, "sqlstate", None) or "").startswith(
+            _RETRYABLE_SQLSTATES
+        )
+    # refused or reset while connecting, before the driver wrapped it
+    return isinstance(e, ConnectionError)
+
+
+class _Latency:
+    """Recent latencies of one read, for the delay before its hedge."""
+
+    def __init__(self) -> None:
+        self._samples: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._p95: float | None = None
+        self._since_p95 = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_p95 += 1
+
+    def p95(self) -> float | None:
+        """None until there are enough samples. Recomputed every _MIN_SAMPLES."""
+        if len(self._samples) < _MIN_SAMPLES:
+            return None
+        if self._p95 is None or self._since_p95 >= _MIN_SAMPLES:
+            self._p95 = statistics.quantiles(self._samples, n=20)[-1]
+            self._since_p95 = 0
+        return self._p95
+
+
+class ResilientDataService(DbDataService):
+    """Reads of another data service, retried on transient errors after a
+    jittered exponential backoff, and optionally hedged. Writes go straight
+    through: one that failed may still have committed. With retries, the inner
+    reads don't retry lost connections themselves (retry_on_disconnect)."""
+
+    def __init__(
+        self,
+        inner: DbDataService,
+        retries: int = 2,
+        backoff_ms: float = 50,
+        hedge: bool = False,
+        hedge_min_delay_ms: float = 10,
+    ):
+        self._inner = inner
+        self.retries = retries
+        self.backoff = backoff_ms / 1000
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay_ms / 1000
+        self._latencies: defaultdict[str, _Latency] = defaultdict(_Latency)
+        # strong references to cancelled hedge losers until they're done
+        self._losers: set[asyncio.Task] = set()
+
+    async def _read[R](self, name: str, call: Callable[[], Awaitable[R]]) -> R:
+        attributes = {"db.operation.name": name}
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(name, call)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                # full jitter: retries of a failover don't arrive all at once
+                delay = random.uniform(0, self.backoff * 2**attempt)
+                left = time_left()
+                if attempt >= self.retries or (left is not None and delay >= left):
+                    RETRIES_EXHAUSTED.add(1, attributes)
+                    raise
+                logger.warning(
+                    "db_read_retry",
+                    operation=name,
+                    attempt=attempt + 1,
+                    error=type(e).__name__,
+                )
+            RETRIES.add(1, attributes)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _attempt[R](self, name: str, call: Callable[[], Awaitable[R]]) -> R:
+        latency = self._latencies[name]
+        p95 = latency.p95() if self.hedge else None
+        if p95 is None:
+            return await self._timed(latency, call)
+        return await self._hedged(name, call, max(p95, self.hedge_min_delay))
+
+    async def _timed[R](self, latency: _Latency, call: Callable[[], Awaitable[R]]) -> R:
+        start = time.perf_counter()
+        with retried_by_caller() if self.retries else nullcontext():
+            result = await call()
+        latency.record(time.perf_counter() - start)
+        return result
+
+    async def _hedged[R](
+        self, name: str, call: Callable[[], Awaitable[R]], delay: float
+    ) -> R:
+        """Run `call`, and once more if it's still running after `delay`: the
+        first to succeed wins, the other is cancelled. Each attempt runs outside
+        the request scope, on its own connection."""
+        latency = self._latencies[name]
+
+        def start() -> asyncio.Task[R]:
+            return asyncio.create_task(
+                self._timed(latency, call), context=detached_context()
+            )
+
+        first = start()
+        hedge: asyncio.Task[R] | None = None
+        pending: set[asyncio.Task[R]] = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                hedge = start()
+                pending.add(hedge)
+            error: BaseException | None = None
+            while True:
+                # exception() on every done attempt, so none goes unretrieved
+                failed = {t: t.exception() for t in done}
+                winner = next((t for t, e in failed.items() if e is None), None)
+                error = error or next((e for e in failed.values() if e), None)
+                if winner is not None or not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+                self._losers.add(task)
+                task.add_done_callback(self._losers.discard)
+        if hedge is not None:
+            outcome = "failed"
+            if winner is not None:
+                outcome = "hedge" if winner is hedge else "first"
+            HEDGES.add(
+                1, {"db.operation.name": name, "db.client.hedge.winner": outcome}
+            )
+        if winner is None:
+            assert error is not None
+            raise error
+        return winner.result()
+
+    async def health_check(self) -> Health:
+        return await self._inner.health_check()
+
+    # ----------------- Portfolio Methods -----------------
+    async def create_portfolio(
+        self, owner_id: str, payload: PortfolioCreate
+    ) -> Portfolio:
+        return await self._inner.create_portfolio(owner_id, payload)
+
+    async def get_portfolio(self, owner_id: str, portfolio_id: int) -> Portfolio | None:
+        return await self._read(
+            "get_portfolio",
+            partial(self._inner.get_portfolio, owner_id, portfolio_id),
+        )
+
+    async def update_portfolio(
+        self, owner_id: str, portfolio_id: int, payload: PortfolioUpdate
+    ) -> Portfolio | None:
+        return await self._inner.update_portfolio(owner_id, portfolio_id, payload)
+
+    async def delete_portfolio(self, owner_id: str, portfolio_id: int) -> bool:
+        return await self._inner.delete_portfolio(owner_id, portfolio_id)
+
+    async def list_portfolios_paginated(
+        self, owner_id: str, pagination_request: PaginationRequest
+    ) -> tuple[list[Portfolio], PaginationResponse]:
+        return await self._read(
+            "list_portfolios_paginated",
+            partial(
+                self._inner.list_portfolios_paginated, owner_id, pagination_request
+            ),
+        )
+
+    # ----------------- Asset Methods -----------------
+    async def create_asset(
+        self, owner_id: str, portfolio_id: int, payload: AssetCreate
+    ) -> Asset | None:
+        return await self._inner.create_asset(owner_id, portfolio_id, payload)
+
+    async def update_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int, payload: AssetUpdate
+    ) -> Asset | None:
+        return await self._inner.update_asset(owner_id, portfolio_id, asset_id, payload)
+
+    async def delete_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int
+    ) -> bool:
+        return await self._inner.delete_asset(owner_id, portfolio_id, asset_id)
+
+    async def list_assets_paginated(
+        self, owner_id: str, portfolio_id: int, pagination_request: PaginationRequest
+    ) -> tuple[list[Asset], PaginationResponse] | None:
+        return await self._read(
+            "list_assets_paginated",
+            partial(
+                self._inner.list_assets_paginated,
+                owner_id,
+                portfolio_id,
+                pagination_request,
+            ),
+        )
+
+    async def list_assets(self, owner_id: str, portfolio_id: int) -> list[Asset]:
+        return await self._read(
+            "list_assets", partial(self._inner.list_assets, owner_id, portfolio_id)
+        )
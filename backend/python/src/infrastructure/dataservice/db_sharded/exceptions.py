@@ -0,0 +1,6 @@
+class OwnerMovingError(Exception):
+    """Raised on a write for an owner whose rows are being moved to another
+    shard. The move takes seconds: the client should retry."""
+
+    def __init__(self, msg="Owner is being moved, retry later", *args, **kwargs):
+        super().__init__(msg, *args, **kwargs)
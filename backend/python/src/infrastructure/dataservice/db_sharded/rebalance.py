@@ -0,0 +1,250 @@
+"""
+Shard rebalancing: how owners are spread over the shards (DB_SHARDS), and
+moving an owner's portfolios to another shard.
+
+A move flags the owner in owner_shards (their writes get a 503 once every API
+replica's placement cache expired, DB_SHARD_MAP_TTL), copies their live
+portfolios and assets to the target shard in one transaction, points the owner
+at the target, then soft-deletes the source rows for the purger. Moved
+portfolios and assets get new ids (a portfolio id encodes its shard): the old
+-> new portfolio ids are printed as JSON.
+
+Usage (from backend/python, with the backend's DB_* and DB_SHARDS settings):
+    python -m src.infrastructure.dataservice.db_sharded.rebalance stats
+    python -m src.infrastructure.dataservice.db_sharded.rebalance move OWNER_ID SHARD
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import func, insert, select, update
+
+from src.infrastructure.config.settings import build_settings
+from src.infrastructure.datastore.sqlalchemy import base
+from src.infrastructure.datastore.sqlalchemy.base import session_scope, use_shard
+from src.infrastructure.datastore.sqlalchemy.models.asset import Asset as AssetModel
+from src.infrastructure.datastore.sqlalchemy.models.owner_shard import (
+    OwnerShard as OwnerShardModel,
+)
+from src.infrastructure.datastore.sqlalchemy.models.portfolio import (
+    Portfolio as PortfolioModel,
+)
+from src.infrastructure.datastore.sqlalchemy.symbols import symbol_ids, symbol_names
+
+from .sharded import _owner_key, encode_portfolio_id
+
+_LIVE = PortfolioModel.deleted_at.is_(None)
+
+
+async def shard_stats() -> list[tuple[int, int, int]]:
+    """(shard, owners, live portfolios) for each shard."""
+    stats = []
+    for shard in base.shards:
+        with use_shard(shard.index):
+            async with session_scope() as db:
+                row = (
+                    await db.execute(
+                        select(
+                            func.count(func.distinct(PortfolioModel.owner_id)),
+                            func.count(),
+                        ).where(_LIVE)
+                    )
+                ).one()
+        stats.append((shard.index, row[0], row[1]))
+    return stats
+
+
+async def _set_placement(owner_id: str, shard: int, moving: bool) -> None:
+    async with session_scope() as db:
+        res = await db.execute(
+            update(OwnerShardModel)
+            .where(OwnerShardModel.owner_id == owner_id)
+            .values(shard=shard, moving=moving, updated_at=func.now())
+        )
+        if res.rowcount == 0:
+            await db.execute(
+                insert(OwnerShardModel).values(
+                    owner_id=owner_id, shard=shard, moving=moving
+                )
+            )
+        await db.commit()
+
+
+async def _copy(
+    owner_id: str, source: int, target: int, batch_size: int
+) -> dict[int, int]:
+    """Copy the owner's live portfolios and their assets, oldest first so the
+    new ids keep their order. Returns source -> target portfolio ids (local)."""
+    with use_shard(source):
+        async with session_scope() as db:
+            portfolios = (
+                await db.execute(
+                    select(
+                        PortfolioModel.id,
+                        PortfolioModel.name,
+                        PortfolioModel.created_at,
+                        PortfolioModel.consolidated,
+                    )
+                    .where(PortfolioModel.owner_id == owner_id, _LIVE)
+                    .order_by(PortfolioModel.id)
+                )
+            ).all()
+            source_symbol_ids = (
+                (
+                    await db.execute(
+                        select(AssetModel.symbol_id)
+                        .distinct()
+                        .join(
+                            PortfolioModel, AssetModel.portfolio_id == PortfolioModel.id
+                        )
+                        .where(PortfolioModel.owner_id == owner_id, _LIVE)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+        names = await symbol_names(source_symbol_ids)
+    # each shard numbers its own symbols: the target's ids are set up before its
+    # write transaction
+    with use_shard(target):
+        target_ids = await symbol_ids([names[i] for i in source_symbol_ids])
+    symbol_id = {i: target_ids[names[i]] for i in source_symbol_ids}
+    ids: dict[int, int] = {}
+    with use_shard(target):
+        async with session_scope() as dst:
+            for portfolio in portfolios:
+                ids[portfolio.id] = (
+                    await dst.execute(
+                        insert(PortfolioModel)
+                        .values(
+                            name=portfolio.name,
+                            owner_id=owner_id,
+                            created_at=portfolio.created_at,
+                            consolidated=portfolio.consolidated,
+                        )
+                        .returning(PortfolioModel.id)
+                    )
+                ).scalar_one()
+                last_id = 0
+                while True:
+                    with use_shard(source):
+                        async with session_scope() as src:
+                            assets = (
+                                await src.execute(
+                                    select(
+                                        AssetModel.id,
+                                        AssetModel.symbol_id,
+                                        AssetModel.quantity,
+                                        AssetModel.created_at,
+                                        AssetModel.holding,
+                                    )
+                                    .where(
+                                        AssetModel.portfolio_id == portfolio.id,
+                                        AssetModel.id > last_id,
+                                    )
+                                    .order_by(AssetModel.id)
+                                    .limit(batch_size)
+                                )
+                            ).all()
+                    if not assets:
+                        break
+                    await dst.execute(
+                        insert(AssetModel),
+                        [
+                            {
+                                "portfolio_id": ids[portfolio.id],
+                                "symbol_id": symbol_id[a.symbol_id],
+                                "quantity": a.quantity,
+                                "created_at": a.created_at,
+                                "holding": a.holding,
+                            }
+                            for a in assets
+                        ],
+                    )
+                    last_id = assets[-1].id
+            await dst.commit()
+    return ids
+
+
+async def move_owner(
+    owner_id: str, target: int, map_ttl: float, batch_size: int = 1000
+) -> dict[int, int]:
+    """Move an owner's portfolios to shard `target`. Returns the old -> new
+    portfolio ids (as clients see them)."""
+    if not 0 <= target < len(base.shards):
+        raise ValueError(f"no shard {target}, there are {len(base.shards)}")
+    key = _owner_key(owner_id)
+    async with session_scope() as db:
+        source = (
+            await db.execute(
+                select(OwnerShardModel.shard).where(OwnerShardModel.owner_id == key)
+            )
+        ).scalar_one_or_none()
+    # owners never placed have their rows on shard 0
+    source = source or 0
+    if source == target:
+        return {}
+
+    await _set_placement(key, source, moving=True)
+    try:
+        # every replica now refuses the owner's writes
+        await asyncio.sleep(map_ttl)
+        ids = await _copy(key, source, target, batch_size)
+        await _set_placement(key, target, moving=False)
+    except BaseException:
+        await _set_placement(key, source, moving=False)
+        raise
+
+    # replicas may read from the source until their cached placement expires
+    await asyncio.sleep(map_ttl)
+    with use_shard(source):
+        async with session_scope() as db:
+            await db.execute(
+                update(PortfolioModel)
+                .where(PortfolioModel.owner_id == key, _LIVE)
+                .values(deleted_at=func.now())
+            )
+            await db.commit()
+    return {
+        encode_portfolio_id(source, old): encode_portfolio_id(target, new)
+        for old, new in ids.items()
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="owners and portfolios per shard")
+    move = commands.add_parser("move", help="move an owner to another shard")
+    move.add_argument("owner_id")
+    move.add_argument("shard", type=int)
+    move.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    settings = build_settings()
+    base.build_engine(settings=settings)
+    try:
+        if args.command == "stats":
+            print(f"{'shard':<7}{'owners':>10}{'portfolios':>12}")
+            for shard, owners, portfolios in await shard_stats():
+                print(f"{shard:<7}{owners:>10}{portfolios:>12}")
+        else:
+            ids = await move_owner(
+                args.owner_id,
+                args.shard,
+                settings.db_shard_map_ttl,
+                batch_size=args.batch_size,
+            )
+            print(json.dumps({str(old): new for old, new in ids.items()}))
+    finally:
+        for shard in base.shards:
+            await shard.engine.dispose()
+            if shard.read_engine is not None:
+                await shard.read_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import hashlib
+import uuid
+from dataclasses import dataclass, replace
+
+from cachetools import TTLCache
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from src.domain.aggregates.health.health import Health
+from src.domain.aggregates.portfolio.asset import Asset
+from src.domain.aggregates.portfolio.portfolio import Portfolio
+from src.domain.usecases.portfoliomgt.payloads import (
+    AssetCreate,
+    AssetUpdate,
+    PortfolioCreate,
+    PortfolioUpdate,
+)
+from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
+    SQLAlchemyDataService,
+)
+from src.infrastructure.dataservice.dbdataservice import DbDataService
+from src.infrastructure.datastore.sqlalchemy.base import session_scope, use_shard
+from src.infrastructure.datastore.sqlalchemy.models.owner_shard import (
+    OwnerShard as OwnerShardModel,
+)
+from src.infrastructure.datastore.sqlalchemy.models.portfolio import (
+    Portfolio as PortfolioModel,
+)
+from src.infrastructure.utils.pagination import PaginationRequest, PaginationResponse
+
+from .exceptions import OwnerMovingError
+
+# Sharding by owner (DB_SHARDS): every method is scoped by owner, so each call
+# runs on the one shard holding that owner, with the single-database
+# SQLAlchemyDataService. Where an owner lives is kept in owner_shards on shard 0.
+#
+# Portfolio ids seen by clients carry their shard above SHARD_ID_SHIFT (each
+# shard numbers its rows with its own sequence, below it). Shard 0's ids are
+# unchanged, so an unsharded deployment can add shards without renumbering.
+SHARD_ID_SHIFT = 40
+_LOCAL_ID_MASK = (1 << SHARD_ID_SHIFT) - 1
+
+
+def encode_portfolio_id(shard: int, local_id: int) -> int:
+    return shard << SHARD_ID_SHIFT | local_id
+
+
+def decode_portfolio_id(portfolio_id: int) -> tuple[int, int]:
+    """(shard, id on that shard)"""
+    return portfolio_id >> SHARD_ID_SHIFT, portfolio_id & _LOCAL_ID_MASK
+
+
+def place_owner(owner_id: str, shard_count: int) -> int:
+    """Shard for a new owner, by rendezvous hashing: the same on every replica,
+    and adding a shard only changes the placement of the owners it wins."""
+    return max(
+        range(shard_count),
+        key=lambda shard: hashlib.blake2b(
+            f"{shard}:{owner_id}".encode(), digest_size=8
+        ).digest(),
+    )
+
+
+def _owner_key(owner_id: str | uuid.UUID) -> str:
+    return str(uuid.UUID(str(owner_id)))
+
+
+@dataclass(frozen=True, slots=True)
+class OwnerPlacement:
+    shard: int
+    moving: bool = False
+    # not in owner_shards yet: an owner is recorded by their first write
+    recorded: bool = True
+
+
+class ShardedDataService(DbDataService):
+    def __init__(self, shards: list[SQLAlchemyDataService], map_ttl: float = 5):
+        # one data service per shard, shards[i] for shard i
+        self._shards = shards
+        # owner -> placement. A move flags the owner, waits for the entries to
+        # expire everywhere, then copies (see rebalance.py)
+        self._placements: TTLCache[str, OwnerPlacement] = TTLCache(
+            maxsize=100_000, ttl=map_ttl
+        )
+
+    async def placement(self, owner_id: str, write: bool = False) -> OwnerPlacement:
+        key = _owner_key(owner_id)
+        placement = self._placements.get(key)
+        if placement is not None and (placement.recorded or not write):
+            return placement
+        # on the primary: a replica could still show a move as in progress
+        async with session_scope() as db:
+            row = (
+                await db.execute(
+                    select(OwnerShardModel.shard, OwnerShardModel.moving).where(
+                        OwnerShardModel.owner_id == key
+                    )
+                )
+            ).one_or_none()
+        if row is None:
+            placement = await self._place(key, record=write)
+        else:
+            placement = OwnerPlacement(row.shard, row.moving)
+        self._placements[key] = placement
+        return placement
+
+    async def _place(self, key: str, record: bool) -> OwnerPlacement:
+        """The shard of an owner seen for the first time, recorded if `record`
+        (a write): a read leaves owner_shards alone, whoever the owner is.
+        Owners from before sharding have their rows on shard 0 and stay
+        there."""
+        async with session_scope() as db:
+            legacy = (
+                await db.execute(
+                    select(PortfolioModel.id)
+                    .where(PortfolioModel.owner_id == key)
+                    .limit(1)
+                )
+            ).first()
+            shard = 0 if legacy else place_owner(key, len(self._shards))
+            if not record:
+                return OwnerPlacement(shard, recorded=False)
+            try:
+                await db.execute(
+                    insert(OwnerShardModel).values(owner_id=key, shard=shard)
+                )
+                await db.commit()
+            except IntegrityError:
+                # placed by another request meanwhile (or not a user at all)
+                await db.rollback()
+                row = (
+                    await db.execute(
+                        select(OwnerShardModel.shard, OwnerShardModel.moving).where(
+                            OwnerShardModel.owner_id == key
+                        )
+                    )
+                ).one_or_none()
+                if row is None:
+                    # shard 0 has the users: a write fails there as it would
+                    # without sharding
+                    return OwnerPlacement(0)
+                return OwnerPlacement(row.shard, row.moving)
+        return OwnerPlacement(shard)
+
+    async def _writable(self, owner_id: str) -> int:
+        placement = await self.placement(owner_id, write=True)
+        if placement.moving:
+            raise OwnerMovingError
+        return placement.shard
+
+    async def _read_shard(self, owner_id: str) -> int:
+        return (await self.placement(owner_id)).shard
+
+    async def _local(
+        self, owner_id: str, portfolio_id: int, write: bool = False
+    ) -> tuple[int, int] | None:
+        """(shard, id on the shard) of an owner's portfolio, or None when the id
+        belongs to another shard: then it can't be the owner's."""
+        shard = await (
+            self._writable(owner_id) if write else self._read_shard(owner_id)
+        )
+        id_shard, local_id = decode_portfolio_id(portfolio_id)
+        if id_shard != shard:
+            return None
+        return shard, local_id
+
+    @staticmethod
+    def _portfolio(shard: int, portfolio: Portfolio) -> Portfolio:
+        return replace(portfolio, id=encode_portfolio_id(shard, portfolio.id))
+
+    @staticmethod
+    def _asset(shard: int, asset: Asset) -> Asset:
+        return replace(
+            asset, portfolio_id=encode_portfolio_id(shard, asset.portfolio_id)
+        )
+
+    async def health_check(self) -> Health:
+        errors: list[str] = []
+        warnings: list[str] = []
+        for shard, ds in enumerate(self._shards):
+            with use_shard(shard):
+                health = await ds.health_check()
+            errors += [f"shard {shard}: {e}" for e in health.errors]
+            warnings += [f"shard {shard}: {w}" for w in health.warnings]
+        return Health(errors=errors, warnings=warnings)
+
+    # ----------------- Portfolio Methods -----------------
+    async def create_portfolio(
+        self, owner_id: str, payload: PortfolioCreate
+    ) -> Portfolio:
+        shard = await self._writable(owner_id)
+        with use_shard(shard):
+            portfolio = await self._shards[shard].create_portfolio(owner_id, payload)
+        return self._portfolio(shard, portfolio)
+
+    async def get_portfolio(self, owner_id: str, portfolio_id: int) -> Portfolio | None:
+        local = await self._local(owner_id, portfolio_id)
+        if local is None:
+            return None
+        shard, local_id = local
+        with use_shard(shard):
+            portfolio = await self._shards[shard].get_portfolio(owner_id, local_id)
+        return self._portfolio(shard, portfolio) if portfolio else None
+
+    async def update_portfolio(
+        self, owner_id: str, portfolio_id: int, payload: PortfolioUpdate
+    ) -> Portfolio | None:
+        local = await self._local(owner_id, portfolio_id, write=True)
+        if local is None:
+            return None
+        shard, local_id = local
+        with use_shard(shard):
+            portfolio = await self._shards[shard].update_portfolio(
+                owner_id, local_id, payload
+            )
+        return self._portfolio(shard, portfolio) if portfolio else None
+
+    async def delete_portfolio(self, owner_id: str, portfolio_id: int) -> bool:
+        local = await self._local(owner_id, portfolio_id, write=True)
+        if local is None:
+            return False
+        shard, local_id = local
+        with use_shard(shard):
+            return await self._shards[shard].delete_portfolio(owner_id, local_id)
+
+    async def list_portfolios_paginated(
+        self, owner_id: str, pagination_request: PaginationRequest
+    ) -> tuple[list[Portfolio], PaginationResponse]:
+        shard = await self._read_shard(owner_id)
+        with use_shard(shard):
+            portfolios, pagination = await self._shards[
+                shard
+            ].list_portfolios_paginated(owner_id, pagination_request)
+        return [self._portfolio(shard, p) for p in portfolios], pagination
+
+    # ----------------- Asset Methods -----------------
+    async def create_asset(
+        self, owner_id: str, portfolio_id: int, payload: AssetCreate
+    ) -> Asset | None:
+        local = await self._local(owner_id, portfolio_id, write=True)
+        if local is None:
+            return None
+        shard, local_id = local
+        with use_shard(shard):
+            asset = await self._shards[shard].create_asset(owner_id, local_id, payload)
+        return self._asset(shard, asset) if asset else None
+
+    async def update_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int, payload: AssetUpdate
+    ) -> Asset | None:
+        local = await self._local(owner_id, portfolio_id, write=True)
+        if local is None:
+            return None
+        shard, local_id = local
+        with use_shard(shard):
+            asset = await self._shards[shard].update_asset(
+                owner_id, local_id, asset_id, payload
+            )
+        return self._asset(shard, asset) if asset else None
+
+    async def delete_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int
+    ) -> bool:
+        local = await self._local(owner_id, portfolio_id, write=True)
+        if local is None:
+            return False
+        shard, local_id = local
+        with use_shard(shard):
+            return await self._shards[shard].delete_asset(owner_id, local_id, asset_id)
+
+    async def list_assets_paginated(
+        self, owner_id: str, portfolio_id: int, pagination_request: PaginationRequest
+    ) -> tuple[list[Asset], PaginationResponse] | None:
+        local = await self._local(owner_id, portfolio_id)
+        if local is None:
+            return None
+        shard, local_id = local
+        with use_shard(shard):
+            res = await self._shards[shard].list_assets_paginated(
+                owner_id, local_id, pagination_request
+            )
+        if res is None:
+            return None
+        assets, pagination = res
+        return [self._asset(shard, a) for a in assets], pagination
+
+    async def list_assets(self, owner_id: str, portfolio_id: int) -> list[Asset]:
+        local = await self._local(owner_id, portfolio_id)
+        if local is None:
+            return []
+        shard, local_id = local
+        with use_shard(shard):
+            assets = await self._shards[shard].list_assets(owner_id, local_id)
+        return [self._asset(shard, a) for a in assets]
@@ -0,0 +1,177 @@
+"""
+One-off compaction of consolidated portfolios: merges the asset rows a portfolio
+got before it was consolidated (one per buy) into its holding row for each
+symbol, as its upserts would have.
+
+Rows are merged --batch-size per transaction, --pause seconds apart, so locks
+stay short whatever the size of the portfolio. The job can be stopped and run
+again: a batch is deleted and added to the holdings in one transaction. A
+holding created by the job keeps the date of the oldest row it merged.
+
+Usage (from backend/python, with the backend's DB_* and DB_SHARDS settings):
+    python -m src.infrastructure.dataservice.db_sqlalchemy.compact_holdings
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import structlog
+from sqlalchemy import delete, select
+
+from src.infrastructure.config.settings import build_settings
+from src.infrastructure.datastore.sqlalchemy import base
+from src.infrastructure.datastore.sqlalchemy.models.asset import Asset as AssetModel
+from src.infrastructure.datastore.sqlalchemy.models.portfolio import (
+    Portfolio as PortfolioModel,
+)
+
+from .sqlalchemy import _INSERTS, _LIVE, _merge_holding
+
+logger = structlog.get_logger("db.compact_holdings")
+
+# portfolios taken per scan, in id order
+_SCAN_LIMIT = 100
+
+
+async def compact_portfolio(portfolio_id: int, batch_size: int, pause: float) -> int:
+    """Merge a consolidated portfolio's other rows into its holdings, batch by
+    batch. Returns the rows merged; stops early if the portfolio was deleted or
+    is no longer consolidated."""
+    merged = 0
+    while True:
+        async with base.session_scope() as db:
+            # FOR SHARE: delete_portfolio waits for the batch, the upserts of
+            # create_asset don't
+            locked = await db.execute(
+                select(PortfolioModel.id)
+                .where(
+                    PortfolioModel.id == portfolio_id,
+                    PortfolioModel.consolidated,
+                    _LIVE,
+                )
+                .with_for_update(read=True)
+            )
+            if locked.scalar_one_or_none() is None:
+                return merged
+            # filtering on portfolio_id prunes to the portfolio's partition
+            batch = (
+                select(AssetModel.id)
+                .where(
+                    AssetModel.portfolio_id == portfolio_id,
+                    AssetModel.holding.is_(False),
+                )
+                .order_by(AssetModel.id)
+                .limit(batch_size)
+            )
+            res = await db.execute(
+                delete(AssetModel)
+                .where(
+                    AssetModel.portfolio_id == portfolio_id,
+                    AssetModel.id.in_(batch.scalar_subquery()),
+                )
+                .returning(
+                    AssetModel.symbol_id, AssetModel.quantity, AssetModel.created_at
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = res.all()
+            # symbol_id -> (quantity, oldest created_at)
+            holdings: dict[int, tuple[float, datetime]] = {}
+            for row in rows:
+                quantity, created_at = holdings.get(
+                    row.symbol_id, (0.0, row.created_at)
+                )
+                holdings[row.symbol_id] = (
+                    quantity + row.quantity,
+                    min(created_at, row.created_at),
+                )
+            if holdings:
+                upsert = _INSERTS[db.get_bind().dialect.name](AssetModel)
+                await db.execute(
+                    _merge_holding(upsert),
+                    [
+                        {
+                            "portfolio_id": portfolio_id,
+                            "symbol_id": symbol_id,
+                            "quantity": quantity,
+                            "created_at": created_at,
+                            "holding": True,
+                        }
+                        for symbol_id, (quantity, created_at) in holdings.items()
+                    ],
+                )
+            await db.commit()
+        merged += len(rows)
+        if len(rows) < batch_size:
+            return merged
+        await asyncio.sleep(pause)
+
+
+async def compact_holdings(batch_size: int, pause: float) -> tuple[int, int]:
+    """One pass over the consolidated portfolios (of the current shard, see
+    base.use_shard). Returns (portfolios compacted, rows merged)."""
+    portfolios = rows = 0
+    last_id = 0
+    while True:
+        async with base.session_scope() as db:
+            portfolio_ids = (
+                (
+                    await db.execute(
+                        select(PortfolioModel.id)
+                        .where(
+                            PortfolioModel.consolidated,
+                            PortfolioModel.id > last_id,
+                            _LIVE,
+                        )
+                        .order_by(PortfolioModel.id)
+                        .limit(_SCAN_LIMIT)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+        if not portfolio_ids:
+            return portfolios, rows
+        for portfolio_id in portfolio_ids:
+            start = time.perf_counter()
+            merged = await compact_portfolio(portfolio_id, batch_size, pause)
+            if merged:
+                logger.info(
+                    "portfolio_compacted",
+                    shard=base.current_shard(),
+                    portfolio_id=portfolio_id,
+                    rows=merged,
+                    duration_s=round(time.perf_counter() - start, 3),
+                )
+                portfolios += 1
+                rows += merged
+        last_id = portfolio_ids[-1]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.1)
+    args = parser.parse_args()
+
+    settings = build_settings()
+    base.build_engine(settings=settings)
+    try:
+        print(f"{'shard':<7}{'portfolios':>12}{'rows':>12}")
+        for shard in base.shards:
+            with base.use_shard(shard.index):
+                portfolios, rows = await compact_holdings(args.batch_size, args.pause)
+            print(f"{shard.index:<7}{portfolios:>12}{rows:>12}")
+    finally:
+        for shard in base.shards:
+            await shard.engine.dispose()
+            if shard.read_engine is not None:
+                await shard.read_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,29 +1,212 @@
 from __future__ import annotations
 
-from sqlalchemy import delete, func, select, update
-from sqlalchemy.exc import SQLAlchemyError
+import asyncio
+import uuid
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
+from dataclasses import dataclass
 
+from sqlalchemy import (
+    Float,
+    Integer,
+    Row,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+
+from src.domain.aggregates.exceptions.portfolio import (
+    InsufficientQuantityError,
+    SymbolLimitError,
+)
 from src.domain.aggregates.health.health import Health
 from src.domain.aggregates.portfolio.asset import Asset
 from src.domain.aggregates.portfolio.portfolio import Portfolio
 from src.domain.usecases.portfoliomgt.payloads import (
     AssetCreate,
+    AssetUpdate,
     PortfolioCreate,
     PortfolioUpdate,
 )
 from src.infrastructure.dataservice.dbdataservice import DbDataService
-from src.infrastructure.datastore.sqlalchemy.base import session_scope
+from src.infrastructure.datastore.sqlalchemy.base import (
+    current_deadline,
+    is_retried_by_caller,
+    mark_written,
+    read_session_scope,
+    retried_by_caller,
+    retry_on_disconnect,
+    session_scope,
+    set_deadline,
+    use_shard,
+)
 from src.infrastructure.datastore.sqlalchemy.models.asset import Asset as AssetModel
 from src.infrastructure.datastore.sqlalchemy.models.portfolio import (
     Portfolio as PortfolioModel,
 )
+from src.infrastructure.datastore.sqlalchemy.symbols import (
+    add_symbol,
+    known_symbol_ids,
+    owned_symbol_ids,
+    symbol_id_column,
+    symbol_limit,
+    symbol_names,
+)
+from src.infrastructure.utils.batching import Batcher
 from src.infrastructure.utils.pagination import (
     PaginationRequest,
     create_pagination_response,
 )
 
+# Hot statements are built once at import time with bound parameters, so each call
+# skips rebuilding the select() construct and hits SQLAlchemy's compiled cache
+# directly. They select plain columns: no ORM entity is loaded, which also keeps
+# the selectin `Portfolio.assets` relationship from firing.
+#
+# Deleted portfolios are only marked (deleted_at) until the purger removes them:
+# every query on portfolios filters them out with _LIVE.
+#
+# Assets store a symbol id, mapped to and from the symbol in process (symbols.py).
+#
+# A consolidated portfolio keeps one holding row per symbol: its assets are
+# written with holding set and ON CONFLICT on the partial unique index
+# (portfolio_id, symbol_id) WHERE holding, adding the quantity to the existing
+# holding. Rows from before it was consolidated are merged by compact_holdings.
+_LIVE = PortfolioModel.deleted_at.is_(None)
+_PORTFOLIO_COLUMNS = (
+    PortfolioModel.id,
+    PortfolioModel.owner_id,
+    PortfolioModel.name,
+    PortfolioModel.created_at,
+    PortfolioModel.consolidated,
+)
+_ASSET_COLUMNS = (
+    AssetModel.id,
+    AssetModel.portfolio_id,
+    AssetModel.symbol_id,
+    AssetModel.quantity,
+    AssetModel.created_at,
+)
+
+GET_PORTFOLIO_STMT = select(*_PORTFOLIO_COLUMNS).where(
+    PortfolioModel.owner_id == bindparam("owner_id"),
+    PortfolioModel.id == bindparam("portfolio_id"),
+    _LIVE,
+)
+
+LIST_ASSETS_STMT = (
+    select(*_ASSET_COLUMNS)
+    .join(PortfolioModel, AssetModel.portfolio_id == PortfolioModel.id)
+    .where(
+        PortfolioModel.owner_id == bindparam("owner_id"),
+        AssetModel.portfolio_id == bindparam("portfolio_id"),
+        _LIVE,
+    )
+)
+
+
+# ON CONFLICT is dialect-specific SQL
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _merge_holding(
+    stmt: postgresql.Insert | sqlite.Insert,
+) -> postgresql.Insert | sqlite.Insert:
+    """Add a holding's quantity to the one already stored, if any."""
+    return stmt.on_conflict_do_update(
+        index_elements=[AssetModel.portfolio_id, AssetModel.symbol_id],
+        index_where=text("holding"),
+        set_={"quantity": AssetModel.quantity + stmt.excluded.quantity},
+    )
+
+
+def _owned_portfolio(owner_id: str, portfolio_id: int):
+    # Ownership as an uncorrelated EXISTS: Postgres evaluates it once
+    # (InitPlan), and unlike UPDATE/DELETE ... USING it also runs on SQLite
+    return (
+        select(PortfolioModel.id)
+        .where(
+            PortfolioModel.id == portfolio_id,
+            PortfolioModel.owner_id == owner_id,
+            _LIVE,
+        )
+        .exists()
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class _PortfolioLookup:
+    owner_id: str
+    portfolio_id: int
+    # the caller's, as _AssetWrite's
+    deadline: float | None = None
+    # whether the caller retries lost connections itself (retried_by_caller)
+    retried: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class _AssetWrite:
+    owner_id: str
+    portfolio_id: int
+    payload: AssetCreate
+    # the caller's (see base.set_deadline): its batch runs outside its context
+    deadline: float | None = None
+
 
 class SQLAlchemyDataService(DbDataService):
+    def __init__(
+        self,
+        coalesce_writes: bool = False,
+        write_batch_max_size: int = 64,
+        write_batch_max_wait_ms: float = 2,
+        batch_reads: bool = False,
+        read_batch_max_size: int = 100,
+        read_batch_max_wait_ms: float = 0,
+        shard: int | None = None,
+    ) -> None:
+        # set for one shard of ShardedDataService, which calls it in use_shard()
+        self._shard = shard
+        # Group commit (DB_WRITE_COALESCING): concurrent create_asset calls share
+        # one transaction and one multi-row INSERT, so one commit (fsync)
+        self._asset_writes: Batcher[_AssetWrite, Asset | None] | None = None
+        if coalesce_writes:
+            self._asset_writes = Batcher(
+                self._in_shard(self._create_assets),
+                max_size=write_batch_max_size,
+                max_wait=write_batch_max_wait_ms / 1000,
+            )
+        # Loader (DB_READ_BATCHING): concurrent get_portfolio calls, such as the
+        # ownership checks of a client's parallel requests, share one query
+        self._portfolio_reads: Batcher[_PortfolioLookup, Portfolio | None] | None = None
+        if batch_reads:
+            self._portfolio_reads = Batcher(
+                self._in_shard(self._get_portfolios),
+                max_size=read_batch_max_size,
+                max_wait=read_batch_max_wait_ms / 1000,
+            )
+
+    def _in_shard[T, R](
+        self, flush: Callable[[list[T]], Awaitable[R]]
+    ) -> Callable[[list[T]], Awaitable[R]]:
+        # batches are flushed outside their callers' context, and so shard
+        if self._shard is None:
+            return flush
+        shard = self._shard
+
+        async def flush_in_shard(items: list[T]) -> R:
+            with use_shard(shard):
+                return await flush(items)
+
+        return flush_in_shard
+
     async def health_check(self) -> Health:
         errors: list[str] = []
         warnings: list[str] = []
@@ -39,36 +222,112 @@ class SQLAlchemyDataService(DbDataService):
     async def create_portfolio(
         self, owner_id: str, payload: PortfolioCreate
     ) -> Portfolio:
-        model = PortfolioModel(name=payload.name, owner_id=owner_id)
         async with session_scope() as db:
-            db.add(model)
+            # RETURNING hands back the server-generated columns (id, created_at)
+            # without a refresh round trip. Columns rather than the entity, so the
+            # selectin-loaded `assets` relationship doesn't fire a second query.
+            res = await db.execute(
+                insert(PortfolioModel)
+                .values(
+                    name=payload.name,
+                    owner_id=owner_id,
+                    consolidated=payload.consolidated,
+                )
+                .returning(*_PORTFOLIO_COLUMNS)
+            )
+            row = res.one()
             await db.commit()
-            await db.refresh(model)
+            mark_written(owner_id)
         return Portfolio(
-            id=model.id,
-            owner_id=model.owner_id,
-            name=model.name,
-            created_at=model.created_at,
+            id=row.id,
+            owner_id=row.owner_id,
+            name=row.name,
+            created_at=row.created_at,
+            consolidated=row.consolidated,
         )
 
     async def get_portfolio(self, owner_id: str, portfolio_id: int) -> Portfolio | None:
-        async with session_scope() as db:
-            res = await db.execute(
-                select(PortfolioModel).where(
-                    PortfolioModel.owner_id == owner_id,
-                    PortfolioModel.id == portfolio_id,
+        if self._portfolio_reads is not None:
+            return await self._portfolio_reads.submit(
+                _PortfolioLookup(
+                    owner_id, portfolio_id, current_deadline(), is_retried_by_caller()
                 )
             )
-            model = res.scalar_one_or_none()
-            if model:
+        return await self._get_portfolio(owner_id, portfolio_id)
+
+    @retry_on_disconnect
+    async def _get_portfolio(
+        self, owner_id: str, portfolio_id: int
+    ) -> Portfolio | None:
+        async with read_session_scope(pin_key=owner_id) as db:
+            res = await db.execute(
+                GET_PORTFOLIO_STMT,
+                {"owner_id": owner_id, "portfolio_id": portfolio_id},
+            )
+            row = res.one_or_none()
+            if row:
                 return Portfolio(
-                    id=model.id,
-                    owner_id=model.owner_id,
-                    name=model.name,
-                    created_at=model.created_at,
+                    id=row.id,
+                    owner_id=row.owner_id,
+                    name=row.name,
+                    created_at=row.created_at,
+                    consolidated=row.consolidated,
                 )
             return None
 
+    async def _get_portfolios(
+        self, lookups: list[_PortfolioLookup]
+    ) -> list[Portfolio | None | Exception]:
+        """A batch of get_portfolio calls: one query per owner, for all the ids
+        that owner asked for (duplicates included once), under the earliest
+        deadline of the callers. Its queries retry a lost connection unless all
+        the callers do."""
+        deadlines = [lu.deadline for lu in lookups if lu.deadline is not None]
+        set_deadline(min(deadlines, default=None))
+        by_owner: defaultdict[str, set[int]] = defaultdict(set)
+        for lookup in lookups:
+            by_owner[lookup.owner_id].add(lookup.portfolio_id)
+        owners = list(by_owner)
+        retried = all(lookup.retried for lookup in lookups)
+        # a failed query only fails that owner's callers
+        with retried_by_caller() if retried else nullcontext():
+            found = await asyncio.gather(
+                *(self._get_owned_portfolios(o, by_owner[o]) for o in owners),
+                return_exceptions=True,
+            )
+        by_id = dict(zip(owners, found, strict=True))
+        results: list[Portfolio | None | Exception] = []
+        for lookup in lookups:
+            portfolios = by_id[lookup.owner_id]
+            if isinstance(portfolios, Exception):
+                results.append(portfolios)
+            else:
+                results.append(portfolios.get(lookup.portfolio_id))
+        return results
+
+    @retry_on_disconnect
+    async def _get_owned_portfolios(
+        self, owner_id: str, portfolio_ids: set[int]
+    ) -> dict[int, Portfolio]:
+        async with read_session_scope(pin_key=owner_id) as db:
+            res = await db.execute(
+                select(*_PORTFOLIO_COLUMNS).where(
+                    PortfolioModel.owner_id == owner_id,
+                    PortfolioModel.id.in_(portfolio_ids),
+                    _LIVE,
+                )
+            )
+            return {
+                row.id: Portfolio(
+                    id=row.id,
+                    owner_id=row.owner_id,
+                    name=row.name,
+                    created_at=row.created_at,
+                    consolidated=row.consolidated,
+                )
+                for row in res
+            }
+
     async def update_portfolio(
         self, owner_id: str, portfolio_id: int, payload: PortfolioUpdate
     ):
@@ -76,137 +335,430 @@ class SQLAlchemyDataService(DbDataService):
             kwargs = {}
             if payload.name:
                 kwargs["name"] = payload.name
+            if payload.consolidated is not None:
+                kwargs["consolidated"] = payload.consolidated
 
+            # columns, not the entity: that would selectin-load its assets
             res = await db.execute(
                 update(PortfolioModel)
-                .returning(PortfolioModel)
+                .returning(*_PORTFOLIO_COLUMNS)
                 .where(
                     PortfolioModel.owner_id == owner_id,
                     PortfolioModel.id == portfolio_id,
+                    _LIVE,
                 )
-                .values(name=payload.name)
+                # nothing to change: a no-op SET still returns the row
+                .values(**(kwargs or {"name": PortfolioModel.name}))
             )
             await db.commit()
-            model = res.scalar_one_or_none()
-            if model:
+            mark_written(owner_id)
+            row = res.one_or_none()
+            if row:
                 return Portfolio(
-                    id=model.id,
-                    owner_id=model.owner_id,
-                    name=model.name,
-                    created_at=model.created_at,
+                    id=row.id,
+                    owner_id=row.owner_id,
+                    name=row.name,
+                    created_at=row.created_at,
+                    consolidated=row.consolidated,
                 )
             return None
 
     async def delete_portfolio(self, owner_id: str, portfolio_id: int) -> bool:
+        # Soft delete: a single-row update, however many assets the portfolio
+        # has. The purger (datastore/sqlalchemy/purge.py) deletes them later.
         async with session_scope() as db:
             res = await db.execute(
-                delete(PortfolioModel).where(
+                update(PortfolioModel)
+                .where(
                     PortfolioModel.owner_id == owner_id,
                     PortfolioModel.id == portfolio_id,
+                    _LIVE,
                 )
+                .values(deleted_at=func.now())
             )
             await db.commit()
+            mark_written(owner_id)
             return res.rowcount > 0
 
+    @retry_on_disconnect
     async def list_portfolios_paginated(
         self, owner_id: str, pagination_request: PaginationRequest
     ):
-        async with session_scope() as db:
+        async with read_session_scope(pin_key=owner_id) as db:
             total_res = await db.execute(
                 select(func.count(PortfolioModel.id)).where(
-                    PortfolioModel.owner_id == owner_id
+                    PortfolioModel.owner_id == owner_id, _LIVE
                 )
             )
             count = total_res.scalar_one()
 
+            # columns, not the entity: that would selectin-load every
+            # portfolio's assets in an extra query
             res = await db.execute(
-                select(PortfolioModel)
-                .where(PortfolioModel.owner_id == owner_id)
+                select(*_PORTFOLIO_COLUMNS)
+                .where(PortfolioModel.owner_id == owner_id, _LIVE)
                 .order_by(PortfolioModel.id.desc())
                 .limit(pagination_request.items_per_page)
                 .offset(pagination_request.offset)
             )
-            items = res.scalars().all()
             portfolios = [
                 Portfolio(
-                    id=model.id,
-                    owner_id=model.owner_id,
-                    name=model.name,
-                    created_at=model.created_at,
+                    id=row.id,
+                    owner_id=row.owner_id,
+                    name=row.name,
+                    created_at=row.created_at,
+                    consolidated=row.consolidated,
                 )
-                for model in items
+                for row in res
             ]
             return portfolios, create_pagination_response(count, pagination_request)
 
     # ----------------- Asset Methods -----------------
 
-    async def create_asset(self, portfolio_id: int, payload: AssetCreate) -> Asset:
-        model = AssetModel(
-            symbol=payload.symbol, quantity=payload.quantity, portfolio_id=portfolio_id
+    async def create_asset(
+        self, owner_id: str, portfolio_id: int, payload: AssetCreate
+    ) -> Asset | None:
+        if self._asset_writes is not None:
+            return await self._asset_writes.submit(
+                _AssetWrite(owner_id, portfolio_id, payload, current_deadline())
+            )
+        return await self._create_asset(owner_id, portfolio_id, payload)
+
+    async def _create_asset(
+        self, owner_id: str, portfolio_id: int, payload: AssetCreate
+    ) -> Asset | None:
+        symbol_id = (await known_symbol_ids()).get(payload.symbol)
+        try:
+            row = await self._insert_asset(owner_id, portfolio_id, payload, symbol_id)
+        except IntegrityError:
+            if symbol_id is not None:
+                raise
+            # another transaction added the symbol after our statement began:
+            # its row wasn't visible to it (symbol_id NOT NULL)
+            ids = await owned_symbol_ids([(payload.symbol, owner_id, portfolio_id)])
+            symbol_id = ids.get(payload.symbol)
+            if symbol_id is None:
+                raise
+            row = await self._insert_asset(owner_id, portfolio_id, payload, symbol_id)
+        if row is None:
+            return None
+        add_symbol(row.symbol_id, payload.symbol)
+        return Asset(
+            id=row.id,
+            symbol=payload.symbol,
+            quantity=row.quantity,
+            portfolio_id=row.portfolio_id,
+            created_at=row.created_at,
+        )
+
+    async def _insert_asset(
+        self,
+        owner_id: str,
+        portfolio_id: int,
+        payload: AssetCreate,
+        symbol_id: int | None,
+    ) -> Row | None:
+        async with session_scope() as db:
+            # a new symbol (symbol_id None) is added by the same statement
+            symbol = (
+                literal(symbol_id, Integer)
+                if symbol_id is not None
+                else await symbol_id_column(db, payload.symbol, owner_id, portfolio_id)
+            )
+            # INSERT ... SELECT FROM portfolios: inserts nothing if the owner
+            # doesn't own the portfolio, so the ownership check costs no extra
+            # round trip. The row is a holding if the portfolio is consolidated:
+            # it then merges.
+            owned_portfolio = select(
+                PortfolioModel.id,
+                symbol,
+                literal(payload.quantity, Float),
+                PortfolioModel.consolidated,
+            ).where(
+                PortfolioModel.owner_id == owner_id,
+                PortfolioModel.id == portfolio_id,
+                _LIVE,
+            )
+            upsert = _INSERTS[db.get_bind().dialect.name](AssetModel).from_select(
+                ["portfolio_id", "symbol_id", "quantity", "holding"], owned_portfolio
+            )
+            with symbol_limit():
+                res = await db.execute(
+                    _merge_holding(upsert).returning(*_ASSET_COLUMNS)
+                )
+            row = res.one_or_none()
+            await db.commit()
+            mark_written(owner_id)
+            return row
+
+    async def _create_assets(
+        self, writes: list[_AssetWrite]
+    ) -> list[Asset | None | Exception]:
+        """A batch of create_asset calls in one transaction: the ownership of all
+        their portfolios in one SELECT, then one multi-row INSERT ... RETURNING
+        (and one upsert for the consolidated portfolios' holdings). It runs
+        under the earliest deadline of its callers. Its statements aren't in any
+        caller's query stats (db_queries): they're shared."""
+        # an owner id that isn't a UUID fails its own write, not the batch
+        bad: dict[int, Exception] = {}
+        for i, w in enumerate(writes):
+            try:
+                uuid.UUID(str(w.owner_id))
+            except ValueError as e:
+                bad[i] = e
+        if bad:
+            good = [w for i, w in enumerate(writes) if i not in bad]
+            done = iter(await self._create_assets(good) if good else [])
+            return [bad[i] if i in bad else next(done) for i in range(len(writes))]
+
+        # the batch's own context (see Batcher): nothing to reset
+        deadlines = [w.deadline for w in writes if w.deadline is not None]
+        set_deadline(min(deadlines, default=None))
+        try:
+            ids = await owned_symbol_ids(
+                (w.payload.symbol, w.owner_id, w.portfolio_id) for w in writes
+            )
+            async with session_scope() as db:
+                res = await db.execute(
+                    select(
+                        PortfolioModel.id,
+                        PortfolioModel.owner_id,
+                        PortfolioModel.consolidated,
+                    )
+                    .where(
+                        PortfolioModel.id.in_({w.portfolio_id for w in writes}),
+                        _LIVE,
+                    )
+                    # FOR SHARE: a concurrent delete_portfolio waits for the commit.
+                    # SQLite has no row locks and renders nothing: there a delete
+                    # committed after this SELECT fails the INSERT (a stale WAL
+                    # snapshot can't write) instead of waiting.
+                    .with_for_update(read=True)
+                )
+                portfolios = res.all()
+                owners = {row.id: row.owner_id for row in portfolios}
+                consolidated = {row.id for row in portfolios if row.consolidated}
+                is_owned = [
+                    owners.get(w.portfolio_id) == uuid.UUID(str(w.owner_id))
+                    and w.payload.symbol in ids
+                    for w in writes
+                ]
+                owned = [
+                    w
+                    for w, ok in zip(writes, is_owned, strict=True)
+                    if ok and w.portfolio_id not in consolidated
+                ]
+                # summed per holding first: one statement can't update a row twice
+                merged: defaultdict[tuple[int, int], float] = defaultdict(float)
+                for w, ok in zip(writes, is_owned, strict=True):
+                    if ok and w.portfolio_id in consolidated:
+                        merged[(w.portfolio_id, ids[w.payload.symbol])] += (
+                            w.payload.quantity
+                        )
+                rows = []
+                holdings = {}
+                if owned:
+                    res = await db.execute(
+                        insert(AssetModel).returning(*_ASSET_COLUMNS),
+                        [
+                            {
+                                "portfolio_id": w.portfolio_id,
+                                "symbol_id": ids[w.payload.symbol],
+                                "quantity": w.payload.quantity,
+                            }
+                            for w in owned
+                        ],
+                    )
+                    rows = res.all()
+                if merged:
+                    upsert = _INSERTS[db.get_bind().dialect.name](AssetModel)
+                    res = await db.execute(
+                        _merge_holding(upsert).returning(*_ASSET_COLUMNS),
+                        [
+                            {
+                                "portfolio_id": portfolio_id,
+                                "symbol_id": symbol_id,
+                                "quantity": quantity,
+                                "holding": True,
+                            }
+                            for (portfolio_id, symbol_id), quantity in merged.items()
+                        ],
+                    )
+                    holdings = {(row.portfolio_id, row.symbol_id): row for row in res}
+                await db.commit()
+        except (IntegrityError, DataError, SymbolLimitError):
+            # One bad row (or new symbol) fails the whole batch: run the writes
+            # one by one, so the error only reaches its own caller. Other errors (a lost
+            # connection, a timeout) would fail them all again: they're raised.
+            results: list[Asset | None | Exception] = []
+            for w in writes:
+                try:
+                    results.append(
+                        await self._create_asset(w.owner_id, w.portfolio_id, w.payload)
+                    )
+                except (IntegrityError, DataError, SymbolLimitError) as e:
+                    results.append(e)
+            return results
+
+        # RETURNING order isn't guaranteed: rows are matched back by value (rows
+        # with the same values are interchangeable)
+        created = defaultdict(list)
+        for row in rows:
+            created[(row.portfolio_id, row.symbol_id, row.quantity)].append(row)
+        results = []
+        for w, ok in zip(writes, is_owned, strict=True):
+            key = (w.portfolio_id, ids.get(w.payload.symbol), w.payload.quantity)
+            row = None
+            if ok and w.portfolio_id in consolidated:
+                # every write to the holding gets its total
+                row = holdings.get(key[:2])
+            elif ok and created[key]:
+                row = created[key].pop()
+            if row is not None:
+                mark_written(w.owner_id)
+                results.append(
+                    Asset(
+                        id=row.id,
+                        symbol=w.payload.symbol,
+                        quantity=row.quantity,
+                        portfolio_id=row.portfolio_id,
+                        created_at=row.created_at,
+                    )
+                )
+            else:
+                results.append(None)
+        return results
+
+    async def update_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int, payload: AssetUpdate
+    ) -> Asset | None:
+        # A delta is added by the database, so concurrent ones all count. The
+        # guard on the new quantity keeps it above 0 in the same statement.
+        if payload.delta is not None:
+            quantity = AssetModel.quantity + payload.delta
+        else:
+            quantity = literal(payload.quantity, Float)
+        asset = (
+            AssetModel.id == asset_id,
+            AssetModel.portfolio_id == portfolio_id,
+            _owned_portfolio(owner_id, portfolio_id),
         )
         async with session_scope() as db:
-            db.add(model)
+            res = await db.execute(
+                update(AssetModel)
+                .where(*asset, quantity > 0)
+                .values(quantity=quantity)
+                .returning(*_ASSET_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+            row = res.one_or_none()
+            if row is None:
+                # only on failure: the guard or a missing asset?
+                found = await db.execute(select(AssetModel.id).where(*asset))
+                if found.first() is not None:
+                    raise InsufficientQuantityError
+                return None
             await db.commit()
-            await db.refresh(model)
+            mark_written(owner_id)
+        symbols = await symbol_names([row.symbol_id])
         return Asset(
-            id=model.id,
-            symbol=model.symbol,
-            quantity=model.quantity,
-            portfolio_id=model.portfolio_id,
-            created_at=model.created_at,
+            id=row.id,
+            symbol=symbols[row.symbol_id],
+            quantity=row.quantity,
+            portfolio_id=row.portfolio_id,
+            created_at=row.created_at,
         )
 
-    async def delete_asset(self, asset_id: int) -> bool:
+    async def delete_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int
+    ) -> bool:
         async with session_scope() as db:
-            res = await db.execute(delete(AssetModel).where(AssetModel.id == asset_id))
+            res = await db.execute(
+                delete(AssetModel)
+                .where(
+                    AssetModel.id == asset_id,
+                    AssetModel.portfolio_id == portfolio_id,
+                    _owned_portfolio(owner_id, portfolio_id),
+                )
+                .execution_options(synchronize_session=False)
+            )
             await db.commit()
+            mark_written(owner_id)
             return res.rowcount > 0
 
+    @retry_on_disconnect
     async def list_assets_paginated(
-        self, portfolio_id: int, pagination_request: PaginationRequest
+        self, owner_id: str, portfolio_id: int, pagination_request: PaginationRequest
     ):
-        async with session_scope() as db:
+        async with read_session_scope(pin_key=owner_id) as db:
+            # Grouping by the portfolio yields no row at all when it isn't owned,
+            # which tells "not found" apart from "no assets"
             total_res = await db.execute(
-                select(func.count(AssetModel.id)).where(
-                    AssetModel.portfolio_id == portfolio_id
+                select(func.count(AssetModel.id))
+                .select_from(PortfolioModel)
+                .outerjoin(
+                    AssetModel,
+                    # filtering assets on the portfolio_id value itself lets
+                    # Postgres prune to that portfolio's partition
+                    (AssetModel.portfolio_id == PortfolioModel.id)
+                    & (AssetModel.portfolio_id == portfolio_id),
+                )
+                .where(
+                    PortfolioModel.owner_id == owner_id,
+                    PortfolioModel.id == portfolio_id,
+                    _LIVE,
                 )
+                .group_by(PortfolioModel.id)
             )
-            count = total_res.scalar_one()
+            count = total_res.scalar_one_or_none()
+            if count is None:
+                return None
 
-            res = await db.execute(
-                select(AssetModel)
-                .where(AssetModel.portfolio_id == portfolio_id)
-                .order_by(AssetModel.id.desc())
-                .limit(pagination_request.items_per_page)
-                .offset(pagination_request.offset)
-            )
-            items = res.scalars().all()
-            assets = [
-                Asset(
-                    id=model.id,
-                    symbol=model.symbol,
-                    quantity=model.quantity,
-                    portfolio_id=model.portfolio_id,
-                    created_at=model.created_at,
+            rows = []
+            if count > 0:
+                res = await db.execute(
+                    select(*_ASSET_COLUMNS)
+                    .join(PortfolioModel, AssetModel.portfolio_id == PortfolioModel.id)
+                    .where(
+                        PortfolioModel.owner_id == owner_id,
+                        AssetModel.portfolio_id == portfolio_id,
+                        _LIVE,
+                    )
+                    .order_by(AssetModel.id.desc())
+                    .limit(pagination_request.items_per_page)
+                    .offset(pagination_request.offset)
                 )
-                for model in items
-            ]
-            return assets, create_pagination_response(count, pagination_request)
+                rows = res.all()
+        # after the read session: a reload of the symbols runs on the primary
+        symbols = await symbol_names([row.symbol_id for row in rows])
+        assets = [
+            Asset(
+                id=row.id,
+                symbol=symbols[row.symbol_id],
+                quantity=row.quantity,
+                portfolio_id=row.portfolio_id,
+                created_at=row.created_at,
+            )
+            for row in rows
+        ]
+        return assets, create_pagination_response(count, pagination_request)
 
-    async def list_assets(self, portfolio_id: int) -> list[Asset]:
-        async with session_scope() as db:
+    @retry_on_disconnect
+    async def list_assets(self, owner_id: str, portfolio_id: int) -> list[Asset]:
+        async with read_session_scope(pin_key=owner_id) as db:
             res = await db.execute(
-                select(AssetModel).where(AssetModel.portfolio_id == portfolio_id)
-            )
-            items = res.scalars().all()
-            assets = [
-                Asset(
-                    id=model.id,
-                    symbol=model.symbol,
-                    quantity=model.quantity,
-                    portfolio_id=model.portfolio_id,
-                    created_at=model.created_at,
-                )
-                for model in items
-            ]
-            return assets
+                LIST_ASSETS_STMT,
+                {"owner_id": owner_id, "portfolio_id": portfolio_id},
+            )
+            rows = res.all()
+        symbols = await symbol_names([row.symbol_id for row in rows])
+        return [
+            Asset(
+                id=row.id,
+                symbol=symbols[row.symbol_id],
+                quantity=row.quantity,
+                portfolio_id=row.portfolio_id,
+                created_at=row.created_at,
+            )
+            for row in rows
+        ]
@@ -7,6 +7,7 @@ from src.domain.aggregates.portfolio.asset import Asset
 from src.domain.aggregates.portfolio.portfolio import Portfolio
 from src.domain.usecases.portfoliomgt.payloads import (
     AssetCreate,
+    AssetUpdate,
     PortfolioCreate,
     PortfolioUpdate,
 )
@@ -46,20 +47,34 @@ class DbDataService(ABC):
         pass
 
     # ----------------- Asset Methods -----------------
+    # Asset methods are scoped by owner: the ownership check runs inside the same
+    # statement, and a portfolio the owner doesn't have behaves as if it didn't exist.
     @abstractmethod
-    async def create_asset(self, portfolio_id: int, payload: AssetCreate) -> Asset:
+    async def create_asset(
+        self, owner_id: str, portfolio_id: int, payload: AssetCreate
+    ) -> Asset | None:
         pass
 
+    # Sets the quantity, or adds the delta to it, in one statement. Raises
+    # InsufficientQuantityError rather than let the quantity drop to 0 or below.
     @abstractmethod
-    async def delete_asset(self, asset_id: int) -> bool:
+    async def update_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int, payload: AssetUpdate
+    ) -> Asset | None:
+        pass
+
+    @abstractmethod
+    async def delete_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int
+    ) -> bool:
         pass
 
     @abstractmethod
     async def list_assets_paginated(
-        self, portfolio_id: int, pagination_request: PaginationRequest
-    ) -> tuple[list[Asset], PaginationResponse]:
+        self, owner_id: str, portfolio_id: int, pagination_request: PaginationRequest
+    ) -> tuple[list[Asset], PaginationResponse] | None:
         pass
 
     @abstractmethod
-    async def list_assets(self, portfolio_id: int) -> list[Asset]:
+    async def list_assets(self, owner_id: str, portfolio_id: int) -> list[Asset]:
         pass
@@ -2,11 +2,51 @@ from __future__ import annotations
 
 from src.infrastructure.config.settings import Settings
 from src.infrastructure.datastore.sqlalchemy.base import build_engine
+from src.infrastructure.utils.faults import FaultInjector
 
+from .db_memory.memory import InMemoryDbDataService
+from .db_resilient.resilient import ResilientDataService
+from .db_sharded.sharded import ShardedDataService
 from .db_sqlalchemy.sqlalchemy import SQLAlchemyDataService
 from .dbdataservice import DbDataService
+from .faulty.faulty import FaultyDbDataService
+
+
+def _with_faults(ds: DbDataService, settings: Settings) -> DbDataService:
+    if not settings.faults:
+        return ds
+    return FaultyDbDataService(ds, FaultInjector(settings.faults, settings.faults_seed))
 
 
 def build_db_dataservice(settings: Settings) -> DbDataService:
+    if settings.db_backend == "memory":
+        return _with_faults(InMemoryDbDataService(), settings)
     build_engine(settings=settings)
-    return SQLAlchemyDataService()
+    options = {
+        "coalesce_writes": settings.db_write_coalescing,
+        "write_batch_max_size": settings.db_write_batch_max_size,
+        "write_batch_max_wait_ms": settings.db_write_batch_max_wait_ms,
+        "batch_reads": settings.db_read_batching,
+        "read_batch_max_size": settings.db_read_batch_max_size,
+        "read_batch_max_wait_ms": settings.db_read_batch_max_wait_ms,
+    }
+    shard_count = 1 + len(settings.shard_database_urls)
+    if shard_count > 1:
+        ds: DbDataService = ShardedDataService(
+            [SQLAlchemyDataService(**options, shard=i) for i in range(shard_count)],
+            map_ttl=settings.db_shard_map_ttl,
+        )
+    else:
+        ds = SQLAlchemyDataService(**options)
+    # injected faults are retried like real ones
+    ds = _with_faults(ds, settings)
+    # retries and hedges wrap the whole call, shard lookup included
+    if settings.db_read_retries or settings.db_hedged_reads:
+        ds = ResilientDataService(
+            ds,
+            retries=settings.db_read_retries,
+            backoff_ms=settings.db_read_retry_backoff_ms,
+            hedge=settings.db_hedged_reads,
+            hedge_min_delay_ms=settings.db_hedge_min_delay_ms,
+        )
+    return ds
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from functools import partial
+
+from src.domain.aggregates.auth.user import User
+from src.domain.aggregates.health.health import Health
+from src.domain.aggregates.portfolio.asset import Asset
+from src.domain.aggregates.portfolio.portfolio import Portfolio
+from src.domain.usecases.portfoliomgt.payloads import (
+    AssetCreate,
+    AssetUpdate,
+    PortfolioCreate,
+    PortfolioUpdate,
+)
+from src.infrastructure.dataservice.authdataservice import AuthDataService
+from src.infrastructure.dataservice.dbdataservice import DbDataService
+from src.infrastructure.utils.faults import FaultInjector
+from src.infrastructure.utils.pagination import PaginationRequest, PaginationResponse
+
+# Data services with injected latency and connection errors (FAULTS, see
+# utils/faults.py), for load tests and tail-latency tests. Not for production.
+
+
+class FaultyDbDataService(DbDataService):
+    def __init__(self, inner: DbDataService, injector: FaultInjector):
+        self._inner = inner
+        self.injector = injector
+
+    async def health_check(self) -> Health:
+        return await self.injector.run("health_check", self._inner.health_check)
+
+    # ----------------- Portfolio Methods -----------------
+    async def create_portfolio(
+        self, owner_id: str, payload: PortfolioCreate
+    ) -> Portfolio:
+        return await self.injector.run(
+            "create_portfolio",
+            partial(self._inner.create_portfolio, owner_id, payload),
+        )
+
+    async def get_portfolio(self, owner_id: str, portfolio_id: int) -> Portfolio | None:
+        return await self.injector.run(
+            "get_portfolio",
+            partial(self._inner.get_portfolio, owner_id, portfolio_id),
+        )
+
+    async def update_portfolio(
+        self, owner_id: str, portfolio_id: int, payload: PortfolioUpdate
+    ) -> Portfolio | None:
+        return await self.injector.run(
+            "update_portfolio",
+            partial(self._inner.update_portfolio, owner_id, portfolio_id, payload),
+        )
+
+    async def delete_portfolio(self, owner_id: str, portfolio_id: int) -> bool:
+        return await self.injector.run(
+            "delete_portfolio",
+            partial(self._inner.delete_portfolio, owner_id, portfolio_id),
+        )
+
+    async def list_portfolios_paginated(
+        self, owner_id: str, pagination_request: PaginationRequest
+    ) -> tuple[list[Portfolio], PaginationResponse]:
+        return await self.injector.run(
+            "list_portfolios_paginated",
+            partial(
+                self._inner.list_portfolios_paginated, owner_id, pagination_request
+            ),
+        )
+
+    # ----------------- Asset Methods -----------------
+    async def create_asset(
+        self, owner_id: str, portfolio_id: int, payload: AssetCreate
+    ) -> Asset | None:
+        return await self.injector.run(
+            "create_asset",
+            partial(self._inner.create_asset, owner_id, portfolio_id, payload),
+        )
+
+    async def update_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int, payload: AssetUpdate
+    ) -> Asset | None:
+        return await self.injector.run(
+            "update_asset",
+            partial(
+                self._inner.update_asset, owner_id, portfolio_id, asset_id, payload
+            ),
+        )
+
+    async def delete_asset(
+        self, owner_id: str, portfolio_id: int, asset_id: int
+    ) -> bool:
+        return await self.injector.run(
+            "delete_asset",
+            partial(self._inner.delete_asset, owner_id, portfolio_id, asset_id),
+        )
+
+    async def list_assets_paginated(
+        self, owner_id: str, portfolio_id: int, pagination_request: PaginationRequest
+    ) -> tuple[list[Asset], PaginationResponse] | None:
+        return await self.injector.run(
+            "list_assets_paginated",
+            partial(
+                self._inner.list_assets_paginated,
+                owner_id,
+                portfolio_id,
+                pagination_request,
+            ),
+        )
+
+    async def list_assets(self, owner_id: str, portfolio_id: int) -> list[Asset]:
+        return await self.injector.run(
+            "list_assets", partial(self._inner.list_assets, owner_id, portfolio_id)
+        )
+
+
+class FaultyAuthDataService(AuthDataService):
+    def __init__(self, inner: AuthDataService, injector: FaultInjector):
+        self._inner = inner
+        self.injector = injector
+
+    async def health_check(self) -> Health:
+        return await self.injector.run("health_check", self._inner.health_check)
+
+    # ----------------- User Methods -----------------
+    async def register(self, email: str, password: str) -> tuple[User, str]:
+        return await self.injector.run(
+            "register", partial(self._inner.register, email, password)
+        )
+
+    async def login(self, email: str, password: str) -> tuple[User, str]:
+        return await self.injector.run(
+            "login", partial(self._inner.login, email, password)
+        )
+
+    async def get_user_from_token(self, access_token: str) -> User | None:
+        return await self.injector.run(
+            "get_user_from_token",
+            partial(self._inner.get_user_from_token, access_token),
+        )
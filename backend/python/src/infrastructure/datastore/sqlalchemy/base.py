@@ -1,58 +1,357 @@
 from __future__ import annotations
 
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+import functools
+import time
+import uuid
+from collections.abc import AsyncGenerator, Awaitable, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import Context, ContextVar, Token, copy_context
+from dataclasses import dataclass
 
+from cachetools import TTLCache
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import NullPool
 
 from src.infrastructure.config.settings import Settings
-from src.infrastructure.datastore.sqlalchemy.exceptions import EngineNotBuiltError
+from src.infrastructure.datastore.sqlalchemy.exceptions import (
+    DeadlineExceededError,
+    EngineNotBuiltError,
+)
+from src.infrastructure.observability.db_pool import (
+    InstrumentedAsyncQueuePool,
+    instrument_engine_pool,
+)
+from src.infrastructure.observability.db_profiler import enable_query_profiler
 
 engine: AsyncEngine | None = None
 SessionLocal: async_sessionmaker | None = None
+# Optional read replica. Without one, reads use the primary.
+read_engine: AsyncEngine | None = None
+ReadSessionLocal: async_sessionmaker | None = None
+# Read-your-writes: keys (owner/user ids) that wrote recently are pinned to the
+# primary until the entry expires, so they never read stale replica data.
+# This is per process: another replica of the API doesn't know about the write.
+_recent_writers: TTLCache = TTLCache(maxsize=100_000, ttl=5)
+# retry_on_disconnect is on with DB_POOL_VALIDATION=background only: without
+# pre-ping, a connection dropped since the last validation is found when used
+_retry_disconnects = False
 
 
-def build_engine(settings: Settings):
-    global engine
-    global SessionLocal
-    engine = create_async_engine(
-        settings.database_url,
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """One database of a sharded deployment (DB_SHARDS). Shard 0 is the primary
+    above, which also holds the users and the owner -> shard map."""
+
+    index: int
+    engine: AsyncEngine
+    session_maker: async_sessionmaker
+    read_engine: AsyncEngine | None = None
+    read_session_maker: async_sessionmaker | None = None
+
+
+shards: list[Shard] = []
+# the shard session_scope/read_session_scope use (see use_shard); None: primary
+_shard: ContextVar[Shard | None] = ContextVar("db_shard", default=None)
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def _create_engine(
+    settings: Settings, url: str, pool_size: int, max_overflow: int
+) -> AsyncEngine:
+    connect_args = {
+        "ssl": settings.asyncpg_ssl,
+        # per-connection LRU of prepared statements, keyed by SQL string
+        "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+    }
+    pool_args = {
+        "pool_pre_ping": settings.pool_pre_ping,  # a round trip on each checkout
+        "pool_recycle": settings.db_pool_recycle,  # replace connections by age
+        "poolclass": InstrumentedAsyncQueuePool,  # records checkout wait/timeouts
+        "pool_size": pool_size,  # steady-state connections kept in the pool
+        "max_overflow": max_overflow,  # extra connections during bursts
+        "pool_timeout": settings.db_pool_timeout,  # seconds to wait for a connection
+    }
+
+    if settings.db_pooler_mode == "transaction":
+        # PgBouncer in transaction mode may run each transaction on a different
+        # server connection: prepared statements can't be cached across
+        # transactions, and their names must not collide between clients
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["statement_cache_size"] = 0  # asyncpg's own cache
+        connect_args["prepared_statement_name_func"] = _unique_statement_name
+        if settings.db_pooler_nullpool:
+            # open/close a (cheap) pooler connection per checkout instead
+            pool_args = {"poolclass": NullPool}
+
+    return create_async_engine(
+        url,
         echo=settings.app_debug,  # echo SQL statements in debug mode
         future=True,  # use SQLAlchemy 2.0 style
-        pool_pre_ping=True,  # validates connections before using them
-        pool_size=10,  # steady-state connections kept in the pool
-        max_overflow=20,  # extra connections allowed above pool_size during bursts
-        pool_timeout=30,  # seconds to wait before giving up getting a connection
-        connect_args={
-            "ssl": settings.asyncpg_ssl,
-        },
+        connect_args=connect_args,
+        **pool_args,
+    )
+
+
+# SQLite (DB_BACKEND=sqlite), run on every new connection. WAL lets readers work
+# on the last committed snapshot while a write is in progress.
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # fsync at checkpoints only, still durable in WAL
+    "PRAGMA foreign_keys=ON",  # owner FKs and ON DELETE CASCADE
+    "PRAGMA cache_size=-65536",  # 64MiB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # reads from a 256MiB memory map
+)
+
+
+def _create_sqlite_engine(
+    settings: Settings,
+    url: str,
+    pool_size: int,
+    max_overflow: int,
+    read_only: bool = False,
+    foreign_keys: bool = True,
+) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url,
+        echo=settings.app_debug,
+        future=True,
+        # busy timeout: how long to wait for another process's write lock
+        connect_args={"timeout": settings.db_sqlite_busy_timeout},
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    pragmas = _SQLITE_PRAGMAS
+    if not foreign_keys:
+        pragmas = tuple(p for p in pragmas if "foreign_keys" not in p)
+    if read_only:
+        pragmas += ("PRAGMA query_only=ON",)
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return new_engine
+
+
+# deadline (time.monotonic()) of the current request, see set_deadline
+_deadline: ContextVar[float | None] = ContextVar("db_deadline", default=None)
+
+
+def set_deadline(deadline: float | None) -> Token[float | None]:
+    """Bound the transactions begun from now on in this context: on Postgres,
+    each one gets the time left as its statement_timeout."""
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token: Token[float | None]) -> None:
+    _deadline.reset(token)
+
+
+def current_deadline() -> float | None:
+    return _deadline.get()
+
+
+def time_left() -> float | None:
+    """Seconds until the deadline (negative once passed); None: no deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class _Session(Session):
+    """Session of the session makers built here (see _set_statement_timeout)."""
+
+
+@event.listens_for(_Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection) -> None:
+    left = time_left()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    if left <= 0:
+        raise DeadlineExceededError
+    # set_config(..., true) is SET LOCAL: the server cancels a statement still
+    # running at the deadline. As a bound parameter, it's one prepared statement.
+    timeout_ms = max(int(left * 1000), 1)
+    connection.execute(
+        select(func.set_config("statement_timeout", str(timeout_ms), True))
     )
 
-    SessionLocal = async_sessionmaker(
-        bind=engine,
+
+def _session_maker(bind: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=bind,
         expire_on_commit=False,
         class_=AsyncSession,
+        sync_session_class=_Session,
+    )
+
+
+def _build_shard(settings: Settings, index: int, url: str) -> Shard:
+    """Engines of one of the DB_SHARDS databases. The users live on shard 0:
+    the others have no owner foreign key to enforce (for Postgres,
+    database/scripts/init_shard.sh drops it), and no read replica."""
+    if settings.db_backend == "sqlite":
+        shard_engine = _create_sqlite_engine(
+            settings, url, pool_size=1, max_overflow=0, foreign_keys=False
+        )
+        shard_read_engine = _create_sqlite_engine(
+            settings,
+            url,
+            pool_size=settings.db_sqlite_read_pool_size,
+            max_overflow=0,
+            read_only=True,
+            foreign_keys=False,
+        )
+    else:
+        shard_engine = _create_engine(
+            settings,
+            url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+        )
+        shard_read_engine = None
+    instrument_engine_pool(shard_engine, name=f"shard-{index}")
+    return Shard(
+        index=index,
+        engine=shard_engine,
+        session_maker=_session_maker(shard_engine),
+        read_engine=shard_read_engine,
+        read_session_maker=(
+            _session_maker(shard_read_engine) if shard_read_engine else None
+        ),
     )
 
 
-def set_engine(new_engine: AsyncEngine) -> async_sessionmaker:
+def build_engine(settings: Settings):
     global engine
     global SessionLocal
-    engine = new_engine
-    SessionLocal = async_sessionmaker(
-        bind=engine,
-        expire_on_commit=False,
-        class_=AsyncSession,
+    global read_engine
+    global ReadSessionLocal
+    global _recent_writers
+    global _retry_disconnects
+    global shards
+    read_your_writes_seconds = settings.db_read_your_writes_seconds
+    if settings.db_backend == "sqlite":
+        # A single writer connection: the pool queues writes (FIFO, up to
+        # DB_POOL_TIMEOUT) so they never fight over SQLite's write lock. Reads go
+        # to read-only connections, which WAL doesn't block.
+        engine = _create_sqlite_engine(
+            settings, settings.database_url, pool_size=1, max_overflow=0
+        )
+        read_engine = _create_sqlite_engine(
+            settings,
+            settings.database_url,
+            pool_size=settings.db_sqlite_read_pool_size,
+            max_overflow=0,
+            read_only=True,
+        )
+        # readers see each commit right away, there's no lag to cover
+        read_your_writes_seconds = 0
+    else:
+        engine = _create_engine(
+            settings,
+            settings.database_url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+        )
+        read_engine = None
+        if settings.read_database_url:
+            read_engine = _create_engine(
+                settings,
+                settings.read_database_url,
+                pool_size=settings.db_read_pool_size,
+                max_overflow=settings.db_read_max_overflow,
+            )
+    instrument_engine_pool(engine, name="primary")
+    if settings.db_query_profiler:
+        enable_query_profiler(
+            slow_query_ms=settings.db_slow_query_ms,
+            explain_first=settings.db_slow_query_explain,
+        )
+
+    SessionLocal = _session_maker(engine)
+
+    ReadSessionLocal = None
+    if read_engine is not None:
+        instrument_engine_pool(read_engine, name="replica")
+        ReadSessionLocal = _session_maker(read_engine)
+
+    shards = [Shard(0, engine, SessionLocal, read_engine, ReadSessionLocal)]
+    for index, url in enumerate(settings.shard_database_urls, start=1):
+        shards.append(_build_shard(settings, index, url))
+
+    _recent_writers = TTLCache(maxsize=100_000, ttl=read_your_writes_seconds)
+    _retry_disconnects = (
+        settings.db_pool_validation == "background" and not settings.pool_pre_ping
     )
+
+
+def set_engine(
+    new_engine: AsyncEngine, new_read_engine: AsyncEngine | None = None
+) -> async_sessionmaker:
+    global engine
+    global SessionLocal
+    global read_engine
+    global ReadSessionLocal
+    global shards
+    engine = new_engine
+    SessionLocal = _session_maker(engine)
+    read_engine = new_read_engine
+    ReadSessionLocal = None
+    if read_engine is not None:
+        ReadSessionLocal = _session_maker(read_engine)
+    shards = [Shard(0, engine, SessionLocal, read_engine, ReadSessionLocal)]
     return SessionLocal
 
 
+def current_shard() -> int:
+    shard = _shard.get()
+    return 0 if shard is None else shard.index
+
+
+def current_engine() -> AsyncEngine:
+    """The primary engine of the current shard (see use_shard)."""
+    shard = _shard.get()
+    bound = engine if shard is None else shard.engine
+    if bound is None:
+        raise EngineNotBuiltError
+    return bound
+
+
+@contextmanager
+def use_shard(index: int) -> Iterator[Shard]:
+    """Point the session_scope/read_session_scope calls made inside the block
+    at shard `index`."""
+    shard = shards[index]
+    token = _shard.set(shard)
+    try:
+        yield shard
+    finally:
+        _shard.reset(token)
+
+
+def mark_written(key: object) -> None:
+    """Pin `key` to the primary for the read-your-writes window."""
+    if ReadSessionLocal is not None:
+        _recent_writers[str(key)] = True
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -64,15 +363,166 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+class RequestScope:
+    """Sessions shared by every data service call of one request (see
+    request_scope). Each one holds a single pool connection, checked out on first
+    use, one per engine. Calls sharing a scope must not run concurrently."""
+
+    def __init__(self) -> None:
+        self._sessions: dict[async_sessionmaker, AsyncSession] = {}
+        self.closed = False
+
+    async def session(self, session_maker: async_sessionmaker) -> AsyncSession:
+        session = self._sessions.get(session_maker)
+        if session is None:
+            connection = await session_maker.kw["bind"].connect()
+            session = session_maker(bind=connection)
+            self._sessions[session_maker] = session
+        return session
+
+    async def discard(self, session_maker: async_sessionmaker) -> None:
+        """Drop the session (e.g. its connection died): the next call checks
+        out a new connection."""
+        session = self._sessions.pop(session_maker, None)
+        if session is not None:
+            connection = session.bind
+            await session.close()
+            await connection.close()
+
+    async def close(self) -> None:
+        self.closed = True
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            connection = session.bind
+            await session.close()
+            await connection.close()
+
+
+_request_scope: ContextVar[RequestScope | None] = ContextVar(
+    "db_request_scope", default=None
+)
+
+
+@asynccontextmanager
+async def request_scope() -> AsyncGenerator[RequestScope, None]:
+    """Share one session (and pool checkout) per engine between all the
+    session_scope/read_session_scope calls made inside the block."""
+    scope = RequestScope()
+    token = _request_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        await scope.close()
+        _request_scope.reset(token)
+
+
+def detached_context() -> Context:
+    """Copy of the current context, outside the request scope: for a task running
+    alongside the request's own calls (it gets its own sessions)."""
+    context = copy_context()
+    context.run(_request_scope.set, None)
+    return context
+
+
+@asynccontextmanager
+async def _scoped_session(
+    session_maker: async_sessionmaker,
+) -> AsyncGenerator[AsyncSession, None]:
+    scope = _request_scope.get()
+    if scope is not None and scope.closed:
+        scope = None
+    if scope is None:
+        session = session_maker()
+    else:
+        # bound to the request's connection: close() ends the transaction but
+        # keeps the connection checked out for the next call
+        session = await scope.session(session_maker)
+    try:
+        yield session
+    except Exception as e:
+        await session.rollback()
+        if scope is not None and _is_disconnect(e):
+            await scope.discard(session_maker)
+        raise
+    finally:
+        await session.close()
+
+
 @asynccontextmanager
 async def session_scope() -> AsyncGenerator[AsyncSession, None]:
-    if SessionLocal is None:
+    shard = _shard.get()
+    session_maker = SessionLocal if shard is None else shard.session_maker
+    if session_maker is None:
         raise EngineNotBuiltError
-    async with SessionLocal() as session:
+    async with _scoped_session(session_maker) as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session_scope(
+    pin_key: object | None = None,
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only work: on the replica, unless there is none or
+    `pin_key` wrote within the read-your-writes window."""
+    shard = _shard.get()
+    primary, session_maker = SessionLocal, ReadSessionLocal
+    if shard is not None:
+        primary, session_maker = shard.session_maker, shard.read_session_maker
+    if session_maker is None or (
+        pin_key is not None and str(pin_key) in _recent_writers
+    ):
+        session_maker = primary
+    if session_maker is None:
+        raise EngineNotBuiltError
+    async with _scoped_session(session_maker) as session:
+        yield session
+
+
+# set while a caller retries lost connections itself (ResilientDataService with
+# DB_READ_RETRIES): retry_on_disconnect then leaves them to it, rather than
+# multiplying the attempts
+_retried_by_caller: ContextVar[bool] = ContextVar("db_retried_by_caller", default=False)
+
+
+@contextmanager
+def retried_by_caller() -> Iterator[None]:
+    """Reads inside are retried by the caller: retry_on_disconnect doesn't."""
+    token = _retried_by_caller.set(True)
+    try:
+        yield
+    finally:
+        _retried_by_caller.reset(token)
+
+
+def is_retried_by_caller() -> bool:
+    return _retried_by_caller.get()
+
+
+def _is_disconnect(e: BaseException) -> bool:
+    # SQLAlchemy flags DBAPI errors it recognised as a lost connection, after
+    # invalidating that connection (and the older ones in its pool)
+    return isinstance(e, DBAPIError) and e.connection_invalidated
+
+
+def retry_on_disconnect[**P, R](
+    fn: Callable[P, Awaitable[R]],
+) -> Callable[P, Awaitable[R]]:
+    """Run an idempotent read once more if its connection turned out to be dead,
+    with background pool validation (DB_POOL_VALIDATION=background). Without
+    pool_pre_ping, a connection dropped by the server (restart, failover, idle
+    timeout) is only noticed when used. Not inside retried_by_caller()."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
         try:
-            yield session
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await session.close()
+            return await fn(*args, **kwargs)
+        except DBAPIError as e:
+            if (
+                not _retry_disconnects
+                or _retried_by_caller.get()
+                or not _is_disconnect(e)
+            ):
+                raise
+            return await fn(*args, **kwargs)
+
+    return wrapper
@@ -3,3 +3,11 @@ class EngineNotBuiltError(Exception):
 
     def __init__(self, msg="base has not been built", *args, **kwargs):
         super().__init__(msg, *args, **kwargs)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the request deadline passes (see base.set_deadline) before
+    or while a statement runs."""
+
+    def __init__(self, msg="Request deadline exceeded", *args, **kwargs):
+        super().__init__(msg, *args, **kwargs)
@@ -1,9 +1,13 @@
 from .asset import Asset
+from .owner_shard import OwnerShard
 from .portfolio import Portfolio
+from .symbol import Symbol
 from .user import User
 
 __all__ = [
     "Asset",
+    "OwnerShard",
     "Portfolio",
+    "Symbol",
     "User",
 ]
@@ -3,28 +3,68 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Float, ForeignKey, Integer, String, func
+from sqlalchemy import (
+    Boolean,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    false,
+    func,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
     from .portfolio import Portfolio
 
 from ..base import Base
+from ..types import UTCDateTime
 
 
 class Asset(Base):
     __tablename__ = "assets"
+    # In Postgres the table is hash-partitioned by portfolio_id, with primary key
+    # (portfolio_id, id): it also serves WHERE portfolio_id = ? ORDER BY id DESC
+    # (database/migrations/000008). Queries must filter on portfolio_id to prune
+    # to one partition. The ORM keeps id alone as identity: it stays unique, all
+    # partitions draw it from the same sequence.
+    __table_args__ = (
+        # index-only valuation scans (database/migrations/000015)
+        Index(
+            "ix_assets_portfolio_id_covering",
+            "portfolio_id",
+            postgresql_include=["symbol_id", "quantity"],
+        ),
+        # at most one holding per symbol: the conflict target of the
+        # consolidated upsert (database/migrations/000016)
+        Index(
+            "ix_assets_portfolio_id_symbol_id_holding",
+            "portfolio_id",
+            "symbol_id",
+            unique=True,
+            postgresql_where=text("holding"),
+            sqlite_where=text("holding"),
+        ),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     portfolio_id: Mapped[int] = mapped_column(
         ForeignKey("portfolios.id", ondelete="CASCADE"),  # cascade delete
         nullable=False,  # an asset must belong to a portfolio
-        index=True,  # for faster lookups
     )
-    symbol: Mapped[str] = mapped_column(String(10), nullable=False, index=True)
+    # symbols.id: the data services map it to the symbol (see symbols.py)
+    symbol_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("symbols.id"), nullable=False, index=True
+    )
     quantity: Mapped[float] = mapped_column(Float, nullable=False)
+    # the portfolio's one row for the symbol, written by a consolidated
+    # portfolio's upserts or the compaction job (compact_holdings.py)
+    holding: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, server_default=false()
+    )
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime,
         server_default=func.now(),
         nullable=False,
     )
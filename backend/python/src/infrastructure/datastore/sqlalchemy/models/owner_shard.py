@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Boolean, ForeignKey, Integer, false, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..base import Base
+from ..types import UTCDateTime, UUIDType
+
+
+class OwnerShard(Base):
+    """Which shard (DB_SHARDS) holds an owner's portfolios. Lives on shard 0,
+    next to the users (database/migrations/000014)."""
+
+    __tablename__ = "owner_shards"
+
+    owner_id: Mapped[uuid.UUID] = mapped_column(
+        UUIDType,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    shard: Mapped[int] = mapped_column(Integer, nullable=False)
+    # set while the rebalancer copies the owner's rows: their writes are refused
+    moving: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, server_default=false()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        UTCDateTime, server_default=func.now(), nullable=False
+    )
@@ -4,31 +4,48 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import UUID, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import Boolean, ForeignKey, Index, Integer, String, false, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
     from .asset import Asset
 
 from ..base import Base
+from ..types import UTCDateTime, UUIDType
 
 
 class Portfolio(Base):
     __tablename__ = "portfolios"
+    __table_args__ = (
+        # WHERE owner_id = ? ORDER BY id DESC (database/migrations/000004)
+        Index("ix_portfolios_owner_id_id", "owner_id", text("id DESC")),
+        # the purge backlog (database/migrations/000012)
+        Index(
+            "ix_portfolios_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     owner_id: Mapped[uuid.UUID] = mapped_column(
-        UUID,
+        UUIDType,
         ForeignKey("users.id", ondelete="CASCADE"),
-        index=True,
         nullable=False,
     )
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime,
         server_default=func.now(),
         nullable=False,
     )
+    # Soft delete: set by delete_portfolio, hidden from reads until purged
+    deleted_at: Mapped[datetime | None] = mapped_column(UTCDateTime, nullable=True)
+    # Consolidated holdings: new assets upsert the symbol's holding row
+    consolidated: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, server_default=false()
+    )
 
     assets: Mapped[list[Asset]] = relationship(
         back_populates="portfolio",  # so the Asset model can reference back
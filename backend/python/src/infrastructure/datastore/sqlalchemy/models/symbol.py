@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..base import Base
+
+
+class Symbol(Base):
+    """Asset symbols, each stored once: assets reference them by their id
+    (database/migrations/000015)."""
+
+    __tablename__ = "symbols"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    symbol: Mapped[str] = mapped_column(String(10), unique=True, nullable=False)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import socket
+
+import structlog
+from sqlalchemy import text
+
+from src.infrastructure.datastore.sqlalchemy import base
+from src.infrastructure.observability.db_pool import (
+    InstrumentedAsyncQueuePool,
+    PoolWindow,
+)
+
+logger = structlog.get_logger("db.pool")
+
+# Adaptive pool sizing (DB_POOL_ADAPTIVE): every DB_POOL_ADAPT_INTERVAL seconds
+# the primary pool's limit is grown when checkouts waited (or the pool was
+# nearly all in use) and shrunk by one when it was mostly idle, between
+# DB_POOL_SIZE and DB_POOL_SIZE + DB_MAX_OVERFLOW. With DB_POOL_GLOBAL_BUDGET the
+# replicas also share a connection budget through the db_pool_leases table. The
+# floor stays DB_POOL_SIZE: the pool keeps that many connections open even when
+# idle, so a lower lease wouldn't free any of them.
+_task: asyncio.Task | None = None
+
+# in-use ratio (peak checked out / limit) over which the pool grows, under which
+# it shrinks
+_GROW_RATIO = 0.9
+_SHRINK_RATIO = 0.5
+# any constant works, as long as nothing else takes this advisory lock
+_LEASES_LOCK = 0x706F6F6C  # "pool"
+
+REPLICA_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_LOCK_LEASES_STMT = text("SELECT pg_advisory_xact_lock(:key)")
+# a replica that stopped renewing (crashed, scaled down) gives its share back
+_EXPIRE_LEASES_STMT = text(
+    "DELETE FROM db_pool_leases WHERE renewed_at < now() - make_interval(secs => :ttl)"
+)
+_OTHER_LEASES_STMT = text(
+    "SELECT coalesce(sum(connections), 0) FROM db_pool_leases"
+    " WHERE replica_id <> :replica_id"
+)
+_RENEW_LEASE_STMT = text(
+    "INSERT INTO db_pool_leases (replica_id, connections, renewed_at)"
+    " VALUES (:replica_id, :connections, now())"
+    " ON CONFLICT (replica_id) DO UPDATE"
+    " SET connections = excluded.connections, renewed_at = excluded.renewed_at"
+)
+_RELEASE_LEASE_STMT = text("DELETE FROM db_pool_leases WHERE replica_id = :replica_id")
+
+
+def next_limit(
+    limit: int, floor: int, ceiling: int, window: PoolWindow, target_wait_s: float
+) -> int:
+    """The pool limit for the next interval, given the last one's checkouts.
+    Grows by a quarter (queueing hurts more than an extra connection) and
+    shrinks one connection at a time."""
+    mean_wait = window.wait_s / window.checkouts if window.checkouts else 0.0
+    in_use = window.peak_in_use / limit
+    if window.timeouts or mean_wait > target_wait_s or in_use >= _GROW_RATIO:
+        limit += max(1, limit // 4)
+    elif in_use < _SHRINK_RATIO:
+        limit -= 1
+    return min(max(limit, floor), ceiling)
+
+
+async def claim_connections(wanted: int, floor: int, budget: int, ttl: float) -> int:
+    """Record this replica's lease and return how many connections it may hold:
+    `wanted`, cut down to what the other live leases leave of `budget`, but
+    never below `floor` (the budget is then exceeded: more replicas than it
+    has connections). The advisory lock serialises replicas claiming at the
+    same time."""
+    async with base.session_scope() as db:
+        await db.execute(_LOCK_LEASES_STMT, {"key": _LEASES_LOCK})
+        await db.execute(_EXPIRE_LEASES_STMT, {"ttl": ttl})
+        others = (
+            await db.execute(_OTHER_LEASES_STMT, {"replica_id": REPLICA_ID})
+        ).scalar_one()
+        granted = max(min(wanted, budget - others), floor)
+        if granted > budget - others:
+            logger.warning(
+                "db_pool_budget_exceeded",
+                budget=budget,
+                others=others,
+                granted=granted,
+            )
+        await db.execute(
+            _RENEW_LEASE_STMT, {"replica_id": REPLICA_ID, "connections": granted}
+        )
+        await db.commit()
+    return granted
+
+
+async def release_connections() -> None:
+    async with base.session_scope() as db:
+        await db.execute(_RELEASE_LEASE_STMT, {"replica_id": REPLICA_ID})
+        await db.commit()
+
+
+async def adjust_pool(
+    pool: InstrumentedAsyncQueuePool,
+    ceiling: int,
+    target_wait_s: float,
+    budget: int,
+    lease_ttl: float,
+) -> int:
+    """One control step. Returns the new limit."""
+    # no point holding back the connections the pool keeps open anyway; the
+    # limit then also bounds the connections open (see InstrumentedAsyncQueuePool)
+    floor = pool.size()
+    window = pool.take_window()
+    limit = next_limit(pool.limit, floor, ceiling, window, target_wait_s)
+    if budget:
+        limit = await claim_connections(limit, floor, budget, lease_ttl)
+    if limit != pool.limit:
+        logger.info(
+            "db_pool_resized",
+            pool=pool.pool_name,
+            old=pool.limit,
+            new=limit,
+            checkouts=window.checkouts,
+            wait_ms=round(window.wait_s * 1000, 2),
+            timeouts=window.timeouts,
+            peak_in_use=window.peak_in_use,
+        )
+        pool.set_limit(limit)
+    return limit
+
+
+def _primary_pool() -> InstrumentedAsyncQueuePool | None:
+    # looked up on every step: engine.dispose() replaces the pool
+    if base.engine is None or not isinstance(
+        base.engine.pool, InstrumentedAsyncQueuePool
+    ):
+        return None  # NullPool (DB_POOLER_NULLPOOL) has no limit to adjust
+    return base.engine.pool
+
+
+async def _run(
+    interval: float, ceiling: int, target_wait_s: float, budget: int
+) -> None:
+    pool = _primary_pool()
+    if pool is not None:
+        # start small, grow with the load
+        pool.set_limit(pool.size())
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            pool = _primary_pool()
+            if pool is None:
+                continue
+            try:
+                await adjust_pool(
+                    pool, ceiling, target_wait_s, budget, lease_ttl=3 * interval
+                )
+            except Exception:
+                logger.exception("db_pool_adjust_failed")
+    finally:
+        if budget:
+            with contextlib.suppress(Exception):
+                await release_connections()
+
+
+def start_pool_controller(
+    interval: float, ceiling: int, target_wait_ms: float, budget: int
+) -> None:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(
+            _run(interval, ceiling, target_wait_ms / 1000, budget),
+            name="db-pool-controller",
+        )
+
+
+async def stop_pool_controller() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await _task
+    _task = None
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+
+import structlog
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from src.infrastructure.datastore.sqlalchemy import base
+
+logger = structlog.get_logger("db.pool")
+
+# Background validation (DB_POOL_VALIDATION=background): instead of a round trip
+# on every checkout (pool_pre_ping), idle connections are pinged on an interval
+# so that dead ones are replaced before a request gets them.
+_task: asyncio.Task | None = None
+
+
+async def validate_idle_connections(engine: AsyncEngine) -> int:
+    """Ping each connection idle in the engine's pool once. Returns how many were
+    found dead; SQLAlchemy invalidates them (and the older connections of the
+    pool) so they are reconnected on their next checkout."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return 0
+    invalidated = 0
+    # QueuePool is FIFO: checking out/in as many connections as are idle visits
+    # each of them once
+    for _ in range(pool.checkedin()):
+        if pool.checkedin() == 0:
+            break  # requests took the rest, they are in use (so alive) anyway
+        async with engine.connect() as conn:
+            try:
+                await conn.exec_driver_sql("SELECT 1")
+            except DBAPIError as e:
+                if not e.connection_invalidated:
+                    raise
+                invalidated += 1
+    return invalidated
+
+
+async def _run(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        engines = [("primary", base.engine), ("replica", base.read_engine)]
+        engines += [(f"shard-{s.index}", s.engine) for s in base.shards[1:]]
+        for name, engine in engines:
+            if engine is None:
+                continue
+            try:
+                invalidated = await validate_idle_connections(engine)
+            except Exception:
+                logger.exception("db_pool_validation_failed", pool=name)
+                continue
+            if invalidated:
+                logger.warning(
+                    "db_pool_connections_invalidated", pool=name, count=invalidated
+                )
+
+
+def start_pool_validation(interval: float) -> None:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_run(interval), name="db-pool-validation")
+
+
+async def stop_pool_validation() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await _task
+    _task = None
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from collections.abc import Iterable
+
+import structlog
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+from sqlalchemy import delete, func, select
+
+from src.infrastructure.datastore.sqlalchemy import base
+from src.infrastructure.datastore.sqlalchemy.models.asset import Asset as AssetModel
+from src.infrastructure.datastore.sqlalchemy.models.portfolio import (
+    Portfolio as PortfolioModel,
+)
+
+logger = structlog.get_logger("db.purge")
+
+# Background purge of soft-deleted portfolios (delete_portfolio only sets
+# deleted_at). Assets are deleted DB_PURGE_BATCH_SIZE rows per transaction,
+# DB_PURGE_PAUSE seconds apart: locks are short and WAL / replication lag grow at
+# a bounded rate, whatever the size of the portfolio. Throughput is the rate of
+# db.purge.rows_deleted.
+_task: asyncio.Task | None = None
+# portfolios taken per scan, oldest deletion first
+_SCAN_LIMIT = 100
+
+_meter = metrics.get_meter("db.purge")
+# shard -> soft-deleted portfolios seen by its last scan
+_backlog: dict[int, int] = {}
+
+
+def _observe_backlog(options: CallbackOptions) -> Iterable[Observation]:
+    for shard, backlog in _backlog.items():
+        yield Observation(backlog, {"db.shard": shard})
+
+
+BACKLOG = _meter.create_observable_gauge(
+    "db.purge.backlog",
+    callbacks=[_observe_backlog],
+    unit="{portfolio}",
+    description="Soft-deleted portfolios waiting to be purged, at the last scan",
+)
+ROWS_DELETED = _meter.create_counter(
+    "db.purge.rows_deleted",
+    unit="{row}",
+    description="Asset rows deleted by the purger",
+)
+PORTFOLIOS_PURGED = _meter.create_counter(
+    "db.purge.portfolios",
+    unit="{portfolio}",
+    description="Soft-deleted portfolios removed with all their assets",
+)
+BATCH_DURATION = _meter.create_histogram(
+    "db.purge.batch.duration",
+    unit="s",
+    description="Duration of one purge batch transaction",
+)
+
+
+async def purge_portfolio(
+    portfolio_id: int, batch_size: int, pause: float
+) -> tuple[int, bool]:
+    """Delete a soft-deleted portfolio's assets batch by batch, then the
+    portfolio itself. Returns the asset rows deleted and whether the portfolio
+    was; stops early (False) if another purger holds the portfolio."""
+    deleted = 0
+    while True:
+        start = time.perf_counter()
+        async with base.session_scope() as db:
+            # Locked for the batch: another replica's purger skips the portfolio
+            # rather than deleting the same rows (SQLite has a single writer)
+            locked = await db.execute(
+                select(PortfolioModel.id)
+                .where(
+                    PortfolioModel.id == portfolio_id,
+                    PortfolioModel.deleted_at.is_not(None),
+                )
+                .with_for_update(skip_locked=True)
+            )
+            if locked.scalar_one_or_none() is None:
+                return deleted, False
+            # filtering on portfolio_id prunes to the portfolio's partition
+            batch = (
+                select(AssetModel.id)
+                .where(AssetModel.portfolio_id == portfolio_id)
+                .limit(batch_size)
+            )
+            res = await db.execute(
+                delete(AssetModel)
+                .where(
+                    AssetModel.portfolio_id == portfolio_id,
+                    AssetModel.id.in_(batch.scalar_subquery()),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            done = res.rowcount < batch_size
+            if done:
+                # no assets left, the cascade has nothing to do
+                await db.execute(
+                    delete(PortfolioModel)
+                    .where(PortfolioModel.id == portfolio_id)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+        BATCH_DURATION.record(time.perf_counter() - start)
+        ROWS_DELETED.add(res.rowcount)
+        deleted += res.rowcount
+        if done:
+            PORTFOLIOS_PURGED.add(1)
+            return deleted, True
+        await asyncio.sleep(pause)
+
+
+async def purge_deleted_portfolios(batch_size: int, pause: float) -> int:
+    """One pass over the soft-deleted portfolios (of the current shard, see
+    base.use_shard). Returns how many were seen."""
+    shard = base.current_shard()
+    async with base.session_scope() as db:
+        _backlog[shard] = (
+            await db.execute(
+                select(func.count()).where(PortfolioModel.deleted_at.is_not(None))
+            )
+        ).scalar_one()
+        res = await db.execute(
+            select(PortfolioModel.id)
+            .where(PortfolioModel.deleted_at.is_not(None))
+            .order_by(PortfolioModel.deleted_at)
+            .limit(_SCAN_LIMIT)
+        )
+        portfolio_ids = res.scalars().all()
+    for portfolio_id in portfolio_ids:
+        start = time.perf_counter()
+        rows, purged = await purge_portfolio(portfolio_id, batch_size, pause)
+        if not purged:
+            # another purger has it: it logs it and lowers its own backlog
+            continue
+        duration = time.perf_counter() - start
+        logger.info(
+            "portfolio_purged",
+            portfolio_id=portfolio_id,
+            rows=rows,
+            duration_s=round(duration, 3),
+            rows_per_s=round(rows / duration) if duration else None,
+        )
+        _backlog[shard] = max(_backlog[shard] - 1, 0)
+    return len(portfolio_ids)
+
+
+async def _run(interval: float, batch_size: int, pause: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await purge_deleted_portfolios(batch_size, pause)
+        except Exception:
+            logger.exception("db_purge_failed")
+        # the other shards of DB_SHARDS
+        for shard in base.shards[1:]:
+            try:
+                with base.use_shard(shard.index):
+                    await purge_deleted_portfolios(batch_size, pause)
+            except Exception:
+                logger.exception("db_purge_failed", shard=shard.index)
+
+
+def start_purger(interval: float, batch_size: int, pause: float) -> None:
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_run(interval, batch_size, pause), name="db-purge")
+
+
+async def stop_purger() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await _task
+    _task = None
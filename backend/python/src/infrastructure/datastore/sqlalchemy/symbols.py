@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import sys
+import weakref
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+import structlog
+from sqlalchemy import (
+    ColumnElement,
+    String,
+    TextClause,
+    bindparam,
+    func,
+    literal,
+    select,
+    text,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.domain.aggregates.exceptions.portfolio import SymbolLimitError
+from src.infrastructure.datastore.sqlalchemy import base
+from src.infrastructure.datastore.sqlalchemy.models.portfolio import (
+    Portfolio as PortfolioModel,
+)
+from src.infrastructure.datastore.sqlalchemy.models.symbol import Symbol as SymbolModel
+
+logger = structlog.get_logger("db.symbols")
+
+# Symbols dimension (database/migrations/000015): assets store an INTEGER
+# symbol_id. Each database's symbols table is mirrored in process, loaded at
+# startup (load_symbols) or on first use. Symbols are never renamed or deleted,
+# so the map never goes stale, it only misses: a new symbol is inserted, an
+# unknown id (inserted by another replica) reloads the table.
+
+# the WHERE NOT EXISTS spares the identity sequence a value for every symbol
+# that already exists; ON CONFLICT covers two replicas inserting it at once
+_INSERT_SYMBOL_STMT = text(
+    "INSERT INTO symbols (symbol) SELECT :symbol"
+    " WHERE NOT EXISTS (SELECT 1 FROM symbols WHERE symbol = :symbol)"
+    " ON CONFLICT (symbol) DO NOTHING"
+)
+
+# The table is shared by every user: a user's asset only adds its symbol if the
+# user owns the portfolio, checked by the INSERT itself
+_INSERT_OWNED_SYMBOL_STMT = text(
+    "INSERT INTO symbols (symbol) SELECT :symbol"
+    " WHERE NOT EXISTS (SELECT 1 FROM symbols WHERE symbol = :symbol)"
+    " AND EXISTS (SELECT 1 FROM portfolios WHERE id = :portfolio_id"
+    " AND owner_id = :owner_id AND deleted_at IS NULL)"
+    " ON CONFLICT (symbol) DO NOTHING"
+).bindparams(bindparam("owner_id", type_=PortfolioModel.owner_id.type))
+
+# sequence_generator_limit_exceeded: the identity has run out of ids
+_SEQUENCE_EXHAUSTED = "2200H"
+
+
+class SymbolMap:
+    """symbol <-> id of one database. The symbols are interned: assets read
+    with the same symbol share one string."""
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.symbols: dict[int, str] = {}
+        self.loaded = False
+
+    def add(self, rows: Iterable[tuple[int, str]]) -> None:
+        for symbol_id, symbol in rows:
+            symbol = sys.intern(symbol)
+            self.ids[symbol] = symbol_id
+            self.symbols[symbol_id] = symbol
+
+
+# per engine: build_engine() (e.g. each test's database) starts afresh
+_maps: weakref.WeakKeyDictionary[AsyncEngine, SymbolMap] = weakref.WeakKeyDictionary()
+
+
+def _symbol_map() -> SymbolMap:
+    engine = base.current_engine()
+    symbols = _maps.get(engine)
+    if symbols is None:
+        symbols = _maps[engine] = SymbolMap()
+    return symbols
+
+
+async def _load() -> SymbolMap:
+    """(Re)load the current shard's symbols, from its primary."""
+    symbols = _symbol_map()
+    async with base.session_scope() as db:
+        rows = (await db.execute(select(SymbolModel.id, SymbolModel.symbol))).all()
+    symbols.add(rows)
+    symbols.loaded = True
+    return symbols
+
+
+async def _loaded() -> SymbolMap:
+    symbols = _symbol_map()
+    return symbols if symbols.loaded else await _load()
+
+
+async def load_symbols() -> None:
+    """Load the symbols of every shard, so requests start with a warm map."""
+    for shard in base.shards:
+        with base.use_shard(shard.index):
+            symbols = await _load()
+        logger.info("db_symbols_loaded", shard=shard.index, count=len(symbols.ids))
+
+
+@contextmanager
+def symbol_limit() -> Iterator[None]:
+    """Raise SymbolLimitError for a symbol insert the identity ran out of ids
+    for."""
+    try:
+        yield
+    except DBAPIError as e:
+        if getattr(e.orig, "sqlstate", None) == _SEQUENCE_EXHAUSTED:
+            raise SymbolLimitError from e
+        raise
+
+
+async def _insert(
+    stmt: TextClause, params: list[dict], missing: set[str]
+) -> dict[str, int]:
+    """Insert the `missing` symbols with `stmt`, one row of `params` each, and
+    map those now stored. The insert commits on its own: call it before opening
+    the write transaction that uses the ids (on SQLite, that holds the only
+    writer)."""
+    symbols = _symbol_map()
+    async with base.session_scope() as db:
+        with symbol_limit():
+            await db.execute(stmt, params)
+        rows = (
+            await db.execute(
+                select(SymbolModel.id, SymbolModel.symbol).where(
+                    SymbolModel.symbol.in_(missing)
+                )
+            )
+        ).all()
+        await db.commit()
+    symbols.add(rows)
+    return symbols.ids
+
+
+async def symbol_ids(names: Iterable[str]) -> dict[str, int]:
+    """symbol -> id, with every symbol of `names` in it: the new ones are
+    inserted. For symbols already trusted (e.g. copied from another shard): a
+    user's are added by owned_symbol_ids."""
+    symbols = await _loaded()
+    missing = {name for name in names if name not in symbols.ids}
+    if not missing:
+        return symbols.ids
+    return await _insert(_INSERT_SYMBOL_STMT, [{"symbol": s} for s in missing], missing)
+
+
+async def owned_symbol_ids(
+    writes: Iterable[tuple[str, str, int]],
+) -> dict[str, int]:
+    """symbol -> id for assets written as (symbol, owner_id, portfolio_id). A
+    new symbol is inserted only for a portfolio the owner owns: one left out of
+    the map has no asset to be written. Raises SymbolLimitError once the table
+    is full."""
+    symbols = await _loaded()
+    new = [w for w in writes if w[0] not in symbols.ids]
+    if not new:
+        return symbols.ids
+    return await _insert(
+        _INSERT_OWNED_SYMBOL_STMT,
+        [
+            {"symbol": symbol, "owner_id": owner_id, "portfolio_id": portfolio_id}
+            for symbol, owner_id, portfolio_id in set(new)
+        ],
+        {symbol for symbol, _, _ in new},
+    )
+
+
+async def known_symbol_ids() -> dict[str, int]:
+    """symbol -> id of the symbols already mapped: no insert."""
+    return (await _loaded()).ids
+
+
+def add_symbol(symbol_id: int, symbol: str) -> None:
+    """Map a symbol inserted by the caller's own (committed) statement."""
+    _symbol_map().add([(symbol_id, symbol)])
+
+
+async def symbol_id_column(
+    db: AsyncSession, symbol: str, owner_id: str, portfolio_id: int
+) -> ColumnElement[int]:
+    """The id of a new `symbol`, for the INSERT ... SELECT of its first asset.
+    The symbol is added if the owner owns the portfolio: by that INSERT itself
+    on Postgres (a data-modifying CTE), by a statement before it in the same
+    transaction on SQLite, which has none. Map it with add_symbol once
+    committed."""
+    stored = (
+        select(SymbolModel.id).where(SymbolModel.symbol == symbol).scalar_subquery()
+    )
+    if db.get_bind().dialect.name != "postgresql":
+        with symbol_limit():
+            await db.execute(
+                _INSERT_OWNED_SYMBOL_STMT,
+                {"symbol": symbol, "owner_id": owner_id, "portfolio_id": portfolio_id},
+            )
+        return stored
+    owned = (
+        select(PortfolioModel.id)
+        .where(
+            PortfolioModel.id == portfolio_id,
+            PortfolioModel.owner_id == owner_id,
+            PortfolioModel.deleted_at.is_(None),
+        )
+        .exists()
+    )
+    new_symbol = (
+        postgresql.insert(SymbolModel)
+        .from_select(
+            ["symbol"],
+            select(literal(symbol, String)).where(owned, ~stored.exists()),
+        )
+        .on_conflict_do_nothing(index_elements=[SymbolModel.symbol])
+        .returning(SymbolModel.id)
+        .cte("new_symbol")
+    )
+    # the statement's snapshot doesn't see the row its CTE inserts
+    return func.coalesce(select(new_symbol.c.id).scalar_subquery(), stored)
+
+
+async def symbol_names(ids: Iterable[int]) -> dict[int, str]:
+    """id -> symbol, with every id of `ids` in it."""
+    symbols = await _loaded()
+    if any(symbol_id not in symbols.symbols for symbol_id in ids):
+        symbols = await _load()
+    return symbols.symbols
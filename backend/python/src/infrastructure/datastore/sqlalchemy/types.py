@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import uuid
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, Uuid
+from sqlalchemy.engine import Dialect
+from sqlalchemy.types import TypeDecorator
+
+# Column types that behave the same on Postgres and SQLite (DB_BACKEND=sqlite).
+# On Postgres they render and bind exactly like the plain types.
+
+
+class UUIDType(TypeDecorator):
+    """UUID that also accepts its string form as a parameter: the data services
+    pass owner ids as str, which asyncpg takes but SQLite's CHAR(32) storage
+    doesn't."""
+
+    impl = Uuid(as_uuid=True)
+    cache_ok = True
+
+    def process_bind_param(
+        self, value: uuid.UUID | str | None, dialect: Dialect
+    ) -> uuid.UUID | None:
+        if isinstance(value, str):
+            return uuid.UUID(value)
+        return value
+
+
+class UTCDateTime(TypeDecorator):
+    """TIMESTAMPTZ. SQLite stores no offset (CURRENT_TIMESTAMP is UTC), so naive
+    values read back are marked as UTC."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_result_value(
+        self, value: datetime | None, dialect: Dialect
+    ) -> datetime | None:
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=UTC)
+        return value
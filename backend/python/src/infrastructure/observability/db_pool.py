@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from opentelemetry import metrics
+from opentelemetry.metrics import CallbackOptions, Observation
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from sqlalchemy.util import await_only
+
+# Instruments follow the OTel database client semantic conventions
+# (db.client.connection.*). They are created on the global meter provider's proxy,
+# so they're no-ops until setup_observability installs a real provider.
+_meter = metrics.get_meter("db.pool")
+
+# pool name -> engine; the engine's current pool is read at collection time so a
+# pool recreated by engine.dispose() keeps being reported
+_engines: dict[str, AsyncEngine] = {}
+
+
+def _observe_connection_count(options: CallbackOptions) -> Iterable[Observation]:
+    for name, engine in _engines.items():
+        pool = engine.pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            continue
+        attributes = {"db.client.connection.pool.name": name}
+        yield Observation(
+            pool.checkedout(), {**attributes, "db.client.connection.state": "used"}
+        )
+        yield Observation(
+            pool.checkedin(), {**attributes, "db.client.connection.state": "idle"}
+        )
+
+
+def _observe_overflow(options: CallbackOptions) -> Iterable[Observation]:
+    for name, engine in _engines.items():
+        pool = engine.pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            continue
+        # QueuePool counts overflow from -pool_size, only report connections
+        # actually opened above pool_size
+        yield Observation(
+            max(pool.overflow(), 0), {"db.client.connection.pool.name": name}
+        )
+
+
+def _observe_max(options: CallbackOptions) -> Iterable[Observation]:
+    for name, engine in _engines.items():
+        pool = engine.pool
+        if isinstance(pool, InstrumentedAsyncQueuePool):
+            yield Observation(pool.limit, {"db.client.connection.pool.name": name})
+
+
+CONNECTION_COUNT = _meter.create_observable_up_down_counter(
+    "db.client.connection.count",
+    callbacks=[_observe_connection_count],
+    unit="{connection}",
+    description="Connections currently checked out (used) or idle in the pool",
+)
+CONNECTION_OVERFLOW = _meter.create_observable_gauge(
+    "db.client.connection.overflow",
+    callbacks=[_observe_overflow],
+    unit="{connection}",
+    description="Connections opened above pool_size (bounded by max_overflow)",
+)
+CONNECTION_MAX = _meter.create_observable_gauge(
+    "db.client.connection.max",
+    callbacks=[_observe_max],
+    unit="{connection}",
+    description="Connections the pool may open (pool_size + max_overflow)",
+)
+CONNECTION_WAIT_TIME = _meter.create_histogram(
+    "db.client.connection.wait_time",
+    unit="s",
+    description="Time it took to obtain a connection from the pool",
+)
+CONNECTION_TIMEOUTS = _meter.create_counter(
+    "db.client.connection.timeouts",
+    unit="{timeout}",
+    description="Checkouts that gave up after pool_timeout",
+)
+
+
+@dataclass(slots=True)
+class PoolWindow:
+    """Checkouts since the pool's last take_window()."""
+
+    checkouts: int = 0
+    wait_s: float = 0.0
+    timeouts: int = 0
+    peak_in_use: int = 0
+
+
+class _CheckoutGate:
+    """A semaphore that can be resized: the checkouts a pool lets through."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.held = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    def try_acquire(self) -> bool:
+        if self.held < self.limit and not self._waiters:
+            self.held += 1
+            return True
+        return False
+
+    async def acquire(self, timeout: float) -> bool:
+        """False if no slot freed up within `timeout` seconds."""
+        if self.try_acquire():
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait([waiter], timeout=timeout)
+        except BaseException:
+            self._give_up(waiter)
+            raise
+        if waiter.done():
+            return True
+        self._give_up(waiter)
+        return False
+
+    def _give_up(self, waiter: asyncio.Future[None]) -> None:
+        if waiter.done():  # a slot was handed over meanwhile
+            self.release()
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        self.held -= 1
+        self._wake()
+
+    def resize(self, limit: int) -> None:
+        self.limit = limit
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.held < self.limit:
+            self.held += 1
+            self._waiters.popleft().set_result(None)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait time and timeouts, and
+    can be resized (set_limit) under its pool_size + max_overflow."""
+
+    pool_name: str = "default"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._window = PoolWindow()
+        # checkouts over the limit wait here, before QueuePool's own limit;
+        # the defaults are QueuePool's
+        max_overflow = kwargs.get("max_overflow", 10)
+        self._gate = _CheckoutGate(
+            self.size() + max_overflow if max_overflow >= 0 else sys.maxsize
+        )
+        self._checkout_timeout: float = kwargs.get("timeout", 30.0)
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        attributes = {"db.client.connection.pool.name": self.pool_name}
+        start = time.perf_counter()
+        try:
+            # awaited only when it has to wait, like QueuePool's queue
+            if not self._gate.try_acquire() and not await_only(
+                self._gate.acquire(self._checkout_timeout)
+            ):
+                raise exc.TimeoutError(
+                    f"Pool limit of {self.limit} reached, connection timed out,"
+                    f" timeout {self._checkout_timeout:0.2f}"
+                )
+            try:
+                record = super()._do_get()
+            except BaseException:
+                self._gate.release()
+                raise
+        except exc.TimeoutError:
+            CONNECTION_TIMEOUTS.add(1, attributes)
+            self._window.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            CONNECTION_WAIT_TIME.record(wait, attributes)
+            self._window.checkouts += 1
+            self._window.wait_s += wait
+        self._window.peak_in_use = max(self._window.peak_in_use, self.checkedout())
+        return record
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._gate.release()
+
+    @property
+    def limit(self) -> int:
+        """Connections the pool lets be checked out at once."""
+        return self._gate.limit
+
+    def set_limit(self, limit: int) -> None:
+        """Resize to `limit` checkouts (at least 1). Checkouts over the limit
+        wait for a connection to come back. The connections open stay under
+        max(limit, pool_size): QueuePool keeps at most pool_size of them idle
+        and closes the others as they come back."""
+        self._gate.resize(max(limit, 1))
+
+    def take_window(self) -> PoolWindow:
+        window, self._window = self._window, PoolWindow()
+        return window
+
+    def recreate(self) -> InstrumentedAsyncQueuePool:
+        pool = super().recreate()
+        pool.pool_name = self.pool_name
+        return pool
+
+
+def instrument_engine_pool(engine: AsyncEngine, name: str) -> None:
+    """Export the engine's pool metrics under `name`."""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        pool.pool_name = name
+    _engines[name] = engine
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# In-process query profiler (DB_QUERY_PROFILER): rolling stats per statement
+# fingerprint, a log line for every statement over DB_SLOW_QUERY_MS and,
+# optionally, the plan of the first DB_SLOW_QUERY_EXPLAIN slow occurrences of
+# each fingerprint. Served by GET /admin/db/queries.
+
+logger = structlog.get_logger("db.profiler")
+
+# latencies kept per fingerprint for the percentiles
+_WINDOW = 1024
+# distinct fingerprints tracked; later ones are counted under _OTHER
+_MAX_FINGERPRINTS = 1000
+_OTHER = "<other>"
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+")
+_NUMBERS = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(
+    r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """The statement with literals and placeholders replaced by `?`, IN lists
+    and multi-row VALUES collapsed and whitespace normalised."""
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _IN_LISTS.sub("IN (...)", sql)
+    sql = _VALUES_ROWS.sub(r"\1, ...", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _shape(value: object) -> str:
+    name = type(value).__name__
+    if isinstance(value, str | bytes | list | tuple):
+        return f"{name}[{len(value)}]"
+    return name
+
+
+def parameter_shapes(parameters: object, many: bool = False) -> object:
+    """Types (and lengths) of the bound parameters, never their values."""
+    if many:
+        rows = list(parameters)  # type: ignore[call-overload]
+        return {"rows": len(rows), "row": parameter_shapes(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, list | tuple):
+        return [_shape(value) for value in parameters]
+    return _shape(parameters)
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ordered, non-empty list."""
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass(frozen=True, slots=True)
+class QueryProfile:
+    fingerprint: str
+    count: int
+    total_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    # rows returned or affected; None if the driver didn't report them
+    rows: int | None
+    slow: int
+    plan: str | None
+
+
+@dataclass(slots=True)
+class _FingerprintStats:
+    count: int = 0
+    total_s: float = 0.0
+    rows: int | None = 0
+    slow: int = 0
+    explained: int = 0
+    plan: str | None = None
+    durations: deque[float] = field(default_factory=lambda: deque(maxlen=_WINDOW))
+
+    def profile(self, fingerprint: str) -> QueryProfile:
+        ordered = sorted(self.durations)
+        return QueryProfile(
+            fingerprint=fingerprint,
+            count=self.count,
+            total_ms=round(self.total_s * 1000, 2),
+            p50_ms=round(_percentile(ordered, 0.50) * 1000, 2),
+            p95_ms=round(_percentile(ordered, 0.95) * 1000, 2),
+            p99_ms=round(_percentile(ordered, 0.99) * 1000, 2),
+            rows=self.rows,
+            slow=self.slow,
+            plan=self.plan,
+        )
+
+
+class QueryProfiler:
+    def __init__(self, slow_query_ms: float = 200, explain_first: int = 0) -> None:
+        self.slow_query_s = slow_query_ms / 1000
+        # slow occurrences per fingerprint whose plan is captured
+        self.explain_first = explain_first
+        self._stats: dict[str, _FingerprintStats] = {}
+
+    def record(
+        self, statement: str, duration_s: float, rows: int | None
+    ) -> _FingerprintStats:
+        key = fingerprint(statement)
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= _MAX_FINGERPRINTS:
+                key = _OTHER
+            stats = self._stats.setdefault(key, _FingerprintStats())
+        stats.count += 1
+        stats.total_s += duration_s
+        if rows is None or stats.rows is None:
+            stats.rows = None
+        else:
+            stats.rows += rows
+        stats.durations.append(duration_s)
+        return stats
+
+    def profiles(self, limit: int | None = None) -> list[QueryProfile]:
+        """Fingerprints by total time spent, most expensive first."""
+        profiles = [stats.profile(key) for key, stats in self._stats.items()]
+        profiles.sort(key=lambda p: p.total_ms, reverse=True)
+        return profiles[:limit]
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+profiler = QueryProfiler()
+
+
+def _rows(cursor) -> int | None:
+    """The DBAPI rowcount: asyncpg sets it for every statement (from the
+    command status, e.g. SELECT 3); aiosqlite only for DML without RETURNING,
+    -1 otherwise."""
+    return cursor.rowcount if cursor.rowcount >= 0 else None
+
+
+_EXPLAIN = {
+    "postgresql": "EXPLAIN (ANALYZE, BUFFERS) ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+
+
+def _explain(conn, statement: str, parameters) -> str | None:
+    """Plan of a SELECT, from a separate cursor so the result set of the
+    statement being profiled is left alone. Postgres' ANALYZE runs the query a
+    second time; a savepoint keeps a failure from aborting the transaction."""
+    prefix = _EXPLAIN.get(conn.dialect.name)
+    if prefix is None or statement.lstrip()[:6].upper() != "SELECT":
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT db_profiler_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = "\n".join(str(row[-1]) for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT db_profiler_explain")
+            logger.warning("explain_failed", exc_info=True)
+            return None
+        cursor.execute("RELEASE SAVEPOINT db_profiler_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    context._profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    start = getattr(context, "_profile_start", None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    rows = _rows(cursor)
+    stats = profiler.record(statement, duration, rows)
+    if duration < profiler.slow_query_s:
+        return
+    stats.slow += 1
+    plan = None
+    if stats.explained < profiler.explain_first:
+        stats.explained += 1
+        plan = _explain(conn, statement, parameters)
+        if plan is not None:
+            stats.plan = plan
+    logger.warning(
+        "slow_query",
+        fingerprint=fingerprint(statement),
+        duration_ms=round(duration * 1000, 2),
+        rows=rows,
+        params=parameter_shapes(parameters, many),
+        plan=plan,
+    )
+
+
+def enable_query_profiler(slow_query_ms: float, explain_first: int) -> None:
+    """Register the cursor events on every engine (idempotent)."""
+    profiler.slow_query_s = slow_query_ms / 1000
+    profiler.explain_first = explain_first
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
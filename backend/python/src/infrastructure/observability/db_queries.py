@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request SQL statement count and DB time (DB_QUERY_STATS). The cursor
+# events are registered on every engine once enabled; outside a track_queries()
+# block they cost a ContextVar lookup. SQLAlchemy runs async drivers' events in
+# the calling task's context, so the counts land in the right request.
+
+
+@dataclass(slots=True)
+class QueryStats:
+    count: int = 0
+    duration_s: float = 0.0
+    # enclosing track_queries() block, which counts these statements too
+    parent: QueryStats | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        return round(self.duration_s * 1000, 2)
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("db_query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count the statements executed inside the block (and in tasks it starts)."""
+    stats = QueryStats(parent=_query_stats.get())
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if _query_stats.get() is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    stats = _query_stats.get()
+    if stats is None:
+        return
+    start = getattr(context, "_query_start", None)
+    duration = time.perf_counter() - start if start is not None else 0.0
+    while stats is not None:
+        stats.count += 1
+        stats.duration_s += duration
+        stats = stats.parent
+
+
+def enable_query_tracking() -> None:
+    """Register the cursor events (idempotent). Until then tracking is off."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from opentelemetry import metrics
+
+# Retries and hedges of the data service reads (see ResilientDataService). Like
+# the pool's instruments, no-ops until setup_observability installs a provider.
+_meter = metrics.get_meter("db.resilience")
+
+RETRIES = _meter.create_counter(
+    "db.client.retries",
+    unit="{retry}",
+    description="Reads run again after a transient error",
+)
+RETRIES_EXHAUSTED = _meter.create_counter(
+    "db.client.retries.exhausted",
+    unit="{read}",
+    description="Reads that still failed after their last retry",
+)
+HEDGES = _meter.create_counter(
+    "db.client.hedges",
+    unit="{hedge}",
+    description="Second attempts of slow reads, by the attempt that finished first",
+)
@@ -1,17 +1,31 @@
 from __future__ import annotations
 
 import time
+from contextlib import nullcontext
 
 import structlog
 from opentelemetry import trace
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import ASGIApp
+
+from src.infrastructure.observability.db_queries import (
+    enable_query_tracking,
+    track_queries,
+)
 
 logger = structlog.get_logger("http")
 
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app: ASGIApp, track_db_queries: bool = False) -> None:
+        super().__init__(app)
+        # adds the request's SQL statement count and DB time to the log line
+        self.track_db_queries = track_db_queries
+        if track_db_queries:
+            enable_query_tracking()
+
     async def dispatch(
         self, request: Request, call_next: RequestResponseEndpoint
     ) -> Response:
@@ -29,9 +43,13 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             span_id=span_id,
         )
 
-        response = await call_next(request)
+        with track_queries() if self.track_db_queries else nullcontext() as queries:
+            response = await call_next(request)
         duration_ms = round((time.perf_counter() - start) * 1000, 2)
 
+        db_fields = {}
+        if queries is not None:
+            db_fields = {"db_queries": queries.count, "db_ms": queries.duration_ms}
         logger.info(
             "request",
             method=request.method,
@@ -39,6 +57,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             status=response.status_code,
             duration_ms=duration_ms,
             trace_id=trace_id,
+            **db_fields,
         )
 
         return response
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+from collections.abc import Awaitable, Callable
+from functools import partial
+
+
+class Batcher[T, R]:
+    """Coalesces concurrent submit() calls into batches. A batch is flushed once
+    it holds `max_size` items or `max_wait` seconds after its first item arrived,
+    whichever comes first. `flush` gets the items and returns one result per
+    item, in order; an exception in that list is raised to that item's caller
+    only, an exception raised by `flush` itself to every caller of the batch.
+
+    Flushes run as their own tasks, outside the callers' context: they don't see
+    a caller's request scope (and its DB connection), so batches can overlap. Nor
+    do they see the callers' deadline or per-request query stats: an item
+    carries what its flush needs from its caller."""
+
+    def __init__(
+        self,
+        flush: Callable[[list[T]], Awaitable[list[R | Exception]]],
+        max_size: int,
+        max_wait: float,
+    ) -> None:
+        self._flush = flush
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending: list[tuple[T, asyncio.Future[R]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        # strong references, so running flushes aren't garbage collected
+        self._flushing: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[R] = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._start_flush()
+        elif len(self._pending) == 1:
+            self._timer = loop.call_later(self.max_wait, self._start_flush)
+        return await future
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(
+            self._flush([item for item, _ in batch]), context=contextvars.Context()
+        )
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+        task.add_done_callback(partial(self._resolve, batch))
+
+    @staticmethod
+    def _resolve(
+        batch: list[tuple[T, asyncio.Future[R]]],
+        task: asyncio.Task[list[R | Exception]],
+    ) -> None:
+        # the callers still waiting: the others were cancelled
+        waiting = [(i, f) for i, (_, f) in enumerate(batch) if not f.done()]
+        if task.cancelled():
+            for _, future in waiting:
+                future.cancel()
+            return
+        error = task.exception()
+        if error is not None:
+            for _, future in waiting:
+                future.set_exception(error)
+            return
+        results = task.result()
+        for i, future in waiting:
+            if isinstance(results[i], Exception):
+                future.set_exception(results[i])
+            else:
+                future.set_result(results[i])
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import re
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from sqlalchemy.exc import DBAPIError
+
+# Fault injection (FAULTS): latency, slow-query spikes and connection errors
+# added to data service calls, to reproduce tail latency and failovers locally.
+#
+# Rules are separated by ";", as `method:option,option`. The method is a data
+# service method name, or "*" for the methods without a rule of their own (an
+# empty rule, e.g. "health_check:", leaves a method alone). Options, times in ms:
+#   latency=fixed(ms) | uniform(min,max) | exp(mean) | lognormal(median,sigma)
+#   spike=p@ms     p of the calls take ms more (slow query)
+#   error=p        p of the calls fail with a lost connection, before running
+# e.g. "*:latency=lognormal(2,0.5);list_assets_paginated:spike=0.01@2000,error=0.01"
+
+_DISTRIBUTIONS = {"fixed": 1, "uniform": 2, "exp": 1, "lognormal": 2}
+_DISTRIBUTION = re.compile(r"(\w+)\(([^)]*)\)")
+# options are comma-separated, but so are a distribution's parameters
+_OPTION_SEPARATOR = re.compile(r",(?![^(]*\))")
+
+
+@dataclass(frozen=True, slots=True)
+class Latency:
+    distribution: str
+    params: tuple[float, ...]
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds"""
+        match self.distribution:
+            case "uniform":
+                ms = rng.uniform(*self.params)
+            case "exp":
+                ms = rng.expovariate(1 / self.params[0])
+            case "lognormal":
+                median, sigma = self.params
+                ms = rng.lognormvariate(math.log(median), sigma)
+            case _:
+                ms = self.params[0]
+        return ms / 1000
+
+
+@dataclass(frozen=True, slots=True)
+class FaultSpec:
+    latency: Latency | None = None
+    spike_rate: float = 0.0
+    spike_ms: float = 0.0
+    error_rate: float = 0.0
+
+
+def _rate(value: str) -> float:
+    rate = float(value)
+    if not 0 <= rate <= 1:
+        raise ValueError(f"rate {value} must be between 0 and 1")
+    return rate
+
+
+def _latency(value: str) -> Latency:
+    match = _DISTRIBUTION.fullmatch(value)
+    if match is None or match[1] not in _DISTRIBUTIONS:
+        raise ValueError(f"latency {value!r}: expected one of {set(_DISTRIBUTIONS)}")
+    params = tuple(float(p) for p in match[2].split(","))
+    if len(params) != _DISTRIBUTIONS[match[1]] or any(p <= 0 for p in params):
+        raise ValueError(f"latency {value!r}: wrong parameters")
+    return Latency(match[1], params)
+
+
+def parse_faults(raw: str) -> dict[str, FaultSpec]:
+    """FAULTS -> spec per method name ("*": the default). Raises ValueError."""
+    faults: dict[str, FaultSpec] = {}
+    for rule in filter(None, map(str.strip, raw.split(";"))):
+        method, separator, options = rule.partition(":")
+        method = method.strip()
+        if not separator or not method:
+            raise ValueError(f"fault rule {rule!r}: expected method:options")
+        fields: dict[str, object] = {}
+        for option in filter(None, map(str.strip, _OPTION_SEPARATOR.split(options))):
+            key, _, value = option.partition("=")
+            match key.strip():
+                case "latency":
+                    fields["latency"] = _latency(value.strip())
+                case "spike":
+                    rate, _, ms = value.partition("@")
+                    spike_ms = float(ms)
+                    if spike_ms < 0:
+                        raise ValueError(f"spike {value!r}: ms must be >= 0")
+                    fields["spike_rate"] = _rate(rate)
+                    fields["spike_ms"] = spike_ms
+                case "error":
+                    fields["error_rate"] = _rate(value)
+                case _:
+                    raise ValueError(f"fault rule {rule!r}: unknown option {key!r}")
+        faults[method] = FaultSpec(**fields)
+    return faults
+
+
+class FaultInjector:
+    """Applies the FAULTS specs to data service calls. A seed makes a run
+    reproducible (for one sequence of calls)."""
+
+    def __init__(self, faults: dict[str, FaultSpec], seed: int | None = None):
+        self.faults = faults
+        self._rng = random.Random(seed)
+
+    async def run[R](self, method: str, call: Callable[[], Awaitable[R]]) -> R:
+        spec = self.faults.get(method, self.faults.get("*"))
+        if spec is None:
+            return await call()
+        # before the call: a failed write must not have committed
+        if spec.error_rate and self._rng.random() < spec.error_rate:
+            raise DBAPIError(
+                f"<injected fault: {method}>",
+                None,
+                ConnectionResetError("injected connection reset"),
+                connection_invalidated=True,
+            )
+        delay = spec.latency.sample(self._rng) if spec.latency else 0.0
+        if spec.spike_rate and self._rng.random() < spec.spike_rate:
+            delay += spec.spike_ms / 1000
+        result = await call()
+        # after the call, as a slow query would: the request's connection is
+        # still checked out meanwhile
+        if delay:
+            await asyncio.sleep(delay)
+        return result
@@ -12,14 +12,20 @@ os.environ.setdefault("OTEL_ENABLED", "false")
 os.environ.setdefault("JWT_SECRET", "test-secret-key")
 
 import json
+import sqlite3
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime
 from functools import lru_cache
+from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock
 from uuid import uuid4
 from zoneinfo import ZoneInfo
 
 import pytest
 from httpx import ASGITransport, AsyncClient, MockTransport, Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
 )
@@ -38,7 +44,19 @@ from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
     SQLAlchemyDataService,
 )
 from src.infrastructure.dataservice.dbdataservice import DbDataService
+from src.infrastructure.dataservice.dbdataservice_builder import build_db_dataservice
+from src.infrastructure.dataservice.faulty.faulty import (
+    FaultyAuthDataService,
+    FaultyDbDataService,
+)
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
 from src.infrastructure.datastore.sqlalchemy.base import build_engine
+from src.infrastructure.observability.db_queries import (
+    QueryStats,
+    enable_query_tracking,
+    track_queries,
+)
+from src.infrastructure.utils.faults import FaultInjector, parse_faults
 
 
 @lru_cache(maxsize=1)
@@ -53,6 +71,101 @@ def dataservice_db_sqlalchemy() -> DbDataService:
     return SQLAlchemyDataService()
 
 
+@pytest.fixture
+def dataservice_db_sqlalchemy_replica() -> DbDataService:
+    """SQLAlchemy dataservice with a read replica. Unless DB_READ_HOST is set
+    (e.g. to a second local Postgres), the "replica" is the primary itself."""
+    settings = build_settings()
+    if not settings.db_read_host:
+        settings.db_read_host = settings.db_host
+    build_engine(settings=settings)
+    return SQLAlchemyDataService()
+
+
+@pytest.fixture(params=[False, True], ids=["pool", "nullpool"])
+def dataservice_db_sqlalchemy_pgbouncer(request) -> DbDataService:
+    """SQLAlchemy dataservice going through PgBouncer in transaction mode.
+    Skipped unless PGBOUNCER_PORT points to a pgbouncer in front of DB_HOST."""
+    port = os.environ.get("PGBOUNCER_PORT")
+    if not port:
+        pytest.skip("PGBOUNCER_PORT not set")
+    settings = build_settings()
+    settings.db_host = os.environ.get("PGBOUNCER_HOST", settings.db_host)
+    settings.db_port = int(port)
+    settings.db_pooler_mode = "transaction"
+    settings.db_pooler_nullpool = request.param
+    build_engine(settings=settings)
+    return SQLAlchemyDataService()
+
+
+@pytest.fixture
+async def dataservice_db_sqlalchemy_sharded():
+    """Sharded dataservice with DB_TEST_SHARDS as the other shards, migrated
+    databases prepared by database/scripts/init_shard.sh. Skipped unless set."""
+    shards = os.environ.get("DB_TEST_SHARDS")
+    if not shards:
+        pytest.skip("DB_TEST_SHARDS not set")
+    settings = build_settings()
+    settings.db_shards_raw = shards
+    settings.db_shard_map_ttl = 0
+    settings.db_read_retries = 0  # the ShardedDataService itself
+    yield build_db_dataservice(settings)
+    for shard in base_mod.shards:
+        await shard.engine.dispose()
+
+
+SQLITE_MIGRATIONS = Path(__file__).parents[3] / "database" / "migrations-sqlite"
+
+
+def apply_sqlite_migrations(path: Path) -> None:
+    """Run database/migrations-sqlite (up) on a new SQLite database file."""
+    with sqlite3.connect(path) as conn:
+        for migration in sorted(SQLITE_MIGRATIONS.glob("*.up.sql")):
+            conn.executescript(migration.read_text())
+
+
+@pytest.fixture
+def sqlite_settings(tmp_path: Path):
+    """Settings for DB_BACKEND=sqlite on a migrated database in tmp_path."""
+    settings = build_settings()
+    settings.db_backend = "sqlite"
+    settings.db_sqlite_path = str(tmp_path / "portfolio.db")
+    apply_sqlite_migrations(Path(settings.db_sqlite_path))
+    return settings
+
+
+@pytest.fixture
+async def dataservice_db_sqlite(sqlite_settings) -> DbDataService:
+    build_engine(settings=sqlite_settings)
+    yield SQLAlchemyDataService()
+    await base_mod.engine.dispose()
+    await base_mod.read_engine.dispose()
+
+
+@pytest.fixture
+async def dataservice_db_sqlite_sharded(sqlite_settings, tmp_path: Path):
+    """Sharded dataservice (DB_SHARDS) over three SQLite databases: the one of
+    sqlite_settings (shard 0, with the users) and two more. Placements aren't
+    cached (DB_SHARD_MAP_TTL=0)."""
+    paths = [tmp_path / f"shard-{i}.db" for i in (1, 2)]
+    for path in paths:
+        apply_sqlite_migrations(path)
+    sqlite_settings.db_shards_raw = ",".join(map(str, paths))
+    sqlite_settings.db_shard_map_ttl = 0
+    sqlite_settings.db_read_retries = 0  # the ShardedDataService itself
+    yield build_db_dataservice(sqlite_settings)
+    for shard in base_mod.shards:
+        await shard.engine.dispose()
+        await shard.read_engine.dispose()
+
+
+@pytest.fixture
+def dataservice_auth_local_sqlite(
+    sqlite_settings, dataservice_db_sqlite: DbDataService
+) -> LocalAuthDataService:
+    return LocalAuthDataService(settings=sqlite_settings)
+
+
 @pytest.fixture
 def dataservice_auth_local():
     settings = build_settings()
@@ -119,6 +232,72 @@ def dataservice_auth_supabase():
     yield ds, access_token, id, email, created_at
 
 
+@pytest.fixture
+def db_statements():
+    """SQL statements sent to the database (by any engine) during the test."""
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def query_budget():
+    """Fail if a block runs more SQL statements than its budget, e.g.
+
+    with query_budget(2):
+        await client.get("/portfolios")
+    """
+    enable_query_tracking()
+
+    @contextmanager
+    def budget(max_queries: int) -> Iterator[QueryStats]:
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f"{stats.count} SQL statements, over the budget of {max_queries}"
+        )
+
+    return budget
+
+
+@pytest.fixture
+def inject_faults():
+    """inject_faults(ds, rules): the data service with FAULTS rules applied (see
+    utils/faults.py), seeded: a test sees the same faults on every run."""
+
+    def inject(ds, rules: str):
+        injector = FaultInjector(parse_faults(rules), seed=0)
+        if isinstance(ds, AuthDataService):
+            return FaultyAuthDataService(ds, injector)
+        return FaultyDbDataService(ds, injector)
+
+    return inject
+
+
+@pytest.fixture
+async def sqlite_rest_client(sqlite_settings):
+    """REST client on the real use cases over SQLite, logged in as a new user."""
+    app = create_app(
+        settings=sqlite_settings, usecases=UseCases.build(settings=sqlite_settings)
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        res = await ac.post(
+            "/auth/register",
+            json={"email": "user@test.com", "password": "password123!"},
+        )
+        assert res.status_code == 201
+        yield ac
+    await base_mod.engine.dispose()
+    await base_mod.read_engine.dispose()
+
+
 @pytest.fixture
 def mock_auth_uc():
     uc = AsyncMock(spec=AuthMgt)
@@ -181,6 +360,7 @@ def mock_db_dataservice():
     db_dataservice.delete_portfolio = AsyncMock()
     db_dataservice.list_portfolios_paginated = AsyncMock()
     db_dataservice.create_asset = AsyncMock()
+    db_dataservice.update_asset = AsyncMock()
     db_dataservice.delete_asset = AsyncMock()
     db_dataservice.list_assets_paginated = AsyncMock()
     db_dataservice.list_assets = AsyncMock()
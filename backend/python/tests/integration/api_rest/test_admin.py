@@ -0,0 +1,49 @@
+"""
+Admin endpoints, on the real use cases over SQLite.
+"""
+
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.fixture
+def sqlite_settings(sqlite_settings):
+    sqlite_settings.db_query_profiler = True
+    return sqlite_settings
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+class TestAdmin:
+    async def test_query_profiles(
+        self, sqlite_rest_client: AsyncClient, sqlite_settings
+    ):
+        client = sqlite_rest_client
+        res = await client.get("/admin/db/queries")
+        assert res.status_code == 403
+
+        sqlite_settings.admin_emails_raw = "User@Test.com"
+        # the profiles are process-wide: drop the other tests' queries
+        res = await client.delete("/admin/db/queries")
+        assert res.status_code == 204
+        res = await client.post("/portfolios", json={"name": "foo"})
+        assert res.status_code == 201
+        res = await client.get("/admin/db/queries", params={"limit": 100})
+        assert res.status_code == 200
+        profiles = {p["fingerprint"]: p for p in res.json()}
+        inserts = [f for f in profiles if f.startswith("INSERT INTO portfolios")]
+        assert len(inserts) == 1
+        assert profiles[inserts[0]]["count"] == 1
+
+        res = await client.delete("/admin/db/queries")
+        assert res.status_code == 204
+        res = await client.get("/admin/db/queries")
+        # only this request's user lookup since the reset
+        assert [p["count"] for p in res.json()] == [1]
+
+    async def test_requires_login(self, sqlite_rest_client: AsyncClient):
+        sqlite_rest_client.cookies.clear()
+        res = await sqlite_rest_client.get("/admin/db/queries")
+        assert res.status_code == 401
@@ -0,0 +1,71 @@
+"""
+The REST API under injected faults (FAULTS), on the real data services over
+SQLite: deadlines, retries and the valuation cache.
+"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.rest.app import create_app
+from src.domain.usecases.usecases import UseCases
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+
+@pytest.fixture
+async def faulty_client(sqlite_settings):
+    """REST client logged in as a new user. list_assets (valuations) takes 300ms,
+    one in two list_assets_paginated calls loses its connection."""
+    sqlite_settings.faults_raw = (
+        "list_assets:latency=fixed(300);list_assets_paginated:error=0.5"
+    )
+    sqlite_settings.faults_seed = 0
+    sqlite_settings.db_read_retries = 10
+    sqlite_settings.db_read_retry_backoff_ms = 1
+    app = create_app(
+        settings=sqlite_settings, usecases=UseCases.build(settings=sqlite_settings)
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        res = await ac.post(
+            "/auth/register",
+            json={"email": "user@test.com", "password": "password123!"},
+        )
+        assert res.status_code == 201
+        res = await ac.post("/portfolios", json={"name": "foo"})
+        assert res.status_code == 201
+        ac.portfolio_id = res.json()["id"]
+        yield ac
+    await base_mod.engine.dispose()
+    await base_mod.read_engine.dispose()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+class TestFaults:
+    async def test_slow_valuation(self, faulty_client: AsyncClient):
+        url = f"/portfolios/{faulty_client.portfolio_id}/valuation"
+        timeout = {"X-Request-Timeout": "0.1"}
+
+        start = time.perf_counter()
+        res = await faulty_client.get(url, headers=timeout)
+        # cut at the client's deadline rather than after the slow read
+        assert res.status_code == 504
+        assert time.perf_counter() - start < 0.3
+
+        res = await faulty_client.get(url)
+        assert res.status_code == 200
+        # then served from the valuation cache, well within the deadline
+        res = await faulty_client.get(url, headers=timeout)
+        assert res.status_code == 200
+
+    async def test_lost_connections_are_retried(self, faulty_client: AsyncClient):
+        for _ in range(10):
+            res = await faulty_client.get(
+                f"/portfolios/{faulty_client.portfolio_id}/assets"
+            )
+            assert res.status_code == 200
@@ -0,0 +1,79 @@
+"""
+SQL statement budgets per endpoint, on the real data services over SQLite.
+A budget going up means an extra round trip per request (or an N+1): raise it
+only on purpose.
+"""
+
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+
+from src.infrastructure.datastore.sqlalchemy.symbols import load_symbols
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+class TestQueryBudget:
+    async def test_portfolio_endpoints(
+        self, sqlite_rest_client: AsyncClient, query_budget
+    ):
+        client = sqlite_rest_client
+        # Every authenticated request starts with the user lookup
+        with query_budget(2):
+            res = await client.post("/portfolios", json={"name": "foo"})
+        assert res.status_code == 201
+        portfolio_id = res.json()["id"]
+        # loaded by the app's lifespan, which the test client doesn't run
+        await load_symbols()
+        for symbol in ("BTC", "ETH", "AAPL"):
+            # a symbol seen for the first time is added to symbols
+            with query_budget(4):
+                res = await client.post(
+                    f"/portfolios/{portfolio_id}/assets",
+                    json={"symbol": symbol, "quantity": 1},
+                )
+            assert res.status_code == 201
+        with query_budget(2):
+            res = await client.post(
+                f"/portfolios/{portfolio_id}/assets",
+                json={"symbol": "BTC", "quantity": 2},
+            )
+        assert res.status_code == 201
+        asset_id = res.json()["id"]
+        # one ownership-scoped UPDATE ... RETURNING
+        with query_budget(2):
+            res = await client.patch(
+                f"/portfolios/{portfolio_id}/assets/{asset_id}", json={"delta": -1}
+            )
+        assert res.status_code == 200
+
+        # count + page: no selectin load of the portfolios' assets
+        with query_budget(3):
+            res = await client.get("/portfolios")
+        assert res.status_code == 200
+        with query_budget(2):
+            res = await client.patch(
+                f"/portfolios/{portfolio_id}", json={"name": "bar"}
+            )
+        assert res.status_code == 200
+        with query_budget(2):
+            res = await client.get(f"/portfolios/{portfolio_id}")
+        assert res.status_code == 200
+        with query_budget(3):
+            res = await client.get(f"/portfolios/{portfolio_id}/assets")
+        assert res.status_code == 200
+        # ownership check, then the assets
+        with query_budget(3):
+            res = await client.get(f"/portfolios/{portfolio_id}/valuation")
+        assert res.status_code == 200
+        with query_budget(2):
+            res = await client.delete(f"/portfolios/{portfolio_id}")
+        assert res.status_code == 204
+
+    async def test_budget_exceeded(self, sqlite_rest_client: AsyncClient, query_budget):
+        with (
+            pytest.raises(AssertionError, match="over the budget of 0"),
+            query_budget(0),
+        ):
+            await sqlite_rest_client.get("/auth/me")
@@ -4,18 +4,21 @@ Integration tests for the REST API
 
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock
 from uuid import uuid4
 
 import pytest
 from httpx import AsyncClient, Cookies
+from sqlalchemy.exc import DBAPIError
 
 from src.domain.aggregates.auth.user import User
 from src.domain.aggregates.exceptions.auth import (
     EmailAlreadyExistsError,
     InvalidCredentialsError,
 )
+from src.domain.aggregates.exceptions.portfolio import InsufficientQuantityError
 from src.domain.aggregates.health.health import Health
 from src.domain.aggregates.portfolio.asset import Asset
 from src.domain.aggregates.portfolio.portfolio import Portfolio
@@ -26,10 +29,14 @@ from src.domain.aggregates.portfolio.portfolio_valuation import (
 from src.domain.usecases.authmgt.authmgt import AuthMgt
 from src.domain.usecases.portfoliomgt.payloads import (
     AssetCreate,
+    AssetUpdate,
     PortfolioCreate,
     PortfolioUpdate,
 )
 from src.domain.usecases.portfoliomgt.portfoliomgt import PortfolioMgt
+from src.infrastructure.dataservice.db_sharded.exceptions import OwnerMovingError
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
+from src.infrastructure.datastore.sqlalchemy.exceptions import DeadlineExceededError
 from src.infrastructure.utils.pagination import PaginationRequest, PaginationResponse
 from tests.conftest import get_tz
 
@@ -356,6 +363,18 @@ class TestREST:
         portfolio_uc.create_portfolio.assert_awaited_once_with(
             owner_id=portfolio.owner_id, payload=PortfolioCreate(name=portfolio.name)
         )
+        assert data.get("consolidated") is False
+
+        # Consolidated holdings
+        portfolio_uc.create_portfolio.reset_mock()
+        res = await client.post(
+            "/portfolios", json={"name": "foo", "consolidated": True}
+        )
+        assert res.status_code == 201
+        portfolio_uc.create_portfolio.assert_awaited_once_with(
+            owner_id=portfolio.owner_id,
+            payload=PortfolioCreate(name="foo", consolidated=True),
+        )
 
         # No token
         cookies = client.cookies
@@ -545,6 +564,16 @@ class TestREST:
             payload=PortfolioUpdate(name=payload["name"]),
         )
 
+        # Consolidated holdings only
+        portfolio_uc.update_portfolio.reset_mock()
+        res = await client.patch(f"/portfolios/{id}", json={"consolidated": True})
+        assert res.status_code == 200
+        portfolio_uc.update_portfolio.assert_awaited_once_with(
+            owner_id=user.id,
+            portfolio_id=id,
+            payload=PortfolioUpdate(name=None, consolidated=True),
+        )
+
         # No token
         cookies = client.cookies
         client.cookies = Cookies()
@@ -650,7 +679,7 @@ class TestREST:
             owner_id=user.id, portfolio_id=id
         )
         portfolio_uc.compute_portfolio_valuation.assert_awaited_once_with(
-            portfolio_id=id
+            owner_id=user.id, portfolio_id=id
         )
 
         # No token
@@ -686,14 +715,9 @@ class TestREST:
     ):
         client, auth_uc, portfolio_uc = rest_client
         user = self.__set_authed_uc(auth_uc)
-        portfolio = Portfolio(
-            id=0, owner_id=user.id, name="foo", created_at=datetime.now(tz=get_tz())
-        )
-        portfolio_uc.get_portfolio = AsyncMock()
-        portfolio_uc.get_portfolio.return_value = portfolio
         asset = Asset(
             id=0,
-            portfolio_id=portfolio.id,
+            portfolio_id=1007,
             symbol="BTC",
             quantity=0.008,
             created_at=datetime.now(tz=get_tz()),
@@ -712,12 +736,10 @@ class TestREST:
         assert data["symbol"] == asset.symbol
         assert data["quantity"] == asset.quantity
         assert datetime.fromisoformat(data["created_at"]) == asset.created_at
-        portfolio_uc.get_portfolio.assert_awaited_once_with(
-            owner_id=user.id, portfolio_id=1007
-        )
         portfolio_uc.create_asset.assert_awaited_once_with(
-            payload=AssetCreate(symbol=payload["symbol"], quantity=payload["quantity"]),
+            owner_id=user.id,
             portfolio_id=1007,
+            payload=AssetCreate(symbol=payload["symbol"], quantity=payload["quantity"]),
         )
 
         # No token
@@ -760,41 +782,37 @@ class TestREST:
 
         assert res.status_code == 422
 
-        # Portfolio doesn't exist
-        portfolio_uc.get_portfolio.reset_mock()
-        portfolio_uc.get_portfolio.return_value = None
+        # Portfolio doesn't exist (or isn't owned by the user)
         portfolio_uc.create_asset.reset_mock()
+        portfolio_uc.create_asset.return_value = None
 
         payload = {"symbol": "BTC", "quantity": 0.004}
         res = await client.post("/portfolios/0/assets", json=payload)
 
         assert res.status_code == 404
-        portfolio_uc.get_portfolio.assert_awaited_once_with(
-            owner_id=user.id, portfolio_id=0
+        portfolio_uc.create_asset.assert_awaited_once_with(
+            owner_id=user.id,
+            portfolio_id=0,
+            payload=AssetCreate(symbol=payload["symbol"], quantity=payload["quantity"]),
         )
-        portfolio_uc.create_asset.assert_not_awaited()
+        portfolio_uc.get_portfolio.assert_not_awaited()
 
     async def test_asset_list(
         self, rest_client: tuple[AsyncClient, AuthMgt, PortfolioMgt]
     ):
         client, auth_uc, portfolio_uc = rest_client
         user = self.__set_authed_uc(auth_uc)
-        portfolio = Portfolio(
-            id=0, owner_id=user.id, name="foo", created_at=datetime.now(tz=get_tz())
-        )
-        portfolio_uc.get_portfolio = AsyncMock()
-        portfolio_uc.get_portfolio.return_value = portfolio
         assets = [
             Asset(
                 id=0,
-                portfolio_id=portfolio.id,
+                portfolio_id=877,
                 symbol="BTC",
                 quantity=0.008,
                 created_at=datetime.now(tz=get_tz()),
             ),
             Asset(
                 id=1,
-                portfolio_id=portfolio.id,
+                portfolio_id=877,
                 symbol="ETH",
                 quantity=0.04,
                 created_at=datetime.now(tz=get_tz()),
@@ -827,10 +845,9 @@ class TestREST:
         assert data["pagination_response"]["total_pages"] == page_res.total_pages
         assert data["pagination_response"]["current_page"] == page_res.current_page
         assert data["pagination_response"]["items_per_page"] == page_res.items_per_page
-        portfolio_uc.get_portfolio.assert_awaited_once_with(
-            owner_id=user.id, portfolio_id=877
-        )
+        portfolio_uc.get_portfolio.assert_not_awaited()
         portfolio_uc.list_assets_paginated.assert_awaited_once_with(
+            owner_id=user.id,
             portfolio_id=877,
             pagination_request=PaginationRequest(page=1, items_per_page=20),
         )
@@ -849,7 +866,6 @@ class TestREST:
         assert res.status_code == 422
 
         # Custom page & items_per_page
-        portfolio_uc.get_portfolio.reset_mock()
         portfolio_uc.list_assets_paginated.reset_mock()
 
         id, page, items_per_page = 84, 7, 45
@@ -858,10 +874,8 @@ class TestREST:
         )
 
         assert res.status_code == 200
-        portfolio_uc.get_portfolio.assert_awaited_once_with(
-            owner_id=user.id, portfolio_id=84
-        )
         portfolio_uc.list_assets_paginated.assert_awaited_once_with(
+            owner_id=user.id,
             portfolio_id=84,
             pagination_request=PaginationRequest(
                 items_per_page=items_per_page, page=page
@@ -886,16 +900,95 @@ class TestREST:
 
         assert res.status_code == 422
 
-    async def test_asset_delete(
+        # Portfolio doesn't exist (or isn't owned by the user)
+        portfolio_uc.list_assets_paginated.reset_mock()
+        portfolio_uc.list_assets_paginated.return_value = None
+
+        res = await client.get(f"/portfolios/{id}/assets")
+
+        assert res.status_code == 404
+        portfolio_uc.list_assets_paginated.assert_awaited_once_with(
+            owner_id=user.id,
+            portfolio_id=id,
+            pagination_request=PaginationRequest(page=1, items_per_page=20),
+        )
+
+    async def test_asset_patch(
         self, rest_client: tuple[AsyncClient, AuthMgt, PortfolioMgt]
     ):
         client, auth_uc, portfolio_uc = rest_client
         user = self.__set_authed_uc(auth_uc)
-        portfolio = Portfolio(
-            id=0, owner_id=user.id, name="foo", created_at=datetime.now(tz=get_tz())
+        asset = Asset(
+            id=48,
+            portfolio_id=551,
+            symbol="BTC",
+            quantity=1.5,
+            created_at=datetime.now(tz=get_tz()),
         )
-        portfolio_uc.get_portfolio = AsyncMock()
-        portfolio_uc.get_portfolio.return_value = portfolio
+        portfolio_uc.update_asset = AsyncMock()
+        portfolio_uc.update_asset.return_value = asset
+
+        p_id, a_id = 551, 48
+        res = await client.patch(
+            f"/portfolios/{p_id}/assets/{a_id}", json={"delta": -0.5}
+        )
+        data = res.json()
+
+        assert res.status_code == 200
+        assert (data["id"], data["symbol"], data["quantity"]) == (48, "BTC", 1.5)
+        assert datetime.fromisoformat(data["created_at"]) == asset.created_at
+        portfolio_uc.get_portfolio.assert_not_awaited()
+        portfolio_uc.update_asset.assert_awaited_once_with(
+            owner_id=user.id,
+            portfolio_id=p_id,
+            asset_id=a_id,
+            payload=AssetUpdate(delta=-0.5),
+        )
+
+        portfolio_uc.update_asset.reset_mock()
+        res = await client.patch(
+            f"/portfolios/{p_id}/assets/{a_id}", json={"quantity": 3}
+        )
+        assert res.status_code == 200
+        portfolio_uc.update_asset.assert_awaited_once_with(
+            owner_id=user.id,
+            portfolio_id=p_id,
+            asset_id=a_id,
+            payload=AssetUpdate(quantity=3),
+        )
+
+        # One of quantity or delta, and a positive quantity
+        for payload in ({}, {"quantity": 1, "delta": 1}, {"quantity": 0}):
+            res = await client.patch(f"/portfolios/{p_id}/assets/{a_id}", json=payload)
+            assert res.status_code == 422
+
+        # No token
+        cookies = client.cookies
+        client.cookies = Cookies()
+        res = await client.patch(f"/portfolios/{p_id}/assets/{a_id}", json={"delta": 1})
+        client.cookies = cookies
+
+        assert res.status_code == 401
+
+        # Selling more than held
+        portfolio_uc.update_asset.side_effect = InsufficientQuantityError()
+        res = await client.patch(
+            f"/portfolios/{p_id}/assets/{a_id}", json={"delta": -5}
+        )
+        assert res.status_code == 409
+        assert res.json()["detail"] == str(InsufficientQuantityError())
+
+        # Unknown asset, or portfolio not owned by the user
+        portfolio_uc.update_asset.side_effect = None
+        portfolio_uc.update_asset.return_value = None
+        res = await client.patch(f"/portfolios/{p_id}/assets/{a_id}", json={"delta": 1})
+        assert res.status_code == 404
+
+    async def test_asset_delete(
+        self, rest_client: tuple[AsyncClient, AuthMgt, PortfolioMgt]
+    ):
+        client, auth_uc, portfolio_uc = rest_client
+        user = self.__set_authed_uc(auth_uc)
         portfolio_uc.delete_asset = AsyncMock()
         portfolio_uc.delete_asset.return_value = True
 
@@ -903,11 +996,9 @@ class TestREST:
         res = await client.delete(f"/portfolios/{p_id}/assets/{a_id}")
 
         assert res.status_code == 204
-        portfolio_uc.get_portfolio.assert_awaited_once_with(
-            owner_id=user.id, portfolio_id=p_id
-        )
+        portfolio_uc.get_portfolio.assert_not_awaited()
         portfolio_uc.delete_asset.assert_awaited_once_with(
-            portfolio_id=p_id, asset_id=a_id
+            owner_id=user.id, portfolio_id=p_id, asset_id=a_id
         )
 
         # No token
@@ -918,29 +1009,171 @@ class TestREST:
 
         assert res.status_code == 401
 
-        # No portfolio
-        portfolio_uc.get_portfolio.reset_mock()
-        portfolio_uc.get_portfolio.return_value = None
+        # Delete not OK (unknown asset, or portfolio not owned by the user)
+        portfolio_uc.delete_asset.reset_mock()
+        portfolio_uc.delete_asset.return_value = False
 
         res = await client.delete(f"/portfolios/{p_id}/assets/{a_id}")
 
         assert res.status_code == 404
-        portfolio_uc.get_portfolio.assert_awaited_once_with(
-            owner_id=user.id, portfolio_id=p_id
+        portfolio_uc.delete_asset.assert_awaited_once_with(
+            owner_id=user.id, portfolio_id=p_id, asset_id=a_id
         )
 
-        # Delete not OK
-        portfolio_uc.get_portfolio.reset_mock()
-        portfolio_uc.get_portfolio.return_value = portfolio
-        portfolio_uc.delete_asset.reset_mock()
-        portfolio_uc.delete_asset.return_value = False
+    async def test_request_db_scope(
+        self, rest_client: tuple[AsyncClient, AuthMgt, PortfolioMgt]
+    ):
+        client, auth_uc, portfolio_uc = rest_client
+        user = self.__set_authed_uc(auth_uc)
+        scopes = []
 
-        res = await client.delete(f"/portfolios/{p_id}/assets/{a_id}")
+        async def get_user_from_token(token):
+            scopes.append(base_mod._request_scope.get())
+            return user
 
-        assert res.status_code == 404
-        portfolio_uc.get_portfolio.assert_awaited_once_with(
-            owner_id=user.id, portfolio_id=p_id
+        async def list_assets_paginated(**kwargs):
+            scopes.append(base_mod._request_scope.get())
+            return [], PaginationResponse(
+                total_items=0, total_pages=0, current_page=1, items_per_page=20
+            )
+
+        auth_uc.get_user_from_token.side_effect = get_user_from_token
+        portfolio_uc.list_assets_paginated = AsyncMock(
+            side_effect=list_assets_paginated
         )
-        portfolio_uc.delete_asset.assert_awaited_once_with(
-            portfolio_id=p_id, asset_id=a_id
+
+        res = await client.get("/portfolios/877/assets")
+
+        assert res.status_code == 200
+        # auth and portfolio use cases share one scope, closed after the response
+        assert len(scopes) == 2
+        assert scopes[0] is not None
+        assert scopes[0] is scopes[1]
+        assert scopes[0].closed
+
+    async def test_owner_moving(
+        self, rest_client: tuple[AsyncClient, AuthMgt, PortfolioMgt]
+    ):
+        client, auth_uc, portfolio_uc = rest_client
+        self.__set_authed_uc(auth_uc)
+        portfolio_uc.create_portfolio = AsyncMock(side_effect=OwnerMovingError)
+
+        res = await client.post("/portfolios", json={"name": "foo"})
+
+        # the owner's rows are moving to another shard: retry later
+        assert res.status_code == 503
+        assert res.headers["Retry-After"] == "5"
+        assert res.json() == {"detail": str(OwnerMovingError())}
+
+    async def test_request_deadline(
+        self, rest_client: tuple[AsyncClient, AuthMgt, PortfolioMgt]
+    ):
+        client, auth_uc, portfolio_uc = rest_client
+        self.__set_authed_uc(auth_uc)
+        time_left = []
+        cancelled = asyncio.Event()
+
+        async def list_assets_paginated(**kwargs):
+            time_left.append(base_mod.time_left())
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        portfolio_uc.list_assets_paginated = AsyncMock(
+            side_effect=list_assets_paginated
+        )
+
+        res = await client.get(
+            "/portfolios/877/assets", headers={"X-Request-Timeout": "0.05"}
+        )
+
+        # the client's timeout, shorter than REQUEST_TIMEOUT, is the DB's too
+        assert res.status_code == 504
+        assert res.json() == {"detail": str(DeadlineExceededError())}
+        assert 0 < time_left[0] <= 0.05
+        assert cancelled.is_set()
+        assert base_mod.time_left() is None
+
+        # a longer one doesn't extend the route's
+        async def health_check():
+            time_left.append(base_mod.time_left())
+            return Health(errors=[], warnings=[])
+
+        time_left.clear()
+        auth_uc.health_check = AsyncMock(side_effect=health_check)
+        portfolio_uc.health_check = AsyncMock(side_effect=health_check)
+        res = await client.get("/health", headers={"X-Request-Timeout": "60"})
+        assert res.status_code == 200
+        assert 0 < time_left[0] <= 5
+
+    async def test_request_deadline_statement_timeout(
+        self, rest_client: tuple[AsyncClient, AuthMgt, PortfolioMgt]
+    ):
+        client, auth_uc, portfolio_uc = rest_client
+        self.__set_authed_uc(auth_uc)
+
+        class QueryCanceled(Exception):
+            sqlstate = "57014"
+
+        portfolio_uc.list_assets_paginated = AsyncMock(
+            side_effect=DBAPIError("SELECT", {}, QueryCanceled())
+        )
+
+        res = await client.get("/portfolios/877/assets")
+
+        # Postgres hit the statement_timeout set from the deadline
+        assert res.status_code == 504
+        assert res.json() == {"detail": str(DeadlineExceededError())}
+
+    async def test_client_disconnect(
+        self, rest_client: tuple[AsyncClient, AuthMgt, PortfolioMgt]
+    ):
+        client, auth_uc, portfolio_uc = rest_client
+        self.__set_authed_uc(auth_uc)
+        app = client._transport.app
+        cancelled = asyncio.Event()
+
+        async def list_assets_paginated(**kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        portfolio_uc.list_assets_paginated = AsyncMock(
+            side_effect=list_assets_paginated
         )
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/portfolios/877/assets",
+            "raw_path": b"/portfolios/877/assets",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"test"), (b"cookie", b"access_token=token")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("test", 80),
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+        # the in-flight work was cancelled as soon as the client went away
+        assert cancelled.is_set()
+        assert sent[0]["status"] == 499
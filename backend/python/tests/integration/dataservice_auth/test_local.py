@@ -4,6 +4,8 @@ Integration tests for the local auth dataservice
 
 from __future__ import annotations
 
+from uuid import uuid4
+
 import pytest
 
 from src.domain.aggregates.auth.user import User
@@ -40,6 +42,19 @@ class TestLocal:
 
         await dataservice_auth_local.delete_user(email)
 
+    async def test_register_single_statement(
+        self, dataservice_auth_local: LocalAuthDataService, db_statements: list[str]
+    ):
+        email = f"test-{uuid4()}@test.com"
+        user, _ = await dataservice_auth_local.register(email=email, password="foo")
+
+        assert user.created_at is not None
+        assert len(db_statements) == 1
+        assert db_statements[0].startswith("INSERT INTO users")
+        assert "RETURNING" in db_statements[0]
+
+        await dataservice_auth_local.delete_user(email)
+
     async def test_login(
         self,
         dataservice_auth_local: LocalAuthDataService,
@@ -0,0 +1,220 @@
+"""
+Integration tests for the sharded database dataservice (DB_SHARDS), on three
+SQLite databases built by database/migrations-sqlite.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from src.domain.usecases.portfoliomgt.payloads import AssetCreate, PortfolioCreate
+from src.infrastructure.dataservice.auth_local.local import LocalAuthDataService
+from src.infrastructure.dataservice.db_sharded import rebalance
+from src.infrastructure.dataservice.db_sharded.exceptions import OwnerMovingError
+from src.infrastructure.dataservice.db_sharded.sharded import (
+    SHARD_ID_SHIFT,
+    OwnerPlacement,
+    ShardedDataService,
+    decode_portfolio_id,
+    encode_portfolio_id,
+    place_owner,
+)
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
+from src.infrastructure.utils.pagination import PaginationRequest
+
+
+async def _owners_by_shard(
+    auth: LocalAuthDataService, shard_count: int
+) -> dict[int, list[str]]:
+    """Register users until every shard has two new owners placed on it."""
+    owners: dict[int, list[str]] = defaultdict(list)
+    i = 0
+    while min(len(owners[s]) for s in range(shard_count)) < 2:
+        user, _ = await auth.register(f"user{i}@test.com", "foo")
+        owners[place_owner(str(user.id), shard_count)].append(str(user.id))
+        i += 1
+    return owners
+
+
+async def _count(shard: int, table: str) -> int:
+    with base_mod.use_shard(shard):
+        async with base_mod.session_scope() as db:
+            return (await db.execute(text(f"SELECT count(*) FROM {table}"))).scalar()
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+class TestSharded:
+    """Test database dataservice : SQLAlchemy sharded by owner"""
+
+    async def test_placement_and_ids(
+        self, sqlite_settings, dataservice_db_sqlite_sharded: ShardedDataService
+    ):
+        ds = dataservice_db_sqlite_sharded
+        assert len(base_mod.shards) == 3
+        owners = await _owners_by_shard(LocalAuthDataService(sqlite_settings), 3)
+
+        for shard in range(3):
+            owner_id = owners[shard][0]
+            portfolio = await ds.create_portfolio(owner_id, PortfolioCreate("foo"))
+            asset = await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 1))
+            # the shard is in the id, shard 0's ids are plain
+            assert decode_portfolio_id(portfolio.id) == (shard, 1)
+            assert (portfolio.id >= 1 << SHARD_ID_SHIFT) == (shard > 0)
+            assert asset.portfolio_id == portfolio.id
+            assert await ds.get_portfolio(owner_id, portfolio.id) == portfolio
+            items, _ = await ds.list_portfolios_paginated(
+                owner_id, PaginationRequest(items_per_page=10, page=1)
+            )
+            assert items == [portfolio]
+            assert await ds.list_assets(owner_id, portfolio.id) == [asset]
+            assert await _count(shard, "portfolios") == 1
+
+        assert await _count(0, "owner_shards") == 3
+        assert (await ds.health_check()).errors == []
+
+    async def test_reads_dont_place(
+        self, sqlite_settings, dataservice_db_sqlite_sharded: ShardedDataService
+    ):
+        ds = dataservice_db_sqlite_sharded
+        owners = await _owners_by_shard(LocalAuthDataService(sqlite_settings), 3)
+        owner_id = owners[2][0]
+
+        # an owner who never wrote reads from their shard, unrecorded
+        page = PaginationRequest(items_per_page=10, page=1)
+        assert (await ds.list_portfolios_paginated(owner_id, page))[0] == []
+        assert await ds.get_portfolio(owner_id, encode_portfolio_id(2, 1)) is None
+        assert await ds.placement(owner_id) == OwnerPlacement(2, recorded=False)
+        assert await _count(0, "owner_shards") == 0
+
+        # their first write records it, even with the read's placement cached
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate("foo"))
+        assert decode_portfolio_id(portfolio.id)[0] == 2
+        assert await ds.placement(owner_id) == OwnerPlacement(2)
+        assert await _count(0, "owner_shards") == 1
+
+    async def test_no_cross_shard_queries(
+        self, sqlite_settings, dataservice_db_sqlite_sharded: ShardedDataService
+    ):
+        ds = dataservice_db_sqlite_sharded
+        owners = await _owners_by_shard(LocalAuthDataService(sqlite_settings), 3)
+        owner_id = owners[2][0]
+        # placing a new owner also looks for their rows from before sharding
+        await ds.placement(owner_id, write=True)
+        statements: dict[str, list[str]] = defaultdict(list)
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements[Path(conn.engine.url.database).name].append(statement)
+
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            portfolio = await ds.create_portfolio(owner_id, PortfolioCreate("foo"))
+            await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 1))
+            await ds.list_assets(owner_id, portfolio.id)
+            await ds.delete_portfolio(owner_id, portfolio.id)
+        finally:
+            event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+        # the placement on shard 0, the owner's data on their shard only
+        assert "shard-1.db" not in statements
+        assert all("owner_shards" in s for s in statements["portfolio.db"])
+        assert not any("owner_shards" in s for s in statements["shard-2.db"])
+
+    async def test_foreign_ids(
+        self, sqlite_settings, dataservice_db_sqlite_sharded: ShardedDataService
+    ):
+        ds = dataservice_db_sqlite_sharded
+        owners = await _owners_by_shard(LocalAuthDataService(sqlite_settings), 3)
+        owner_id, neighbour_id = owners[1][:2]
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate("foo"))
+        _, local_id = decode_portfolio_id(portfolio.id)
+
+        # the same row through another shard's id, or another owner of the shard
+        for other_shard in (0, 2):
+            other_id = encode_portfolio_id(other_shard, local_id)
+            assert await ds.get_portfolio(owner_id, other_id) is None
+            assert not await ds.delete_portfolio(owner_id, other_id)
+            assert await ds.list_assets(owner_id, other_id) == []
+        assert await ds.get_portfolio(neighbour_id, portfolio.id) is None
+        assert (
+            await ds.create_asset(neighbour_id, portfolio.id, AssetCreate("X", 1))
+            is None
+        )
+
+    async def test_legacy_owner_stays_on_shard_0(
+        self, sqlite_settings, dataservice_db_sqlite_sharded: ShardedDataService
+    ):
+        ds = dataservice_db_sqlite_sharded
+        owners = await _owners_by_shard(LocalAuthDataService(sqlite_settings), 3)
+        owner_id = owners[1][0]
+        # written before sharding: straight to the primary, no placement
+        legacy = await ds._shards[0].create_portfolio(owner_id, PortfolioCreate("old"))
+
+        assert (await ds.placement(owner_id)).shard == 0
+        assert await ds.get_portfolio(owner_id, legacy.id) == legacy
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate("new"))
+        assert decode_portfolio_id(portfolio.id)[0] == 0
+
+    async def test_move_owner(
+        self, sqlite_settings, dataservice_db_sqlite_sharded: ShardedDataService
+    ):
+        ds = dataservice_db_sqlite_sharded
+        owners = await _owners_by_shard(LocalAuthDataService(sqlite_settings), 3)
+        owner_id, neighbour_id = owners[1][:2]
+        portfolios = [
+            await ds.create_portfolio(owner_id, PortfolioCreate(name))
+            for name in ("foo", "bar")
+        ]
+        for i in range(5):
+            await ds.create_asset(owner_id, portfolios[0].id, AssetCreate("BTC", i))
+        deleted = await ds.create_portfolio(owner_id, PortfolioCreate("baz"))
+        await ds.delete_portfolio(owner_id, deleted.id)
+        kept = await ds.create_portfolio(neighbour_id, PortfolioCreate("kept"))
+
+        ids = await rebalance.move_owner(owner_id, 2, map_ttl=0, batch_size=2)
+
+        # live portfolios only, in order, with their assets
+        assert list(ids) == [p.id for p in portfolios]
+        assert all(decode_portfolio_id(new)[0] == 2 for new in ids.values())
+        assert (await ds.placement(owner_id)).shard == 2
+        for old in portfolios:
+            assert await ds.get_portfolio(owner_id, old.id) is None
+            moved = await ds.get_portfolio(owner_id, ids[old.id])
+            assert (moved.name, moved.created_at) == (old.name, old.created_at)
+        assets = await ds.list_assets(owner_id, ids[portfolios[0].id])
+        assert sorted(a.quantity for a in assets) == list(range(5))
+        # the source rows are left to the purger, the neighbour stays
+        assert await _count(1, "portfolios WHERE deleted_at IS NULL") == 1
+        assert await ds.get_portfolio(neighbour_id, kept.id) == kept
+        assert await rebalance.shard_stats() == [(0, 0, 0), (1, 1, 1), (2, 1, 2)]
+
+        # moving back is the same
+        back = await rebalance.move_owner(owner_id, 1, map_ttl=0)
+        assert len(back) == 2
+        assert await rebalance.move_owner(owner_id, 1, map_ttl=0) == {}
+        with pytest.raises(ValueError):
+            await rebalance.move_owner(owner_id, 3, map_ttl=0)
+
+    async def test_owner_moving(
+        self, sqlite_settings, dataservice_db_sqlite_sharded: ShardedDataService
+    ):
+        ds = dataservice_db_sqlite_sharded
+        owners = await _owners_by_shard(LocalAuthDataService(sqlite_settings), 3)
+        owner_id = owners[2][0]
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate("foo"))
+
+        await rebalance._set_placement(owner_id, 2, moving=True)
+
+        # reads go on, writes wait for the move
+        assert await ds.get_portfolio(owner_id, portfolio.id) == portfolio
+        with pytest.raises(OwnerMovingError):
+            await ds.create_portfolio(owner_id, PortfolioCreate("bar"))
+        with pytest.raises(OwnerMovingError):
+            await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 1))
+        with pytest.raises(OwnerMovingError):
+            await ds.delete_portfolio(owner_id, portfolio.id)
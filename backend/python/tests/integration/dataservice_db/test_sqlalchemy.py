@@ -4,18 +4,28 @@ Integration tests for the SQLAlchemy database dataservice.
 
 from __future__ import annotations
 
+import time
+from unittest.mock import patch
 from uuid import uuid4
 
 import pytest
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, IntegrityError
 
+from src.domain.aggregates.exceptions.portfolio import InsufficientQuantityError
 from src.domain.usecases.portfoliomgt.payloads import (
     AssetCreate,
+    AssetUpdate,
     PortfolioCreate,
     PortfolioUpdate,
 )
+from src.infrastructure.dataservice.db_sqlalchemy import compact_holdings
 from src.infrastructure.dataservice.dbdataservice import DbDataService
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
+from src.infrastructure.datastore.sqlalchemy import purge
+from src.infrastructure.datastore.sqlalchemy.exceptions import DeadlineExceededError
 from src.infrastructure.datastore.sqlalchemy.models.user import User as UserModel
+from src.infrastructure.datastore.sqlalchemy.symbols import symbol_ids
 from src.infrastructure.utils.pagination import PaginationRequest
 
 
@@ -44,6 +54,22 @@ class TestSQLAlchemy:
                 owner_id=str(uuid4()), payload=PortfolioCreate(name="foo")
             )
 
+    async def test_create_portfolio_single_statement(
+        self,
+        dataservice_db_sqlalchemy: DbDataService,
+        dataservice_auth_local_user: tuple[UserModel, str, str],
+        db_statements: list[str],
+    ):
+        owner_id = dataservice_auth_local_user[0].id
+        portfolio = await dataservice_db_sqlalchemy.create_portfolio(
+            owner_id=str(owner_id), payload=PortfolioCreate(name="foo")
+        )
+
+        assert portfolio.created_at is not None
+        assert len(db_statements) == 1
+        assert db_statements[0].startswith("INSERT INTO portfolios")
+        assert "RETURNING" in db_statements[0]
+
     async def test_get_portfolio(
         self,
         dataservice_db_sqlalchemy: DbDataService,
@@ -136,6 +162,18 @@ class TestSQLAlchemy:
 
         assert read is None
 
+        # Soft-deleted until purged
+        count = text("SELECT count(*) FROM portfolios WHERE id = :id")
+        async with base_mod.session_scope() as db:
+            assert (await db.execute(count, {"id": created.id})).scalar() == 1
+        rows, purged = await purge.purge_portfolio(created.id, batch_size=100, pause=0)
+        assert (rows, purged) == (0, True)
+        # Already gone: nothing to purge
+        rows, purged = await purge.purge_portfolio(created.id, batch_size=100, pause=0)
+        assert (rows, purged) == (0, False)
+        async with base_mod.session_scope() as db:
+            assert (await db.execute(count, {"id": created.id})).scalar() == 0
+
         # Unknown portfolio
         deleted = await dataservice_db_sqlalchemy.delete_portfolio(
             owner_id=str(owner_id), portfolio_id=9999
@@ -195,48 +233,187 @@ class TestSQLAlchemy:
 
         # Create asset
         asset = await dataservice_db_sqlalchemy.create_asset(
-            portfolio_id=portfolio.id, payload=AssetCreate(symbol="BTC", quantity=0.001)
+            owner_id=str(owner_id),
+            portfolio_id=portfolio.id,
+            payload=AssetCreate(symbol="BTC", quantity=0.001),
         )
 
+        assert asset is not None
         assert asset.id >= 0
         assert asset.symbol == "BTC"
         assert asset.quantity == 0.001
         assert asset.portfolio_id == portfolio.id
 
         # Unknown portfolio
-        with pytest.raises(IntegrityError):
-            await dataservice_db_sqlalchemy.create_asset(
-                portfolio_id=9999, payload=AssetCreate(symbol="BTC", quantity=0.005)
+        asset = await dataservice_db_sqlalchemy.create_asset(
+            owner_id=str(owner_id),
+            portfolio_id=9999,
+            payload=AssetCreate(symbol="BTC", quantity=0.005),
+        )
+
+        assert asset is None
+
+        # Portfolio owned by someone else
+        asset = await dataservice_db_sqlalchemy.create_asset(
+            owner_id=str(uuid4()),
+            portfolio_id=portfolio.id,
+            payload=AssetCreate(symbol="BTC", quantity=0.005),
+        )
+
+        assert asset is None
+        assets = await dataservice_db_sqlalchemy.list_assets(
+            owner_id=str(owner_id), portfolio_id=portfolio.id
+        )
+        assert len(assets) == 1
+
+    async def test_create_asset_single_statement(
+        self,
+        dataservice_db_sqlalchemy: DbDataService,
+        dataservice_auth_local_user: tuple[UserModel, str, str],
+        db_statements: list[str],
+    ):
+        owner_id = dataservice_auth_local_user[0].id
+        portfolio = await dataservice_db_sqlalchemy.create_portfolio(
+            owner_id=str(owner_id), payload=PortfolioCreate(name="foo")
+        )
+        # a known symbol: its id comes from the in-process map
+        await symbol_ids(["BTC"])
+        db_statements.clear()
+
+        asset = await dataservice_db_sqlalchemy.create_asset(
+            owner_id=str(owner_id),
+            portfolio_id=portfolio.id,
+            payload=AssetCreate(symbol="BTC", quantity=0.001),
+        )
+
+        assert asset is not None
+        assert asset.created_at is not None
+        assert len(db_statements) == 1
+        assert db_statements[0].startswith("INSERT INTO assets")
+        assert "RETURNING" in db_statements[0]
+
+        # a new symbol is added by the same statement
+        db_statements.clear()
+        asset = await dataservice_db_sqlalchemy.create_asset(
+            owner_id=str(owner_id),
+            portfolio_id=portfolio.id,
+            payload=AssetCreate(symbol="SOL", quantity=1),
+        )
+        assert asset is not None
+        assert asset.symbol == "SOL"
+        assert len(db_statements) == 1
+        assert db_statements[0].startswith("WITH new_symbol AS")
+
+    async def test_consolidated_holdings(
+        self,
+        dataservice_db_sqlalchemy: DbDataService,
+        dataservice_auth_local_user: tuple[UserModel, str, str],
+    ):
+        owner_id = str(dataservice_auth_local_user[0].id)
+        ds = dataservice_db_sqlalchemy
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 1))
+        updated = await ds.update_portfolio(
+            owner_id, portfolio.id, PortfolioUpdate(name=None, consolidated=True)
+        )
+        assert updated.consolidated
+
+        # the upsert finds the holding through the partitioned unique index
+        first = await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 2))
+        merged = await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 3))
+        assert (merged.id, merged.quantity) == (first.id, 5)
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 2
+
+        merged_rows = await compact_holdings.compact_portfolio(
+            portfolio.id, batch_size=10, pause=0
+        )
+        assert merged_rows == 1
+        assets = await ds.list_assets(owner_id, portfolio.id)
+        assert [(a.id, a.quantity) for a in assets] == [(first.id, 6)]
+
+    async def test_update_asset(
+        self,
+        dataservice_db_sqlalchemy: DbDataService,
+        dataservice_auth_local_user: tuple[UserModel, str, str],
+        db_statements: list[str],
+    ):
+        owner_id = str(dataservice_auth_local_user[0].id)
+        ds = dataservice_db_sqlalchemy
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        asset = await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 2))
+        db_statements.clear()
+
+        updated = await ds.update_asset(
+            owner_id, portfolio.id, asset.id, AssetUpdate(delta=-0.5)
+        )
+
+        assert (updated.id, updated.quantity) == (asset.id, 1.5)
+        assert updated.created_at == asset.created_at
+        assert len(db_statements) == 1
+        assert db_statements[0].startswith("UPDATE assets")
+        with pytest.raises(InsufficientQuantityError):
+            await ds.update_asset(
+                owner_id, portfolio.id, asset.id, AssetUpdate(delta=-2)
             )
+        assert (
+            await ds.update_asset(owner_id, 9999, asset.id, AssetUpdate(delta=1))
+            is None
+        )
 
     async def test_delete_asset(
         self,
         dataservice_db_sqlalchemy: DbDataService,
         dataservice_auth_local_user: tuple[UserModel, str, str],
     ):
-        # Create portfolio
+        # Create portfolios
         owner_id = dataservice_auth_local_user[0].id
         portfolio = await dataservice_db_sqlalchemy.create_portfolio(
             owner_id=str(owner_id), payload=PortfolioCreate(name="foo")
         )
+        other_portfolio = await dataservice_db_sqlalchemy.create_portfolio(
+            owner_id=str(owner_id), payload=PortfolioCreate(name="bar")
+        )
 
         # Create asset
         asset = await dataservice_db_sqlalchemy.create_asset(
-            portfolio_id=portfolio.id, payload=AssetCreate(symbol="BTC", quantity=0.001)
+            owner_id=str(owner_id),
+            portfolio_id=portfolio.id,
+            payload=AssetCreate(symbol="BTC", quantity=0.001),
+        )
+        assert asset is not None
+
+        # Wrong owner
+        deleted = await dataservice_db_sqlalchemy.delete_asset(
+            owner_id=str(uuid4()), portfolio_id=portfolio.id, asset_id=asset.id
         )
 
+        assert not deleted
+
+        # Wrong portfolio
+        deleted = await dataservice_db_sqlalchemy.delete_asset(
+            owner_id=str(owner_id), portfolio_id=other_portfolio.id, asset_id=asset.id
+        )
+
+        assert not deleted
+
         # Delete asset
-        deleted = await dataservice_db_sqlalchemy.delete_asset(asset_id=asset.id)
+        deleted = await dataservice_db_sqlalchemy.delete_asset(
+            owner_id=str(owner_id), portfolio_id=portfolio.id, asset_id=asset.id
+        )
 
         assert deleted
 
         # List assets for portfolio
-        assets = await dataservice_db_sqlalchemy.list_assets(portfolio_id=portfolio.id)
+        assets = await dataservice_db_sqlalchemy.list_assets(
+            owner_id=str(owner_id), portfolio_id=portfolio.id
+        )
 
         assert len(assets) == 0
 
         # Unknown asset
-        deleted = await dataservice_db_sqlalchemy.delete_asset(asset_id=9999)
+        deleted = await dataservice_db_sqlalchemy.delete_asset(
+            owner_id=str(owner_id), portfolio_id=portfolio.id, asset_id=9999
+        )
 
         assert not deleted
 
@@ -251,24 +428,50 @@ class TestSQLAlchemy:
             owner_id=str(owner_id), payload=PortfolioCreate(name="foo")
         )
 
+        # Empty portfolio
+        page_req = PaginationRequest(items_per_page=5, page=1)
+        res = await dataservice_db_sqlalchemy.list_assets_paginated(
+            owner_id=str(owner_id),
+            portfolio_id=portfolio.id,
+            pagination_request=page_req,
+        )
+
+        assert res is not None
+        assets, page_res = res
+        assert len(assets) == 0
+        assert page_res.total_items == 0
+
         # Create assets
         for i in range(10):
             await dataservice_db_sqlalchemy.create_asset(
+                owner_id=str(owner_id),
                 portfolio_id=portfolio.id,
                 payload=AssetCreate(symbol="BTC", quantity=0.001),
             )
 
-        page_req = PaginationRequest(items_per_page=5, page=1)
-        assets, page_res = await dataservice_db_sqlalchemy.list_assets_paginated(
-            portfolio_id=portfolio.id, pagination_request=page_req
+        res = await dataservice_db_sqlalchemy.list_assets_paginated(
+            owner_id=str(owner_id),
+            portfolio_id=portfolio.id,
+            pagination_request=page_req,
         )
 
+        assert res is not None
+        assets, page_res = res
         assert len(assets) == 5
         assert page_res.current_page == 1
         assert page_res.items_per_page == 5
         assert page_res.total_items == 10
         assert page_res.total_pages == 2
 
+        # Portfolio owned by someone else
+        res = await dataservice_db_sqlalchemy.list_assets_paginated(
+            owner_id=str(uuid4()),
+            portfolio_id=portfolio.id,
+            pagination_request=page_req,
+        )
+
+        assert res is None
+
     async def test_list_assets(
         self,
         dataservice_db_sqlalchemy: DbDataService,
@@ -283,12 +486,192 @@ class TestSQLAlchemy:
         # Create assets
         created = [
             await dataservice_db_sqlalchemy.create_asset(
+                owner_id=str(owner_id),
                 portfolio_id=portfolio.id,
                 payload=AssetCreate(symbol="BTC", quantity=0.001),
             )
             for i in range(10)
         ]
 
-        assets = await dataservice_db_sqlalchemy.list_assets(portfolio_id=portfolio.id)
+        assets = await dataservice_db_sqlalchemy.list_assets(
+            owner_id=str(owner_id), portfolio_id=portfolio.id
+        )
 
         assert len(assets) == len(created)
+
+        # Portfolio owned by someone else
+        assets = await dataservice_db_sqlalchemy.list_assets(
+            owner_id=str(uuid4()), portfolio_id=portfolio.id
+        )
+
+        assert len(assets) == 0
+
+    async def test_read_replica_routing(
+        self,
+        dataservice_auth_local_user: tuple[UserModel, str, str],
+        dataservice_db_sqlalchemy_replica: DbDataService,
+    ):
+        assert base_mod.read_engine is not None
+        replica_statements: list[str] = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+            replica_statements.append(statement)
+
+        event.listen(
+            base_mod.read_engine.sync_engine,
+            "before_cursor_execute",
+            before_cursor_execute,
+        )
+        try:
+            ds = dataservice_db_sqlalchemy_replica
+            owner_id = str(dataservice_auth_local_user[0].id)
+
+            # Reads go to the replica
+            await ds.list_portfolios_paginated(
+                owner_id=owner_id,
+                pagination_request=PaginationRequest(items_per_page=5, page=1),
+            )
+            assert len(replica_statements) == 2
+
+            # Writes go to the primary and pin the owner to it
+            portfolio = await ds.create_portfolio(
+                owner_id=owner_id, payload=PortfolioCreate(name="foo")
+            )
+            assert len(replica_statements) == 2
+
+            read = await ds.get_portfolio(owner_id=owner_id, portfolio_id=portfolio.id)
+            assert read is not None
+            assert len(replica_statements) == 2
+
+            # Other owners still read from the replica
+            await ds.get_portfolio(owner_id=str(uuid4()), portfolio_id=portfolio.id)
+            assert len(replica_statements) == 3
+        finally:
+            event.remove(
+                base_mod.read_engine.sync_engine,
+                "before_cursor_execute",
+                before_cursor_execute,
+            )
+            base_mod._recent_writers.clear()
+
+    async def test_transaction_pooler(
+        self,
+        dataservice_auth_local_user: tuple[UserModel, str, str],
+        dataservice_db_sqlalchemy_pgbouncer: DbDataService,
+    ):
+        # Under transaction pooling consecutive transactions land on different
+        # server connections: repeating the same statements must not hit
+        # "prepared statement ... does not exist / already exists"
+        ds = dataservice_db_sqlalchemy_pgbouncer
+        owner_id = str(dataservice_auth_local_user[0].id)
+
+        for i in range(20):
+            portfolio = await ds.create_portfolio(
+                owner_id=owner_id, payload=PortfolioCreate(name=f"pgbouncer-{i}")
+            )
+            asset = await ds.create_asset(
+                owner_id=owner_id,
+                portfolio_id=portfolio.id,
+                payload=AssetCreate(symbol="BTC", quantity=1.0),
+            )
+            assert asset is not None
+            assets = await ds.list_assets(owner_id=owner_id, portfolio_id=portfolio.id)
+            assert [a.id for a in assets] == [asset.id]
+            read = await ds.get_portfolio(owner_id=owner_id, portfolio_id=portfolio.id)
+            assert read is not None
+            assert await ds.delete_portfolio(
+                owner_id=owner_id, portfolio_id=portfolio.id
+            )
+
+    async def test_pool_leases(self, dataservice_db_sqlalchemy: DbDataService):
+        from src.infrastructure.datastore.sqlalchemy import pool_controller
+
+        async def claim(replica_id: str, wanted: int, ttl: float = 60) -> int:
+            with patch.object(pool_controller, "REPLICA_ID", replica_id):
+                return await pool_controller.claim_connections(
+                    wanted, floor=5, budget=40, ttl=ttl
+                )
+
+        try:
+            assert await claim("replica-a", 30) == 30
+            # What replica-a leaves of the budget
+            assert await claim("replica-b", 30) == 10
+            # Never below the floor, even over budget
+            assert await claim("replica-c", 30) == 5
+            # A replica's own lease doesn't count against it
+            assert await claim("replica-a", 20) == 20
+            # Leases that weren't renewed within the ttl are dropped
+            assert await claim("replica-b", 30, ttl=0) == 30
+        finally:
+            async with base_mod.session_scope() as db:
+                await db.execute(
+                    text("DELETE FROM db_pool_leases WHERE replica_id LIKE 'replica-%'")
+                )
+                await db.commit()
+
+    async def test_statement_timeout(self, dataservice_db_sqlalchemy: DbDataService):
+        token = base_mod.set_deadline(time.monotonic() + 0.5)
+        try:
+            async with base_mod.session_scope() as db:
+                # the time left when the transaction began
+                timeout = (await db.execute(text("SHOW statement_timeout"))).scalar()
+                assert 0 < int(timeout.removesuffix("ms")) <= 500
+                with pytest.raises(DBAPIError) as exc_info:
+                    await db.execute(text("SELECT pg_sleep(5)"))
+                assert exc_info.value.orig.sqlstate == "57014"  # query_canceled
+
+            base_mod.set_deadline(time.monotonic() - 1)
+            with pytest.raises(DeadlineExceededError):
+                async with base_mod.session_scope() as db:
+                    await db.execute(text("SELECT 1"))
+        finally:
+            base_mod.reset_deadline(token)
+
+        # no deadline: the server's default
+        async with base_mod.session_scope() as db:
+            assert (await db.execute(text("SHOW statement_timeout"))).scalar() == "0"
+
+    async def test_sharded(self, dataservice_db_sqlalchemy_sharded: DbDataService):
+        from src.infrastructure.dataservice.db_sharded import rebalance
+        from src.infrastructure.dataservice.db_sharded.sharded import (
+            decode_portfolio_id,
+            place_owner,
+        )
+
+        ds = dataservice_db_sqlalchemy_sharded
+        # a new owner that hashes to shard 1
+        owner_id = next(
+            o for o in (uuid4() for _ in range(100)) if place_owner(str(o), 2) == 1
+        )
+        async with base_mod.session_scope() as db:
+            await db.execute(
+                UserModel.__table__.insert().values(
+                    id=owner_id, email=f"{owner_id}@test.com", password_hash="x"
+                )
+            )
+            await db.commit()
+        owner = str(owner_id)
+        try:
+            portfolio = await ds.create_portfolio(owner, PortfolioCreate(name="foo"))
+            await ds.create_asset(owner, portfolio.id, AssetCreate("BTC", 1))
+            assert decode_portfolio_id(portfolio.id)[0] == 1
+            assert await ds.get_portfolio(owner, portfolio.id) == portfolio
+
+            ids = await rebalance.move_owner(owner, 0, map_ttl=0)
+            assert await ds.get_portfolio(owner, portfolio.id) is None
+            moved = ids[portfolio.id]
+            assert decode_portfolio_id(moved)[0] == 0
+            assert len(await ds.list_assets(owner, moved)) == 1
+        finally:
+            with base_mod.use_shard(1):
+                async with base_mod.session_scope() as db:
+                    await db.execute(
+                        text("DELETE FROM portfolios WHERE owner_id = :owner_id"),
+                        {"owner_id": owner_id},
+                    )
+                    await db.commit()
+            async with base_mod.session_scope() as db:
+                await db.execute(
+                    UserModel.__table__.delete().where(UserModel.id == owner_id)
+                )
+                await db.commit()
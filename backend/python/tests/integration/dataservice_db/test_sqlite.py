@@ -0,0 +1,729 @@
+"""
+Integration tests for the SQLAlchemy database dataservice on SQLite
+(DB_BACKEND=sqlite), against a database built by database/migrations-sqlite.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.aggregates.exceptions.auth import EmailAlreadyExistsError
+from src.domain.aggregates.exceptions.portfolio import (
+    InsufficientQuantityError,
+    SymbolLimitError,
+)
+from src.domain.usecases.portfoliomgt.payloads import (
+    AssetCreate,
+    AssetUpdate,
+    PortfolioCreate,
+    PortfolioUpdate,
+)
+from src.infrastructure.dataservice.auth_local.local import LocalAuthDataService
+from src.infrastructure.dataservice.db_sqlalchemy import compact_holdings
+from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
+    SQLAlchemyDataService,
+)
+from src.infrastructure.dataservice.dbdataservice import DbDataService
+from src.infrastructure.datastore.sqlalchemy import base as base_mod
+from src.infrastructure.datastore.sqlalchemy import purge
+from src.infrastructure.datastore.sqlalchemy.models.portfolio import (
+    Portfolio as PortfolioModel,
+)
+from src.infrastructure.utils.pagination import PaginationRequest
+from tests.conftest import SQLITE_MIGRATIONS
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+class TestSQLite:
+    """Test database dataservice : SQLAlchemy on SQLite"""
+
+    async def test_pragmas(self, dataservice_db_sqlite: DbDataService):
+        async with base_mod.engine.connect() as conn:
+            assert (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar() == "wal"
+            assert (await conn.exec_driver_sql("PRAGMA foreign_keys")).scalar() == 1
+            assert (await conn.exec_driver_sql("PRAGMA query_only")).scalar() == 0
+        async with base_mod.read_engine.connect() as conn:
+            assert (await conn.exec_driver_sql("PRAGMA query_only")).scalar() == 1
+            with pytest.raises(OperationalError):
+                await conn.exec_driver_sql("DELETE FROM portfolios")
+        # The single writer
+        assert base_mod.engine.pool.size() == 1
+        assert base_mod.engine.pool.limit == 1
+
+    async def test_portfolio_and_assets(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+    ):
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        assert portfolio.owner_id == user.id
+        assert portfolio.created_at.tzinfo is not None
+        assert await ds.get_portfolio(owner_id, portfolio.id) == portfolio
+        assert await ds.get_portfolio(str(uuid4()), portfolio.id) is None
+
+        updated = await ds.update_portfolio(
+            owner_id, portfolio.id, PortfolioUpdate(name="bar")
+        )
+        assert updated.name == "bar"
+
+        assets = [
+            await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", i))
+            for i in range(3)
+        ]
+        not_owned = await ds.create_asset(
+            str(uuid4()), portfolio.id, AssetCreate("X", 1)
+        )
+        assert not_owned is None
+        items, page = await ds.list_assets_paginated(
+            owner_id, portfolio.id, PaginationRequest(items_per_page=2, page=1)
+        )
+        assert [a.id for a in items] == [assets[2].id, assets[1].id]
+        assert (page.total_items, page.total_pages) == (3, 2)
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 3
+
+        # Ownership is checked on delete
+        assert not await ds.delete_asset(str(uuid4()), portfolio.id, assets[0].id)
+        assert await ds.delete_asset(owner_id, portfolio.id, assets[0].id)
+        assert not await ds.delete_asset(owner_id, portfolio.id, assets[0].id)
+
+        # ON DELETE CASCADE needs foreign_keys=ON
+        async with base_mod.session_scope() as db:
+            await db.execute(text("DELETE FROM portfolios"))
+            await db.commit()
+        async with base_mod.read_session_scope() as db:
+            remaining = await db.execute(text("SELECT count(*) FROM assets"))
+            assert remaining.scalar() == 0
+
+    async def test_soft_delete_and_purge(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+    ):
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        kept = await ds.create_portfolio(owner_id, PortfolioCreate(name="kept"))
+        await ds.create_asset(owner_id, kept.id, AssetCreate("BTC", 1))
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        assets = [
+            await ds.create_asset(owner_id, portfolio.id, AssetCreate("ETH", i))
+            for i in range(5)
+        ]
+
+        assert await ds.delete_portfolio(owner_id, portfolio.id)
+        assert not await ds.delete_portfolio(owner_id, portfolio.id)
+        # Hidden from every read and write right away
+        page = PaginationRequest(items_per_page=10, page=1)
+        assert await ds.get_portfolio(owner_id, portfolio.id) is None
+        items, _ = await ds.list_portfolios_paginated(owner_id, page)
+        assert [p.id for p in items] == [kept.id]
+        assert await ds.list_assets(owner_id, portfolio.id) == []
+        assert await ds.list_assets_paginated(owner_id, portfolio.id, page) is None
+        update = PortfolioUpdate(name="bar")
+        assert await ds.update_portfolio(owner_id, portfolio.id, update) is None
+        assert (
+            await ds.create_asset(owner_id, portfolio.id, AssetCreate("X", 1)) is None
+        )
+        assert not await ds.delete_asset(owner_id, portfolio.id, assets[0].id)
+
+        async def count(table: str) -> int:
+            async with base_mod.session_scope() as db:
+                return (
+                    await db.execute(text(f"SELECT count(*) FROM {table}"))
+                ).scalar()
+
+        # The rows stay until the purge, which goes batch by batch
+        assert (await count("assets"), await count("portfolios")) == (6, 2)
+        # A portfolio another purger holds is skipped: not logged, still pending
+        with (
+            patch.object(purge, "purge_portfolio", AsyncMock(return_value=(0, False))),
+            patch.object(purge, "logger") as logger,
+        ):
+            assert await purge.purge_deleted_portfolios(batch_size=2, pause=0) == 1
+        logger.info.assert_not_called()
+        assert purge._backlog[0] == 1
+        with patch.object(purge, "ROWS_DELETED") as rows_deleted:
+            assert await purge.purge_deleted_portfolios(batch_size=2, pause=0) == 1
+        assert [c.args[0] for c in rows_deleted.add.call_args_list] == [2, 2, 1]
+        assert (await count("assets"), await count("portfolios")) == (1, 1)
+        assert purge._backlog[0] == 0
+        assert await purge.purge_deleted_portfolios(batch_size=2, pause=0) == 0
+        assert len(await ds.list_assets(owner_id, kept.id)) == 1
+
+    async def test_coalesced_asset_writes(
+        self,
+        sqlite_settings,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+        db_statements: list[str],
+    ):
+        ds = SQLAlchemyDataService(
+            coalesce_writes=True, write_batch_max_size=50, write_batch_max_wait_ms=50
+        )
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        other, _ = await dataservice_auth_local_sqlite.register("b@test.com", "foo")
+        owner_id, other_id = str(user.id), str(other.id)
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        deleted = await ds.create_portfolio(owner_id, PortfolioCreate(name="bar"))
+        await ds.delete_portfolio(owner_id, deleted.id)
+        db_statements.clear()
+
+        writes = [(owner_id, portfolio.id, AssetCreate("BTC", 1)) for _ in range(3)]
+        writes += [
+            (owner_id, portfolio.id, AssetCreate("ETH", 2)),
+            (other_id, portfolio.id, AssetCreate("ETH", 2)),  # not the owner
+            (owner_id, deleted.id, AssetCreate("ETH", 2)),  # soft-deleted
+        ]
+        results = await asyncio.gather(*(ds.create_asset(*w) for w in writes))
+
+        # One transaction: the ownership check and a single multi-row INSERT
+        inserts = [s for s in db_statements if s.startswith("INSERT INTO assets")]
+        assert len(inserts) == 1
+        assert inserts[0].count("(?, ?, ?)") == 4
+        assert len({a.id for a in results[:4]}) == 4
+        assert [(a.symbol, a.quantity) for a in results[:4]] == [("BTC", 1)] * 3 + [
+            ("ETH", 2)
+        ]
+        assert all(a.portfolio_id == portfolio.id for a in results[:4])
+        assert results[4:] == [None, None]
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 4
+
+        # A failing row only fails its own caller
+        results = await asyncio.gather(
+            ds.create_asset(owner_id, portfolio.id, AssetCreate("SOL", 3)),
+            ds.create_asset(owner_id, portfolio.id, AssetCreate("SOL", None)),
+            return_exceptions=True,
+        )
+        assert results[0].symbol == "SOL"
+        assert isinstance(results[1], IntegrityError)
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 5
+
+        # So does an owner id that isn't a UUID
+        results = await asyncio.gather(
+            ds.create_asset("not-a-uuid", portfolio.id, AssetCreate("SOL", 1)),
+            ds.create_asset(owner_id, portfolio.id, AssetCreate("SOL", 4)),
+            return_exceptions=True,
+        )
+        assert isinstance(results[0], ValueError)
+        assert results[1].quantity == 4
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 6
+
+    async def test_coalesced_writes_deadline_and_errors(
+        self,
+        sqlite_settings,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+    ):
+        from src.infrastructure.dataservice.db_sqlalchemy import (
+            sqlalchemy as sqlalchemy_mod,
+        )
+        from src.infrastructure.observability.db_queries import (
+            enable_query_tracking,
+            track_queries,
+        )
+
+        ds = SQLAlchemyDataService(
+            coalesce_writes=True, write_batch_max_size=3, write_batch_max_wait_ms=50
+        )
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+
+        async def create(timeout: float | None):
+            deadline = None if timeout is None else time.monotonic() + timeout
+            token = base_mod.set_deadline(deadline)
+            try:
+                return await ds.create_asset(
+                    owner_id, portfolio.id, AssetCreate("BTC", 1)
+                )
+            finally:
+                base_mod.reset_deadline(token)
+
+        # The batch runs under its callers' earliest deadline
+        seen = []
+        owned_symbol_ids = sqlalchemy_mod.owned_symbol_ids
+
+        async def spy(writes):
+            seen.append(base_mod.time_left())
+            return await owned_symbol_ids(writes)
+
+        with patch.object(sqlalchemy_mod, "owned_symbol_ids", spy):
+            await asyncio.gather(create(None), create(60), create(5))
+        assert len(seen) == 1
+        assert 0 < seen[0] <= 5
+
+        # A lost connection fails the batch once, rather than each write again
+        lost = DBAPIError(
+            "INSERT", None, Exception("gone"), connection_invalidated=True
+        )
+        with patch.object(
+            sqlalchemy_mod, "owned_symbol_ids", AsyncMock(side_effect=lost)
+        ) as mock_ids:
+            results = await asyncio.gather(
+                *(create(None) for _ in range(3)), return_exceptions=True
+            )
+        assert results == [lost] * 3
+        mock_ids.assert_awaited_once()
+
+        # Its statements aren't counted in any caller's query stats
+        enable_query_tracking()
+        with track_queries() as stats:
+            await asyncio.gather(*(create(None) for _ in range(3)))
+        assert stats.count == 0
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 6
+
+    async def test_consolidated_holdings(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+        db_statements: list[str],
+    ):
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await ds.create_portfolio(
+            owner_id, PortfolioCreate(name="foo", consolidated=True)
+        )
+        assert portfolio.consolidated
+        assert await ds.get_portfolio(owner_id, portfolio.id) == portfolio
+
+        db_statements.clear()
+        first = await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 1))
+        merged = await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 2))
+        eth = await ds.create_asset(owner_id, portfolio.id, AssetCreate("ETH", 1))
+
+        # still one statement per buy, the second one updates the holding
+        inserts = [s for s in db_statements if s.startswith("INSERT INTO assets")]
+        assert len(inserts) == 3
+        assert all("ON CONFLICT" in s for s in inserts)
+        assert (merged.id, merged.quantity, merged.created_at) == (
+            first.id,
+            3,
+            first.created_at,
+        )
+        assets = await ds.list_assets(owner_id, portfolio.id)
+        assert sorted(assets, key=lambda a: a.id) == [merged, eth]
+
+        # switched off, buys are rows of their own again
+        updated = await ds.update_portfolio(
+            owner_id, portfolio.id, PortfolioUpdate(name=None, consolidated=False)
+        )
+        assert (updated.name, updated.consolidated) == ("foo", False)
+        await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 1))
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 3
+
+    async def test_coalesced_consolidated_writes(
+        self,
+        sqlite_settings,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+    ):
+        ds = SQLAlchemyDataService(
+            coalesce_writes=True, write_batch_max_size=50, write_batch_max_wait_ms=50
+        )
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        holdings = await ds.create_portfolio(
+            owner_id, PortfolioCreate(name="foo", consolidated=True)
+        )
+        rows = await ds.create_portfolio(owner_id, PortfolioCreate(name="bar"))
+        writes = [(holdings.id, AssetCreate("BTC", i)) for i in range(1, 4)]
+        writes += [(rows.id, AssetCreate("BTC", 1)) for _ in range(2)]
+
+        results = await asyncio.gather(*(ds.create_asset(owner_id, *w) for w in writes))
+
+        # the holding's writers all get its total
+        assert {(a.id, a.quantity) for a in results[:3]} == {(results[0].id, 6)}
+        assert len({a.id for a in results[3:]}) == 2
+        assert [a.quantity for a in await ds.list_assets(owner_id, holdings.id)] == [6]
+        assert len(await ds.list_assets(owner_id, rows.id)) == 2
+
+    async def test_compact_holdings(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+    ):
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        kept = await ds.create_portfolio(owner_id, PortfolioCreate(name="bar"))
+        buys = [
+            await ds.create_asset(owner_id, portfolio.id, AssetCreate(symbol, i))
+            for i, symbol in enumerate(["BTC", "ETH", "BTC", "BTC", "ETH"], start=1)
+        ]
+        await ds.create_asset(owner_id, kept.id, AssetCreate("BTC", 1))
+        # consolidated afterwards: a new buy merges into a holding, the older
+        # rows wait for the compaction
+        await ds.update_portfolio(
+            owner_id, portfolio.id, PortfolioUpdate(name=None, consolidated=True)
+        )
+        holding = await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 10))
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 6
+
+        assert await compact_holdings.compact_holdings(batch_size=2, pause=0) == (1, 5)
+
+        assets = sorted(
+            await ds.list_assets(owner_id, portfolio.id), key=lambda a: a.symbol
+        )
+        assert [(a.symbol, a.quantity) for a in assets] == [("BTC", 18), ("ETH", 7)]
+        # merged into the existing holding, or a new one from the oldest buy
+        assert assets[0].id == holding.id
+        assert assets[1].created_at == buys[1].created_at
+        assert len(await ds.list_assets(owner_id, kept.id)) == 1
+        # nothing left to do, and later buys merge
+        assert await compact_holdings.compact_holdings(batch_size=2, pause=0) == (0, 0)
+        eth = await ds.create_asset(owner_id, portfolio.id, AssetCreate("ETH", 1))
+        assert (eth.id, eth.quantity) == (assets[1].id, 8)
+
+    async def test_update_asset(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+        db_statements: list[str],
+    ):
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        other, _ = await dataservice_auth_local_sqlite.register("b@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        asset = await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 2))
+
+        db_statements.clear()
+        # concurrent deltas all count: the database adds them
+        await asyncio.gather(
+            *(
+                ds.update_asset(owner_id, portfolio.id, asset.id, AssetUpdate(delta=1))
+                for _ in range(3)
+            )
+        )
+        updates = [s for s in db_statements if s.startswith("UPDATE assets")]
+        assert len(updates) == 3 and len(db_statements) == 3
+        assets = await ds.list_assets(owner_id, portfolio.id)
+        assert [(a.id, a.quantity, a.created_at) for a in assets] == [
+            (asset.id, 5, asset.created_at)
+        ]
+
+        updated = await ds.update_asset(
+            owner_id, portfolio.id, asset.id, AssetUpdate(quantity=0.5)
+        )
+        assert (updated.symbol, updated.quantity) == ("BTC", 0.5)
+        with pytest.raises(InsufficientQuantityError):
+            await ds.update_asset(
+                owner_id, portfolio.id, asset.id, AssetUpdate(delta=-0.5)
+            )
+        assert (await ds.list_assets(owner_id, portfolio.id))[0].quantity == 0.5
+
+        # not the owner, not in the portfolio, or soft-deleted
+        update = AssetUpdate(delta=1)
+        assert (
+            await ds.update_asset(str(other.id), portfolio.id, asset.id, update) is None
+        )
+        kept = await ds.create_portfolio(owner_id, PortfolioCreate(name="bar"))
+        assert await ds.update_asset(owner_id, kept.id, asset.id, update) is None
+        await ds.delete_portfolio(owner_id, portfolio.id)
+        assert await ds.update_asset(owner_id, portfolio.id, asset.id, update) is None
+
+    async def test_batched_portfolio_reads(
+        self,
+        sqlite_settings,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+        db_statements: list[str],
+    ):
+        ds = SQLAlchemyDataService(batch_reads=True)
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        other, _ = await dataservice_auth_local_sqlite.register("b@test.com", "foo")
+        owner_id, other_id = str(user.id), str(other.id)
+        first = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        second = await ds.create_portfolio(owner_id, PortfolioCreate(name="bar"))
+        deleted = await ds.create_portfolio(owner_id, PortfolioCreate(name="baz"))
+        await ds.delete_portfolio(owner_id, deleted.id)
+        db_statements.clear()
+
+        lookups = [
+            (owner_id, first.id),
+            (owner_id, second.id),
+            (owner_id, first.id),  # asked twice
+            (owner_id, deleted.id),  # soft-deleted
+            (other_id, first.id),  # not the owner
+        ]
+        results = await asyncio.gather(*(ds.get_portfolio(*k) for k in lookups))
+
+        # Lookups from the same tick: one query per owner
+        selects = [s for s in db_statements if s.startswith("SELECT")]
+        assert len(selects) == 2
+        assert [p.name if p else None for p in results] == [
+            "foo",
+            "bar",
+            "foo",
+            None,
+            None,
+        ]
+
+        # A lookup on its own still gets its answer
+        portfolio = await ds.get_portfolio(owner_id, second.id)
+        assert portfolio == second
+
+        # The batch runs under its callers' earliest deadline
+        seen = []
+        get_owned = ds._get_owned_portfolios
+
+        async def spy(*args):
+            seen.append(base_mod.time_left())
+            return await get_owned(*args)
+
+        async def get(timeout: float):
+            token = base_mod.set_deadline(time.monotonic() + timeout)
+            try:
+                return await ds.get_portfolio(owner_id, first.id)
+            finally:
+                base_mod.reset_deadline(token)
+
+        with patch.object(ds, "_get_owned_portfolios", spy):
+            assert await asyncio.gather(get(60), get(5)) == [first, first]
+        assert len(seen) == 1
+        assert 0 < seen[0] <= 5
+
+    async def test_batched_reads_retried_once(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+        monkeypatch,
+    ):
+        """Under ResilientDataService, a batched lookup's lost connection is
+        retried by the service only, not by retry_on_disconnect too."""
+        from src.infrastructure.dataservice.db_resilient.resilient import (
+            ResilientDataService,
+        )
+        from src.infrastructure.dataservice.db_sqlalchemy import (
+            sqlalchemy as sqlalchemy_mod,
+        )
+
+        monkeypatch.setattr(base_mod, "_retry_disconnects", True)
+        inner = SQLAlchemyDataService(batch_reads=True)
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await inner.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        lost = DBAPIError(
+            "SELECT", None, Exception("gone"), connection_invalidated=True
+        )
+        scope = MagicMock(side_effect=lost)
+        monkeypatch.setattr(sqlalchemy_mod, "read_session_scope", scope)
+
+        ds = ResilientDataService(inner, retries=2, backoff_ms=0)
+        with pytest.raises(DBAPIError):
+            await ds.get_portfolio(owner_id, portfolio.id)
+        assert scope.call_count == 3
+
+        # without the service's retries, the lookup retries once on its own
+        scope.reset_mock()
+        with pytest.raises(DBAPIError):
+            await inner.get_portfolio(owner_id, portfolio.id)
+        assert scope.call_count == 2
+
+    async def test_symbols(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+        db_statements: list[str],
+    ):
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        for symbol in ("BTC", "eth", "BTC"):
+            await ds.create_asset(owner_id, portfolio.id, AssetCreate(symbol, 1))
+
+        # Each symbol stored once, as given
+        async with base_mod.session_scope() as db:
+            rows = await db.execute(text("SELECT id, symbol FROM symbols ORDER BY id"))
+            assert [r.symbol for r in rows] == ["BTC", "eth"]
+            rows = await db.execute(text("SELECT symbol_id FROM assets ORDER BY id"))
+            assert [r.symbol_id for r in rows] == [1, 2, 1]
+        assets = sorted(
+            await ds.list_assets(owner_id, portfolio.id), key=lambda a: a.id
+        )
+        assert [a.symbol for a in assets] == ["BTC", "eth", "BTC"]
+        assert assets[0].symbol is assets[2].symbol
+
+        # Another user's assets don't add their symbol, coalesced or not
+        other, _ = await dataservice_auth_local_sqlite.register("b@test.com", "foo")
+        other_id = str(other.id)
+        asset = await ds.create_asset(other_id, portfolio.id, AssetCreate("DOGE", 1))
+        assert asset is None
+        coalescing = SQLAlchemyDataService(
+            coalesce_writes=True, write_batch_max_size=2, write_batch_max_wait_ms=50
+        )
+        assets = await asyncio.gather(
+            coalescing.create_asset(other_id, portfolio.id, AssetCreate("PEPE", 1)),
+            coalescing.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 1)),
+        )
+        assert assets[0] is None
+        assert assets[1] is not None
+        async with base_mod.session_scope() as db:
+            rows = await db.execute(text("SELECT symbol FROM symbols ORDER BY id"))
+            assert [r.symbol for r in rows] == ["BTC", "eth"]
+
+        # A symbol added by another process is picked up on first sight
+        async with base_mod.session_scope() as db:
+            await db.execute(text("INSERT INTO symbols (symbol) VALUES ('SOL')"))
+            await db.execute(
+                text(
+                    "INSERT INTO assets (portfolio_id, symbol_id, quantity)"
+                    " VALUES (:portfolio_id, 3, 5)"
+                ),
+                {"portfolio_id": portfolio.id},
+            )
+            await db.commit()
+        items, _ = await ds.list_assets_paginated(
+            owner_id, portfolio.id, PaginationRequest(items_per_page=10, page=1)
+        )
+        assert [a.symbol for a in items] == ["SOL", "BTC", "BTC", "eth", "BTC"]
+
+        # A new symbol is added in the asset's own transaction, just before it
+        db_statements.clear()
+        asset = await ds.create_asset(owner_id, portfolio.id, AssetCreate("ADA", 1))
+        assert asset.symbol == "ADA"
+        assert [s.split(" (")[0] for s in db_statements] == [
+            "INSERT INTO symbols",
+            "INSERT INTO assets",
+        ]
+        db_statements.clear()
+        await ds.create_asset(owner_id, portfolio.id, AssetCreate("ADA", 2))
+        assert len(db_statements) == 1
+
+    async def test_symbol_limit(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+    ):
+        """Once the symbol ids run out, only assets with a new symbol fail."""
+        from src.infrastructure.datastore.sqlalchemy import symbols as symbols_mod
+
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+        await ds.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 1))
+
+        class SequenceExhausted(Exception):
+            sqlstate = "2200H"
+
+        execute = AsyncSession.execute
+
+        async def exhausted(self, statement, *args, **kwargs):
+            if statement is symbols_mod._INSERT_OWNED_SYMBOL_STMT:
+                raise DBAPIError("INSERT", None, SequenceExhausted())
+            return await execute(self, statement, *args, **kwargs)
+
+        coalescing = SQLAlchemyDataService(
+            coalesce_writes=True, write_batch_max_size=2, write_batch_max_wait_ms=50
+        )
+        with patch.object(AsyncSession, "execute", exhausted):
+            with pytest.raises(SymbolLimitError):
+                await ds.create_asset(owner_id, portfolio.id, AssetCreate("ETH", 1))
+            results = await asyncio.gather(
+                coalescing.create_asset(owner_id, portfolio.id, AssetCreate("ETH", 1)),
+                coalescing.create_asset(owner_id, portfolio.id, AssetCreate("BTC", 2)),
+                return_exceptions=True,
+            )
+        assert isinstance(results[0], SymbolLimitError)
+        assert results[1].quantity == 2
+
+    async def test_symbols_migration(self, tmp_path):
+        """The symbols migration moves existing assets over to symbol ids."""
+        migrations = sorted(SQLITE_MIGRATIONS.glob("*.up.sql"))
+        symbols = next(
+            m for m in migrations if m.name.endswith("_create_symbols.up.sql")
+        )
+        with sqlite3.connect(tmp_path / "portfolio.db") as conn:
+            for migration in migrations[: migrations.index(symbols)]:
+                conn.executescript(migration.read_text())
+            conn.executescript(
+                """
+                INSERT INTO users (id, email, password_hash) VALUES ('u', 'a', 'x');
+                INSERT INTO portfolios (name, owner_id) VALUES ('foo', 'u');
+                INSERT INTO assets (portfolio_id, symbol, quantity)
+                    VALUES (1, 'ETH', 1), (1, 'BTC', 2), (1, 'ETH', 3);
+                """
+            )
+            conn.executescript(symbols.read_text())
+            rows = conn.execute(
+                "SELECT assets.id, symbols.symbol, assets.quantity FROM assets"
+                " JOIN symbols ON symbols.id = assets.symbol_id ORDER BY assets.id"
+            ).fetchall()
+            assert rows == [(1, "ETH", 1), (2, "BTC", 2), (3, "ETH", 3)]
+            assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+    async def test_foreign_keys(self, dataservice_db_sqlite: DbDataService):
+        with pytest.raises(IntegrityError):
+            await dataservice_db_sqlite.create_portfolio(
+                owner_id=str(uuid4()), payload=PortfolioCreate(name="foo")
+            )
+
+    async def test_register_duplicate_email(
+        self, dataservice_auth_local_sqlite: LocalAuthDataService
+    ):
+        await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        with pytest.raises(EmailAlreadyExistsError):
+            await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+
+    async def test_concurrent_writes_are_queued(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+    ):
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+
+        # No "database is locked": the writes wait for the writer connection
+        created = await asyncio.gather(
+            *(
+                ds.create_asset(owner_id, portfolio.id, AssetCreate("ETH", i))
+                for i in range(50)
+            )
+        )
+        assert len({asset.id for asset in created}) == 50
+        assert len(await ds.list_assets(owner_id, portfolio.id)) == 50
+
+    async def test_reads_not_blocked_by_writes(
+        self,
+        dataservice_db_sqlite: DbDataService,
+        dataservice_auth_local_sqlite: LocalAuthDataService,
+    ):
+        ds = dataservice_db_sqlite
+        user, _ = await dataservice_auth_local_sqlite.register("a@test.com", "foo")
+        owner_id = str(user.id)
+        portfolio = await ds.create_portfolio(owner_id, PortfolioCreate(name="foo"))
+
+        async with base_mod.session_scope() as db:
+            # Write transaction left open on the writer connection
+            await db.execute(
+                insert(PortfolioModel).values(name="uncommitted", owner_id=owner_id)
+            )
+            # WAL: readers still see the last committed state, without waiting
+            items, _ = await asyncio.wait_for(
+                ds.list_portfolios_paginated(
+                    owner_id, PaginationRequest(items_per_page=10, page=1)
+                ),
+                timeout=1,
+            )
+            assert [p.id for p in items] == [portfolio.id]
+            await db.rollback()
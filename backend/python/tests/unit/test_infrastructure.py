@@ -4,7 +4,7 @@ Unit tests for infrastructure components to improve code coverage.
 
 from __future__ import annotations
 
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -66,8 +66,316 @@ class TestDbDataServiceBuilder:
         )
 
         settings = build_settings()
+        settings.db_read_retries = 0
         ds = build_db_dataservice(settings=settings)
         assert isinstance(ds, SQLAlchemyDataService)
+        assert ds._asset_writes is None
+        assert ds._portfolio_reads is None
+
+        settings.db_write_coalescing = True
+        settings.db_write_batch_max_size = 8
+        settings.db_write_batch_max_wait_ms = 5
+        ds = build_db_dataservice(settings=settings)
+        assert ds._asset_writes.max_size == 8
+        assert ds._asset_writes.max_wait == 0.005
+
+        settings.db_read_batching = True
+        ds = build_db_dataservice(settings=settings)
+        assert ds._portfolio_reads.max_size == 100
+        assert ds._portfolio_reads.max_wait == 0
+
+    def test_build_sharded(self, tmp_path):
+        from src.infrastructure.dataservice.db_sharded.sharded import (
+            ShardedDataService,
+        )
+        from src.infrastructure.dataservice.dbdataservice_builder import (
+            build_db_dataservice,
+        )
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        settings = build_settings()
+        settings.db_backend = "sqlite"
+        settings.db_sqlite_path = str(tmp_path / "portfolio.db")
+        settings.db_shards_raw = f"{tmp_path / 'shard-1.db'},{tmp_path / 'shard-2.db'}"
+        settings.db_read_batching = True
+        settings.db_read_retries = 0
+        ds = build_db_dataservice(settings=settings)
+        assert isinstance(ds, ShardedDataService)
+        assert [s._shard for s in ds._shards] == [0, 1, 2]
+        assert all(s._portfolio_reads is not None for s in ds._shards)
+        assert [s.index for s in base_mod.shards] == [0, 1, 2]
+        assert base_mod.shards[0].engine is base_mod.engine
+        assert base_mod.shards[2].engine.url.database.endswith("shard-2.db")
+
+    def test_build_resilient(self):
+        from src.infrastructure.dataservice.db_resilient.resilient import (
+            ResilientDataService,
+        )
+        from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
+            SQLAlchemyDataService,
+        )
+        from src.infrastructure.dataservice.dbdataservice_builder import (
+            build_db_dataservice,
+        )
+
+        settings = build_settings()
+        ds = build_db_dataservice(settings=settings)
+        assert isinstance(ds, ResilientDataService)
+        assert isinstance(ds._inner, SQLAlchemyDataService)
+        assert ds.retries == 2
+        assert ds.backoff == 0.05
+        assert ds.hedge is False
+
+        settings.db_read_retries = 0
+        settings.db_hedged_reads = True
+        settings.db_hedge_min_delay_ms = 20
+        ds = build_db_dataservice(settings=settings)
+        assert ds.retries == 0
+        assert ds.hedge is True
+        assert ds.hedge_min_delay == 0.02
+
+    def test_build_faults(self):
+        from src.infrastructure.dataservice import dbdataservice_builder
+        from src.infrastructure.dataservice.auth_local.local import (
+            LocalAuthDataService,
+        )
+        from src.infrastructure.dataservice.authdataservice_builder import (
+            build_auth_dataservice,
+        )
+        from src.infrastructure.dataservice.db_memory.memory import (
+            InMemoryDbDataService,
+        )
+        from src.infrastructure.dataservice.db_sqlalchemy.sqlalchemy import (
+            SQLAlchemyDataService,
+        )
+        from src.infrastructure.dataservice.faulty.faulty import (
+            FaultyAuthDataService,
+            FaultyDbDataService,
+        )
+
+        settings = build_settings()
+        settings.faults_raw = "*:latency=fixed(5)"
+        settings.faults_seed = 1
+        # under the retries: injected errors get retried
+        ds = dbdataservice_builder.build_db_dataservice(settings=settings)
+        assert isinstance(ds._inner, FaultyDbDataService)
+        assert isinstance(ds._inner._inner, SQLAlchemyDataService)
+        assert ds._inner.injector.faults == settings.faults
+
+        settings.db_backend = "memory"
+        ds = dbdataservice_builder.build_db_dataservice(settings=settings)
+        assert isinstance(ds, FaultyDbDataService)
+        assert isinstance(ds._inner, InMemoryDbDataService)
+
+        auth = build_auth_dataservice(settings=settings)
+        assert isinstance(auth, FaultyAuthDataService)
+        assert isinstance(auth._inner, LocalAuthDataService)
+
+    def test_build_memory(self):
+        from src.infrastructure.dataservice import dbdataservice_builder
+        from src.infrastructure.dataservice.db_memory.memory import (
+            InMemoryDbDataService,
+        )
+
+        settings = build_settings()
+        settings.db_backend = "memory"
+        with patch.object(dbdataservice_builder, "build_engine") as mock_build:
+            ds = dbdataservice_builder.build_db_dataservice(settings=settings)
+        assert isinstance(ds, InMemoryDbDataService)
+        mock_build.assert_not_called()
+
+
+# ----------------------- InMemoryDbDataService -----------------------
+
+OWNER = "00000000-0000-0000-0000-000000000001"
+OTHER_OWNER = "00000000-0000-0000-0000-000000000002"
+
+
+@pytest.mark.asyncio
+class TestInMemoryDbDataService:
+    @pytest.fixture
+    def ds(self):
+        from src.infrastructure.dataservice.db_memory.memory import (
+            InMemoryDbDataService,
+        )
+
+        return InMemoryDbDataService()
+
+    async def test_portfolio_crud(self, ds):
+        from src.domain.usecases.portfoliomgt.payloads import (
+            PortfolioCreate,
+            PortfolioUpdate,
+        )
+
+        created = await ds.create_portfolio(OWNER, PortfolioCreate(name="Main"))
+        assert str(created.owner_id) == OWNER
+        assert await ds.get_portfolio(OWNER, created.id) == created
+
+        updated = await ds.update_portfolio(
+            OWNER, created.id, PortfolioUpdate(name="Renamed")
+        )
+        assert updated.name == "Renamed"
+        assert updated.created_at == created.created_at
+        assert await ds.get_portfolio(OWNER, created.id) == updated
+        # No name: unchanged
+        unchanged = await ds.update_portfolio(
+            OWNER, created.id, PortfolioUpdate(name=None)
+        )
+        assert unchanged == updated
+
+        assert await ds.delete_portfolio(OWNER, created.id) is True
+        assert await ds.get_portfolio(OWNER, created.id) is None
+        assert await ds.delete_portfolio(OWNER, created.id) is False
+
+    async def test_owner_scoping(self, ds):
+        from src.domain.usecases.portfoliomgt.payloads import (
+            AssetCreate,
+            PortfolioCreate,
+            PortfolioUpdate,
+        )
+        from src.infrastructure.utils.pagination import PaginationRequest
+
+        portfolio = await ds.create_portfolio(OWNER, PortfolioCreate(name="Main"))
+        asset = await ds.create_asset(OWNER, portfolio.id, AssetCreate("BTC", 1.0))
+        pagination = PaginationRequest(items_per_page=10, page=1)
+
+        assert await ds.get_portfolio(OTHER_OWNER, portfolio.id) is None
+        renamed = await ds.update_portfolio(
+            OTHER_OWNER, portfolio.id, PortfolioUpdate(name="x")
+        )
+        assert renamed is None
+        assert await ds.delete_portfolio(OTHER_OWNER, portfolio.id) is False
+        items, page = await ds.list_portfolios_paginated(OTHER_OWNER, pagination)
+        assert items == []
+        assert page.total_items == 0
+        other_asset = await ds.create_asset(
+            OTHER_OWNER, portfolio.id, AssetCreate("ETH", 1.0)
+        )
+        assert other_asset is None
+        assert await ds.delete_asset(OTHER_OWNER, portfolio.id, asset.id) is False
+        page = await ds.list_assets_paginated(OTHER_OWNER, portfolio.id, pagination)
+        assert page is None
+        assert await ds.list_assets(OTHER_OWNER, portfolio.id) == []
+        assert await ds.list_assets(OWNER, portfolio.id) == [asset]
+
+    async def test_pagination_newest_first(self, ds):
+        from src.domain.usecases.portfoliomgt.payloads import (
+            AssetCreate,
+            PortfolioCreate,
+        )
+        from src.infrastructure.utils.pagination import PaginationRequest
+
+        portfolios = [
+            await ds.create_portfolio(OWNER, PortfolioCreate(name=f"P{i}"))
+            for i in range(5)
+        ]
+        items, page = await ds.list_portfolios_paginated(
+            OWNER, PaginationRequest(items_per_page=2, page=1)
+        )
+        assert [p.id for p in items] == [portfolios[4].id, portfolios[3].id]
+        assert (page.total_items, page.total_pages, page.current_page) == (5, 3, 1)
+        items, _ = await ds.list_portfolios_paginated(
+            OWNER, PaginationRequest(items_per_page=2, page=3)
+        )
+        assert [p.id for p in items] == [portfolios[0].id]
+        items, page = await ds.list_portfolios_paginated(
+            OWNER, PaginationRequest(items_per_page=2, page=4)
+        )
+        assert items == []
+        assert page.total_items == 5
+
+        portfolio_id = portfolios[0].id
+        assets = [
+            await ds.create_asset(OWNER, portfolio_id, AssetCreate(f"S{i}", i))
+            for i in range(3)
+        ]
+        items, page = await ds.list_assets_paginated(
+            OWNER, portfolio_id, PaginationRequest(items_per_page=2, page=2)
+        )
+        assert items == [assets[0]]
+        assert (page.total_items, page.total_pages) == (3, 2)
+
+    async def test_consolidated_holdings(self, ds):
+        from src.domain.usecases.portfoliomgt.payloads import (
+            AssetCreate,
+            PortfolioCreate,
+            PortfolioUpdate,
+        )
+
+        portfolio = await ds.create_portfolio(
+            OWNER, PortfolioCreate(name="Main", consolidated=True)
+        )
+        assert portfolio.consolidated
+        first = await ds.create_asset(OWNER, portfolio.id, AssetCreate("BTC", 1.0))
+        merged = await ds.create_asset(OWNER, portfolio.id, AssetCreate("BTC", 2.0))
+        eth = await ds.create_asset(OWNER, portfolio.id, AssetCreate("ETH", 1.0))
+        assert (merged.id, merged.quantity) == (first.id, 3.0)
+        assert await ds.list_assets(OWNER, portfolio.id) == [merged, eth]
+
+        # a deleted holding starts afresh
+        assert await ds.delete_asset(OWNER, portfolio.id, first.id)
+        again = await ds.create_asset(OWNER, portfolio.id, AssetCreate("BTC", 1.0))
+        assert again.id != first.id and again.quantity == 1.0
+
+        # not consolidated: one row per buy
+        updated = await ds.update_portfolio(
+            OWNER, portfolio.id, PortfolioUpdate(name=None, consolidated=False)
+        )
+        assert (updated.name, updated.consolidated) == ("Main", False)
+        await ds.create_asset(OWNER, portfolio.id, AssetCreate("ETH", 1.0))
+        assert len(await ds.list_assets(OWNER, portfolio.id)) == 3
+
+    async def test_update_asset(self, ds):
+        from src.domain.aggregates.exceptions.portfolio import (
+            InsufficientQuantityError,
+        )
+        from src.domain.usecases.portfoliomgt.payloads import (
+            AssetCreate,
+            AssetUpdate,
+            PortfolioCreate,
+        )
+
+        portfolio = await ds.create_portfolio(OWNER, PortfolioCreate(name="Main"))
+        asset = await ds.create_asset(OWNER, portfolio.id, AssetCreate("BTC", 2.0))
+
+        bought = await ds.update_asset(
+            OWNER, portfolio.id, asset.id, AssetUpdate(delta=1.5)
+        )
+        assert (bought.id, bought.quantity) == (asset.id, 3.5)
+        assert bought.created_at == asset.created_at
+        sold = await ds.update_asset(
+            OWNER, portfolio.id, asset.id, AssetUpdate(quantity=1.0)
+        )
+        assert sold.quantity == 1.0
+        assert await ds.list_assets(OWNER, portfolio.id) == [sold]
+        with pytest.raises(InsufficientQuantityError):
+            await ds.update_asset(OWNER, portfolio.id, asset.id, AssetUpdate(delta=-1))
+        assert await ds.list_assets(OWNER, portfolio.id) == [sold]
+
+        # someone else's, or unknown
+        update = AssetUpdate(delta=1)
+        assert (
+            await ds.update_asset(OTHER_OWNER, portfolio.id, asset.id, update) is None
+        )
+        assert await ds.update_asset(OWNER, portfolio.id, 999, update) is None
+
+    async def test_delete_cascades_to_assets(self, ds):
+        from src.domain.usecases.portfoliomgt.payloads import (
+            AssetCreate,
+            PortfolioCreate,
+        )
+
+        kept = await ds.create_portfolio(OWNER, PortfolioCreate(name="Kept"))
+        deleted = await ds.create_portfolio(OWNER, PortfolioCreate(name="Deleted"))
+        kept_asset = await ds.create_asset(OWNER, kept.id, AssetCreate("BTC", 1.0))
+        asset = await ds.create_asset(OWNER, deleted.id, AssetCreate("ETH", 2.0))
+
+        assert await ds.delete_asset(OWNER, deleted.id, asset.id) is True
+        assert await ds.delete_asset(OWNER, deleted.id, asset.id) is False
+        await ds.create_asset(OWNER, deleted.id, AssetCreate("SOL", 3.0))
+        assert await ds.delete_portfolio(OWNER, deleted.id) is True
+        assert await ds.list_assets(OWNER, deleted.id) == []
+        assert await ds.list_assets(OWNER, kept.id) == [kept_asset]
 
 
 # ----------------------- UseCases.build -----------------------
@@ -88,7 +396,6 @@ class TestUseCasesBuild:
 # ----------------------- SQLAlchemy base -----------------------
 
 
-@pytest.mark.asyncio
 class TestSQLAlchemyBase:
     def test_set_engine(self):
         from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
@@ -99,6 +406,212 @@ class TestSQLAlchemyBase:
         session_maker = set_engine(engine)
         assert isinstance(session_maker, async_sessionmaker)
 
+    def test_build_engine_prepared_statement_cache_size(self):
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        settings = build_settings()
+        settings.db_prepared_statement_cache_size = 250
+        original = base_mod.engine, base_mod.SessionLocal
+        try:
+            with patch.object(base_mod, "create_async_engine") as mock_create:
+                base_mod.build_engine(settings=settings)
+        finally:
+            base_mod.engine, base_mod.SessionLocal = original
+
+        connect_args = mock_create.call_args.kwargs["connect_args"]
+        assert connect_args["prepared_statement_cache_size"] == 250
+
+    def test_build_engine_pool_settings(self):
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+        from src.infrastructure.observability.db_pool import (
+            InstrumentedAsyncQueuePool,
+        )
+
+        settings = build_settings()
+        settings.db_pool_size = 3
+        settings.db_max_overflow = 4
+        settings.db_pool_timeout = 5.5
+        original = base_mod.engine, base_mod.SessionLocal
+        try:
+            with patch.object(base_mod, "create_async_engine") as mock_create:
+                base_mod.build_engine(settings=settings)
+        finally:
+            base_mod.engine, base_mod.SessionLocal = original
+
+        kwargs = mock_create.call_args.kwargs
+        assert kwargs["poolclass"] is InstrumentedAsyncQueuePool
+        assert kwargs["pool_size"] == 3
+        assert kwargs["max_overflow"] == 4
+        assert kwargs["pool_timeout"] == 5.5
+
+    def test_build_engine_transaction_pooler(self):
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        settings = build_settings()
+        settings.db_pooler_mode = "transaction"
+        original = base_mod.engine, base_mod.SessionLocal
+        try:
+            with patch.object(base_mod, "create_async_engine") as mock_create:
+                base_mod.build_engine(settings=settings)
+        finally:
+            base_mod.engine, base_mod.SessionLocal = original
+
+        kwargs = mock_create.call_args.kwargs
+        connect_args = kwargs["connect_args"]
+        assert connect_args["prepared_statement_cache_size"] == 0
+        assert connect_args["statement_cache_size"] == 0
+        name_func = connect_args["prepared_statement_name_func"]
+        assert name_func() != name_func()
+        assert kwargs["pool_pre_ping"] is False
+        assert kwargs["pool_size"] == settings.db_pool_size
+
+    def test_build_engine_transaction_pooler_nullpool(self):
+        from sqlalchemy.pool import NullPool
+
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        settings = build_settings()
+        settings.db_pooler_mode = "transaction"
+        settings.db_pooler_nullpool = True
+        original = base_mod.engine, base_mod.SessionLocal
+        try:
+            with patch.object(base_mod, "create_async_engine") as mock_create:
+                base_mod.build_engine(settings=settings)
+        finally:
+            base_mod.engine, base_mod.SessionLocal = original
+
+        kwargs = mock_create.call_args.kwargs
+        assert kwargs["poolclass"] is NullPool
+        assert "pool_size" not in kwargs
+        assert "max_overflow" not in kwargs
+        assert "pool_timeout" not in kwargs
+
+    def test_build_engine_read_replica(self):
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        settings = build_settings()
+        settings.db_read_host = "replica.example.com"
+        settings.db_read_pool_size = 7
+        settings.db_read_max_overflow = 3
+        original = base_mod.engine, base_mod.SessionLocal
+        try:
+            with patch.object(base_mod, "create_async_engine") as mock_create:
+                base_mod.build_engine(settings=settings)
+            assert base_mod.ReadSessionLocal is not None
+        finally:
+            base_mod.engine, base_mod.SessionLocal = original
+            base_mod.read_engine, base_mod.ReadSessionLocal = None, None
+
+        assert mock_create.call_count == 2
+        primary_call, replica_call = mock_create.call_args_list
+        assert "@localhost:" in primary_call.args[0]
+        assert "@replica.example.com:" in replica_call.args[0]
+        assert replica_call.kwargs["pool_size"] == 7
+        assert replica_call.kwargs["max_overflow"] == 3
+
+    @pytest.mark.asyncio
+    async def test_read_session_scope_routing(self, tmp_path):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'p.db'}")
+        replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'r.db'}")
+
+        # No replica: reads go to the primary, writes aren't tracked
+        base_mod.set_engine(primary)
+        base_mod.mark_written("no-replica")
+        assert "no-replica" not in base_mod._recent_writers
+        async with base_mod.read_session_scope(pin_key="owner") as db:
+            assert db.bind is primary
+
+        # With a replica: reads go to it until the owner writes
+        base_mod.set_engine(primary, replica)
+        try:
+            async with base_mod.read_session_scope(pin_key="owner") as db:
+                assert db.bind is replica
+            async with base_mod.read_session_scope() as db:
+                assert db.bind is replica
+
+            base_mod.mark_written("owner")
+            async with base_mod.read_session_scope(pin_key="owner") as db:
+                assert db.bind is primary
+            async with base_mod.read_session_scope(pin_key="other") as db:
+                assert db.bind is replica
+        finally:
+            base_mod._recent_writers.clear()
+            base_mod.set_engine(primary)
+            await primary.dispose()
+            await replica.dispose()
+
+    @pytest.mark.asyncio
+    async def test_request_scope_shares_connection(self, tmp_path):
+        from sqlalchemy import event, text
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'db.db'}",
+            poolclass=AsyncAdaptedQueuePool,
+        )
+        checkouts = []
+        event.listen(engine.sync_engine, "checkout", lambda *args: checkouts.append(1))
+        base_mod.set_engine(engine)
+        try:
+            async with base_mod.request_scope() as scope:
+                # Nothing is checked out until the first DB use
+                assert checkouts == []
+                async with base_mod.session_scope() as db:
+                    await db.execute(text("CREATE TABLE t (x INTEGER)"))
+                    await db.execute(text("INSERT INTO t VALUES (1)"))
+                    await db.commit()
+                async with base_mod.read_session_scope(pin_key="owner") as db:
+                    assert (await db.execute(text("SELECT x FROM t"))).scalar() == 1
+                # A failing call rolls back without losing the connection
+                with pytest.raises(RuntimeError):
+                    async with base_mod.session_scope() as db:
+                        await db.execute(text("INSERT INTO t VALUES (2)"))
+                        raise RuntimeError
+                async with base_mod.session_scope() as db:
+                    assert (
+                        await db.execute(text("SELECT count(*) FROM t"))
+                    ).scalar() == 1
+                assert len(checkouts) == 1
+                assert engine.pool.checkedout() == 1
+
+            assert scope.closed
+            assert engine.pool.checkedout() == 0
+            assert base_mod._request_scope.get() is None
+
+            # Outside a request scope, each call checks out its own connection
+            async with base_mod.session_scope() as db:
+                await db.execute(text("SELECT 1"))
+            assert len(checkouts) == 2
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_read_your_writes_window_expires(self):
+        from cachetools import TTLCache
+
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        timer = MagicMock(return_value=0)
+        original = base_mod._recent_writers, base_mod.ReadSessionLocal
+        base_mod._recent_writers = TTLCache(maxsize=10, ttl=5, timer=timer)
+        base_mod.ReadSessionLocal = MagicMock()
+        try:
+            base_mod.mark_written("owner")
+            timer.return_value = 4
+            assert "owner" in base_mod._recent_writers
+            timer.return_value = 6
+            assert "owner" not in base_mod._recent_writers
+        finally:
+            base_mod._recent_writers, base_mod.ReadSessionLocal = original
+
+    @pytest.mark.asyncio
     async def test_get_db_happy_path(self):
         from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
@@ -114,6 +627,7 @@ class TestSQLAlchemyBase:
         except StopAsyncIteration:
             pass
 
+    @pytest.mark.asyncio
     async def test_get_db_not_built(self):
         import src.infrastructure.datastore.sqlalchemy.base as base_mod
 
@@ -126,6 +640,7 @@ class TestSQLAlchemyBase:
         finally:
             base_mod.SessionLocal = original
 
+    @pytest.mark.asyncio
     async def test_session_scope_not_built(self):
         import src.infrastructure.datastore.sqlalchemy.base as base_mod
 
@@ -138,6 +653,20 @@ class TestSQLAlchemyBase:
         finally:
             base_mod.SessionLocal = original
 
+    @pytest.mark.asyncio
+    async def test_read_session_scope_not_built(self):
+        import src.infrastructure.datastore.sqlalchemy.base as base_mod
+
+        original = base_mod.SessionLocal, base_mod.ReadSessionLocal
+        base_mod.SessionLocal, base_mod.ReadSessionLocal = None, None
+        try:
+            with pytest.raises(Exception, match="base has not been built"):
+                async with base_mod.read_session_scope():
+                    pass
+        finally:
+            base_mod.SessionLocal, base_mod.ReadSessionLocal = original
+
+    @pytest.mark.asyncio
     async def test_session_scope_rollback_on_error(self):
         import src.infrastructure.datastore.sqlalchemy.base as base_mod
 
@@ -164,6 +693,670 @@ class TestSQLAlchemyBase:
 # ----------------------- Supabase exceptions -----------------------
 
 
+async def _drop_idle_connection(engine) -> None:
+    """Simulate the server dropping a connection that sits idle in the pool."""
+    conn = await engine.connect()
+    driver_connection = (await conn.get_raw_connection()).driver_connection
+    await conn.close()
+    await driver_connection.close()
+
+
+class TestPoolValidation:
+    @pytest.fixture
+    async def engine(self, tmp_path):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'db.db'}",
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=1,
+            pool_pre_ping=False,
+        )
+        base_mod.set_engine(engine)
+        yield engine
+        await engine.dispose()
+
+    def test_build_engine_background_validation(self):
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        settings = build_settings()
+        settings.db_pool_validation = "background"
+        settings.db_pool_recycle = 600
+        original = base_mod.engine, base_mod.SessionLocal
+        try:
+            with patch.object(base_mod, "create_async_engine") as mock_create:
+                base_mod.build_engine(settings=settings)
+                assert mock_create.call_args.kwargs["pool_pre_ping"] is False
+                assert mock_create.call_args.kwargs["pool_recycle"] == 600
+                assert base_mod._retry_disconnects is True
+
+                # Pre-ping can still be forced on
+                settings.db_pool_pre_ping = True
+                base_mod.build_engine(settings=settings)
+                assert mock_create.call_args.kwargs["pool_pre_ping"] is True
+                assert base_mod._retry_disconnects is False
+
+                # The default, pre-ping: reads aren't retried
+                base_mod.build_engine(settings=build_settings())
+                assert base_mod._retry_disconnects is False
+        finally:
+            base_mod.engine, base_mod.SessionLocal = original
+
+    @pytest.mark.asyncio
+    async def test_validate_idle_connections(self, engine):
+        from src.infrastructure.datastore.sqlalchemy.pool_validation import (
+            validate_idle_connections,
+        )
+
+        await _drop_idle_connection(engine)
+        assert await validate_idle_connections(engine) == 1
+        # Replaced: the next round finds nothing to invalidate
+        assert await validate_idle_connections(engine) == 0
+        async with engine.connect() as conn:
+            assert (await conn.exec_driver_sql("SELECT 1")).scalar() == 1
+
+    @pytest.mark.asyncio
+    async def test_background_validation_task(self, engine):
+        import asyncio
+
+        from src.infrastructure.datastore.sqlalchemy import pool_validation
+
+        await _drop_idle_connection(engine)
+        with patch.object(
+            pool_validation,
+            "validate_idle_connections",
+            wraps=pool_validation.validate_idle_connections,
+        ) as mock_validate:
+            pool_validation.start_pool_validation(interval=0.01)
+            try:
+                for _ in range(100):
+                    await asyncio.sleep(0.01)
+                    if mock_validate.await_count:
+                        break
+            finally:
+                await pool_validation.stop_pool_validation()
+        assert mock_validate.await_count >= 1
+        assert pool_validation._task is None
+
+    @pytest.mark.asyncio
+    async def test_purger_task(self):
+        import asyncio
+
+        from src.infrastructure.datastore.sqlalchemy import purge
+
+        with patch.object(
+            purge, "purge_deleted_portfolios", AsyncMock(side_effect=[RuntimeError, 0])
+        ) as mock_purge:
+            purge.start_purger(interval=0.01, batch_size=10, pause=0)
+            try:
+                for _ in range(100):
+                    await asyncio.sleep(0.01)
+                    if mock_purge.await_count >= 2:
+                        break
+            finally:
+                await purge.stop_purger()
+        # a failed pass doesn't stop the task
+        assert mock_purge.await_count >= 2
+        mock_purge.assert_awaited_with(10, 0)
+        assert purge._task is None
+
+    @pytest.mark.asyncio
+    async def test_retry_on_disconnect(self, engine, monkeypatch):
+        from sqlalchemy import text
+
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        calls = []
+        monkeypatch.setattr(base_mod, "_retry_disconnects", True)
+
+        @base_mod.retry_on_disconnect
+        async def read() -> int:
+            calls.append(1)
+            async with base_mod.read_session_scope() as db:
+                return (await db.execute(text("SELECT 1"))).scalar()
+
+        await _drop_idle_connection(engine)
+        assert await read() == 1
+        assert len(calls) == 2
+
+        # Inside a request scope, the dead connection is dropped from the scope
+        calls.clear()
+        async with base_mod.request_scope():
+            assert await read() == 1
+            # Drop the connection the request holds
+            scope = base_mod._request_scope.get()
+            session = await scope.session(base_mod.SessionLocal)
+            raw = await session.bind.get_raw_connection()
+            await raw.driver_connection.close()
+            assert await read() == 1
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_retry_on_disconnect_other_errors(self, monkeypatch):
+        from sqlalchemy.exc import DBAPIError
+
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        monkeypatch.setattr(base_mod, "_retry_disconnects", True)
+        error = DBAPIError("SELECT 1", None, Exception("boom"))
+        read = AsyncMock(side_effect=error)
+        with pytest.raises(DBAPIError):
+            await base_mod.retry_on_disconnect(read)()
+        read.assert_awaited_once()
+
+        # Only retried once
+        error = DBAPIError(
+            "SELECT 1", None, Exception("gone"), connection_invalidated=True
+        )
+        read = AsyncMock(side_effect=error)
+        with pytest.raises(DBAPIError):
+            await base_mod.retry_on_disconnect(read)()
+        assert read.await_count == 2
+
+        # Not retried at all without background validation
+        monkeypatch.setattr(base_mod, "_retry_disconnects", False)
+        read = AsyncMock(side_effect=error)
+        with pytest.raises(DBAPIError):
+            await base_mod.retry_on_disconnect(read)()
+        read.assert_awaited_once()
+
+
+# ----------------------- Pool controller -----------------------
+
+
+class TestPoolController:
+    @pytest.fixture
+    async def pool(self, tmp_path):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+        from src.infrastructure.observability.db_pool import (
+            InstrumentedAsyncQueuePool,
+        )
+
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'db.db'}",
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=2,
+            max_overflow=10,
+        )
+        base_mod.set_engine(engine)
+        yield engine.pool
+        await engine.dispose()
+
+    def test_next_limit(self):
+        from src.infrastructure.datastore.sqlalchemy.pool_controller import (
+            next_limit,
+        )
+        from src.infrastructure.observability.db_pool import PoolWindow
+
+        def step(limit, **window):
+            return next_limit(
+                limit,
+                floor=2,
+                ceiling=12,
+                window=PoolWindow(**window),
+                target_wait_s=0.005,
+            )
+
+        # Checkouts waited, timed out or the pool was nearly full: grow
+        assert step(8, checkouts=10, wait_s=0.1, peak_in_use=4) == 10
+        assert step(8, checkouts=10, timeouts=1, peak_in_use=4) == 10
+        assert step(4, checkouts=10, peak_in_use=4) == 5
+        assert step(11, checkouts=10, wait_s=0.1, peak_in_use=11) == 12
+        # Mostly idle: shrink one at a time, down to the floor
+        assert step(8, checkouts=10, peak_in_use=3) == 7
+        assert step(2, checkouts=0) == 2
+        # In between: keep
+        assert step(8, checkouts=10, peak_in_use=5) == 8
+
+    @pytest.mark.asyncio
+    async def test_adjust_pool(self, pool):
+        from src.infrastructure.datastore.sqlalchemy import pool_controller
+
+        pool.set_limit(2)
+        pool._window.checkouts = 10
+        pool._window.wait_s = 1.0
+        assert await pool_controller.adjust_pool(pool, 12, 0.005, 0, 30) == 3
+        assert pool.limit == 3
+        # Idle window
+        assert await pool_controller.adjust_pool(pool, 12, 0.005, 0, 30) == 2
+
+        # With a global budget, the lease decides
+        pool._window.timeouts = 1
+        with patch.object(
+            pool_controller, "claim_connections", AsyncMock(return_value=2)
+        ) as mock_claim:
+            assert await pool_controller.adjust_pool(pool, 12, 0.005, 20, 30) == 2
+        # never below pool_size: those connections stay open when idle
+        mock_claim.assert_awaited_once_with(3, 2, 20, 30)
+
+    @pytest.mark.asyncio
+    async def test_controller_task(self, pool):
+        import asyncio
+
+        from src.infrastructure.datastore.sqlalchemy import pool_controller
+
+        with patch.object(
+            pool_controller, "adjust_pool", AsyncMock(side_effect=[RuntimeError, 2])
+        ) as mock_adjust:
+            pool_controller.start_pool_controller(
+                interval=0.01, ceiling=12, target_wait_ms=5, budget=0
+            )
+            # starts at pool_size
+            await asyncio.sleep(0)
+            assert pool.limit == 2
+            try:
+                for _ in range(100):
+                    await asyncio.sleep(0.01)
+                    if mock_adjust.await_count >= 2:
+                        break
+            finally:
+                await pool_controller.stop_pool_controller()
+        # a failed step doesn't stop the task
+        assert mock_adjust.await_count >= 2
+        mock_adjust.assert_awaited_with(pool, 12, 0.005, 0, lease_ttl=0.03)
+        assert pool_controller._task is None
+
+
+# ----------------------- Batcher -----------------------
+
+
+@pytest.mark.asyncio
+class TestBatcher:
+    async def test_flushes_full_batches_and_after_max_wait(self):
+        import asyncio
+
+        from src.infrastructure.utils.batching import Batcher
+
+        batches = []
+
+        async def flush(items):
+            batches.append(items)
+            return [i * 10 for i in items]
+
+        batcher = Batcher(flush, max_size=3, max_wait=0.01)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        assert results == [0, 10, 20, 30, 40]
+        # a full batch right away, the rest once max_wait elapsed
+        assert batches == [[0, 1, 2], [3, 4]]
+
+    async def test_errors_reach_their_callers(self):
+        import asyncio
+
+        from src.infrastructure.utils.batching import Batcher
+
+        async def flush(items):
+            return [ValueError(i) if i % 2 else i for i in items]
+
+        batcher = Batcher(flush, max_size=10, max_wait=0)
+        results = await asyncio.gather(
+            *(batcher.submit(i) for i in range(3)), return_exceptions=True
+        )
+        assert results[0] == 0
+        assert isinstance(results[1], ValueError)
+        assert results[2] == 2
+
+        # a failed flush fails the whole batch
+        failing = Batcher(AsyncMock(side_effect=RuntimeError), max_size=2, max_wait=0)
+        results = await asyncio.gather(
+            failing.submit(1), failing.submit(2), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    async def test_flush_runs_outside_callers_context(self):
+        import asyncio
+        from contextvars import ContextVar
+
+        from src.infrastructure.utils.batching import Batcher
+
+        var: ContextVar[str | None] = ContextVar("var", default=None)
+        seen = []
+
+        async def flush(items):
+            seen.append(var.get())
+            return items
+
+        batcher = Batcher(flush, max_size=1, max_wait=0)
+        var.set("request")
+        assert await asyncio.wait_for(batcher.submit(1), timeout=1) == 1
+        assert seen == [None]
+
+
+class TestResilientDataService:
+    @staticmethod
+    def _disconnect():
+        from sqlalchemy.exc import DBAPIError
+
+        return DBAPIError(
+            "SELECT 1", None, Exception("gone"), connection_invalidated=True
+        )
+
+    def test_is_retryable(self):
+        from sqlalchemy.exc import DBAPIError, IntegrityError
+
+        from src.infrastructure.dataservice.db_resilient.resilient import (
+            is_retryable,
+        )
+
+        class PgError(Exception):
+            def __init__(self, sqlstate):
+                self.sqlstate = sqlstate
+
+        assert is_retryable(self._disconnect())
+        assert is_retryable(ConnectionRefusedError())
+        # failover: admin_shutdown, then connection_failure
+        assert is_retryable(DBAPIError("SELECT 1", None, PgError("57P01")))
+        assert is_retryable(DBAPIError("SELECT 1", None, PgError("08006")))
+        assert is_retryable(DBAPIError("SELECT 1", None, PgError("40001")))
+        assert not is_retryable(DBAPIError("SELECT 1", None, PgError("57014")))
+        assert not is_retryable(IntegrityError("INSERT", None, PgError("23505")))
+        assert not is_retryable(ValueError())
+
+    @pytest.mark.asyncio
+    async def test_retries_reads_only(self):
+        from src.infrastructure.dataservice.db_resilient import resilient
+        from src.infrastructure.dataservice.dbdataservice import DbDataService
+
+        inner = AsyncMock(spec=DbDataService)
+        inner.get_portfolio.side_effect = [self._disconnect(), "portfolio"]
+        inner.create_asset.side_effect = self._disconnect()
+        ds = resilient.ResilientDataService(inner, retries=2, backoff_ms=0)
+
+        with patch.object(resilient, "RETRIES") as mock_retries:
+            assert await ds.get_portfolio("owner", 1) == "portfolio"
+            # a write that failed may have committed: never run twice
+            with pytest.raises(Exception, match="gone"):
+                await ds.create_asset("owner", 1, MagicMock())
+        assert inner.get_portfolio.await_count == 2
+        inner.create_asset.assert_awaited_once()
+        mock_retries.add.assert_called_once_with(
+            1, {"db.operation.name": "get_portfolio"}
+        )
+
+    @pytest.mark.asyncio
+    async def test_retries_are_bounded(self):
+        import time
+
+        from src.infrastructure.dataservice.db_resilient import resilient
+        from src.infrastructure.dataservice.dbdataservice import DbDataService
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        inner = AsyncMock(spec=DbDataService)
+        inner.list_assets.side_effect = self._disconnect()
+        inner.get_portfolio.side_effect = ValueError
+        ds = resilient.ResilientDataService(inner, retries=2, backoff_ms=1)
+
+        with patch.object(resilient, "RETRIES_EXHAUSTED") as mock_exhausted:
+            with pytest.raises(Exception, match="gone"):
+                await ds.list_assets("owner", 1)
+            assert inner.list_assets.await_count == 3
+            mock_exhausted.add.assert_called_once()
+
+            # not a transient error
+            with pytest.raises(ValueError):
+                await ds.get_portfolio("owner", 1)
+            inner.get_portfolio.assert_awaited_once()
+
+            # no retry whose backoff would end past the request deadline
+            inner.list_assets.reset_mock()
+            ds.backoff = 10
+            token = base_mod.set_deadline(time.monotonic() + 0.001)
+            try:
+                with pytest.raises(Exception, match="gone"):
+                    await ds.list_assets("owner", 1)
+            finally:
+                base_mod.reset_deadline(token)
+            inner.list_assets.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_disconnects_not_retried_twice(self, monkeypatch):
+        from src.infrastructure.dataservice.db_resilient import resilient
+        from src.infrastructure.dataservice.dbdataservice import DbDataService
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        monkeypatch.setattr(base_mod, "_retry_disconnects", True)
+        read = AsyncMock(side_effect=self._disconnect())
+        inner = AsyncMock(spec=DbDataService)
+        inner.list_assets = base_mod.retry_on_disconnect(read)
+        ds = resilient.ResilientDataService(inner, retries=2, backoff_ms=0)
+
+        with pytest.raises(Exception, match="gone"):
+            await ds.list_assets("owner", 1)
+        # retried by the service only: 3 attempts rather than 6
+        assert read.await_count == 3
+
+        # without retries, the read still retries its lost connection
+        read.reset_mock()
+        ds = resilient.ResilientDataService(inner, retries=0, hedge=True)
+        with pytest.raises(Exception, match="gone"):
+            await ds.list_assets("owner", 1)
+        assert read.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_hedged_reads(self):
+        import asyncio
+
+        from src.infrastructure.dataservice.db_resilient import resilient
+        from src.infrastructure.dataservice.dbdataservice import DbDataService
+        from src.infrastructure.datastore.sqlalchemy import base as base_mod
+
+        inner = AsyncMock(spec=DbDataService)
+        scopes = []
+        cancelled = asyncio.Event()
+        calls = 0
+
+        async def get_portfolio(owner_id, portfolio_id):
+            nonlocal calls
+            calls += 1
+            scopes.append(base_mod._request_scope.get())
+            if calls == 1:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return f"portfolio-{calls}"
+
+        inner.get_portfolio.side_effect = get_portfolio
+        ds = resilient.ResilientDataService(
+            inner, retries=0, hedge=True, hedge_min_delay_ms=5
+        )
+
+        # no hedge until the p95 is known
+        assert (await ds._attempt("list_assets", AsyncMock(return_value=1))) == 1
+        assert ds._latencies["list_assets"].p95() is None
+
+        for _ in range(resilient._MIN_SAMPLES):
+            ds._latencies["get_portfolio"].record(0.001)
+        with patch.object(resilient, "HEDGES") as mock_hedges:
+            async with base_mod.request_scope():
+                portfolio = await asyncio.wait_for(
+                    ds.get_portfolio("owner", 1), timeout=5
+                )
+        # the slow first attempt lost to the hedge, fired after the min delay
+        assert portfolio == "portfolio-2"
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        mock_hedges.add.assert_called_once_with(
+            1, {"db.operation.name": "get_portfolio", "db.client.hedge.winner": "hedge"}
+        )
+        # both ran outside the request scope, on their own connections
+        assert scopes == [None, None]
+
+
+class TestFaultInjection:
+    def test_parse_faults(self):
+        from src.infrastructure.utils.faults import FaultSpec, Latency, parse_faults
+
+        faults = parse_faults(
+            "*: latency=lognormal(2,0.5) ; list_assets:latency=uniform(5, 20),"
+            "spike=0.01@2000,error=0.1;health_check:"
+        )
+        assert faults == {
+            "*": FaultSpec(latency=Latency("lognormal", (2, 0.5))),
+            "list_assets": FaultSpec(
+                latency=Latency("uniform", (5, 20)),
+                spike_rate=0.01,
+                spike_ms=2000,
+                error_rate=0.1,
+            ),
+            "health_check": FaultSpec(),
+        }
+        assert parse_faults("") == {}
+
+        for raw in (
+            "list_assets",
+            ":error=0.1",
+            "list_assets:error=2",
+            "list_assets:latency=normal(5)",
+            "list_assets:latency=uniform(5)",
+            "list_assets:latency=fixed(-1)",
+            "list_assets:spike=0.5",
+            "list_assets:timeout=5",
+        ):
+            with pytest.raises(ValueError):
+                parse_faults(raw)
+
+    @pytest.mark.asyncio
+    async def test_injector(self):
+        import time
+
+        from sqlalchemy.exc import DBAPIError
+
+        from src.infrastructure.utils.faults import FaultInjector, parse_faults
+
+        injector = FaultInjector(
+            parse_faults(
+                "*:latency=fixed(20);list_assets:error=1;get_portfolio:spike=1@30"
+            ),
+            seed=0,
+        )
+        call = AsyncMock(return_value="result")
+
+        start = time.perf_counter()
+        assert await injector.run("create_asset", call) == "result"
+        assert time.perf_counter() - start >= 0.02
+
+        # a method's own rule replaces the default
+        start = time.perf_counter()
+        assert await injector.run("get_portfolio", call) == "result"
+        assert 0.03 <= time.perf_counter() - start < 0.05
+
+        # errors look like a lost connection, and come before the call
+        call.reset_mock()
+        with pytest.raises(DBAPIError) as exc_info:
+            await injector.run("list_assets", call)
+        assert exc_info.value.connection_invalidated
+        call.assert_not_awaited()
+
+        assert await FaultInjector({}).run("list_assets", call) == "result"
+
+    @pytest.mark.asyncio
+    async def test_faulty_data_services(self, inject_faults):
+        from sqlalchemy.exc import DBAPIError
+
+        from src.infrastructure.dataservice.authdataservice import AuthDataService
+        from src.infrastructure.dataservice.db_resilient import resilient
+        from src.infrastructure.dataservice.dbdataservice import DbDataService
+        from src.infrastructure.dataservice.faulty.faulty import (
+            FaultyAuthDataService,
+            FaultyDbDataService,
+        )
+
+        inner = AsyncMock(spec=DbDataService)
+        inner.list_assets.return_value = ["asset"]
+        ds = inject_faults(inner, "list_assets:error=0.5;create_asset:error=1")
+        assert isinstance(ds, FaultyDbDataService)
+
+        # injected errors are retried like real ones, writes still aren't
+        retrying = resilient.ResilientDataService(ds, retries=10, backoff_ms=0)
+        with patch.object(resilient, "RETRIES") as mock_retries:
+            for _ in range(5):
+                assert await retrying.list_assets("owner", 1) == ["asset"]
+            with pytest.raises(DBAPIError):
+                await retrying.create_asset("owner", 1, MagicMock())
+        assert mock_retries.add.call_count > 0
+        assert inner.list_assets.await_count == 5
+        inner.create_asset.assert_not_awaited()
+        inner.get_portfolio.return_value = None
+        assert await ds.get_portfolio("owner", 1) is None
+        inner.get_portfolio.assert_awaited_once_with("owner", 1)
+
+        auth_inner = AsyncMock(spec=AuthDataService)
+        auth = inject_faults(auth_inner, "login:error=1")
+        assert isinstance(auth, FaultyAuthDataService)
+        with pytest.raises(DBAPIError):
+            await auth.login("user@test.com", "password")
+        auth_inner.login.assert_not_awaited()
+        await auth.get_user_from_token("token")
+        auth_inner.get_user_from_token.assert_awaited_once_with("token")
+
+
+class TestSharding:
+    def test_portfolio_ids(self):
+        from src.infrastructure.dataservice.db_sharded.sharded import (
+            decode_portfolio_id,
+            encode_portfolio_id,
+        )
+
+        # shard 0 keeps the ids it had before sharding
+        assert encode_portfolio_id(0, 42) == 42
+        assert decode_portfolio_id(42) == (0, 42)
+        portfolio_id = encode_portfolio_id(3, 42)
+        assert portfolio_id > 2**40
+        assert decode_portfolio_id(portfolio_id) == (3, 42)
+
+    def test_place_owner(self):
+        from uuid import uuid4
+
+        from src.infrastructure.dataservice.db_sharded.sharded import place_owner
+
+        owners = [str(uuid4()) for _ in range(300)]
+        placed = [place_owner(o, 3) for o in owners]
+        assert placed == [place_owner(o, 3) for o in owners]
+        assert set(placed) == {0, 1, 2}
+        # a fourth shard only takes owners, it doesn't shuffle the others
+        for owner, shard in zip(owners, placed, strict=True):
+            assert place_owner(owner, 4) in (shard, 3)
+
+
+class TestModels:
+    def test_indexes_match_migrations(self):
+        """The models declare the indexes the migrations leave in place."""
+        import re
+        from pathlib import Path
+
+        from src.infrastructure.datastore.sqlalchemy.base import Base
+
+        migrations = Path(__file__).parents[4] / "database" / "migrations"
+        created: set[str] = set()
+        # in statement order: a migration may drop an index and create it anew
+        statement = re.compile(
+            r"CREATE (?:UNIQUE )?INDEX .*?(?P<create>ix_\w+)"
+            r"|ALTER INDEX (?P<old>ix_\w+)\s+RENAME TO (?P<new>ix_\w+)"
+            r"|DROP INDEX (?:IF EXISTS )?(?P<drop>ix_\w+)"
+        )
+        for path in sorted(migrations.glob("*.up.sql")):
+            for m in statement.finditer(path.read_text()):
+                if m["create"]:
+                    created.add(m["create"])
+                elif m["old"]:
+                    created.discard(m["old"])
+                    created.add(m["new"])
+                else:
+                    created.discard(m["drop"])
+
+        declared = {
+            index.name
+            for table in Base.metadata.tables.values()
+            for index in table.indexes
+        }
+        assert declared == created
+
+
 class TestSupabaseExceptions:
     def test_all_exceptions_instantiate(self):
         from src.infrastructure.dataservice.auth_supabase.exceptions import (
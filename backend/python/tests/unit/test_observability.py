@@ -7,12 +7,18 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 import structlog
+from sqlalchemy import create_engine
 from starlette.applications import Starlette
 from starlette.requests import Request
 from starlette.responses import Response
 from starlette.routing import Route
 from starlette.testclient import TestClient
 
+from src.infrastructure.observability import db_profiler
+from src.infrastructure.observability.db_queries import (
+    enable_query_tracking,
+    track_queries,
+)
 from src.infrastructure.observability.middleware import RequestLoggingMiddleware
 from src.infrastructure.observability.setup import (
     _configure_structlog,
@@ -46,10 +52,17 @@ def _make_settings(**overrides):
 class TestRequestLoggingMiddleware:
     """Tests for RequestLoggingMiddleware."""
 
-    def _build_app(self) -> Starlette:
+    def _build_app(self, **middleware_options) -> Starlette:
         async def homepage(request: Request) -> Response:
             return Response("ok", status_code=200)
 
+        async def queries_route(request: Request) -> Response:
+            engine = create_engine("sqlite://")
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+                conn.exec_driver_sql("SELECT 2")
+            return Response("ok", status_code=200)
+
         async def error_route(request: Request) -> Response:
             return Response("fail", status_code=500)
 
@@ -57,9 +70,10 @@ class TestRequestLoggingMiddleware:
             routes=[
                 Route("/", homepage),
                 Route("/error", error_route),
+                Route("/queries", queries_route),
             ],
         )
-        app.add_middleware(RequestLoggingMiddleware)
+        app.add_middleware(RequestLoggingMiddleware, **middleware_options)
         return app
 
     def test_middleware_returns_response(self):
@@ -97,6 +111,22 @@ class TestRequestLoggingMiddleware:
         assert kw["path"] == "/error"
         assert kw["status"] == 500
 
+    @patch("src.infrastructure.observability.middleware.logger")
+    def test_middleware_logs_db_queries(self, mock_logger):
+        client = TestClient(self._build_app(track_db_queries=True))
+        client.get("/queries")
+
+        kw = mock_logger.info.call_args[1]
+        assert kw["db_queries"] == 2
+        assert isinstance(kw["db_ms"], float)
+
+    @patch("src.infrastructure.observability.middleware.logger")
+    def test_middleware_db_queries_disabled(self, mock_logger):
+        client = TestClient(self._build_app())
+        client.get("/queries")
+
+        assert "db_queries" not in mock_logger.info.call_args[1]
+
     @patch("src.infrastructure.observability.middleware.trace")
     @patch("src.infrastructure.observability.middleware.logger")
     def test_middleware_extracts_trace_context(self, mock_logger, mock_trace):
@@ -336,3 +366,307 @@ class TestGetLogger:
     def test_returns_logger_without_name(self):
         logger = get_logger()
         assert logger is not None
+
+
+# ---------------------------------------------------------------------------
+# DB pool metrics tests
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestDbPoolMetrics:
+    """Tests for the instrumented connection pool and its gauges."""
+
+    def _build_engine(self, tmp_path, **kwargs):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        from src.infrastructure.observability.db_pool import (
+            InstrumentedAsyncQueuePool,
+        )
+
+        return create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedAsyncQueuePool,
+            **kwargs,
+        )
+
+    async def test_records_wait_time_per_checkout(self, tmp_path):
+        from src.infrastructure.observability import db_pool
+
+        engine = self._build_engine(tmp_path, pool_size=1, max_overflow=0)
+        db_pool.instrument_engine_pool(engine, name="test")
+        with patch.object(db_pool, "CONNECTION_WAIT_TIME") as mock_wait_time:
+            async with engine.connect():
+                pass
+            async with engine.connect():
+                pass
+        await engine.dispose()
+
+        assert mock_wait_time.record.call_count == 2
+        wait, attributes = mock_wait_time.record.call_args.args
+        assert wait >= 0
+        assert attributes == {"db.client.connection.pool.name": "test"}
+
+    async def test_counts_timeouts(self, tmp_path):
+        from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+        from src.infrastructure.observability import db_pool
+
+        engine = self._build_engine(
+            tmp_path, pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+        db_pool.instrument_engine_pool(engine, name="test")
+        with patch.object(db_pool, "CONNECTION_TIMEOUTS") as mock_timeouts:
+            async with engine.connect():
+                with pytest.raises(PoolTimeoutError):
+                    async with engine.connect():
+                        pass
+        await engine.dispose()
+
+        mock_timeouts.add.assert_called_once_with(
+            1, {"db.client.connection.pool.name": "test"}
+        )
+
+    async def test_observes_used_idle_and_overflow(self, tmp_path):
+        from src.infrastructure.observability import db_pool
+
+        engine = self._build_engine(tmp_path, pool_size=1, max_overflow=2)
+        db_pool.instrument_engine_pool(engine, name="test")
+        async with engine.connect(), engine.connect():
+            counts = {
+                o.attributes["db.client.connection.state"]: o.value
+                for o in db_pool._observe_connection_count(MagicMock())
+                if o.attributes["db.client.connection.pool.name"] == "test"
+            }
+            overflow = [
+                o.value
+                for o in db_pool._observe_overflow(MagicMock())
+                if o.attributes["db.client.connection.pool.name"] == "test"
+            ]
+        await engine.dispose()
+
+        assert counts == {"used": 2, "idle": 0}
+        assert overflow == [1]
+
+    async def test_limit_and_window(self, tmp_path):
+        from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+        from src.infrastructure.observability import db_pool
+
+        engine = self._build_engine(
+            tmp_path, pool_size=1, max_overflow=3, pool_timeout=0.05
+        )
+        db_pool.instrument_engine_pool(engine, name="test")
+        pool = engine.pool
+        assert pool.limit == 4
+        pool.set_limit(2)
+        async with engine.connect(), engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                async with engine.connect():
+                    pass
+        window = pool.take_window()
+        assert (window.checkouts, window.timeouts, window.peak_in_use) == (3, 1, 2)
+        assert window.wait_s >= 0.05
+        assert pool.take_window() == db_pool.PoolWindow()
+        maximum = [
+            o.value
+            for o in db_pool._observe_max(MagicMock())
+            if o.attributes["db.client.connection.pool.name"] == "test"
+        ]
+        assert maximum == [2]
+
+        # At least one
+        pool.set_limit(0)
+        assert pool.limit == 1
+        await engine.dispose()
+
+    async def test_limit_below_pool_size(self, tmp_path):
+        import asyncio
+
+        engine = self._build_engine(tmp_path, pool_size=3, max_overflow=0)
+        pool = engine.pool
+        pool.set_limit(1)
+
+        async def connect():
+            return await engine.connect()
+
+        first = await connect()
+        waiting = asyncio.create_task(connect())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        assert pool.checkedout() == 1
+
+        # A connection coming back goes to the checkout waiting for it
+        await first.close()
+        second = await asyncio.wait_for(waiting, 1)
+        assert pool.checkedout() == 1
+
+        # Growing lets the next checkout through right away
+        pool.set_limit(2)
+        third = await asyncio.wait_for(connect(), 1)
+        assert pool.checkedout() == 2
+        await second.close()
+        await third.close()
+        await engine.dispose()
+
+    async def test_recreated_pool_keeps_name(self, tmp_path):
+        from src.infrastructure.observability import db_pool
+
+        engine = self._build_engine(tmp_path)
+        db_pool.instrument_engine_pool(engine, name="test")
+        await engine.dispose()
+
+        assert engine.pool.pool_name == "test"
+
+
+# ---------------------------------------------------------------------------
+# Per-request query tracking
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.unit
+class TestQueryTracking:
+    def test_nested_blocks_count_into_parent(self):
+        enable_query_tracking()
+        enable_query_tracking()  # idempotent: statements are counted once
+        engine = create_engine("sqlite://")
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")  # outside any block
+            with track_queries() as outer:
+                conn.exec_driver_sql("SELECT 1")
+                with track_queries() as inner:
+                    conn.exec_driver_sql("SELECT 1")
+                    conn.exec_driver_sql("SELECT 1")
+        assert inner.count == 2
+        assert outer.count == 3
+        assert outer.duration_s >= inner.duration_s > 0
+
+
+# ---------------------------------------------------------------------------
+# Query profiler
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.unit
+class TestQueryFingerprint:
+    def test_literals_and_placeholders(self):
+        assert (
+            db_profiler.fingerprint(
+                "SELECT * FROM assets\n  WHERE portfolio_id = $1 AND symbol = 'BTC'"
+                " AND quantity > 1.5 -- hot path"
+            )
+            == "SELECT * FROM assets WHERE portfolio_id = ? AND symbol = ? AND quantity > ?"
+        )
+        assert (
+            db_profiler.fingerprint(
+                "SELECT id FROM t2 WHERE a = :a AND b::text = %(b)s LIMIT 10"
+            )
+            == "SELECT id FROM t2 WHERE a = ? AND b::text = ? LIMIT ?"
+        )
+
+    def test_lists_collapsed(self):
+        assert (
+            db_profiler.fingerprint("SELECT 1 FROM t WHERE id IN (?, ?, ?)")
+            == db_profiler.fingerprint("SELECT 1 FROM t WHERE id IN (1)")
+            == "SELECT ? FROM t WHERE id IN (...)"
+        )
+        assert (
+            db_profiler.fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)")
+            == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+        )
+
+    def test_parameter_shapes(self):
+        assert db_profiler.parameter_shapes(("BTC", 1.5, None)) == [
+            "str[3]",
+            "float",
+            "NoneType",
+        ]
+        assert db_profiler.parameter_shapes({"ids": [1, 2]}) == {"ids": "list[2]"}
+        assert db_profiler.parameter_shapes([(1,), (2,)], many=True) == {
+            "rows": 2,
+            "row": ["int"],
+        }
+
+
+@pytest.mark.unit
+class TestQueryProfiler:
+    async def _engine(self, tmp_path):
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        db_profiler.enable_query_profiler(slow_query_ms=10_000, explain_first=0)
+        db_profiler.enable_query_profiler(slow_query_ms=10_000, explain_first=0)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'prof.db'}")
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql("CREATE TABLE t (id INTEGER, name TEXT)")
+            await conn.exec_driver_sql(
+                "INSERT INTO t VALUES (?, ?)", [(i, f"n{i}") for i in range(5)]
+            )
+        db_profiler.profiler.reset()
+        return engine
+
+    @pytest.mark.asyncio
+    async def test_stats_per_fingerprint(self, tmp_path):
+        engine = await self._engine(tmp_path)
+        async with engine.connect() as conn:
+            for limit in (1, 2, 3):
+                await conn.exec_driver_sql(f"SELECT * FROM t LIMIT {limit}")
+            await conn.exec_driver_sql("UPDATE t SET name = ? WHERE id < ?", ("x", 2))
+        await engine.dispose()
+
+        profiles = {p.fingerprint: p for p in db_profiler.profiler.profiles()}
+        select = profiles["SELECT * FROM t LIMIT ?"]
+        assert (select.count, select.slow) == (3, 0)
+        assert select.total_ms >= select.p99_ms >= select.p95_ms >= select.p50_ms
+        # aiosqlite reports no rowcount for a result set, only for DML
+        assert select.rows is None
+        update = profiles["UPDATE t SET name = ? WHERE id < ?"]
+        assert (update.count, update.rows) == (1, 2)
+        assert len(db_profiler.profiler.profiles(limit=1)) == 1
+        # counted once although enabled twice
+        assert sum(p.count for p in profiles.values()) == 4
+
+    def test_rows(self):
+        profiler = db_profiler.QueryProfiler()
+        profiler.record("DELETE FROM t WHERE id = 1", 0.001, 1)
+        profiler.record("DELETE FROM t WHERE id = 2", 0.001, 0)
+        profiler.record("SELECT * FROM t", 0.001, 3)
+        profiler.record("SELECT * FROM t", 0.001, None)
+        rows = {p.fingerprint: p.rows for p in profiler.profiles()}
+        assert rows == {"DELETE FROM t WHERE id = ?": 1, "SELECT * FROM t": None}
+
+    @pytest.mark.asyncio
+    async def test_slow_queries_logged_and_explained(self, tmp_path):
+        engine = await self._engine(tmp_path)
+        with (
+            patch.object(db_profiler.profiler, "slow_query_s", 0),
+            patch.object(db_profiler.profiler, "explain_first", 1),
+            patch.object(db_profiler, "logger") as mock_logger,
+        ):
+            async with engine.connect() as conn:
+                for _ in range(2):
+                    result = await conn.exec_driver_sql(
+                        "SELECT name FROM t WHERE id = ?", (3,)
+                    )
+                    # the plan is read on its own cursor
+                    assert result.scalar() == "n3"
+        await engine.dispose()
+
+        calls = [
+            c for c in mock_logger.warning.call_args_list if c.args == ("slow_query",)
+        ]
+        assert len(calls) == 2
+        first, second = calls[0].kwargs, calls[1].kwargs
+        assert first["fingerprint"] == "SELECT name FROM t WHERE id = ?"
+        assert first["params"] == ["int"]
+        assert first["rows"] is None
+        assert "SCAN t" in first["plan"]
+        # only the first occurrence is explained
+        assert second["plan"] is None
+        profile = next(
+            p
+            for p in db_profiler.profiler.profiles()
+            if p.fingerprint == "SELECT name FROM t WHERE id = ?"
+        )
+        assert profile.slow == 2
+        assert "SCAN t" in profile.plan
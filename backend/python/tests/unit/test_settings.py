@@ -155,3 +155,348 @@ class TestSettings:
             build_settings()
         errors = exc_info.value.errors()
         assert any("DB_SSLMODE" in str(err.get("loc", [])) for err in errors)
+
+    def test_validate_db_prepared_statement_cache_size(self, monkeypatch):
+        """Test DB_PREPARED_STATEMENT_CACHE_SIZE default and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.delenv("DB_PREPARED_STATEMENT_CACHE_SIZE", raising=False)
+
+        settings = build_settings()
+        assert settings.db_prepared_statement_cache_size == 100
+
+        # 0 disables the cache
+        monkeypatch.setenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "0")
+        settings = build_settings()
+        assert settings.db_prepared_statement_cache_size == 0
+
+        monkeypatch.setenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "-1")
+        with pytest.raises(ValidationError):
+            build_settings()
+
+    def test_validate_db_pool(self, monkeypatch):
+        """Test connection pool settings defaults and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.delenv("DB_POOL_SIZE", raising=False)
+        monkeypatch.delenv("DB_MAX_OVERFLOW", raising=False)
+        monkeypatch.delenv("DB_POOL_TIMEOUT", raising=False)
+
+        settings = build_settings()
+        assert settings.db_pool_size == 10
+        assert settings.db_max_overflow == 20
+        assert settings.db_pool_timeout == 30
+
+        monkeypatch.setenv("DB_POOL_SIZE", "0")
+        with pytest.raises(ValidationError):
+            build_settings()
+        monkeypatch.setenv("DB_POOL_SIZE", "5")
+
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "-1")
+        with pytest.raises(ValidationError):
+            build_settings()
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+
+        monkeypatch.setenv("DB_POOL_TIMEOUT", "0")
+        with pytest.raises(ValidationError):
+            build_settings()
+        monkeypatch.setenv("DB_POOL_TIMEOUT", "2.5")
+
+        settings = build_settings()
+        assert settings.db_pool_size == 5
+        assert settings.db_max_overflow == 0
+        assert settings.db_pool_timeout == 2.5
+
+    def test_read_database_url_property(self, monkeypatch):
+        """Test read replica URL construction and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.setenv("DB_PORT", "5433")
+        monkeypatch.delenv("DB_READ_HOST", raising=False)
+        monkeypatch.delenv("DB_READ_PORT", raising=False)
+
+        # No replica by default
+        settings = build_settings()
+        assert settings.read_database_url is None
+        assert settings.db_read_your_writes_seconds == 5
+
+        # Replica on the primary port unless told otherwise
+        monkeypatch.setenv("DB_READ_HOST", "replica.example.com")
+        settings = build_settings()
+        assert settings.read_database_url is not None
+        assert "@replica.example.com:5433/" in settings.read_database_url
+        assert settings.read_database_url.startswith("postgresql+asyncpg://")
+
+        monkeypatch.setenv("DB_READ_PORT", "6543")
+        settings = build_settings()
+        assert "@replica.example.com:6543/" in settings.read_database_url
+
+        monkeypatch.setenv("DB_READ_PORT", "0")
+        with pytest.raises(ValidationError):
+            build_settings()
+        monkeypatch.delenv("DB_READ_PORT")
+
+        monkeypatch.setenv("DB_READ_POOL_SIZE", "0")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "DB_READ_POOL_SIZE" in str(exc_info.value)
+        monkeypatch.delenv("DB_READ_POOL_SIZE")
+
+        monkeypatch.setenv("DB_READ_YOUR_WRITES_SECONDS", "-1")
+        with pytest.raises(ValidationError):
+            build_settings()
+
+    def test_shard_database_urls(self, monkeypatch):
+        """Test DB_SHARDS parsing."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.setenv("DB_PORT", "5433")
+        monkeypatch.setenv("DB_NAME", "portfolio")
+        monkeypatch.delenv("DB_SHARDS", raising=False)
+        assert build_settings().shard_database_urls == []
+
+        # the primary's port and database name unless given
+        monkeypatch.setenv("DB_SHARDS", "shard1, shard2:6543/other,")
+        urls = build_settings().shard_database_urls
+        assert len(urls) == 2
+        assert urls[0].startswith("postgresql+asyncpg://")
+        assert urls[0].endswith("@shard1:5433/portfolio")
+        assert urls[1].endswith("@shard2:6543/other")
+
+        monkeypatch.setenv("DB_BACKEND", "sqlite")
+        monkeypatch.setenv("DB_SHARDS", "/data/shard-1.db")
+        settings = build_settings()
+        assert settings.shard_database_urls == ["sqlite+aiosqlite:////data/shard-1.db"]
+        assert settings.db_shard_map_ttl == 5
+
+        monkeypatch.setenv("DB_SHARD_MAP_TTL", "-1")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "DB_SHARD_MAP_TTL" in str(exc_info.value)
+
+    def test_validate_request_timeout(self, monkeypatch):
+        """Test REQUEST_TIMEOUT default and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.delenv("REQUEST_TIMEOUT", raising=False)
+        assert build_settings().request_timeout == 30
+
+        monkeypatch.setenv("REQUEST_TIMEOUT", "0")
+        assert build_settings().request_timeout == 0
+
+        monkeypatch.setenv("REQUEST_TIMEOUT", "-1")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "REQUEST_TIMEOUT" in str(exc_info.value)
+
+    def test_validate_read_resilience(self, monkeypatch):
+        """Test DB_READ_RETRIES / DB_HEDGED_READS defaults and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        settings = build_settings()
+        assert settings.db_read_retries == 2
+        assert settings.db_read_retry_backoff_ms == 50
+        assert settings.db_hedged_reads is False
+        assert settings.db_hedge_min_delay_ms == 10
+
+        for name in (
+            "DB_READ_RETRIES",
+            "DB_READ_RETRY_BACKOFF_MS",
+            "DB_HEDGE_MIN_DELAY_MS",
+        ):
+            monkeypatch.setenv(name, "-1")
+            with pytest.raises(ValidationError) as exc_info:
+                build_settings()
+            assert name in str(exc_info.value)
+            monkeypatch.delenv(name)
+
+    def test_validate_faults(self, monkeypatch):
+        """Test FAULTS parsing and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.delenv("FAULTS", raising=False)
+        monkeypatch.delenv("APP_ENV", raising=False)
+        assert build_settings().faults == {}
+
+        monkeypatch.setenv("FAULTS", "list_assets:latency=exp(5),error=0.01")
+        faults = build_settings().faults
+        assert faults["list_assets"].error_rate == 0.01
+
+        monkeypatch.setenv("FAULTS", "list_assets:error=5")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "FAULTS" in str(exc_info.value)
+
+        # never in production
+        monkeypatch.setenv("FAULTS", "list_assets:error=0.01")
+        monkeypatch.setenv("APP_ENV", "prod")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "FAULTS" in str(exc_info.value)
+
+    def test_validate_db_backend(self, monkeypatch):
+        """Test DB_BACKEND default and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.delenv("DB_BACKEND", raising=False)
+        assert build_settings().db_backend == "postgres"
+
+        monkeypatch.setenv("DB_BACKEND", "Memory")
+        assert build_settings().db_backend == "memory"
+
+        monkeypatch.setenv("DB_BACKEND", "sqlite")
+        monkeypatch.setenv("DB_SQLITE_PATH", "/data/portfolio.db")
+        settings = build_settings()
+        assert settings.database_url == "sqlite+aiosqlite:////data/portfolio.db"
+        assert settings.db_sqlite_busy_timeout == 5
+
+        assert settings.db_sqlite_read_pool_size == 4
+
+        monkeypatch.setenv("DB_SQLITE_BUSY_TIMEOUT", "-1")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "DB_SQLITE_BUSY_TIMEOUT" in str(exc_info.value)
+        monkeypatch.delenv("DB_SQLITE_BUSY_TIMEOUT")
+
+        monkeypatch.setenv("DB_BACKEND", "mysql")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "DB_BACKEND" in str(exc_info.value)
+
+    def test_validate_db_purge(self, monkeypatch):
+        """Test DB_PURGE_* / DB_*_BATCH_* defaults and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        settings = build_settings()
+        assert settings.db_purge_enabled is True
+        assert settings.db_purge_batch_size == 1000
+        assert settings.db_write_coalescing is False
+        assert settings.db_read_batching is False
+        assert settings.db_read_batch_max_wait_ms == 0
+
+        for name, value in (
+            ("DB_PURGE_INTERVAL", "0"),
+            ("DB_PURGE_BATCH_SIZE", "0"),
+            ("DB_PURGE_PAUSE", "-1"),
+            ("DB_WRITE_BATCH_MAX_SIZE", "0"),
+            ("DB_WRITE_BATCH_MAX_WAIT_MS", "-1"),
+            ("DB_READ_BATCH_MAX_SIZE", "0"),
+            ("DB_READ_BATCH_MAX_WAIT_MS", "-1"),
+        ):
+            monkeypatch.setenv(name, value)
+            with pytest.raises(ValidationError) as exc_info:
+                build_settings()
+            assert name in str(exc_info.value)
+            monkeypatch.delenv(name)
+
+    def test_validate_pool_adaptive(self, monkeypatch):
+        """Test DB_POOL_ADAPT* / DB_POOL_GLOBAL_BUDGET defaults and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        settings = build_settings()
+        assert settings.db_pool_adaptive is False
+        assert settings.db_pool_global_budget == 0
+
+        for name, value in (
+            ("DB_POOL_ADAPT_INTERVAL", "0"),
+            ("DB_POOL_TARGET_WAIT_MS", "-1"),
+            ("DB_POOL_GLOBAL_BUDGET", "-1"),
+        ):
+            monkeypatch.setenv(name, value)
+            with pytest.raises(ValidationError) as exc_info:
+                build_settings()
+            assert name in str(exc_info.value)
+            monkeypatch.delenv(name)
+
+    def test_validate_query_profiler(self, monkeypatch):
+        """Test DB_SLOW_QUERY_* validation and ADMIN_EMAILS parsing."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.setenv("ADMIN_EMAILS", " Ops@Example.com, ,dba@example.com")
+        settings = build_settings()
+        assert settings.admin_emails == {"ops@example.com", "dba@example.com"}
+        assert settings.db_query_profiler is False
+        assert settings.db_slow_query_ms == 200
+        assert settings.db_slow_query_explain == 0
+
+        for name in ("DB_SLOW_QUERY_MS", "DB_SLOW_QUERY_EXPLAIN"):
+            monkeypatch.setenv(name, "-1")
+            with pytest.raises(ValidationError) as exc_info:
+                build_settings()
+            assert name in str(exc_info.value)
+            monkeypatch.delenv(name)
+
+    def test_validate_db_pooler_mode(self, monkeypatch):
+        """Test DB_POOLER_MODE / DB_POOLER_NULLPOOL defaults and validation."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        monkeypatch.delenv("DB_POOLER_MODE", raising=False)
+        monkeypatch.delenv("DB_POOLER_NULLPOOL", raising=False)
+
+        settings = build_settings()
+        assert settings.db_pooler_mode == "none"
+        assert settings.db_pooler_nullpool is False
+
+        monkeypatch.setenv("DB_POOLER_MODE", "session")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "DB_POOLER_MODE" in str(exc_info.value)
+
+        # NullPool without an external pooler would connect to Postgres per query
+        monkeypatch.setenv("DB_POOLER_MODE", "none")
+        monkeypatch.setenv("DB_POOLER_NULLPOOL", "true")
+        with pytest.raises(ValidationError) as exc_info:
+            build_settings()
+        assert "DB_POOLER_NULLPOOL" in str(exc_info.value)
+
+        monkeypatch.setenv("DB_POOLER_MODE", "Transaction")
+        settings = build_settings()
+        assert settings.db_pooler_mode == "transaction"
+        assert settings.db_pooler_nullpool is True
+
+    def test_validate_db_pool_validation(self, monkeypatch):
+        """Test pool validation settings and the derived pool_pre_ping."""
+        monkeypatch.setenv("ENV_FILE", "/nonexistent/.env")
+        monkeypatch.setenv("JWT_SECRET", "foobar")
+        for name in (
+            "DB_POOL_VALIDATION",
+            "DB_POOL_VALIDATION_INTERVAL",
+            "DB_POOL_RECYCLE",
+            "DB_POOL_PRE_PING",
+            "DB_POOLER_MODE",
+        ):
+            monkeypatch.delenv(name, raising=False)
+
+        settings = build_settings()
+        assert settings.db_pool_validation == "pre_ping"
+        assert settings.db_pool_validation_interval == 30
+        assert settings.db_pool_recycle == 1800
+        assert settings.pool_pre_ping is True
+
+        monkeypatch.setenv("DB_POOL_VALIDATION", "background")
+        assert build_settings().pool_pre_ping is False
+        monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+        assert build_settings().pool_pre_ping is True
+        monkeypatch.delenv("DB_POOL_PRE_PING")
+
+        # Behind a transaction pooler pre-ping is off unless forced
+        monkeypatch.setenv("DB_POOL_VALIDATION", "pre_ping")
+        monkeypatch.setenv("DB_POOLER_MODE", "transaction")
+        assert build_settings().pool_pre_ping is False
+        monkeypatch.delenv("DB_POOLER_MODE")
+
+        monkeypatch.setenv("DB_POOL_VALIDATION", "sometimes")
+        with pytest.raises(ValidationError):
+            build_settings()
+        monkeypatch.delenv("DB_POOL_VALIDATION")
+
+        monkeypatch.setenv("DB_POOL_VALIDATION_INTERVAL", "0")
+        with pytest.raises(ValidationError):
+            build_settings()
+        monkeypatch.delenv("DB_POOL_VALIDATION_INTERVAL")
+
+        monkeypatch.setenv("DB_POOL_RECYCLE", "-1")
+        assert build_settings().db_pool_recycle == -1
+        monkeypatch.setenv("DB_POOL_RECYCLE", "0")
+        with pytest.raises(ValidationError):
+            build_settings()
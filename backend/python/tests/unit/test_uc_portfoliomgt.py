@@ -15,6 +15,7 @@ from src.domain.aggregates.portfolio.asset import Asset
 from src.domain.aggregates.portfolio.portfolio import Portfolio
 from src.domain.usecases.portfoliomgt.payloads import (
     AssetCreate,
+    AssetUpdate,
     PortfolioCreate,
     PortfolioUpdate,
 )
@@ -174,8 +175,9 @@ class TestPortfolioMgtUseCase:
         mock_db_dataservice.list_assets.return_value = assets
         uc = self.__get_uc(mock_db_dataservice)
 
+        owner_id = "my-id"
         p_id = 5
-        res = await uc.compute_portfolio_valuation(portfolio_id=p_id)
+        res = await uc.compute_portfolio_valuation(owner_id=owner_id, portfolio_id=p_id)
 
         assert res.portfolio_id == p_id
         assert len(res.lines) == len(assets) - 1
@@ -199,6 +201,9 @@ class TestPortfolioMgtUseCase:
             assert res.lines[i].value == a.quantity * price
             total_value += a.quantity * price
         assert res.total_value == total_value
+        mock_db_dataservice.list_assets.assert_awaited_once_with(
+            owner_id=owner_id, portfolio_id=p_id
+        )
 
     async def test_create_asset(self, mock_db_dataservice: DbDataService):
         asset = Asset(
@@ -212,23 +217,50 @@ class TestPortfolioMgtUseCase:
         mock_db_dataservice.create_asset.return_value = asset
         uc = self.__get_uc(mock_db_dataservice)
 
+        owner_id = "my-id"
         p_id = 5
         payload = AssetCreate(symbol="BTC", quantity=8)
-        res = await uc.create_asset(p_id, payload)
+        res = await uc.create_asset(owner_id, p_id, payload)
 
         assert res == asset
-        mock_db_dataservice.create_asset.assert_awaited_once_with(p_id, payload)
+        mock_db_dataservice.create_asset.assert_awaited_once_with(
+            owner_id, p_id, payload
+        )
+
+    async def test_update_asset(self, mock_db_dataservice: DbDataService):
+        asset = Asset(
+            id=8,
+            portfolio_id=3,
+            symbol="BTC",
+            quantity=5,
+            created_at=datetime.now(tz=get_tz()),
+        )
+        mock_db_dataservice.update_asset = AsyncMock()
+        mock_db_dataservice.update_asset.return_value = asset
+        uc = self.__get_uc(mock_db_dataservice)
+        uc.valuation_cache["valuation:3"] = "cached"
+
+        owner_id = "my-id"
+        payload = AssetUpdate(delta=-1)
+        res = await uc.update_asset(owner_id, 3, 8, payload)
+
+        assert res == asset
+        assert "valuation:3" not in uc.valuation_cache
+        mock_db_dataservice.update_asset.assert_awaited_once_with(
+            owner_id, 3, 8, payload
+        )
 
     async def test_delete_asset(self, mock_db_dataservice: DbDataService):
         mock_db_dataservice.delete_asset = AsyncMock()
         mock_db_dataservice.delete_asset.return_value = True
         uc = self.__get_uc(mock_db_dataservice)
 
-        a_id = 8
-        res = await uc.delete_asset(portfolio_id=3, asset_id=a_id)
+        owner_id = "my-id"
+        p_id, a_id = 3, 8
+        res = await uc.delete_asset(owner_id=owner_id, portfolio_id=p_id, asset_id=a_id)
 
         assert res
-        mock_db_dataservice.delete_asset.assert_awaited_once_with(a_id)
+        mock_db_dataservice.delete_asset.assert_awaited_once_with(owner_id, p_id, a_id)
 
     async def test_list_assets_paginated(self, mock_db_dataservice: DbDataService):
         assets = [
@@ -254,9 +286,12 @@ class TestPortfolioMgtUseCase:
         mock_db_dataservice.list_assets_paginated.return_value = assets, page_res
         uc = self.__get_uc(mock_db_dataservice)
 
+        owner_id = "my-id"
         p_id = 14
         page_req = PaginationRequest(items_per_page=28, page=17)
-        res_assets, res_page_res = await uc.list_assets_paginated(p_id, page_req)
+        res_assets, res_page_res = await uc.list_assets_paginated(
+            owner_id, p_id, page_req
+        )
 
         assert len(res_assets) == len(assets)
         for i in range(len(res_assets)):
@@ -269,3 +304,6 @@ class TestPortfolioMgtUseCase:
         assert res_page_res.items_per_page == page_res.items_per_page
         assert res_page_res.total_items == page_res.total_items
         assert res_page_res.total_pages == page_res.total_pages
+        mock_db_dataservice.list_assets_paginated.assert_awaited_once_with(
+            owner_id, p_id, page_req
+        )
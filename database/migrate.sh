@@ -34,6 +34,17 @@ DB_SSLMODE="${DB_SSLMODE:-disable}"
 
 DATABASE_URL="postgresql://${DB_USER}:${DB_PASSWORD}@${DB_HOST}:${DB_PORT}/${DB_NAME}?sslmode=${DB_SSLMODE}"
 
+# DB_BACKEND=sqlite: migrations-sqlite on the DB_SQLITE_PATH file instead
+DB_BACKEND="${DB_BACKEND:-postgres}"
+DOCKER_DB_ARGS=()
+if [ "${DB_BACKEND}" = "sqlite" ]; then
+    MIGRATIONS_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/migrations-sqlite" && pwd)"
+    DB_SQLITE_PATH="$(realpath -m "${DB_SQLITE_PATH:-portfolio.db}")"
+    DATABASE_URL="sqlite3://${DB_SQLITE_PATH}"
+    # the Docker image needs the database file's directory
+    DOCKER_DB_ARGS=(-v "$(dirname "${DB_SQLITE_PATH}"):$(dirname "${DB_SQLITE_PATH}")")
+fi
+
 AUTH_MODE="${AUTH_MODE:-local}"
 
 echo -e "${YELLOW}Migration Configuration:${NC}"
@@ -42,6 +53,10 @@ echo "  Auth mode: ${AUTH_MODE}"
 if [ "${AUTH_MODE}" = "supabase" ] && [ -n "${MIGRATIONS_SUPABASE_DIR}" ]; then
     echo "  Supabase migrations: ${MIGRATIONS_SUPABASE_DIR}"
 fi
+echo "  Backend: ${DB_BACKEND}"
+if [ "${DB_BACKEND}" = "sqlite" ]; then
+    echo "  Database file: ${DB_SQLITE_PATH}"
+fi
 echo "  Database host: ${DB_HOST}:${DB_PORT}"
 echo "  Database name: ${DB_NAME}"
 echo "  Database user: ${DB_USER}"
@@ -69,6 +84,7 @@ run_with_docker() {
     docker run --rm \
         --network host \
         -v "${MIGRATIONS_DIR}:/migrations" \
+        "${DOCKER_DB_ARGS[@]}" \
         migrate/migrate:latest \
         -path=/migrations \
         -database "${DATABASE_URL}" \
@@ -101,6 +117,8 @@ usage() {
     echo "  DB_USER        Database user (default: postgres)"
     echo "  DB_PASSWORD    Database password (default: postgres)"
     echo "  DB_SSLMODE     SSL mode (default: disable)"
+    echo "  DB_BACKEND     postgres | sqlite (default: postgres)"
+    echo "  DB_SQLITE_PATH SQLite database file (default: portfolio.db)"
 }
 
 # Handle create command separately (doesn't need database connection)
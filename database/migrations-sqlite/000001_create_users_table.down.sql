@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS ix_users_email;
+DROP TABLE IF EXISTS users;
@@ -0,0 +1,12 @@
+-- Create users table
+-- UUIDs are stored as 32 hex digits (SQLAlchemy's Uuid type on SQLite); keyed
+-- lookups only, so the table is clustered on the primary key
+CREATE TABLE IF NOT EXISTS users (
+    id CHAR(32) NOT NULL PRIMARY KEY,
+    email VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+
+-- Create unique index on email
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email);
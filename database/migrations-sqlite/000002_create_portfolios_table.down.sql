@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS ix_portfolios_owner_id_id;
+DROP TABLE IF EXISTS portfolios;
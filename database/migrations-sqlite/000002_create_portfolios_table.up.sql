@@ -0,0 +1,14 @@
+-- Create portfolios table
+-- AUTOINCREMENT never hands out a deleted id again, like the Postgres sequence
+CREATE TABLE IF NOT EXISTS portfolios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    owner_id CHAR(32) NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT portfolios_owner_id_fkey FOREIGN KEY (owner_id)
+        REFERENCES users (id)
+        ON DELETE CASCADE
+);
+
+-- WHERE owner_id = ? ORDER BY id DESC
+CREATE INDEX IF NOT EXISTS ix_portfolios_owner_id_id ON portfolios (owner_id, id DESC);
@@ -0,0 +1,4 @@
+DROP INDEX IF EXISTS ix_assets_symbol;
+DROP INDEX IF EXISTS ix_assets_portfolio_id_covering;
+DROP INDEX IF EXISTS ix_assets_portfolio_id_id;
+DROP TABLE IF EXISTS assets;
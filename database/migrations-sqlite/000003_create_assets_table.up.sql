@@ -0,0 +1,20 @@
+-- Create assets table
+CREATE TABLE IF NOT EXISTS assets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id INTEGER NOT NULL,
+    symbol VARCHAR(10) NOT NULL,
+    quantity REAL NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT assets_portfolio_id_fkey FOREIGN KEY (portfolio_id)
+        REFERENCES portfolios (id)
+        ON DELETE CASCADE
+);
+
+-- WHERE portfolio_id = ? ORDER BY id DESC, and the ON DELETE CASCADE lookup
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id_id ON assets (portfolio_id, id DESC);
+
+-- Index-only valuation scans (SQLite has no INCLUDE, the columns are keys)
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id_covering
+    ON assets (portfolio_id, symbol, quantity);
+
+CREATE INDEX IF NOT EXISTS ix_assets_symbol ON assets (symbol);
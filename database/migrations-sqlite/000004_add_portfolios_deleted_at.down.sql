@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS ix_portfolios_deleted_at;
+ALTER TABLE portfolios DROP COLUMN deleted_at;
@@ -0,0 +1,6 @@
+-- Soft delete, purged in the background (see migrations/000011)
+ALTER TABLE portfolios ADD COLUMN deleted_at DATETIME;
+
+-- The purger's backlog
+CREATE INDEX IF NOT EXISTS ix_portfolios_deleted_at
+    ON portfolios (deleted_at) WHERE deleted_at IS NOT NULL;
@@ -0,0 +1,10 @@
+-- Owner -> shard map (see migrations/000014)
+CREATE TABLE IF NOT EXISTS owner_shards (
+    owner_id CHAR(32) NOT NULL PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    moving BOOLEAN NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT owner_shards_owner_id_fkey FOREIGN KEY (owner_id)
+        REFERENCES users (id)
+        ON DELETE CASCADE
+) WITHOUT ROWID;
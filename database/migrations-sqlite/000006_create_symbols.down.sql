@@ -0,0 +1,34 @@
+CREATE TABLE assets_old (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id INTEGER NOT NULL,
+    symbol VARCHAR(10) NOT NULL,
+    quantity REAL NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT assets_portfolio_id_fkey FOREIGN KEY (portfolio_id)
+        REFERENCES portfolios (id)
+        ON DELETE CASCADE
+);
+
+INSERT INTO assets_old (id, portfolio_id, symbol, quantity, created_at)
+SELECT assets.id, assets.portfolio_id, symbols.symbol, assets.quantity, assets.created_at
+FROM assets JOIN symbols ON symbols.id = assets.symbol_id;
+
+UPDATE sqlite_sequence
+SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'assets')
+WHERE name = 'assets_old';
+INSERT INTO sqlite_sequence (name, seq)
+SELECT 'assets_old', seq FROM sqlite_sequence
+WHERE name = 'assets'
+    AND NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'assets_old');
+
+DROP TABLE assets;
+ALTER TABLE assets_old RENAME TO assets;
+
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id_id ON assets (portfolio_id, id DESC);
+
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id_covering
+    ON assets (portfolio_id, symbol, quantity);
+
+CREATE INDEX IF NOT EXISTS ix_assets_symbol ON assets (symbol);
+
+DROP TABLE IF EXISTS symbols;
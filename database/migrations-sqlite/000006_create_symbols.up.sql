@@ -0,0 +1,46 @@
+-- Symbols dimension (see migrations/000015). SQLite can't add a NOT NULL
+-- foreign key column or drop an indexed one: assets is rebuilt.
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol VARCHAR(10) NOT NULL,
+    CONSTRAINT symbols_symbol_key UNIQUE (symbol)
+);
+
+INSERT OR IGNORE INTO symbols (symbol)
+SELECT DISTINCT symbol FROM assets ORDER BY symbol;
+
+CREATE TABLE assets_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id INTEGER NOT NULL,
+    symbol_id INTEGER NOT NULL,
+    quantity REAL NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT assets_portfolio_id_fkey FOREIGN KEY (portfolio_id)
+        REFERENCES portfolios (id)
+        ON DELETE CASCADE,
+    CONSTRAINT assets_symbol_id_fkey FOREIGN KEY (symbol_id)
+        REFERENCES symbols (id)
+);
+
+INSERT INTO assets_new (id, portfolio_id, symbol_id, quantity, created_at)
+SELECT assets.id, assets.portfolio_id, symbols.id, assets.quantity, assets.created_at
+FROM assets JOIN symbols ON symbols.symbol = assets.symbol;
+
+-- ids of deleted assets stay unused
+UPDATE sqlite_sequence
+SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'assets')
+WHERE name = 'assets_new';
+INSERT INTO sqlite_sequence (name, seq)
+SELECT 'assets_new', seq FROM sqlite_sequence
+WHERE name = 'assets'
+    AND NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'assets_new');
+
+DROP TABLE assets;
+ALTER TABLE assets_new RENAME TO assets;
+
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id_id ON assets (portfolio_id, id DESC);
+
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id_covering
+    ON assets (portfolio_id, symbol_id, quantity);
+
+CREATE INDEX IF NOT EXISTS ix_assets_symbol_id ON assets (symbol_id);
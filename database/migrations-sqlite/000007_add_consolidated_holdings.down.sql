@@ -0,0 +1,3 @@
+DROP INDEX IF EXISTS ix_assets_portfolio_id_symbol_id_holding;
+ALTER TABLE assets DROP COLUMN holding;
+ALTER TABLE portfolios DROP COLUMN consolidated;
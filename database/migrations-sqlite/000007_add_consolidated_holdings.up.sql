@@ -0,0 +1,6 @@
+-- Consolidated holdings (see migrations/000016)
+ALTER TABLE portfolios ADD COLUMN consolidated BOOLEAN NOT NULL DEFAULT 0;
+ALTER TABLE assets ADD COLUMN holding BOOLEAN NOT NULL DEFAULT 0;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_assets_portfolio_id_symbol_id_holding
+    ON assets (portfolio_id, symbol_id) WHERE holding;
@@ -0,0 +1,6 @@
+-- Portfolios are always filtered by owner and listed newest first:
+-- WHERE owner_id = $1 ORDER BY id DESC LIMIT/OFFSET reads the index in order.
+-- CONCURRENTLY can't run in a transaction, hence one statement per migration.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_portfolios_owner_id_id
+    ON portfolios USING btree (owner_id ASC NULLS LAST, id DESC)
+    WITH (fillfactor=100, deduplicate_items=True);
@@ -0,0 +1 @@
+DROP INDEX CONCURRENTLY IF EXISTS ix_assets_portfolio_id_id;
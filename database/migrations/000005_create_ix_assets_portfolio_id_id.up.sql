@@ -0,0 +1,5 @@
+-- Assets are listed per portfolio, newest first:
+-- WHERE portfolio_id = $1 ORDER BY id DESC LIMIT/OFFSET reads the index in order.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_assets_portfolio_id_id
+    ON assets USING btree (portfolio_id ASC NULLS LAST, id DESC)
+    WITH (fillfactor=100, deduplicate_items=True);
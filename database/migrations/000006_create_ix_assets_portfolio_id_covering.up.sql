@@ -0,0 +1,6 @@
+-- Valuation scans every (symbol, quantity) of a portfolio: with both columns in
+-- the index leaf pages, the scan can be index-only and skip the heap.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_assets_portfolio_id_covering
+    ON assets USING btree (portfolio_id ASC NULLS LAST)
+    INCLUDE (symbol, quantity)
+    WITH (fillfactor=100);
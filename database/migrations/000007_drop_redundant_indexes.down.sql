@@ -0,0 +1,16 @@
+-- Restore the indexes of 000002 / 000003
+CREATE INDEX IF NOT EXISTS ix_portfolios_id
+    ON portfolios USING btree (id ASC NULLS LAST)
+    WITH (fillfactor=100, deduplicate_items=True);
+
+CREATE INDEX IF NOT EXISTS ix_portfolios_owner_id
+    ON portfolios USING btree (owner_id ASC NULLS LAST)
+    WITH (fillfactor=100, deduplicate_items=True);
+
+CREATE INDEX IF NOT EXISTS ix_assets_id
+    ON assets USING btree (id ASC NULLS LAST)
+    WITH (fillfactor=100, deduplicate_items=True);
+
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id
+    ON assets USING btree (portfolio_id ASC NULLS LAST)
+    WITH (fillfactor=100, deduplicate_items=True);
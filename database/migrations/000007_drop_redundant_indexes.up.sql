@@ -0,0 +1,7 @@
+-- ix_portfolios_id / ix_assets_id duplicate the primary keys, and the single
+-- column owner_id / portfolio_id indexes are prefixes of the composite indexes
+-- (000004, 000005): they only cost writes and vacuum.
+DROP INDEX IF EXISTS ix_portfolios_id;
+DROP INDEX IF EXISTS ix_portfolios_owner_id;
+DROP INDEX IF EXISTS ix_assets_id;
+DROP INDEX IF EXISTS ix_assets_portfolio_id;
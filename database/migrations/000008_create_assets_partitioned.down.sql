@@ -0,0 +1,4 @@
+DROP TRIGGER IF EXISTS assets_mirror_to_partitioned ON assets;
+DROP FUNCTION IF EXISTS assets_mirror_to_partitioned();
+DROP TABLE IF EXISTS assets_partition_backfill;
+DROP TABLE IF EXISTS assets_partitioned CASCADE;
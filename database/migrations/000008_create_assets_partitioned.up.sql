@@ -0,0 +1,77 @@
+-- Step 1/3 of hash-partitioning assets by portfolio_id.
+--
+-- Every asset query filters on portfolio_id, so each one prunes to a single
+-- partition; vacuum, index maintenance and portfolio cascade deletes then work
+-- on partitions ~1/32 of the table.
+--
+-- This creates the partitioned copy and mirrors every write on assets into it.
+-- Existing rows are copied by database/scripts/backfill_assets_partitioned.sh,
+-- then 000009 swaps the tables.
+
+CREATE TABLE IF NOT EXISTS assets_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('assets_id_seq'::regclass),
+    portfolio_id INTEGER NOT NULL,
+    symbol VARCHAR(10) NOT NULL,
+    quantity DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- A unique constraint on a partitioned table must include the partition
+    -- key. (portfolio_id, id) also serves WHERE portfolio_id = ? ORDER BY id DESC
+    -- (scanned backwards), replacing ix_assets_portfolio_id_id.
+    CONSTRAINT assets_partitioned_pkey PRIMARY KEY (portfolio_id, id),
+    CONSTRAINT assets_portfolio_id_fkey FOREIGN KEY (portfolio_id)
+        REFERENCES portfolios (id) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE CASCADE
+) PARTITION BY HASH (portfolio_id);
+
+DO $$
+BEGIN
+    FOR i IN 0..31 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS assets_p%s PARTITION OF assets_partitioned
+                FOR VALUES WITH (MODULUS 32, REMAINDER %s)',
+            lpad(i::text, 2, '0'), i
+        );
+    END LOOP;
+END $$;
+
+CREATE INDEX IF NOT EXISTS ix_assets_partitioned_portfolio_id_covering
+    ON assets_partitioned USING btree (portfolio_id ASC NULLS LAST)
+    INCLUDE (symbol, quantity)
+    WITH (fillfactor=100);
+
+CREATE INDEX IF NOT EXISTS ix_assets_partitioned_symbol
+    ON assets_partitioned USING btree (symbol ASC NULLS LAST)
+    WITH (fillfactor=100, deduplicate_items=True);
+
+-- Backfill progress: rows of assets with id <= last_id have been copied
+CREATE TABLE IF NOT EXISTS assets_partition_backfill (
+    last_id INTEGER NOT NULL
+);
+INSERT INTO assets_partition_backfill (last_id) VALUES (0);
+
+-- Mirror writes made while the backfill runs. Upserts make the order in which
+-- the trigger and the backfill touch a row irrelevant.
+CREATE OR REPLACE FUNCTION assets_mirror_to_partitioned() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM assets_partitioned
+            WHERE portfolio_id = OLD.portfolio_id AND id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO assets_partitioned (id, portfolio_id, symbol, quantity, created_at)
+            VALUES (NEW.id, NEW.portfolio_id, NEW.symbol, NEW.quantity, NEW.created_at)
+            ON CONFLICT (portfolio_id, id) DO UPDATE
+            SET symbol = EXCLUDED.symbol,
+                quantity = EXCLUDED.quantity,
+                created_at = EXCLUDED.created_at;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Waits for in-flight writes to assets: once this commits, rows not mirrored
+-- are all visible to the backfill
+CREATE TRIGGER assets_mirror_to_partitioned
+    AFTER INSERT OR UPDATE OR DELETE ON assets
+    FOR EACH ROW EXECUTE FUNCTION assets_mirror_to_partitioned();
@@ -0,0 +1,62 @@
+-- Swap the unpartitioned table back, with the writes made since the swap
+
+LOCK TABLE assets, assets_unpartitioned IN ACCESS EXCLUSIVE MODE;
+
+DELETE FROM assets_unpartitioned u
+WHERE NOT EXISTS (
+    SELECT 1 FROM assets a WHERE a.portfolio_id = u.portfolio_id AND a.id = u.id
+);
+INSERT INTO assets_unpartitioned (id, portfolio_id, symbol, quantity, created_at)
+SELECT id, portfolio_id, symbol, quantity, created_at
+FROM assets
+ON CONFLICT (id) DO UPDATE
+SET portfolio_id = EXCLUDED.portfolio_id,
+    symbol = EXCLUDED.symbol,
+    quantity = EXCLUDED.quantity,
+    created_at = EXCLUDED.created_at;
+
+ALTER INDEX ix_assets_symbol RENAME TO ix_assets_partitioned_symbol;
+ALTER INDEX ix_assets_portfolio_id_covering
+    RENAME TO ix_assets_partitioned_portfolio_id_covering;
+ALTER TABLE assets RENAME CONSTRAINT assets_pkey TO assets_partitioned_pkey;
+ALTER TABLE assets RENAME TO assets_partitioned;
+
+ALTER INDEX ix_assets_unpartitioned_symbol RENAME TO ix_assets_symbol;
+ALTER INDEX ix_assets_unpartitioned_portfolio_id_covering
+    RENAME TO ix_assets_portfolio_id_covering;
+ALTER INDEX ix_assets_unpartitioned_portfolio_id_id RENAME TO ix_assets_portfolio_id_id;
+ALTER TABLE assets_unpartitioned
+    RENAME CONSTRAINT assets_unpartitioned_portfolio_id_fkey TO assets_portfolio_id_fkey;
+ALTER TABLE assets_unpartitioned RENAME CONSTRAINT assets_unpartitioned_pkey TO assets_pkey;
+ALTER TABLE assets_unpartitioned
+    ALTER COLUMN id SET DEFAULT nextval('assets_id_seq'::regclass);
+ALTER TABLE assets_unpartitioned RENAME TO assets;
+
+-- Back to the state after 000008: both tables in sync, writes mirrored
+CREATE TABLE assets_partition_backfill (
+    last_id INTEGER NOT NULL
+);
+INSERT INTO assets_partition_backfill (last_id)
+SELECT coalesce(max(id), 0) FROM assets;
+
+CREATE OR REPLACE FUNCTION assets_mirror_to_partitioned() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM assets_partitioned
+            WHERE portfolio_id = OLD.portfolio_id AND id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO assets_partitioned (id, portfolio_id, symbol, quantity, created_at)
+            VALUES (NEW.id, NEW.portfolio_id, NEW.symbol, NEW.quantity, NEW.created_at)
+            ON CONFLICT (portfolio_id, id) DO UPDATE
+            SET symbol = EXCLUDED.symbol,
+                quantity = EXCLUDED.quantity,
+                created_at = EXCLUDED.created_at;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER assets_mirror_to_partitioned
+    AFTER INSERT OR UPDATE OR DELETE ON assets
+    FOR EACH ROW EXECUTE FUNCTION assets_mirror_to_partitioned();
@@ -0,0 +1,48 @@
+-- Step 2/3 of hash-partitioning assets: swap the partitioned table in.
+-- Run database/scripts/backfill_assets_partitioned.sh first on a populated
+-- database: this fails, rather than copy the rows under an exclusive lock, if it
+-- hasn't caught up.
+
+LOCK TABLE assets, assets_partitioned IN ACCESS EXCLUSIVE MODE;
+
+-- Rows past the backfill's last id were all mirrored by the trigger once it's
+-- done. Scans from last_id up, so it stops at the first row not copied.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM assets a
+        WHERE a.id > (SELECT last_id FROM assets_partition_backfill)
+          AND NOT EXISTS (
+              SELECT 1 FROM assets_partitioned p
+              WHERE p.portfolio_id = a.portfolio_id AND p.id = a.id
+          )
+    ) THEN
+        RAISE EXCEPTION 'assets_partitioned is missing rows of assets'
+            USING HINT = 'Run ./migrate.sh force 8, '
+                'then ./scripts/backfill_assets_partitioned.sh, then migrate again';
+    END IF;
+END $$;
+
+DROP TRIGGER assets_mirror_to_partitioned ON assets;
+DROP FUNCTION assets_mirror_to_partitioned();
+DROP TABLE assets_partition_backfill;
+
+-- Keep the old table (dropped by 000010) under another name
+ALTER TABLE assets RENAME TO assets_unpartitioned;
+ALTER TABLE assets_unpartitioned ALTER COLUMN id DROP DEFAULT;
+ALTER TABLE assets_unpartitioned RENAME CONSTRAINT assets_pkey TO assets_unpartitioned_pkey;
+ALTER TABLE assets_unpartitioned
+    RENAME CONSTRAINT assets_portfolio_id_fkey TO assets_unpartitioned_portfolio_id_fkey;
+ALTER INDEX ix_assets_portfolio_id_id RENAME TO ix_assets_unpartitioned_portfolio_id_id;
+ALTER INDEX ix_assets_portfolio_id_covering
+    RENAME TO ix_assets_unpartitioned_portfolio_id_covering;
+ALTER INDEX ix_assets_symbol RENAME TO ix_assets_unpartitioned_symbol;
+
+ALTER TABLE assets_partitioned RENAME TO assets;
+ALTER TABLE assets RENAME CONSTRAINT assets_partitioned_pkey TO assets_pkey;
+ALTER INDEX ix_assets_partitioned_portfolio_id_covering
+    RENAME TO ix_assets_portfolio_id_covering;
+ALTER INDEX ix_assets_partitioned_symbol RENAME TO ix_assets_symbol;
+
+ANALYZE assets;
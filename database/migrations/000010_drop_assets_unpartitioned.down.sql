@@ -0,0 +1,27 @@
+-- Recreate the old table (empty) so that 000009 can be rolled back: its down
+-- migration copies the rows back.
+CREATE TABLE IF NOT EXISTS assets_unpartitioned (
+    id INTEGER NOT NULL,
+    portfolio_id INTEGER NOT NULL,
+    symbol VARCHAR(10) NOT NULL,
+    quantity DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT assets_unpartitioned_pkey PRIMARY KEY (id),
+    CONSTRAINT assets_unpartitioned_portfolio_id_fkey FOREIGN KEY (portfolio_id)
+        REFERENCES portfolios (id) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_assets_unpartitioned_portfolio_id_id
+    ON assets_unpartitioned USING btree (portfolio_id ASC NULLS LAST, id DESC)
+    WITH (fillfactor=100, deduplicate_items=True);
+
+CREATE INDEX IF NOT EXISTS ix_assets_unpartitioned_portfolio_id_covering
+    ON assets_unpartitioned USING btree (portfolio_id ASC NULLS LAST)
+    INCLUDE (symbol, quantity)
+    WITH (fillfactor=100);
+
+CREATE INDEX IF NOT EXISTS ix_assets_unpartitioned_symbol
+    ON assets_unpartitioned USING btree (symbol ASC NULLS LAST)
+    WITH (fillfactor=100, deduplicate_items=True);
@@ -0,0 +1,6 @@
+-- Step 3/3 of hash-partitioning assets: drop the old table once the
+-- partitioned one is verified (until then, 000009 can be rolled back).
+DROP INDEX IF EXISTS ix_assets_unpartitioned_portfolio_id_id;
+DROP INDEX IF EXISTS ix_assets_unpartitioned_portfolio_id_covering;
+DROP INDEX IF EXISTS ix_assets_unpartitioned_symbol;
+DROP TABLE IF EXISTS assets_unpartitioned;
@@ -0,0 +1 @@
+ALTER TABLE portfolios DROP COLUMN IF EXISTS deleted_at;
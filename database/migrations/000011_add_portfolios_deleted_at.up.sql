@@ -0,0 +1,4 @@
+-- Soft delete: DELETE /portfolios/{id} only sets deleted_at (every read filters
+-- it out) and the background purger removes the assets in batches, then the
+-- row. A nullable column without default is a catalog-only change.
+ALTER TABLE portfolios ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
@@ -0,0 +1 @@
+DROP INDEX CONCURRENTLY IF EXISTS ix_portfolios_deleted_at;
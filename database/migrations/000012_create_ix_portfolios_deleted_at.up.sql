@@ -0,0 +1,5 @@
+-- The purger's backlog: WHERE deleted_at IS NOT NULL ORDER BY deleted_at.
+-- Partial, so it only holds the (few) portfolios waiting to be purged.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_portfolios_deleted_at
+    ON portfolios USING btree (deleted_at ASC)
+    WHERE deleted_at IS NOT NULL;
@@ -0,0 +1 @@
+DROP TABLE IF EXISTS db_pool_leases;
@@ -0,0 +1,8 @@
+-- Connection budget shared by the backend replicas (DB_POOL_GLOBAL_BUDGET): each
+-- one renews its lease every DB_POOL_ADAPT_INTERVAL seconds, under an advisory
+-- lock, and may only hold what the other live leases leave of the budget.
+CREATE TABLE IF NOT EXISTS db_pool_leases (
+    replica_id  TEXT PRIMARY KEY,
+    connections INTEGER NOT NULL,
+    renewed_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,12 @@
+-- Owner -> shard map of a sharded deployment (DB_SHARDS), read on shard 0 only.
+-- Owners without a row have their portfolios on shard 0.
+CREATE TABLE IF NOT EXISTS owner_shards (
+    owner_id   UUID PRIMARY KEY,
+    shard      INTEGER NOT NULL,
+    -- set while the rebalancer copies the owner's rows to another shard
+    moving     BOOLEAN NOT NULL DEFAULT false,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT owner_shards_owner_id_fkey FOREIGN KEY (owner_id)
+        REFERENCES users (id)
+        ON DELETE CASCADE
+);
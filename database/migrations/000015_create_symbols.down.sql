@@ -0,0 +1,20 @@
+ALTER TABLE assets ADD COLUMN IF NOT EXISTS symbol VARCHAR(10);
+UPDATE assets SET symbol = symbols.symbol
+    FROM symbols
+    WHERE symbols.id = assets.symbol_id;
+ALTER TABLE assets ALTER COLUMN symbol SET NOT NULL;
+
+DROP INDEX IF EXISTS ix_assets_portfolio_id_covering;
+DROP INDEX IF EXISTS ix_assets_symbol_id;
+ALTER TABLE assets DROP COLUMN symbol_id;
+
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id_covering
+    ON assets USING btree (portfolio_id ASC NULLS LAST)
+    INCLUDE (symbol, quantity)
+    WITH (fillfactor=100);
+
+CREATE INDEX IF NOT EXISTS ix_assets_symbol
+    ON assets USING btree (symbol ASC NULLS LAST)
+    WITH (fillfactor=100, deduplicate_items=True);
+
+DROP TABLE IF EXISTS symbols;
@@ -0,0 +1,37 @@
+-- Symbols dimension: every asset row repeated its VARCHAR symbol (and so did the
+-- covering and symbol indexes). Symbols are now stored once and assets reference
+-- them by an INTEGER id, which the backend maps back in process. Not SMALLINT:
+-- users add symbols, and 32,767 of them could run out.
+CREATE TABLE IF NOT EXISTS symbols (
+    id     INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    symbol VARCHAR(10) NOT NULL,
+    CONSTRAINT symbols_symbol_key UNIQUE (symbol)
+);
+
+INSERT INTO symbols (symbol)
+SELECT DISTINCT symbol FROM assets ORDER BY symbol
+ON CONFLICT (symbol) DO NOTHING;
+
+-- Backfill. The UPDATE rewrites every asset row: on a large table, run it
+-- off-peak.
+ALTER TABLE assets ADD COLUMN IF NOT EXISTS symbol_id INTEGER;
+UPDATE assets SET symbol_id = symbols.id
+    FROM symbols
+    WHERE symbols.symbol = assets.symbol;
+ALTER TABLE assets ALTER COLUMN symbol_id SET NOT NULL;
+ALTER TABLE assets ADD CONSTRAINT assets_symbol_id_fkey
+    FOREIGN KEY (symbol_id) REFERENCES symbols (id);
+
+DROP INDEX IF EXISTS ix_assets_portfolio_id_covering;
+DROP INDEX IF EXISTS ix_assets_symbol;
+ALTER TABLE assets DROP COLUMN symbol;
+
+-- Index-only valuation scans, on 4-byte symbol ids
+CREATE INDEX IF NOT EXISTS ix_assets_portfolio_id_covering
+    ON assets USING btree (portfolio_id ASC NULLS LAST)
+    INCLUDE (symbol_id, quantity)
+    WITH (fillfactor=100);
+
+CREATE INDEX IF NOT EXISTS ix_assets_symbol_id
+    ON assets USING btree (symbol_id ASC NULLS LAST)
+    WITH (fillfactor=100, deduplicate_items=True);
@@ -0,0 +1,13 @@
+-- Consolidated holdings, opt-in per portfolio: adding an asset to a consolidated
+-- portfolio upserts its one holding row for the symbol (quantity added) instead
+-- of inserting a row per buy. Constant defaults: both columns are catalog-only.
+ALTER TABLE portfolios ADD COLUMN IF NOT EXISTS consolidated BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE assets ADD COLUMN IF NOT EXISTS holding BOOLEAN NOT NULL DEFAULT false;
+
+-- The upsert's conflict target. Partial: rows written before a portfolio was
+-- consolidated (or while it isn't) may repeat a symbol until the compaction job
+-- merges them into the holding row. A partitioned table can't build an index
+-- CONCURRENTLY; no row is a holding yet, but the build still scans assets.
+CREATE UNIQUE INDEX IF NOT EXISTS ix_assets_portfolio_id_symbol_id_holding
+    ON assets USING btree (portfolio_id, symbol_id)
+    WHERE holding;
@@ -0,0 +1,74 @@
+#!/bin/bash
+set -euo pipefail
+
+# Copies the existing rows of `assets` into `assets_partitioned` (created by
+# migration 000008), in small batches so the app keeps running.
+#
+#   ./migrate.sh up 8                              # partitioned table + mirror trigger
+#   ./scripts/backfill_assets_partitioned.sh       # this script
+#   ./migrate.sh up 1                              # 000009: swap the tables
+#   ./migrate.sh up 1                              # 000010: drop the old table, once verified
+#
+# Resumable: progress is kept in assets_partition_backfill. Rows written after
+# 000008 are mirrored by its trigger, so only ids up to the current max are copied.
+# Each batch locks its source rows FOR SHARE: a concurrent delete/update waits for
+# the batch to commit, then the trigger mirrors it.
+
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+if [ -f "../backend/.env" ]; then
+    echo -e "${GREEN}Loading environment from ../backend/.env${NC}"
+    export $(cat ../backend/.env | grep -v '^#' | xargs)
+fi
+
+DB_HOST="${DB_HOST:-localhost}"
+DB_PORT="${DB_PORT:-5432}"
+DB_NAME="${DB_NAME:-portfolio_db}"
+DB_USER="${DB_USER:-postgres}"
+DB_PASSWORD="${DB_PASSWORD:-postgres}"
+DB_SSLMODE="${DB_SSLMODE:-disable}"
+BATCH_SIZE="${BATCH_SIZE:-10000}"
+# Pause between batches (seconds), to leave I/O to the app and replicas
+BATCH_PAUSE="${BATCH_PAUSE:-0}"
+
+DATABASE_URL="postgresql://${DB_USER}:${DB_PASSWORD}@${DB_HOST}:${DB_PORT}/${DB_NAME}?sslmode=${DB_SSLMODE}"
+
+psql_q() {
+    psql "${DATABASE_URL}" -v ON_ERROR_STOP=1 -qtAX "$@"
+}
+
+STOP_ID=$(psql_q -c "SELECT coalesce(max(id), 0) FROM assets")
+echo -e "${YELLOW}Backfilling assets_partitioned up to id ${STOP_ID} (batches of ${BATCH_SIZE})${NC}"
+
+while true; do
+    LAST_ID=$(psql_q -v stop_id="${STOP_ID}" -v batch_size="${BATCH_SIZE}" <<'SQL'
+BEGIN;
+WITH batch AS (
+    SELECT id, portfolio_id, symbol, quantity, created_at
+    FROM assets
+    WHERE id > (SELECT last_id FROM assets_partition_backfill)
+      AND id <= :stop_id
+    ORDER BY id
+    LIMIT :batch_size
+    FOR SHARE
+), copied AS (
+    INSERT INTO assets_partitioned (id, portfolio_id, symbol, quantity, created_at)
+    SELECT id, portfolio_id, symbol, quantity, created_at FROM batch
+    ON CONFLICT (portfolio_id, id) DO NOTHING
+)
+UPDATE assets_partition_backfill
+SET last_id = coalesce((SELECT max(id) FROM batch), :stop_id)
+RETURNING last_id;
+COMMIT;
+SQL
+)
+    echo "  copied up to id ${LAST_ID}"
+    if [ "${LAST_ID}" -ge "${STOP_ID}" ]; then
+        break
+    fi
+    sleep "${BATCH_PAUSE}"
+done
+
+echo -e "${GREEN}Backfill done: run ./migrate.sh up 1 to swap the tables (000009)${NC}"
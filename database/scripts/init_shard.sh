@@ -0,0 +1,35 @@
+#!/bin/bash
+set -euo pipefail
+
+# Prepares a migrated database to serve as one of the backend's DB_SHARDS:
+#
+#   DB_HOST=pg-shard-1 ./migrate.sh up
+#   DB_HOST=pg-shard-1 ./scripts/init_shard.sh
+#
+# The users (and owner_shards) live on shard 0, the primary: a portfolio on
+# another shard can't reference its owner, so the owner foreign key is dropped.
+# Don't run it on shard 0.
+
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+if [ -f "../backend/.env" ]; then
+    echo -e "${GREEN}Loading environment from ../backend/.env${NC}"
+    export $(cat ../backend/.env | grep -v '^#' | xargs)
+fi
+
+DB_HOST="${DB_HOST:-localhost}"
+DB_PORT="${DB_PORT:-5432}"
+DB_NAME="${DB_NAME:-portfolio_db}"
+DB_USER="${DB_USER:-postgres}"
+DB_PASSWORD="${DB_PASSWORD:-postgres}"
+DB_SSLMODE="${DB_SSLMODE:-disable}"
+
+DATABASE_URL="postgresql://${DB_USER}:${DB_PASSWORD}@${DB_HOST}:${DB_PORT}/${DB_NAME}?sslmode=${DB_SSLMODE}"
+
+echo -e "${YELLOW}Initialising ${DB_HOST}:${DB_PORT}/${DB_NAME} as a shard${NC}"
+psql "${DATABASE_URL}" -v ON_ERROR_STOP=1 -q <<'SQL'
+ALTER TABLE portfolios DROP CONSTRAINT IF EXISTS portfolios_owner_id_fkey;
+SQL
+echo -e "${GREEN}Done${NC}"